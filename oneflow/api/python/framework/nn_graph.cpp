@@ -55,6 +55,8 @@ ONEFLOW_API_PYBIND11_MODULE("nn.graph.", m) {
            &NNGraph::RegisterAdditionalVarOpNamesAndTensorsToBeLoaded)
       .def_property_readonly("additional_var_names", &APINNGraphAdditionalVarNames)
       .def_property_readonly("additional_var_tensors", &APINNGraphAdditionalVarTensors)
+      .def("enable_compile_cache", &NNGraph::EnableCompileCache)
+      .def_property_readonly("compile_cache_hit", &NNGraph::compile_cache_hit)
       .def("complie_and_init_runtime", &NNGraph::CompileAndInitRuntime);
 
   m.def("RunLazyNNGraph", &RunLazyNNGraph);
@@ -32,6 +32,8 @@ ONEFLOW_API_PYBIND11_MODULE("profiler", m) {
 
   m.def("EnableProfiler", &profiler::EnableProfiler);
 
+  m.def("IsProfilerEnabled", &profiler::IsProfilerEnabled);
+
   m.def("DisableProfilerAndReturnResult", &profiler::DisableProfilerAndReturnResult);
 
   m.def("StartRecord", &profiler::StartRecord);
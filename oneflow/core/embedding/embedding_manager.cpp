@@ -17,14 +17,29 @@ limitations under the License.
 #include "oneflow/core/embedding/persistent_table_key_value_store.h"
 #include "oneflow/core/ep/include/device_manager_registry.h"
 #include "oneflow/core/embedding/cached_key_value_store.h"
+#include "oneflow/core/embedding/host_key_value_store.h"
+#include "oneflow/core/device/cuda_util.h"
 
 namespace oneflow {
 
 namespace embedding {
 
+constexpr size_t kDefaultMaxQueryLength = 65536;
+
 #ifdef WITH_CUDA
 
-constexpr size_t kDefaultMaxQueryLength = 65536;
+namespace {
+
+// CUDA backed stores must run on the device of their rank, the host store needs no device.
+std::unique_ptr<CudaCurrentDeviceGuard> NewCurrentDeviceGuard(DeviceType device_type,
+                                                              int64_t local_rank_id) {
+  if (device_type != DeviceType::kCUDA) { return nullptr; }
+  return std::make_unique<CudaCurrentDeviceGuard>(local_rank_id);
+}
+
+}  // namespace
+
+#endif  // WITH_CUDA
 
 KeyValueStore* EmbeddingManager::GetKeyValueStore(const std::string& embedding_name,
                                                   int64_t rank_id) {
@@ -39,54 +54,81 @@ KeyValueStore* EmbeddingManager::GetKeyValueStore(const std::string& embedding_n
 void EmbeddingManager::CreateKeyValueStore(const KeyValueStoreOptions& key_value_store_options,
                                            int64_t local_rank_id, int64_t rank_id,
                                            int64_t world_size) {
-  CudaCurrentDeviceGuard guard(local_rank_id);
   const std::string& name = key_value_store_options.Name();
   const uint32_t line_size = key_value_store_options.LineSize();
   std::pair<std::string, int64_t> map_key = std::make_pair(name, rank_id);
   std::unique_lock<std::mutex> lock(mutex_);
 
   std::unique_ptr<KeyValueStore> store;
-  PersistentTableKeyValueStoreOptions options{};
+  PersistentTableOptions table_options{};
   const std::vector<std::string>& persistent_table_paths =
       key_value_store_options.PersistentTablePaths();
   CHECK_EQ(persistent_table_paths.size(), world_size);
-  options.table_options.path = persistent_table_paths.at(rank_id);
-  options.table_options.value_size = line_size * key_value_store_options.ValueTypeSize();
-  options.table_options.key_size = key_value_store_options.KeyTypeSize();
-  options.table_options.physical_block_size =
-      key_value_store_options.PersistentTablePhysicalBlockSize();
-  options.table_options.target_chunk_size_mb = 4 * 1024;
-  options.table_options.capacity_hint = key_value_store_options.PersistentTableCapacityHint();
-  store = NewPersistentTableKeyValueStore(options);
+  table_options.path = persistent_table_paths.at(rank_id);
+  table_options.value_size = line_size * key_value_store_options.ValueTypeSize();
+  table_options.key_size = key_value_store_options.KeyTypeSize();
+  table_options.physical_block_size = key_value_store_options.PersistentTablePhysicalBlockSize();
+  table_options.target_chunk_size_mb = 4 * 1024;
+  table_options.capacity_hint = key_value_store_options.PersistentTableCapacityHint();
+  table_options.compaction_occupancy_threshold =
+      key_value_store_options.PersistentTableCompactionOccupancyThreshold();
+  table_options.compaction_interval_ms =
+      key_value_store_options.PersistentTableCompactionIntervalMs();
   const std::vector<CacheOptions>& cache_options = key_value_store_options.GetCachesOptions();
-  for (int i = cache_options.size() - 1; i >= 0; --i) {
-    std::unique_ptr<Cache> cache = NewCache(cache_options.at(i));
-    store = NewCachedKeyValueStore(std::move(store), std::move(cache));
+  if (key_value_store_options.GetDeviceType() == DeviceType::kCPU) {
+    HostKeyValueStoreOptions options{};
+    options.table_options = table_options;
+    CHECK_LE(cache_options.size(), 1) << "CPU embedding supports at most one host memory cache";
+    if (!cache_options.empty()) {
+      CHECK(cache_options.at(0).value_memory_kind == CacheOptions::MemoryKind::kHost)
+          << "CPU embedding only supports host memory cache";
+      options.cache_policy = cache_options.at(0).policy;
+      options.cache_capacity = cache_options.at(0).capacity;
+    }
+    store = NewHostKeyValueStore(options);
+  } else {
+#ifdef WITH_CUDA
+    CudaCurrentDeviceGuard guard(local_rank_id);
+    PersistentTableKeyValueStoreOptions options{};
+    options.table_options = table_options;
+    store = NewPersistentTableKeyValueStore(options);
+    for (int i = cache_options.size() - 1; i >= 0; --i) {
+      std::unique_ptr<Cache> cache = NewCache(cache_options.at(i));
+      store = NewCachedKeyValueStore(std::move(store), std::move(cache));
+    }
+#else
+    UNIMPLEMENTED() << "CUDA embedding is only supported when built with CUDA";
+#endif  // WITH_CUDA
   }
   store->ReserveQueryLength(kDefaultMaxQueryLength);
   CHECK(key_value_store_map_.emplace(map_key, std::move(store)).second)
       << "Can't create an embedding with same name of an existing embedding, the name: " << name;
+  key_value_store_device_type_map_[map_key] = key_value_store_options.GetDeviceType();
 }
 
 void EmbeddingManager::SaveSnapshot(const std::string& embedding_name, int64_t local_rank_id,
                                     int64_t rank_id, const std::string& snapshot_name) {
-  CudaCurrentDeviceGuard guard(local_rank_id);
   std::pair<std::string, int64_t> map_key = std::make_pair(embedding_name, rank_id);
   std::unique_lock<std::mutex> lock(mutex_);
 
   auto it = key_value_store_map_.find(map_key);
   CHECK(it != key_value_store_map_.end())
       << "Can not find embedding: " << embedding_name << "-" << rank_id;
+#ifdef WITH_CUDA
+  auto guard = NewCurrentDeviceGuard(key_value_store_device_type_map_.at(map_key), local_rank_id);
+#endif  // WITH_CUDA
   it->second->SaveSnapshot(snapshot_name);
 }
 
 void EmbeddingManager::LoadSnapshot(const std::string& embedding_name, int64_t local_rank_id,
                                     int64_t rank_id, const std::string& snapshot_name) {
-  CudaCurrentDeviceGuard guard(local_rank_id);
   std::pair<std::string, int64_t> map_key = std::make_pair(embedding_name, rank_id);
   auto it = key_value_store_map_.find(map_key);
   CHECK(it != key_value_store_map_.end())
       << "Can not find embedding: " << embedding_name << "-" << rank_id;
+#ifdef WITH_CUDA
+  auto guard = NewCurrentDeviceGuard(key_value_store_device_type_map_.at(map_key), local_rank_id);
+#endif  // WITH_CUDA
   if (it->second->SnapshotExists(snapshot_name)) {
     it->second->LoadSnapshot(snapshot_name);
   } else {
@@ -95,8 +137,6 @@ void EmbeddingManager::LoadSnapshot(const std::string& embedding_name, int64_t l
   }
 }
 
-#endif  // WITH_CUDA
-
 }  // namespace embedding
 
 }  // namespace oneflow
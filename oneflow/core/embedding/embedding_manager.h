@@ -16,8 +16,6 @@ limitations under the License.
 #ifndef ONEFLOW_CORE_EMBEDDING_EMBEDDING_MANAGER_H_
 #define ONEFLOW_CORE_EMBEDDING_EMBEDDING_MANAGER_H_
 
-#include "oneflow/core/device/cuda_util.h"
-
 #include "oneflow/core/embedding/key_value_store.h"
 #include "oneflow/core/embedding/key_value_store_options.h"
 
@@ -25,8 +23,6 @@ namespace oneflow {
 
 namespace embedding {
 
-#ifdef WITH_CUDA
-
 class EmbeddingManager final {
  public:
   EmbeddingManager() = default;
@@ -44,11 +40,10 @@ class EmbeddingManager final {
 
  private:
   HashMap<std::pair<std::string, int64_t>, std::unique_ptr<KeyValueStore>> key_value_store_map_;
+  HashMap<std::pair<std::string, int64_t>, DeviceType> key_value_store_device_type_map_;
   std::mutex mutex_;
 };
 
-#endif  // WITH_CUDA
-
 }  // namespace embedding
 }  // namespace oneflow
 
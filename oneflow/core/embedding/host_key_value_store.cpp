@@ -0,0 +1,400 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/embedding/host_key_value_store.h"
+#include "oneflow/core/embedding/hash_functions.cuh"
+#include "oneflow/core/thread/thread_manager.h"
+#include <robin_hood.h>
+
+namespace oneflow {
+
+namespace embedding {
+
+namespace {
+
+constexpr uint8_t kReferencedFlag = 1;
+constexpr uint8_t kDirtyFlag = 2;
+constexpr uint32_t kMaxSyncBatchSize = 65536;
+
+enum class RowState : uint8_t { kHit = 0, kLoaded, kMissing };
+
+class IteratorImpl : public KVIterator {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(IteratorImpl);
+  explicit IteratorImpl(PersistentTable::Iterator* base_iter) : base_iter_(base_iter) {}
+  ~IteratorImpl() override = default;
+
+  void NextN(ep::Stream* stream, uint32_t n_request, uint32_t* n_result, void* keys,
+             void* values) override {
+    base_iter_->Next(n_request, n_result, keys, values);
+  }
+
+  void Reset() override { base_iter_->Reset(); }
+
+ private:
+  PersistentTable::Iterator* base_iter_;
+};
+
+// One shard of the in-memory table. Shards are only touched by one thread at a time, rows are
+// stored in contiguous slots and evicted with the CLOCK approximation of LRU.
+template<typename Key>
+class Shard final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(Shard);
+  Shard(uint32_t value_size, uint64_t capacity, CacheOptions::Policy policy)
+      : value_size_(value_size), capacity_(capacity), policy_(policy), clock_hand_(0) {
+    index_.reserve(capacity);
+    keys_.reserve(capacity);
+    values_.reserve(capacity * value_size);
+    flags_.reserve(capacity);
+  }
+  ~Shard() = default;
+
+  bool Get(Key key, void* value) {
+    auto it = index_.find(key);
+    if (it == index_.end()) { return false; }
+    const uint64_t slot = it->second;
+    std::memcpy(value, Value(slot), value_size_);
+    flags_[slot] |= kReferencedFlag;
+    return true;
+  }
+
+  void Put(Key key, const void* value, bool dirty, std::vector<Key>* evicted_keys,
+           std::vector<char>* evicted_values) {
+    uint64_t slot = 0;
+    auto it = index_.find(key);
+    if (it != index_.end()) {
+      slot = it->second;
+    } else {
+      slot = AcquireSlot(evicted_keys, evicted_values);
+      keys_[slot] = key;
+      flags_[slot] = 0;
+      index_[key] = slot;
+    }
+    std::memcpy(Value(slot), value, value_size_);
+    flags_[slot] |= kReferencedFlag;
+    if (dirty) { flags_[slot] |= kDirtyFlag; }
+  }
+
+  void ForEachDirty(const std::function<void(Key key, const char* value)>& Handler) {
+    for (uint64_t slot = 0; slot < keys_.size(); ++slot) {
+      if ((flags_[slot] & kDirtyFlag) == 0) { continue; }
+      Handler(keys_[slot], Value(slot));
+      flags_[slot] &= ~kDirtyFlag;
+    }
+  }
+
+  void Clear() {
+    index_.clear();
+    keys_.clear();
+    values_.clear();
+    flags_.clear();
+    clock_hand_ = 0;
+  }
+
+ private:
+  char* Value(uint64_t slot) { return values_.data() + slot * value_size_; }
+
+  uint64_t AcquireSlot(std::vector<Key>* evicted_keys, std::vector<char>* evicted_values) {
+    const uint64_t num_slots = keys_.size();
+    if (policy_ == CacheOptions::Policy::kFull || num_slots < capacity_) {
+      keys_.emplace_back();
+      values_.resize(values_.size() + value_size_);
+      flags_.push_back(0);
+      return num_slots;
+    }
+    while (true) {
+      const uint64_t slot = clock_hand_;
+      clock_hand_ = (clock_hand_ + 1) % num_slots;
+      if ((flags_[slot] & kReferencedFlag) != 0) {
+        flags_[slot] &= ~kReferencedFlag;
+        continue;
+      }
+      if ((flags_[slot] & kDirtyFlag) != 0) {
+        evicted_keys->push_back(keys_[slot]);
+        evicted_values->insert(evicted_values->end(), Value(slot), Value(slot) + value_size_);
+      }
+      index_.erase(keys_[slot]);
+      return slot;
+    }
+  }
+
+  uint32_t value_size_;
+  uint64_t capacity_;
+  CacheOptions::Policy policy_;
+  uint64_t clock_hand_;
+  robin_hood::unordered_flat_map<Key, uint64_t> index_;
+  std::vector<Key> keys_;
+  std::vector<char> values_;
+  std::vector<uint8_t> flags_;
+};
+
+template<typename Key>
+class KeyValueStoreImpl : public KeyValueStore {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(KeyValueStoreImpl);
+  explicit KeyValueStoreImpl(const HostKeyValueStoreOptions& options)
+      : key_size_(options.table_options.key_size),
+        value_size_(options.table_options.value_size),
+        max_query_length_(0) {
+    CHECK_EQ(key_size_, sizeof(Key));
+    table_ = NewPersistentTable(options.table_options);
+    if (options.cache_capacity > 0) {
+      const uint32_t num_shards = options.num_shards;
+      CHECK_GT(num_shards, 0);
+      const uint64_t shard_capacity = (options.cache_capacity + num_shards - 1) / num_shards;
+      shards_.resize(num_shards);
+      for (auto& shard : shards_) {
+        shard.reset(new Shard<Key>(value_size_, shard_capacity, options.cache_policy));
+      }
+      shard_offsets_.resize(num_shards + 1);
+      shard_cursors_.resize(num_shards);
+      evicted_keys_.resize(num_shards);
+      evicted_values_.resize(num_shards);
+    }
+  }
+  ~KeyValueStoreImpl() override = default;
+
+  uint32_t KeySize() const override { return key_size_; }
+
+  uint32_t ValueSize() const override { return value_size_; }
+
+  uint32_t MaxQueryLength() const override { return max_query_length_; }
+
+  void ReserveQueryLength(uint32_t query_length) override {
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (query_length <= max_query_length_) { return; }
+    key_shard_ids_.resize(query_length);
+    shard_indices_.resize(query_length);
+    row_states_.resize(query_length);
+    table_query_indices_.resize(query_length);
+    table_keys_.resize(query_length);
+    table_values_.resize(static_cast<size_t>(query_length) * value_size_);
+    table_missing_indices_.resize(query_length);
+    max_query_length_ = query_length;
+  }
+
+  void Get(ep::Stream* stream, uint32_t num_keys, const void* keys, void* values,
+           uint32_t* n_missing, uint32_t* missing_indices) override;
+  void Put(ep::Stream* stream, uint32_t num_keys, const void* keys, const void* values) override;
+  bool SnapshotExists(const std::string& name) override;
+  void LoadSnapshot(const std::string& name) override;
+  void LoadSnapshot(const std::string& name,
+                    const std::function<void(KVIterator* iter)>& Hook) override;
+  void SaveSnapshot(const std::string& name) override;
+
+ private:
+  void PartitionKeys(uint32_t num_keys, const Key* keys);
+  void PutEvictedToTable();
+  void SyncCacheToTable();
+
+  uint32_t key_size_;
+  uint32_t value_size_;
+  uint32_t max_query_length_;
+
+  std::mutex mutex_;
+  std::unique_ptr<PersistentTable> table_;
+  std::vector<std::unique_ptr<Shard<Key>>> shards_;
+  std::vector<uint32_t> shard_offsets_;
+  std::vector<uint32_t> shard_cursors_;
+  std::vector<uint32_t> key_shard_ids_;
+  std::vector<uint32_t> shard_indices_;
+  std::vector<RowState> row_states_;
+  std::vector<uint32_t> table_query_indices_;
+  std::vector<Key> table_keys_;
+  std::vector<char> table_values_;
+  std::vector<uint32_t> table_missing_indices_;
+  std::vector<std::vector<Key>> evicted_keys_;
+  std::vector<std::vector<char>> evicted_values_;
+};
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::PartitionKeys(uint32_t num_keys, const Key* keys) {
+  const uint32_t num_shards = shards_.size();
+  std::fill(shard_offsets_.begin(), shard_offsets_.end(), 0);
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    const uint32_t shard_id = FullCacheHash()(static_cast<uint64_t>(keys[i])) % num_shards;
+    key_shard_ids_[i] = shard_id;
+    shard_offsets_[shard_id + 1] += 1;
+  }
+  for (uint32_t i = 0; i < num_shards; ++i) {
+    shard_offsets_[i + 1] += shard_offsets_[i];
+    shard_cursors_[i] = shard_offsets_[i];
+  }
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    shard_indices_[shard_cursors_[key_shard_ids_[i]]++] = i;
+  }
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::PutEvictedToTable() {
+  for (size_t i = 0; i < shards_.size(); ++i) {
+    if (evicted_keys_[i].empty()) { continue; }
+    table_->Put(evicted_keys_[i].size(), evicted_keys_[i].data(), evicted_values_[i].data());
+    evicted_keys_[i].clear();
+    evicted_values_[i].clear();
+  }
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::SyncCacheToTable() {
+  std::vector<Key> keys;
+  std::vector<char> values;
+  for (auto& shard : shards_) {
+    shard->ForEachDirty([&](Key key, const char* value) {
+      keys.push_back(key);
+      values.insert(values.end(), value, value + value_size_);
+      if (keys.size() == kMaxSyncBatchSize) {
+        table_->Put(keys.size(), keys.data(), values.data());
+        keys.clear();
+        values.clear();
+      }
+    });
+  }
+  if (!keys.empty()) { table_->Put(keys.size(), keys.data(), values.data()); }
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::Get(ep::Stream* stream, uint32_t num_keys, const void* keys,
+                                 void* values, uint32_t* n_missing, uint32_t* missing_indices) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  CHECK_LE(num_keys, max_query_length_);
+  if (shards_.empty()) {
+    table_->Get(num_keys, keys, values, n_missing, missing_indices);
+    return;
+  }
+  *n_missing = 0;
+  if (num_keys == 0) { return; }
+  const Key* query_keys = static_cast<const Key*>(keys);
+  char* query_values = static_cast<char*>(values);
+  PartitionKeys(num_keys, query_keys);
+  MultiThreadLoop(shards_.size(), [&](size_t shard_id) {
+    Shard<Key>* shard = shards_[shard_id].get();
+    for (uint32_t i = shard_offsets_[shard_id]; i < shard_offsets_[shard_id + 1]; ++i) {
+      const uint32_t index = shard_indices_[i];
+      const bool hit =
+          shard->Get(query_keys[index], query_values + static_cast<size_t>(index) * value_size_);
+      row_states_[index] = hit ? RowState::kHit : RowState::kMissing;
+    }
+  });
+  uint32_t num_cache_missing = 0;
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    if (row_states_[i] == RowState::kHit) { continue; }
+    table_query_indices_[num_cache_missing] = i;
+    table_keys_[num_cache_missing] = query_keys[i];
+    row_states_[i] = RowState::kLoaded;
+    num_cache_missing += 1;
+  }
+  if (num_cache_missing == 0) { return; }
+  uint32_t num_table_missing = 0;
+  table_->Get(num_cache_missing, table_keys_.data(), table_values_.data(), &num_table_missing,
+              table_missing_indices_.data());
+  for (uint32_t i = 0; i < num_table_missing; ++i) {
+    const uint32_t index = table_query_indices_[table_missing_indices_[i]];
+    row_states_[index] = RowState::kMissing;
+    missing_indices[i] = index;
+  }
+  *n_missing = num_table_missing;
+  if (num_table_missing == num_cache_missing) { return; }
+  for (uint32_t i = 0; i < num_cache_missing; ++i) {
+    const uint32_t index = table_query_indices_[i];
+    if (row_states_[index] != RowState::kLoaded) { continue; }
+    std::memcpy(query_values + static_cast<size_t>(index) * value_size_,
+                table_values_.data() + static_cast<size_t>(i) * value_size_, value_size_);
+  }
+  MultiThreadLoop(shards_.size(), [&](size_t shard_id) {
+    Shard<Key>* shard = shards_[shard_id].get();
+    for (uint32_t i = shard_offsets_[shard_id]; i < shard_offsets_[shard_id + 1]; ++i) {
+      const uint32_t index = shard_indices_[i];
+      if (row_states_[index] != RowState::kLoaded) { continue; }
+      shard->Put(query_keys[index], query_values + static_cast<size_t>(index) * value_size_,
+                 false, &evicted_keys_[shard_id], &evicted_values_[shard_id]);
+    }
+  });
+  PutEvictedToTable();
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::Put(ep::Stream* stream, uint32_t num_keys, const void* keys,
+                                 const void* values) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  CHECK_LE(num_keys, max_query_length_);
+  if (num_keys == 0) { return; }
+  if (shards_.empty()) {
+    table_->Put(num_keys, keys, values);
+    return;
+  }
+  const Key* query_keys = static_cast<const Key*>(keys);
+  const char* query_values = static_cast<const char*>(values);
+  PartitionKeys(num_keys, query_keys);
+  MultiThreadLoop(shards_.size(), [&](size_t shard_id) {
+    Shard<Key>* shard = shards_[shard_id].get();
+    for (uint32_t i = shard_offsets_[shard_id]; i < shard_offsets_[shard_id + 1]; ++i) {
+      const uint32_t index = shard_indices_[i];
+      shard->Put(query_keys[index], query_values + static_cast<size_t>(index) * value_size_, true,
+                 &evicted_keys_[shard_id], &evicted_values_[shard_id]);
+    }
+  });
+  PutEvictedToTable();
+}
+
+template<typename Key>
+bool KeyValueStoreImpl<Key>::SnapshotExists(const std::string& name) {
+  return table_->SnapshotExists(name);
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::LoadSnapshot(const std::string& name) {
+  LoadSnapshot(name, nullptr);
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::LoadSnapshot(const std::string& name,
+                                          const std::function<void(KVIterator* iter)>& Hook) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  for (auto& shard : shards_) { shard->Clear(); }
+  if (Hook) {
+    table_->LoadSnapshot(name, [&](PersistentTable::Iterator* chunk_iterator) {
+      IteratorImpl iterator(chunk_iterator);
+      Hook(&iterator);
+    });
+  } else {
+    table_->LoadSnapshot(name);
+  }
+}
+
+template<typename Key>
+void KeyValueStoreImpl<Key>::SaveSnapshot(const std::string& name) {
+  std::lock_guard<std::mutex> lock(mutex_);
+  SyncCacheToTable();
+  table_->SaveSnapshot(name);
+}
+
+}  // namespace
+
+std::unique_ptr<KeyValueStore> NewHostKeyValueStore(const HostKeyValueStoreOptions& options) {
+  if (options.table_options.key_size == sizeof(uint64_t)) {
+    return std::unique_ptr<KeyValueStore>(new KeyValueStoreImpl<uint64_t>(options));
+  } else if (options.table_options.key_size == sizeof(uint32_t)) {
+    return std::unique_ptr<KeyValueStore>(new KeyValueStoreImpl<uint32_t>(options));
+  } else {
+    UNIMPLEMENTED();
+    return nullptr;
+  }
+}
+
+}  // namespace embedding
+
+}  // namespace oneflow
@@ -0,0 +1,43 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_CORE_EMBEDDING_HOST_KEY_VALUE_STORE_H_
+#define ONEFLOW_CORE_EMBEDDING_HOST_KEY_VALUE_STORE_H_
+
+#include "oneflow/core/embedding/key_value_store.h"
+#include "oneflow/core/embedding/persistent_table.h"
+#include "oneflow/core/embedding/cache.h"
+
+namespace oneflow {
+
+namespace embedding {
+
+struct HostKeyValueStoreOptions {
+  PersistentTableOptions table_options{};
+  // Number of rows kept in host memory, 0 means all queries go to the persistent table.
+  uint64_t cache_capacity = 0;
+  // kFull keeps every row in memory and only uses the persistent table for snapshots and rows
+  // that are not loaded yet, kLRU evicts cold rows to the persistent table.
+  CacheOptions::Policy cache_policy = CacheOptions::Policy::kFull;
+  uint32_t num_shards = 64;
+};
+
+std::unique_ptr<KeyValueStore> NewHostKeyValueStore(const HostKeyValueStoreOptions& options);
+
+}  // namespace embedding
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_CORE_EMBEDDING_HOST_KEY_VALUE_STORE_H_
@@ -17,6 +17,7 @@ limitations under the License.
 #define ONEFLOW_EMBEDDING_KEY_VALUE_STORE_OPTIONS_H_
 #include "nlohmann/json.hpp"
 #include "oneflow/core/job/resource_desc.h"
+#include "oneflow/core/common/device_type.h"
 #include "oneflow/core/embedding/cache.h"
 
 namespace oneflow {
@@ -97,6 +98,17 @@ class KeyValueStoreOptions final {
     CHECK(json_object.contains("kv_store"));
     auto kv_store = json_object["kv_store"];
 
+    device_type_ = DeviceType::kCUDA;
+    if (kv_store.contains("device")) {
+      CHECK(kv_store["device"].is_string());
+      const std::string device = kv_store["device"].get<std::string>();
+      if (device == "cpu") {
+        device_type_ = DeviceType::kCPU;
+      } else {
+        CHECK_EQ(device, "cuda") << "Unsupported kv_store device";
+      }
+    }
+
     auto caches = kv_store["caches"];
     if (caches != nlohmann::detail::value_t::null && caches.size() > 0) {
       CHECK(caches.is_array());
@@ -140,16 +152,35 @@ class KeyValueStoreOptions final {
     } else {
       persistent_table_capacity_hint_ = 0;
     }
+    persistent_table_compaction_occupancy_threshold_ = 0.5;
+    if (persistent_table.contains("compaction_occupancy_threshold")) {
+      CHECK(persistent_table["compaction_occupancy_threshold"].is_number());
+      persistent_table_compaction_occupancy_threshold_ =
+          persistent_table["compaction_occupancy_threshold"].get<double>();
+    }
+    persistent_table_compaction_interval_ms_ = 0;
+    if (persistent_table.contains("compaction_interval_ms")) {
+      CHECK(persistent_table["compaction_interval_ms"].is_number());
+      persistent_table_compaction_interval_ms_ =
+          persistent_table["compaction_interval_ms"].get<int64_t>();
+    }
   }
   ~KeyValueStoreOptions() = default;
   int64_t KeyTypeSize() const { return key_type_size_; }
   int64_t ValueTypeSize() const { return value_type_size_; }
   const std::string& Name() const { return name_; }
   int64_t LineSize() const { return line_size_; }
+  DeviceType GetDeviceType() const { return device_type_; }
   const std::vector<CacheOptions>& GetCachesOptions() const { return cache_options_; }
   const std::vector<std::string>& PersistentTablePaths() const { return persistent_table_paths_; }
   int64_t PersistentTablePhysicalBlockSize() const { return persistent_table_physical_block_size_; }
   int64_t PersistentTableCapacityHint() const { return persistent_table_capacity_hint_; }
+  double PersistentTableCompactionOccupancyThreshold() const {
+    return persistent_table_compaction_occupancy_threshold_;
+  }
+  int64_t PersistentTableCompactionIntervalMs() const {
+    return persistent_table_compaction_interval_ms_;
+  }
   bool IsFullCache() const {
     if (cache_options_.size() > 0 && cache_options_.at(0).policy == CacheOptions::Policy::kFull) {
       return true;
@@ -162,9 +193,12 @@ class KeyValueStoreOptions final {
   int64_t value_type_size_;
   std::string name_;
   int64_t line_size_;
+  DeviceType device_type_;
   std::vector<std::string> persistent_table_paths_;
   int64_t persistent_table_physical_block_size_;
   int64_t persistent_table_capacity_hint_;
+  double persistent_table_compaction_occupancy_threshold_;
+  int64_t persistent_table_compaction_interval_ms_;
   std::vector<CacheOptions> cache_options_;
 };
 
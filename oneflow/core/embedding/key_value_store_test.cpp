@@ -16,6 +16,7 @@ limitations under the License.
 #include "oneflow/core/embedding/persistent_table_key_value_store.h"
 #include "oneflow/core/embedding/cached_key_value_store.h"
 #include "oneflow/core/embedding/mock_key_value_store.h"
+#include "oneflow/core/embedding/host_key_value_store.h"
 #include "oneflow/core/embedding/cache.h"
 #include "oneflow/core/device/cuda_util.h"
 #include <gtest/gtest.h>
@@ -28,8 +29,6 @@ namespace embedding {
 
 namespace {
 
-#ifdef WITH_CUDA
-
 std::string CreateTempDirectory() {
   const char* tmp_env = getenv("TMPDIR");
   const char* tmp_dir = tmp_env == nullptr ? "/tmp" : tmp_env;
@@ -39,6 +38,92 @@ std::string CreateTempDirectory() {
   return std::string(path);
 }
 
+void TestHostKeyValueStore(KeyValueStore* store, size_t num_embeddings,
+                           size_t embedding_vec_size) {
+  auto device = Global<ep::DeviceManagerRegistry>::Get()->GetDevice(DeviceType::kCPU, 0);
+  ep::Stream* stream = device->CreateStream();
+  store->SaveSnapshot("init");
+
+  std::vector<uint64_t> keys(num_embeddings);
+  std::vector<float> values(num_embeddings * embedding_vec_size);
+  std::vector<float> values1(num_embeddings * embedding_vec_size);
+  std::vector<uint32_t> missing_indices(num_embeddings);
+  uint32_t n_missing = 0;
+  std::iota(keys.begin(), keys.end(), 1);
+  for (size_t i = 0; i < values.size(); ++i) { values.at(i) = i; }
+
+  const uint32_t batch_size = store->MaxQueryLength();
+  for (size_t offset = 0; offset < num_embeddings; offset += batch_size) {
+    const uint32_t num_keys = std::min<size_t>(batch_size, num_embeddings - offset);
+    store->Get(stream, num_keys, keys.data() + offset,
+               values1.data() + offset * embedding_vec_size, &n_missing, missing_indices.data());
+    ASSERT_EQ(n_missing, num_keys);
+    store->Put(stream, num_keys, keys.data() + offset, values.data() + offset * embedding_vec_size);
+  }
+  store->SaveSnapshot("final");
+
+  auto check_all = [&]() {
+    std::fill(values1.begin(), values1.end(), 0);
+    for (size_t offset = 0; offset < num_embeddings; offset += batch_size) {
+      const uint32_t num_keys = std::min<size_t>(batch_size, num_embeddings - offset);
+      store->Get(stream, num_keys, keys.data() + offset,
+                 values1.data() + offset * embedding_vec_size, &n_missing, missing_indices.data());
+      ASSERT_EQ(n_missing, 0);
+    }
+    ASSERT_EQ(values, values1);
+  };
+  check_all();
+
+  store->LoadSnapshot("init");
+  store->Get(stream, std::min<size_t>(batch_size, num_embeddings), keys.data(), values1.data(),
+             &n_missing, missing_indices.data());
+  ASSERT_EQ(n_missing, std::min<size_t>(batch_size, num_embeddings));
+
+  store->LoadSnapshot("final");
+  check_all();
+  device->DestroyStream(stream);
+}
+
+TEST(HostKeyValueStore, LRU) {
+  Global<ep::DeviceManagerRegistry>::New();
+  HostKeyValueStoreOptions options{};
+  std::string path = CreateTempDirectory();
+  uint32_t value_length = 64;
+  options.table_options.path = path;
+  options.table_options.value_size = value_length * sizeof(float);
+  options.table_options.key_size = GetSizeOfDataType(DataType::kUInt64);
+  options.table_options.physical_block_size = 512;
+  options.cache_policy = CacheOptions::Policy::kLRU;
+  options.cache_capacity = 1024;
+  std::unique_ptr<KeyValueStore> store = NewHostKeyValueStore(options);
+  store->ReserveQueryLength(128);
+  TestHostKeyValueStore(store.get(), 4096, value_length);
+  store.reset();
+  PosixFile::RecursiveDelete(path);
+  Global<ep::DeviceManagerRegistry>::Delete();
+}
+
+TEST(HostKeyValueStore, Full) {
+  Global<ep::DeviceManagerRegistry>::New();
+  HostKeyValueStoreOptions options{};
+  std::string path = CreateTempDirectory();
+  uint32_t value_length = 64;
+  options.table_options.path = path;
+  options.table_options.value_size = value_length * sizeof(float);
+  options.table_options.key_size = GetSizeOfDataType(DataType::kUInt64);
+  options.table_options.physical_block_size = 512;
+  options.cache_policy = CacheOptions::Policy::kFull;
+  options.cache_capacity = 4096;
+  std::unique_ptr<KeyValueStore> store = NewHostKeyValueStore(options);
+  store->ReserveQueryLength(128);
+  TestHostKeyValueStore(store.get(), 4096, value_length);
+  store.reset();
+  PosixFile::RecursiveDelete(path);
+  Global<ep::DeviceManagerRegistry>::Delete();
+}
+
+#ifdef WITH_CUDA
+
 bool HasCudaDevice() {
   int device_count = 0;
   if (cudaGetDeviceCount(&device_count) != cudaSuccess) { return false; }
@@ -29,6 +29,10 @@ limitations under the License.
 #include <sys/syscall.h>
 #include <linux/aio_abi.h>
 #include <unistd.h>
+#include <condition_variable>
+#include <limits>
+#include <shared_mutex>
+#include <unordered_set>
 #ifdef WITH_LIBURING
 #include <liburing.h>
 #endif  // WITH_LIBURING
@@ -60,7 +64,12 @@ constexpr char const* kKeysDirName = "keys";
 constexpr char const* kValuesDirName = "values";
 constexpr char const* kSnapshotsDirName = "snapshots";
 constexpr char const* kSnapshotListFileName = "LIST";
+constexpr char const* kSnapshotManifestFileName = "MANIFEST";
 constexpr size_t kParallelForStride = 256;
+constexpr size_t kCompactionBatchSize = 65536;
+constexpr size_t kNumIndexShards = 64;
+constexpr uint64_t kIndexShardHashSeed = 6;
+constexpr uint64_t kInvalidRowId = std::numeric_limits<uint64_t>::max();
 
 template<typename T>
 T* BytesOffset(T* ptr, size_t bytes) {
@@ -120,6 +129,11 @@ void ListChunkFiles(const std::string& base, const std::string& prefix,
   PCHECK(closedir(dir) == 0);
 }
 
+template<typename Key>
+size_t GetIndexShard(Key key) {
+  return xxh64_uint64(static_cast<uint64_t>(key), kIndexShardHashSeed) % kNumIndexShards;
+}
+
 uint32_t GetLogicalBlockSize(uint32_t physical_block_size, uint32_t value_size) {
   return physical_block_size >= value_size ? physical_block_size
                                            : RoundUp(value_size, physical_block_size);
@@ -359,17 +373,34 @@ class PersistentTableImpl : public PersistentTable {
                     const std::function<void(Iterator* iter)>& Hook) override;
   void SaveSnapshot(const std::string& name) override;
   Iterator* ReadSnapshot(const std::string& name) override;
+  void Compact() override;
+  PersistentTableStats GetStats() override;
 
  private:
   friend class SnapshotIteratorImpl<Key, Engine>;
+  using RowIdMapping = robin_hood::unordered_flat_map<Key, uint64_t>;
+
   std::string KeyFilePath(uint64_t chunk_id) const;
   std::string ValueFilePath(uint64_t chunk_id) const;
   std::string IndexFilePath(const std::string& name, uint64_t chunk_id) const;
   std::string SnapshotDirPath(const std::string& name) const;
   std::string SnapshotListFilePath(const std::string& name) const;
+  std::string SnapshotManifestFilePath(const std::string& name) const;
+  void ReadSnapshotList(const std::string& name, std::vector<uint64_t>* chunk_ids) const;
   void LoadSnapshotImpl(const std::string& name);
   void SaveSnapshotImpl(const std::string& name);
-  void ParallelFor(size_t total, const ForRange<Engine>& for_range);
+  void WriteIndexFiles(const std::string& name, const std::vector<bool>& is_written);
+  void ParallelFor(size_t total, const ForRange<Engine>& for_range,
+                   size_t stride = kParallelForStride);
+  RowIdMapping& RowIdShard(Key key) { return row_id_shards_[GetIndexShard(key)]; }
+  void GroupKeysByShard(uint32_t num_keys, const Key* keys, std::vector<uint32_t>* shard_offsets,
+                        std::vector<uint32_t>* sorted_indices) const;
+  void LookupRowIds(uint32_t num_keys, const Key* keys, uint64_t* row_ids);
+  uint64_t NumLiveRows() const;
+  void CompactChunks(const std::vector<bool>& is_victim);
+  void CollectGarbage();
+  void CollectPinnedChunks(std::unordered_set<uint64_t>* pinned_chunks);
+  void CompactionLoop();
 
   std::string root_dir_;
   std::string keys_dir_;
@@ -385,16 +416,35 @@ class PersistentTableImpl : public PersistentTable {
 
   std::vector<std::unique_ptr<Worker<Engine>>> workers_;
 
-  std::vector<uint32_t> offsets_buffer_;
-  AlignedBuffer blocks_buffer_;
-
+  // Serializes the writers, snapshots and compaction, index shards are only modified while it is
+  // held, so its holder reads the index without taking the shard locks.
   std::recursive_mutex mutex_;
   uint64_t physical_table_size_;
-  robin_hood::unordered_flat_map<Key, uint64_t> row_id_mapping_;
+  // The index is split into shards by key hash, each with its own lock, so that lookups do not
+  // block each other and snapshots are saved and loaded in parallel.
+  std::vector<RowIdMapping> row_id_shards_;
+  std::vector<std::shared_timed_mutex> shard_mutexes_;
+  // Held shared by lookups until their reads are done, and exclusively to change value_files_.
+  std::shared_timed_mutex files_mutex_;
   std::vector<PosixFile> value_files_;
   PosixFile writable_key_file_;
   uint64_t writable_key_file_chunk_id_;
   PosixFileLockGuard lock_;
+
+  std::vector<uint64_t> chunk_live_rows_;
+  double compaction_occupancy_threshold_;
+  uint64_t num_compacted_chunks_;
+  uint64_t num_deleted_chunks_;
+  std::thread compaction_thread_;
+  std::mutex compaction_mutex_;
+  std::condition_variable compaction_cv_;
+  std::chrono::milliseconds compaction_interval_;
+  bool compaction_shutdown_;
+
+  // The snapshot saved or loaded last, chunks which are not dirty have the same index entries as in
+  // this snapshot, so their index files are hard linked instead of rewritten.
+  std::string base_snapshot_;
+  std::vector<bool> chunk_dirty_;
 };
 
 template<typename Key, typename Engine>
@@ -404,11 +454,19 @@ PersistentTableImpl<Key, Engine>::PersistentTableImpl(const PersistentTableOptio
       value_size_(options.value_size),
       physical_block_size_(options.physical_block_size),
       logical_block_size_(GetLogicalBlockSize(options.physical_block_size, value_size_)),
-      blocks_buffer_(options.physical_block_size),
-      writable_key_file_chunk_id_(-1) {
+      shard_mutexes_(kNumIndexShards),
+      writable_key_file_chunk_id_(-1),
+      num_compacted_chunks_(0),
+      num_deleted_chunks_(0),
+      compaction_shutdown_(false) {
   const uint64_t capacity_hint = ParseIntegerFromEnv(
       "ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_CAPACITY_HINT", options.capacity_hint);
-  if (capacity_hint > 0) { row_id_mapping_.reserve(capacity_hint); }
+  row_id_shards_.resize(kNumIndexShards);
+  if (capacity_hint > 0) {
+    for (auto& shard : row_id_shards_) {
+      shard.reserve(RoundUp(capacity_hint, kNumIndexShards) / kNumIndexShards);
+    }
+  }
   PosixFile::RecursiveCreateDirectory(options.path, 0755);
   const std::string lock_filename = PosixFile::JoinPath(options.path, kLockFileName);
   const bool init = !PosixFile::FileExists(lock_filename);
@@ -452,10 +510,31 @@ PersistentTableImpl<Key, Engine>::PersistentTableImpl(const PersistentTableOptio
   } else {
     physical_table_size_ = 0;
   }
+  chunk_live_rows_.assign(value_files_.size(), 0);
+  chunk_dirty_.assign(value_files_.size(), false);
+  compaction_occupancy_threshold_ =
+      ParseFloatFromEnv("ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_COMPACTION_OCCUPANCY_THRESHOLD",
+                        options.compaction_occupancy_threshold);
+  CHECK_GE(compaction_occupancy_threshold_, 0);
+  CHECK_LE(compaction_occupancy_threshold_, 1);
+  compaction_interval_ = std::chrono::milliseconds(ParseIntegerFromEnv(
+      "ONEFLOW_ONE_EMBEDDING_PERSISTENT_TABLE_COMPACTION_INTERVAL_MS",
+      options.compaction_interval_ms));
+  if (compaction_interval_.count() > 0) {
+    compaction_thread_ = std::thread(&PersistentTableImpl<Key, Engine>::CompactionLoop, this);
+  }
 }
 
 template<typename Key, typename Engine>
 PersistentTableImpl<Key, Engine>::~PersistentTableImpl() {
+  if (compaction_thread_.joinable()) {
+    {
+      std::lock_guard<std::mutex> lock(compaction_mutex_);
+      compaction_shutdown_ = true;
+    }
+    compaction_cv_.notify_all();
+    compaction_thread_.join();
+  }
   for (uint32_t tid = 0; tid < workers_.size(); ++tid) { workers_.at(tid)->Shutdown(); }
 }
 
@@ -467,15 +546,17 @@ uint32_t PersistentTableImpl<Key, Engine>::LogicalBlockSize() const {
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::GetBlocks(uint32_t num_keys, const void* keys, void* blocks,
                                                  uint32_t* offsets) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  // Lookups only take the locks of the shards they touch and are done before the reads are
+  // scheduled, so that the workers are never blocked on a lock and are shared by all callers.
+  std::shared_lock<std::shared_timed_mutex> files_lock(files_mutex_);
+  std::vector<uint64_t> row_ids(num_keys);
+  LookupRowIds(num_keys, static_cast<const Key*>(keys), row_ids.data());
   ParallelFor(num_keys, [&](Engine* engine, size_t start, size_t end) {
     for (uint64_t i = start; i < end; ++i) {
-      const Key key = static_cast<const Key*>(keys)[i];
-      auto it = row_id_mapping_.find(key);
-      if (it == row_id_mapping_.end()) {
+      if (row_ids[i] == kInvalidRowId) {
         offsets[i] = logical_block_size_;
       } else {
-        const uint64_t id = it->second;
+        const uint64_t id = row_ids[i];
         const uint64_t block_id = id / num_values_per_block_;
         const uint32_t id_in_block = id - block_id * num_values_per_block_;
         const uint32_t offset_in_block = id_in_block * value_size_;
@@ -494,26 +575,26 @@ void PersistentTableImpl<Key, Engine>::GetBlocks(uint32_t num_keys, const void*
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::Get(uint32_t num_keys, const void* keys, void* values,
                                            uint32_t* n_missing, uint32_t* missing_indices) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
-  offsets_buffer_.resize(num_keys);
+  std::vector<uint32_t> offsets(num_keys);
+  AlignedBuffer blocks_buffer(physical_block_size_);
   void* blocks_ptr = nullptr;
   if (value_size_ == logical_block_size_
       && reinterpret_cast<uintptr_t>(values) % physical_block_size_ == 0) {
     blocks_ptr = values;
   } else {
-    blocks_buffer_.Resize(num_keys * logical_block_size_);
-    blocks_ptr = blocks_buffer_.ptr();
+    blocks_buffer.Resize(num_keys * logical_block_size_);
+    blocks_ptr = blocks_buffer.ptr();
   }
-  GetBlocks(num_keys, keys, blocks_ptr, offsets_buffer_.data());
+  GetBlocks(num_keys, keys, blocks_ptr, offsets.data());
   uint32_t missing_count = 0;
   for (uint32_t i = 0; i < num_keys; ++i) {
-    if (offsets_buffer_.at(i) == logical_block_size_) {
+    if (offsets.at(i) == logical_block_size_) {
       missing_indices[missing_count] = i;
       missing_count += 1;
     } else {
       if (value_size_ != logical_block_size_) {
         MemcpyOffset(values, i * value_size_, blocks_ptr,
-                     (i * logical_block_size_) + offsets_buffer_[i], value_size_);
+                     (i * logical_block_size_) + offsets[i], value_size_);
       }
     }
   }
@@ -532,18 +613,27 @@ void PersistentTableImpl<Key, Engine>::PutBlocks(uint32_t num_keys, const void*
   const uint64_t start_block_id = start_index / num_values_per_block_;
   uint64_t written_blocks = 0;
   const uint64_t block_keys_size = num_values_per_block_ * sizeof(Key);
+  if (num_blocks > 0) {
+    const uint64_t end_chunk_id = (start_block_id + num_blocks - 1) / num_logical_blocks_per_chunk_;
+    if (end_chunk_id >= value_files_.size()) {
+      // Value files are created here instead of on the worker, a worker waiting for files_mutex_
+      // could otherwise block the reads of a lookup holding it.
+      std::unique_lock<std::shared_timed_mutex> files_lock(files_mutex_);
+      while (end_chunk_id >= value_files_.size()) {
+        value_files_.emplace_back(ValueFilePath(value_files_.size()), O_CREAT | O_RDWR | O_DIRECT,
+                                  0644);
+      }
+    }
+  }
   BlockingCounter bc(1);
   workers_.at(0)->Schedule([&](Engine*) {
     while (written_blocks < num_blocks) {
       const uint64_t batch_start_block_id = start_block_id + written_blocks;
       const uint64_t batch_chunk_id = batch_start_block_id / num_logical_blocks_per_chunk_;
-      if (batch_chunk_id == value_files_.size()) {
-        value_files_.emplace_back(ValueFilePath(batch_chunk_id), O_CREAT | O_RDWR | O_DIRECT, 0644);
-      } else {
-        CHECK_LE(batch_chunk_id, value_files_.size());
-      }
+      CHECK_LT(batch_chunk_id, value_files_.size());
       if ((!writable_key_file_.IsOpen()) || writable_key_file_chunk_id_ != batch_chunk_id) {
         writable_key_file_ = PosixFile(KeyFilePath(batch_chunk_id), O_CREAT | O_RDWR, 0644);
+        writable_key_file_chunk_id_ = batch_chunk_id;
       }
       PosixFile& value_file = value_files_.at(batch_chunk_id);
       const uint64_t block_id_in_chunk =
@@ -570,32 +660,99 @@ void PersistentTableImpl<Key, Engine>::PutBlocks(uint32_t num_keys, const void*
     }
     bc.Decrease();
   });
-  for (uint64_t i = 0; i < num_keys; ++i) {
-    row_id_mapping_[static_cast<const Key*>(keys)[i]] = start_index + i;
+  std::vector<uint32_t> shard_offsets;
+  std::vector<uint32_t> sorted_indices;
+  GroupKeysByShard(num_keys, static_cast<const Key*>(keys), &shard_offsets, &sorted_indices);
+  if (num_keys > 0) {
+    const uint64_t last_chunk_id = (start_index + num_keys - 1) / num_values_per_chunk_;
+    if (chunk_live_rows_.size() <= last_chunk_id) {
+      chunk_live_rows_.resize(last_chunk_id + 1, 0);
+      chunk_dirty_.resize(last_chunk_id + 1, false);
+    }
   }
+  // The new rows are only published once they are on disk.
   bc.WaitForeverUntilCntEqualZero();
+  for (size_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+    if (shard_offsets.at(shard_id) == shard_offsets.at(shard_id + 1)) { continue; }
+    std::unique_lock<std::shared_timed_mutex> shard_lock(shard_mutexes_.at(shard_id));
+    RowIdMapping& shard = row_id_shards_.at(shard_id);
+    for (uint32_t j = shard_offsets.at(shard_id); j < shard_offsets.at(shard_id + 1); ++j) {
+      const uint32_t i = sorted_indices.at(j);
+      const uint64_t index = start_index + i;
+      auto it = shard.emplace(static_cast<const Key*>(keys)[i], index);
+      if (!it.second) {
+        const uint64_t old_chunk_id = it.first->second / num_values_per_chunk_;
+        chunk_live_rows_.at(old_chunk_id) -= 1;
+        chunk_dirty_.at(old_chunk_id) = true;
+        it.first->second = index;
+      }
+      chunk_live_rows_.at(index / num_values_per_chunk_) += 1;
+      chunk_dirty_.at(index / num_values_per_chunk_) = true;
+    }
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::GroupKeysByShard(
+    uint32_t num_keys, const Key* keys, std::vector<uint32_t>* shard_offsets,
+    std::vector<uint32_t>* sorted_indices) const {
+  // A stable counting sort, so that the last of duplicated keys still wins in PutBlocks.
+  static_assert(kNumIndexShards <= 256, "");
+  std::vector<uint8_t> key_shards(num_keys);
+  shard_offsets->assign(kNumIndexShards + 1, 0);
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    key_shards[i] = GetIndexShard(keys[i]);
+    shard_offsets->at(key_shards[i] + 1) += 1;
+  }
+  for (size_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+    shard_offsets->at(shard_id + 1) += shard_offsets->at(shard_id);
+  }
+  std::vector<uint32_t> positions(shard_offsets->cbegin(), shard_offsets->cend() - 1);
+  sorted_indices->resize(num_keys);
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    sorted_indices->at(positions[key_shards[i]]) = i;
+    positions[key_shards[i]] += 1;
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::LookupRowIds(uint32_t num_keys, const Key* keys,
+                                                    uint64_t* row_ids) {
+  std::vector<uint32_t> shard_offsets;
+  std::vector<uint32_t> sorted_indices;
+  GroupKeysByShard(num_keys, keys, &shard_offsets, &sorted_indices);
+  for (size_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+    if (shard_offsets.at(shard_id) == shard_offsets.at(shard_id + 1)) { continue; }
+    std::shared_lock<std::shared_timed_mutex> shard_lock(shard_mutexes_.at(shard_id));
+    const RowIdMapping& shard = row_id_shards_.at(shard_id);
+    for (uint32_t j = shard_offsets.at(shard_id); j < shard_offsets.at(shard_id + 1); ++j) {
+      const uint32_t i = sorted_indices.at(j);
+      auto it = shard.find(keys[i]);
+      row_ids[i] = it == shard.end() ? kInvalidRowId : it->second;
+    }
+  }
 }
 
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::Put(uint32_t num_keys, const void* keys,
                                            const void* values) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
   const void* blocks_ptr = nullptr;
+  AlignedBuffer blocks_buffer(physical_block_size_);
   if (value_size_ == logical_block_size_
       && reinterpret_cast<uintptr_t>(values) % physical_block_size_ == 0) {
     blocks_ptr = values;
   } else {
     const uint32_t num_blocks = RoundUp(num_keys, num_values_per_block_);
-    blocks_buffer_.Resize(num_blocks * logical_block_size_);
+    blocks_buffer.Resize(num_blocks * logical_block_size_);
     for (uint32_t i = 0; i < num_keys; i += num_values_per_block_) {
       const uint32_t block_id = i / num_values_per_block_;
       const uint32_t copy_size = (num_keys - i) < num_values_per_block_
                                      ? (num_keys - i) * value_size_
                                      : logical_block_size_;
-      MemcpyOffset(blocks_buffer_.ptr(), block_id * logical_block_size_, values, i * value_size_,
+      MemcpyOffset(blocks_buffer.ptr(), block_id * logical_block_size_, values, i * value_size_,
                    copy_size);
     }
-    blocks_ptr = blocks_buffer_.ptr();
+    blocks_ptr = blocks_buffer.ptr();
   }
   PutBlocks(num_keys, keys, blocks_ptr);
 }
@@ -627,66 +784,189 @@ std::string PersistentTableImpl<Key, Engine>::SnapshotListFilePath(const std::st
 }
 
 template<typename Key, typename Engine>
-void PersistentTableImpl<Key, Engine>::LoadSnapshotImpl(const std::string& name) {
-  std::lock_guard<std::recursive_mutex> lock(mutex_);
-  const std::string snapshot_base = SnapshotDirPath(name);
-  const std::string snapshot_list = SnapshotListFilePath(name);
-  row_id_mapping_.clear();
-  std::ifstream list_if(snapshot_list);
+std::string PersistentTableImpl<Key, Engine>::SnapshotManifestFilePath(
+    const std::string& name) const {
+  return PosixFile::JoinPath(SnapshotDirPath(name), kSnapshotManifestFileName);
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::ReadSnapshotList(const std::string& name,
+                                                        std::vector<uint64_t>* chunk_ids) const {
+  std::ifstream list_if(SnapshotListFilePath(name));
   std::string index_filename;
   while (std::getline(list_if, index_filename)) {
-    const uint64_t chunk_id = GetChunkId(index_filename, kIndexFileNamePrefix);
-    PosixFile index_file(PosixFile::JoinPath(snapshot_base, index_filename), O_RDONLY, 0644);
-    const size_t index_file_size = index_file.Size();
-    CHECK_EQ(index_file_size % sizeof(uint64_t), 0);
-    if (index_file_size == 0) { return; }
-    const size_t n_entries = index_file_size / sizeof(uint64_t);
-    PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ);
-    PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
-    PosixMappedFile mapped_key(std::move(key_file), key_file.Size(), PROT_READ);
-    const uint64_t* indices = static_cast<const uint64_t*>(mapped_index.ptr());
-    const Key* keys = static_cast<const Key*>(mapped_key.ptr());
-    const uint64_t chunk_start_index = chunk_id * num_values_per_chunk_;
-    row_id_mapping_.reserve(row_id_mapping_.size() + n_entries);
-    for (size_t i = 0; i < n_entries; ++i) {
-      CHECK(row_id_mapping_.emplace(keys[indices[i] - chunk_start_index], indices[i]).second);
-    }
+    chunk_ids->push_back(GetChunkId(index_filename, kIndexFileNamePrefix));
   }
 }
 
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::LoadSnapshotImpl(const std::string& name) {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::vector<uint64_t> chunk_ids;
+  ReadSnapshotList(name, &chunk_ids);
+  const size_t num_chunks = chunk_ids.size();
+  std::vector<PosixMappedFile> index_files(num_chunks);
+  std::vector<PosixMappedFile> key_files(num_chunks);
+  std::vector<uint64_t> num_entries(num_chunks, 0);
+  // Positions of the entries of every chunk in its index file, grouped by index shard.
+  std::vector<std::vector<std::vector<uint32_t>>> shard_entries(num_chunks);
+  ParallelFor(
+      num_chunks,
+      [&](Engine*, size_t start, size_t end) {
+        for (size_t i = start; i < end; ++i) {
+          const uint64_t chunk_id = chunk_ids.at(i);
+          PosixFile index_file(IndexFilePath(name, chunk_id), O_RDONLY, 0644);
+          const size_t index_file_size = index_file.Size();
+          CHECK_EQ(index_file_size % sizeof(uint64_t), 0);
+          if (index_file_size == 0) { continue; }
+          const size_t n_entries = index_file_size / sizeof(uint64_t);
+          CHECK_LE(n_entries, num_values_per_chunk_);
+          index_files.at(i) = PosixMappedFile(std::move(index_file), index_file_size, PROT_READ);
+          PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
+          key_files.at(i) = PosixMappedFile(std::move(key_file), key_file.Size(), PROT_READ);
+          const uint64_t* indices = static_cast<const uint64_t*>(index_files.at(i).ptr());
+          const Key* keys = static_cast<const Key*>(key_files.at(i).ptr());
+          const uint64_t chunk_start_index = chunk_id * num_values_per_chunk_;
+          std::vector<std::vector<uint32_t>>& entries = shard_entries.at(i);
+          entries.resize(kNumIndexShards);
+          for (size_t j = 0; j < n_entries; ++j) {
+            entries.at(GetIndexShard(keys[indices[j] - chunk_start_index])).push_back(j);
+          }
+          num_entries.at(i) = n_entries;
+        }
+      },
+      1);
+  std::vector<std::unique_lock<std::shared_timed_mutex>> shard_locks;
+  for (auto& shard_mutex : shard_mutexes_) { shard_locks.emplace_back(shard_mutex); }
+  ParallelFor(
+      kNumIndexShards,
+      [&](Engine*, size_t start, size_t end) {
+        for (size_t shard_id = start; shard_id < end; ++shard_id) {
+          RowIdMapping& shard = row_id_shards_.at(shard_id);
+          shard.clear();
+          size_t shard_size = 0;
+          for (size_t i = 0; i < num_chunks; ++i) {
+            if (num_entries.at(i) > 0) { shard_size += shard_entries.at(i).at(shard_id).size(); }
+          }
+          shard.reserve(shard_size);
+          for (size_t i = 0; i < num_chunks; ++i) {
+            if (num_entries.at(i) == 0) { continue; }
+            const uint64_t* indices = static_cast<const uint64_t*>(index_files.at(i).ptr());
+            const Key* keys = static_cast<const Key*>(key_files.at(i).ptr());
+            const uint64_t chunk_start_index = chunk_ids.at(i) * num_values_per_chunk_;
+            for (const uint32_t j : shard_entries.at(i).at(shard_id)) {
+              CHECK(shard.emplace(keys[indices[j] - chunk_start_index], indices[j]).second);
+            }
+          }
+        }
+      },
+      1);
+  chunk_live_rows_.assign(value_files_.size(), 0);
+  for (size_t i = 0; i < num_chunks; ++i) {
+    chunk_live_rows_.at(chunk_ids.at(i)) += num_entries.at(i);
+  }
+  base_snapshot_ = name;
+  chunk_dirty_.assign(value_files_.size(), false);
+}
+
 template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::SaveSnapshotImpl(const std::string& name) {
   std::lock_guard<std::recursive_mutex> lock(mutex_);
   PosixFile::RecursiveCreateDirectory(SnapshotDirPath(name), 0755);
-  std::ofstream list_ofs(SnapshotListFilePath(name));
-  if (row_id_mapping_.empty()) { return; }
-  std::vector<PosixMappedFile> index_files(value_files_.size());
-  std::vector<uint64_t> counters(value_files_.size());
-  const uint64_t max_index_file_size = num_values_per_chunk_ * sizeof(uint64_t);
-  for (const auto& pair : row_id_mapping_) {
-    const uint64_t chunk_id = pair.second / num_values_per_chunk_;
-    CHECK(chunk_id < value_files_.size());
-    if (index_files[chunk_id].ptr() == nullptr) {
-      PosixFile snapshot_file(IndexFilePath(name, chunk_id), O_CREAT | O_RDWR, 0644);
-      snapshot_file.Truncate(max_index_file_size);
-      index_files[chunk_id] =
-          PosixMappedFile(std::move(snapshot_file), max_index_file_size, PROT_READ | PROT_WRITE);
+  const uint64_t num_chunks = value_files_.size();
+  CHECK_EQ(chunk_live_rows_.size(), num_chunks);
+  std::vector<bool> is_written(num_chunks, false);
+  for (uint64_t chunk_id = 0; chunk_id < num_chunks; ++chunk_id) {
+    if (chunk_live_rows_.at(chunk_id) == 0) { continue; }
+    bool shared = false;
+    if (!base_snapshot_.empty() && !chunk_dirty_.at(chunk_id)) {
+      // The index entries of the chunk have not changed since the base snapshot, so its index file
+      // is shared by a hard link, which keeps every snapshot self-contained.
+      const std::string index_file_path = IndexFilePath(name, chunk_id);
+      const std::string base_index_file_path = IndexFilePath(base_snapshot_, chunk_id);
+      if (base_snapshot_ == name) {
+        shared = PosixFile::FileExists(index_file_path);
+      } else if (PosixFile::FileExists(base_index_file_path)) {
+        if (PosixFile::FileExists(index_file_path)) {
+          PCHECK(unlink(index_file_path.c_str()) == 0);
+        }
+        shared = link(base_index_file_path.c_str(), index_file_path.c_str()) == 0;
+      }
     }
-    uint64_t* indices = static_cast<uint64_t*>(index_files[chunk_id].ptr());
-    uint64_t& count = counters[chunk_id];
-    CHECK_LT(count, num_values_per_chunk_);
-    indices[count] = pair.second;
-    count += 1;
-  }
-  for (size_t i = 0; i < value_files_.size(); ++i) {
-    const uint64_t count = counters[i];
-    if (count > 0) {
-      index_files[i].file().Truncate(count * sizeof(uint64_t));
-      list_ofs << kIndexFileNamePrefix + GetChunkName(i) << std::endl;
-    } else {
-      CHECK(index_files[i].ptr() == nullptr);
+    is_written.at(chunk_id) = !shared;
+  }
+  WriteIndexFiles(name, is_written);
+  std::ofstream list_ofs(SnapshotListFilePath(name));
+  std::ofstream manifest_ofs(SnapshotManifestFilePath(name));
+  if (!base_snapshot_.empty() && base_snapshot_ != name) {
+    manifest_ofs << "PARENT " << base_snapshot_ << std::endl;
+  }
+  for (uint64_t chunk_id = 0; chunk_id < num_chunks; ++chunk_id) {
+    if (chunk_live_rows_.at(chunk_id) == 0) { continue; }
+    const std::string index_filename = kIndexFileNamePrefix + GetChunkName(chunk_id);
+    list_ofs << index_filename << std::endl;
+    manifest_ofs << (is_written.at(chunk_id) ? "WRITTEN " : "SHARED ") << index_filename
+                 << std::endl;
+  }
+  base_snapshot_ = name;
+  chunk_dirty_.assign(num_chunks, false);
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::WriteIndexFiles(const std::string& name,
+                                                       const std::vector<bool>& is_written) {
+  const uint64_t num_chunks = is_written.size();
+  if (std::find(is_written.cbegin(), is_written.cend(), true) == is_written.cend()) { return; }
+  // Count the entries of every shard in every chunk, so that the shards write their entries to
+  // disjoint ranges of the index files in parallel.
+  std::vector<uint64_t> offsets(kNumIndexShards * num_chunks, 0);
+  ParallelFor(
+      kNumIndexShards,
+      [&](Engine*, size_t start, size_t end) {
+        for (size_t shard_id = start; shard_id < end; ++shard_id) {
+          uint64_t* shard_counts = offsets.data() + shard_id * num_chunks;
+          for (const auto& pair : row_id_shards_.at(shard_id)) {
+            const uint64_t chunk_id = pair.second / num_values_per_chunk_;
+            if (is_written.at(chunk_id)) { shard_counts[chunk_id] += 1; }
+          }
+        }
+      },
+      1);
+  std::vector<PosixMappedFile> index_files(num_chunks);
+  for (uint64_t chunk_id = 0; chunk_id < num_chunks; ++chunk_id) {
+    if (!is_written.at(chunk_id)) { continue; }
+    uint64_t count = 0;
+    for (size_t shard_id = 0; shard_id < kNumIndexShards; ++shard_id) {
+      uint64_t& offset = offsets.at(shard_id * num_chunks + chunk_id);
+      const uint64_t shard_count = offset;
+      offset = count;
+      count += shard_count;
     }
+    CHECK_EQ(count, chunk_live_rows_.at(chunk_id));
+    // Index files may be hard linked by other snapshots, so they are replaced instead of rewritten.
+    const std::string index_file_path = IndexFilePath(name, chunk_id);
+    if (PosixFile::FileExists(index_file_path)) { PCHECK(unlink(index_file_path.c_str()) == 0); }
+    PosixFile index_file(index_file_path, O_CREAT | O_RDWR, 0644);
+    const uint64_t index_file_size = count * sizeof(uint64_t);
+    index_file.Truncate(index_file_size);
+    index_files.at(chunk_id) =
+        PosixMappedFile(std::move(index_file), index_file_size, PROT_READ | PROT_WRITE);
   }
+  ParallelFor(
+      kNumIndexShards,
+      [&](Engine*, size_t start, size_t end) {
+        for (size_t shard_id = start; shard_id < end; ++shard_id) {
+          uint64_t* shard_offsets = offsets.data() + shard_id * num_chunks;
+          for (const auto& pair : row_id_shards_.at(shard_id)) {
+            const uint64_t chunk_id = pair.second / num_values_per_chunk_;
+            if (!is_written.at(chunk_id)) { continue; }
+            uint64_t* indices = static_cast<uint64_t*>(index_files.at(chunk_id).ptr());
+            indices[shard_offsets[chunk_id]] = pair.second;
+            shard_offsets[chunk_id] += 1;
+          }
+        }
+      },
+      1);
 }
 
 template<typename Key, typename Engine>
@@ -704,36 +984,26 @@ template<typename Key, typename Engine>
 void PersistentTableImpl<Key, Engine>::LoadSnapshot(
     const std::string& name, const std::function<void(Iterator* iter)>& Hook) {
   std::lock_guard<std::recursive_mutex> lock(mutex_);
-  const std::string snapshot_base = SnapshotDirPath(name);
-  const std::string snapshot_list = SnapshotListFilePath(name);
-  row_id_mapping_.clear();
-  std::ifstream list_if(snapshot_list);
-  std::string index_filename;
-  while (std::getline(list_if, index_filename)) {
-    const uint64_t chunk_id = GetChunkId(index_filename, kIndexFileNamePrefix);
-    PosixFile index_file(PosixFile::JoinPath(snapshot_base, index_filename), O_RDONLY, 0644);
+  LoadSnapshotImpl(name);
+  if (!Hook) { return; }
+  std::vector<uint64_t> chunk_ids;
+  ReadSnapshotList(name, &chunk_ids);
+  for (const uint64_t chunk_id : chunk_ids) {
+    PosixFile index_file(IndexFilePath(name, chunk_id), O_RDONLY, 0644);
     const size_t index_file_size = index_file.Size();
-    CHECK_EQ(index_file_size % sizeof(uint64_t), 0);
-    if (index_file_size == 0) { return; }
+    if (index_file_size == 0) { continue; }
     const size_t n_entries = index_file_size / sizeof(uint64_t);
     PosixMappedFile mapped_index(std::move(index_file), index_file_size, PROT_READ);
     PosixFile key_file(KeyFilePath(chunk_id), O_RDONLY, 0644);
     PosixMappedFile mapped_key(std::move(key_file), key_file.Size(), PROT_READ);
-    const uint64_t* indices = static_cast<const uint64_t*>(mapped_index.ptr());
-    const Key* keys = static_cast<const Key*>(mapped_key.ptr());
-    const uint64_t chunk_start_index = chunk_id * num_values_per_chunk_;
-    row_id_mapping_.reserve(row_id_mapping_.size() + n_entries);
-    for (size_t i = 0; i < n_entries; ++i) {
-      CHECK(row_id_mapping_.emplace(keys[indices[i] - chunk_start_index], indices[i]).second);
-    }
-    if (Hook) {
-      PosixFile value_file(ValueFilePath(chunk_id), O_RDONLY, 0644);
-      PosixMappedFile mapped_value(std::move(value_file), value_file.Size(), PROT_READ);
-      ChunkIteratorImpl<Key> chunk_iterator(value_size_, logical_block_size_, num_values_per_block_,
-                                            num_values_per_chunk_, chunk_id, n_entries, keys,
-                                            indices, mapped_value.ptr());
-      Hook(&chunk_iterator);
-    }
+    PosixFile value_file(ValueFilePath(chunk_id), O_RDONLY, 0644);
+    PosixMappedFile mapped_value(std::move(value_file), value_file.Size(), PROT_READ);
+    ChunkIteratorImpl<Key> chunk_iterator(value_size_, logical_block_size_, num_values_per_block_,
+                                          num_values_per_chunk_, chunk_id, n_entries,
+                                          static_cast<const Key*>(mapped_key.ptr()),
+                                          static_cast<const uint64_t*>(mapped_index.ptr()),
+                                          mapped_value.ptr());
+    Hook(&chunk_iterator);
   }
 }
 
@@ -749,16 +1019,173 @@ PersistentTable::Iterator* PersistentTableImpl<Key, Engine>::ReadSnapshot(const
 }
 
 template<typename Key, typename Engine>
-void PersistentTableImpl<Key, Engine>::ParallelFor(size_t total,
-                                                   const ForRange<Engine>& for_range) {
+void PersistentTableImpl<Key, Engine>::Compact() {
+  std::vector<bool> is_victim;
+  {
+    std::lock_guard<std::recursive_mutex> lock(mutex_);
+    // The last chunk is still being appended to, so only the sealed chunks are compacted.
+    if (value_files_.size() < 2) { return; }
+    is_victim.resize(value_files_.size() - 1, false);
+    const double min_live_rows = compaction_occupancy_threshold_ * num_values_per_chunk_;
+    for (uint64_t chunk_id = 0; chunk_id < is_victim.size(); ++chunk_id) {
+      const uint64_t live_rows = chunk_live_rows_.at(chunk_id);
+      if (value_files_.at(chunk_id).IsOpen() && live_rows > 0 && live_rows < min_live_rows) {
+        is_victim.at(chunk_id) = true;
+        num_compacted_chunks_ += 1;
+      }
+    }
+  }
+  if (std::find(is_victim.cbegin(), is_victim.cend(), true) != is_victim.cend()) {
+    CompactChunks(is_victim);
+  }
+  CollectGarbage();
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::CompactChunks(const std::vector<bool>& is_victim) {
+  auto IsVictimRow = [&](uint64_t row_id) {
+    const uint64_t chunk_id = row_id / num_values_per_chunk_;
+    return chunk_id < is_victim.size() && is_victim.at(chunk_id);
+  };
+  std::vector<Key> victim_keys;
+  {
+    std::lock_guard<std::recursive_mutex> lock(mutex_);
+    for (const auto& shard : row_id_shards_) {
+      for (const auto& pair : shard) {
+        if (IsVictimRow(pair.second)) { victim_keys.push_back(pair.first); }
+      }
+    }
+  }
+  std::vector<Key> batch_keys;
+  batch_keys.reserve(kCompactionBatchSize);
+  std::vector<char> batch_values(kCompactionBatchSize * value_size_);
+  std::vector<uint32_t> missing_indices(kCompactionBatchSize);
+  for (size_t start = 0; start < victim_keys.size(); start += kCompactionBatchSize) {
+    const size_t end = std::min(start + kCompactionBatchSize, victim_keys.size());
+    // Release the lock between batches so that lookups and updates are not blocked for the whole
+    // compaction, keys updated in the meantime have already been moved out of the victim chunks.
+    std::lock_guard<std::recursive_mutex> lock(mutex_);
+    batch_keys.clear();
+    for (size_t i = start; i < end; ++i) {
+      const RowIdMapping& shard = RowIdShard(victim_keys.at(i));
+      auto it = shard.find(victim_keys.at(i));
+      if (it != shard.end() && IsVictimRow(it->second)) {
+        batch_keys.push_back(victim_keys.at(i));
+      }
+    }
+    if (batch_keys.empty()) { continue; }
+    uint32_t n_missing = 0;
+    Get(batch_keys.size(), batch_keys.data(), batch_values.data(), &n_missing,
+        missing_indices.data());
+    CHECK_EQ(n_missing, 0);
+    Put(batch_keys.size(), batch_keys.data(), batch_values.data());
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::CollectGarbage() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  if (value_files_.size() < 2) { return; }
+  // Chunks referenced by a snapshot are kept until the snapshot is removed.
+  std::unordered_set<uint64_t> pinned_chunks;
+  CollectPinnedChunks(&pinned_chunks);
+  uint64_t num_deleted = 0;
+  {
+    // Waits for the lookups which may still read rows moved out of the deleted chunks.
+    std::unique_lock<std::shared_timed_mutex> files_lock(files_mutex_);
+    for (uint64_t chunk_id = 0; chunk_id < value_files_.size() - 1; ++chunk_id) {
+      if (!value_files_.at(chunk_id).IsOpen() || chunk_live_rows_.at(chunk_id) != 0
+          || pinned_chunks.count(chunk_id) != 0) {
+        continue;
+      }
+      value_files_.at(chunk_id).Close();
+      PCHECK(unlink(ValueFilePath(chunk_id).c_str()) == 0);
+      const std::string key_file_path = KeyFilePath(chunk_id);
+      if (PosixFile::FileExists(key_file_path)) { PCHECK(unlink(key_file_path.c_str()) == 0); }
+      num_deleted += 1;
+    }
+  }
+  num_deleted_chunks_ += num_deleted;
+  if (num_deleted > 0) {
+    const PersistentTableStats stats = GetStats();
+    LOG(INFO) << "PersistentTable " << root_dir_ << " deleted " << num_deleted
+              << " chunks, live rows: " << stats.num_live_rows
+              << ", physical rows: " << stats.num_physical_rows
+              << ", space amplification: " << stats.SpaceAmplification();
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::CollectPinnedChunks(
+    std::unordered_set<uint64_t>* pinned_chunks) {
+  if (!PosixFile::FileExists(snapshots_dir_)) { return; }
+  DIR* dir = opendir(snapshots_dir_.c_str());
+  PCHECK(dir != nullptr);
+  struct dirent* ent = nullptr;
+  while ((ent = readdir(dir)) != nullptr) {
+    if (strcmp(ent->d_name, ".") == 0 || strcmp(ent->d_name, "..") == 0) { continue; }
+    std::ifstream list_if(SnapshotListFilePath(ent->d_name));
+    std::string index_filename;
+    while (std::getline(list_if, index_filename)) {
+      pinned_chunks->insert(GetChunkId(index_filename, kIndexFileNamePrefix));
+    }
+  }
+  PCHECK(closedir(dir) == 0);
+}
+
+template<typename Key, typename Engine>
+PersistentTableStats PersistentTableImpl<Key, Engine>::GetStats() {
+  std::lock_guard<std::recursive_mutex> lock(mutex_);
+  std::unordered_set<uint64_t> pinned_chunks;
+  CollectPinnedChunks(&pinned_chunks);
+  PersistentTableStats stats;
+  stats.num_live_rows = NumLiveRows();
+  for (uint64_t chunk_id = 0; chunk_id < value_files_.size(); ++chunk_id) {
+    PosixFile& value_file = value_files_.at(chunk_id);
+    if (!value_file.IsOpen()) { continue; }
+    const uint64_t num_rows = value_file.Size() / logical_block_size_ * num_values_per_block_;
+    stats.num_chunks += 1;
+    stats.num_physical_rows += num_rows;
+    stats.disk_usage_bytes += value_file.Size() + num_rows * sizeof(Key);
+    if (pinned_chunks.count(chunk_id) != 0) { stats.num_pinned_chunks += 1; }
+  }
+  stats.num_compacted_chunks = num_compacted_chunks_;
+  stats.num_deleted_chunks = num_deleted_chunks_;
+  return stats;
+}
+
+template<typename Key, typename Engine>
+uint64_t PersistentTableImpl<Key, Engine>::NumLiveRows() const {
+  uint64_t num_live_rows = 0;
+  for (const auto& shard : row_id_shards_) { num_live_rows += shard.size(); }
+  return num_live_rows;
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::CompactionLoop() {
+  while (true) {
+    {
+      std::unique_lock<std::mutex> lock(compaction_mutex_);
+      if (compaction_cv_.wait_for(lock, compaction_interval_,
+                                  [&]() { return compaction_shutdown_; })) {
+        break;
+      }
+    }
+    Compact();
+  }
+}
+
+template<typename Key, typename Engine>
+void PersistentTableImpl<Key, Engine>::ParallelFor(size_t total, const ForRange<Engine>& for_range,
+                                                   size_t stride) {
   BlockingCounter bc(workers_.size());
   std::atomic<size_t> counter(0);
   for (size_t i = 0; i < workers_.size(); ++i) {
     workers_.at(i)->Schedule([&](Engine* engine) {
       while (true) {
-        const size_t start = counter.fetch_add(kParallelForStride, std::memory_order_relaxed);
+        const size_t start = counter.fetch_add(stride, std::memory_order_relaxed);
         if (start >= total) { break; }
-        const size_t next_start = start + kParallelForStride;
+        const size_t next_start = start + stride;
         const size_t end = std::min(next_start, total);
         for_range(engine, start, end);
       }
@@ -29,6 +29,25 @@ struct PersistentTableOptions {
   uint64_t target_chunk_size_mb = 4 * 1024;
   uint16_t physical_block_size = 4096;
   uint64_t capacity_hint = 0;
+  // Chunks whose fraction of live rows is below this threshold are rewritten by compaction.
+  double compaction_occupancy_threshold = 0.5;
+  // Interval of the background compaction, 0 means compaction only runs on Compact().
+  uint64_t compaction_interval_ms = 0;
+};
+
+struct PersistentTableStats {
+  uint64_t num_live_rows = 0;
+  uint64_t num_physical_rows = 0;
+  uint64_t num_chunks = 0;
+  uint64_t num_pinned_chunks = 0;
+  uint64_t disk_usage_bytes = 0;
+  uint64_t num_compacted_chunks = 0;
+  uint64_t num_deleted_chunks = 0;
+
+  double SpaceAmplification() const {
+    if (num_live_rows == 0) { return 0; }
+    return static_cast<double>(num_physical_rows) / num_live_rows;
+  }
 };
 
 class PersistentTable {
@@ -61,6 +80,8 @@ class PersistentTable {
                             const std::function<void(Iterator* iter)>& Hook) = 0;
   virtual void SaveSnapshot(const std::string& name) = 0;
   virtual Iterator* ReadSnapshot(const std::string& name) = 0;
+  virtual void Compact() = 0;
+  virtual PersistentTableStats GetStats() = 0;
 };
 
 std::unique_ptr<PersistentTable> NewPersistentTable(const PersistentTableOptions& options);
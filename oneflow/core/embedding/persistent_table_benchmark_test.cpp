@@ -0,0 +1,137 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/embedding/persistent_table.h"
+#include "oneflow/core/embedding/posix_file.h"
+#include <gtest/gtest.h>
+#include <chrono>
+#include <numeric>
+
+namespace oneflow {
+
+namespace embedding {
+
+namespace {
+
+#ifdef __linux__
+
+std::string CreateTempDirectory() {
+  const char* tmp_env = getenv("TMPDIR");
+  const char* tmp_dir = tmp_env == nullptr ? "/tmp" : tmp_env;
+  std::string tpl = std::string(tmp_dir) + "/test_ptb_XXXXXX";
+  char* path = mkdtemp(const_cast<char*>(tpl.c_str()));
+  PCHECK(path != nullptr);
+  return std::string(path);
+}
+
+void FillValues(uint32_t num_keys, const uint64_t* keys, uint32_t value_length, float* values) {
+  for (uint32_t i = 0; i < num_keys; ++i) {
+    std::fill_n(values + i * value_length, value_length, static_cast<float>(keys[i]));
+  }
+}
+
+// Readers and writers of random batches run concurrently, writers rewrite the same values so that
+// readers can check every result. The sizes can be changed via the environment to benchmark.
+TEST(PersistentTable, ConcurrentThroughput) {
+  const uint64_t num_keys =
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_TABLE_BENCHMARK_NUM_KEYS", 64 * 1024);
+  const uint32_t num_readers =
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_TABLE_BENCHMARK_NUM_READERS", 8);
+  const uint32_t num_writers =
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_TABLE_BENCHMARK_NUM_WRITERS", 1);
+  const uint32_t num_iters =
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_TABLE_BENCHMARK_NUM_ITERS", 64);
+  const uint32_t batch_size = 1024;
+  const uint32_t value_length = 32;
+  std::string path = CreateTempDirectory();
+  PersistentTableOptions options{};
+  options.path = path;
+  options.key_size = sizeof(uint64_t);
+  options.value_size = value_length * sizeof(float);
+  options.physical_block_size = 512;
+  options.target_chunk_size_mb = 64;
+  std::unique_ptr<PersistentTable> table = NewPersistentTable(options);
+  std::vector<uint64_t> keys(batch_size);
+  std::vector<float> values(batch_size * value_length);
+  for (uint64_t start = 0; start < num_keys; start += batch_size) {
+    const uint32_t n = std::min<uint64_t>(batch_size, num_keys - start);
+    std::iota(keys.begin(), keys.begin() + n, start);
+    FillValues(n, keys.data(), value_length, values.data());
+    table->Put(n, keys.data(), values.data());
+  }
+
+  std::atomic<uint64_t> num_errors(0);
+  std::vector<double> seconds(num_readers + num_writers);
+  std::vector<std::thread> threads;
+  for (uint32_t tid = 0; tid < num_readers + num_writers; ++tid) {
+    threads.emplace_back([&, tid]() {
+      const bool is_writer = tid >= num_readers;
+      std::mt19937_64 rng(tid);
+      std::uniform_int_distribution<uint64_t> dist(0, num_keys - 1);
+      std::vector<uint64_t> batch_keys(batch_size);
+      std::vector<float> batch_values(batch_size * value_length);
+      std::vector<uint32_t> missing_indices(batch_size);
+      const auto start = std::chrono::steady_clock::now();
+      for (uint32_t iter = 0; iter < num_iters; ++iter) {
+        for (auto& key : batch_keys) { key = dist(rng); }
+        if (is_writer) {
+          FillValues(batch_size, batch_keys.data(), value_length, batch_values.data());
+          table->Put(batch_size, batch_keys.data(), batch_values.data());
+        } else {
+          uint32_t n_missing = 0;
+          table->Get(batch_size, batch_keys.data(), batch_values.data(), &n_missing,
+                     missing_indices.data());
+          if (n_missing != 0) { num_errors += 1; }
+          for (uint32_t i = 0; i < batch_size; ++i) {
+            if (batch_values.at(i * value_length) != static_cast<float>(batch_keys.at(i))) {
+              num_errors += 1;
+            }
+          }
+        }
+      }
+      seconds.at(tid) =
+          std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    });
+  }
+  for (auto& thread : threads) { thread.join(); }
+  ASSERT_EQ(num_errors.load(), 0);
+  const double num_keys_per_thread = static_cast<double>(num_iters) * batch_size;
+  double read_seconds = 0;
+  double write_seconds = 0;
+  for (uint32_t tid = 0; tid < num_readers; ++tid) {
+    read_seconds = std::max(read_seconds, seconds.at(tid));
+  }
+  for (uint32_t tid = num_readers; tid < num_readers + num_writers; ++tid) {
+    write_seconds = std::max(write_seconds, seconds.at(tid));
+  }
+  if (num_readers > 0) {
+    LOG(INFO) << "PersistentTable " << num_readers << " readers: "
+              << num_readers * num_keys_per_thread / read_seconds << " keys/s";
+  }
+  if (num_writers > 0) {
+    LOG(INFO) << "PersistentTable " << num_writers << " writers: "
+              << num_writers * num_keys_per_thread / write_seconds << " keys/s";
+  }
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+#endif  // __linux__
+
+}  // namespace
+
+}  // namespace embedding
+
+}  // namespace oneflow
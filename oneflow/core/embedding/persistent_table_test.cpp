@@ -0,0 +1,188 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/embedding/persistent_table.h"
+#include "oneflow/core/embedding/posix_file.h"
+#include <gtest/gtest.h>
+#include <numeric>
+#include <sys/stat.h>
+
+namespace oneflow {
+
+namespace embedding {
+
+namespace {
+
+#ifdef __linux__
+
+constexpr uint32_t kValueLength = 128;
+constexpr uint64_t kNumValuesPerChunk = 1024 * 1024 / (kValueLength * sizeof(float));
+
+std::string CreateTempDirectory() {
+  const char* tmp_env = getenv("TMPDIR");
+  const char* tmp_dir = tmp_env == nullptr ? "/tmp" : tmp_env;
+  std::string tpl = std::string(tmp_dir) + "/test_pt_XXXXXX";
+  char* path = mkdtemp(const_cast<char*>(tpl.c_str()));
+  PCHECK(path != nullptr);
+  return std::string(path);
+}
+
+std::unique_ptr<PersistentTable> NewTestTable(const std::string& path) {
+  PersistentTableOptions options{};
+  options.path = path;
+  options.key_size = sizeof(uint64_t);
+  options.value_size = kValueLength * sizeof(float);
+  options.physical_block_size = 512;
+  options.target_chunk_size_mb = 1;
+  options.compaction_occupancy_threshold = 0.5;
+  return NewPersistentTable(options);
+}
+
+void PutRange(PersistentTable* table, uint64_t begin, uint64_t end, float version) {
+  std::vector<uint64_t> keys(end - begin);
+  std::vector<float> values(keys.size() * kValueLength);
+  for (uint64_t i = 0; i < keys.size(); ++i) {
+    keys.at(i) = begin + i;
+    std::fill_n(values.data() + i * kValueLength, kValueLength, keys.at(i) + version);
+  }
+  table->Put(keys.size(), keys.data(), values.data());
+}
+
+void CheckRange(PersistentTable* table, uint64_t begin, uint64_t end,
+                const std::function<float(uint64_t)>& Version) {
+  std::vector<uint64_t> keys(end - begin);
+  std::vector<float> values(keys.size() * kValueLength);
+  std::vector<uint32_t> missing_indices(keys.size());
+  std::iota(keys.begin(), keys.end(), begin);
+  uint32_t n_missing = 0;
+  table->Get(keys.size(), keys.data(), values.data(), &n_missing, missing_indices.data());
+  ASSERT_EQ(n_missing, 0);
+  for (uint64_t i = 0; i < keys.size(); ++i) {
+    for (uint32_t j = 0; j < kValueLength; ++j) {
+      ASSERT_EQ(values.at(i * kValueLength + j), keys.at(i) + Version(keys.at(i)));
+    }
+  }
+}
+
+TEST(PersistentTable, Compaction) {
+  std::string path = CreateTempDirectory();
+  std::unique_ptr<PersistentTable> table = NewTestTable(path);
+  const uint64_t num_keys = 2 * kNumValuesPerChunk;
+  const uint64_t num_updated_keys = num_keys - kNumValuesPerChunk / 8;
+  PutRange(table.get(), 0, num_keys, 0);
+  // The first chunk becomes garbage and the second one keeps 1/8 of its rows alive.
+  PutRange(table.get(), 0, num_updated_keys, 1);
+  PersistentTableStats stats = table->GetStats();
+  ASSERT_EQ(stats.num_live_rows, num_keys);
+  ASSERT_EQ(stats.num_physical_rows, num_keys + num_updated_keys);
+  ASSERT_GT(stats.SpaceAmplification(), 1.9);
+
+  table->Compact();
+  stats = table->GetStats();
+  ASSERT_EQ(stats.num_live_rows, num_keys);
+  ASSERT_EQ(stats.num_physical_rows, num_keys);
+  ASSERT_EQ(stats.num_chunks, 2);
+  ASSERT_EQ(stats.num_compacted_chunks, 1);
+  ASSERT_EQ(stats.num_deleted_chunks, 2);
+  ASSERT_EQ(stats.SpaceAmplification(), 1);
+  CheckRange(table.get(), 0, num_keys,
+             [&](uint64_t key) { return key < num_updated_keys ? 1 : 0; });
+
+  table->SaveSnapshot("compacted");
+  table.reset();
+  table = NewTestTable(path);
+  table->LoadSnapshot("compacted");
+  CheckRange(table.get(), 0, num_keys,
+             [&](uint64_t key) { return key < num_updated_keys ? 1 : 0; });
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+TEST(PersistentTable, CompactionKeepsSnapshotChunks) {
+  std::string path = CreateTempDirectory();
+  std::unique_ptr<PersistentTable> table = NewTestTable(path);
+  const uint64_t num_keys = 2 * kNumValuesPerChunk;
+  PutRange(table.get(), 0, num_keys, 0);
+  table->SaveSnapshot("init");
+  PutRange(table.get(), 0, num_keys, 1);
+  table->Compact();
+  PersistentTableStats stats = table->GetStats();
+  ASSERT_EQ(stats.num_deleted_chunks, 0);
+  ASSERT_EQ(stats.num_pinned_chunks, 2);
+  CheckRange(table.get(), 0, num_keys, [](uint64_t) { return 1; });
+  table->LoadSnapshot("init");
+  CheckRange(table.get(), 0, num_keys, [](uint64_t) { return 0; });
+
+  // Once the snapshot is removed its chunks are garbage and can be deleted.
+  PutRange(table.get(), 0, num_keys, 2);
+  PosixFile::RecursiveDelete(PosixFile::JoinPath(PosixFile::JoinPath(path, "snapshots"), "init"));
+  table->Compact();
+  stats = table->GetStats();
+  ASSERT_EQ(stats.num_pinned_chunks, 0);
+  ASSERT_EQ(stats.num_live_rows, num_keys);
+  CheckRange(table.get(), 0, num_keys, [](uint64_t) { return 2; });
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+ino_t GetIndexFileInode(const std::string& path, const std::string& snapshot, uint64_t chunk_id) {
+  const std::string chunk_name = std::to_string(chunk_id);
+  const std::string index_file_path = PosixFile::JoinPath(
+      PosixFile::JoinPath(PosixFile::JoinPath(path, "snapshots"), snapshot),
+      "index-" + std::string(12 - chunk_name.size(), '0') + chunk_name);
+  struct stat st {};
+  if (stat(index_file_path.c_str(), &st) != 0) { return 0; }
+  return st.st_ino;
+}
+
+TEST(PersistentTable, IncrementalSnapshot) {
+  std::string path = CreateTempDirectory();
+  std::unique_ptr<PersistentTable> table = NewTestTable(path);
+  const uint64_t num_keys = 3 * kNumValuesPerChunk;
+  PutRange(table.get(), 0, num_keys, 0);
+  table->SaveSnapshot("first");
+  // Only the rows of the last chunk are moved, the index files of the others are shared.
+  PutRange(table.get(), 2 * kNumValuesPerChunk, num_keys, 1);
+  table->SaveSnapshot("second");
+  ASSERT_NE(GetIndexFileInode(path, "second", 0), 0);
+  ASSERT_EQ(GetIndexFileInode(path, "second", 0), GetIndexFileInode(path, "first", 0));
+  ASSERT_EQ(GetIndexFileInode(path, "second", 1), GetIndexFileInode(path, "first", 1));
+  ASSERT_EQ(GetIndexFileInode(path, "second", 2), 0);
+  ASSERT_NE(GetIndexFileInode(path, "second", 3), 0);
+
+  // Rewriting a shared index file must not change the snapshots it is shared with.
+  PutRange(table.get(), 0, kNumValuesPerChunk / 2, 2);
+  table->SaveSnapshot("second");
+  ASSERT_NE(GetIndexFileInode(path, "second", 0), GetIndexFileInode(path, "first", 0));
+  table.reset();
+  table = NewTestTable(path);
+  table->LoadSnapshot("second");
+  CheckRange(table.get(), 0, num_keys, [&](uint64_t key) {
+    if (key < kNumValuesPerChunk / 2) { return 2; }
+    return key < 2 * kNumValuesPerChunk ? 0 : 1;
+  });
+  table->LoadSnapshot("first");
+  CheckRange(table.get(), 0, num_keys, [](uint64_t) { return 0; });
+  table.reset();
+  PosixFile::RecursiveDelete(path);
+}
+
+#endif  // __linux__
+
+}  // namespace
+
+}  // namespace embedding
+
+}  // namespace oneflow
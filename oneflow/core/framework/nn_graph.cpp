@@ -24,6 +24,7 @@ limitations under the License.
 #include "oneflow/core/eager/eager_blob_object.h"
 #include "oneflow/core/framework/instructions_builder.h"
 #include "oneflow/core/framework/nd_sbp.h"
+#include "oneflow/core/framework/nn_graph_compile_cache.h"
 #include "oneflow/core/framework/tensor_name_scope.h"
 #include "oneflow/core/functional/functional.h"
 #include "oneflow/core/graph/op_graph.h"
@@ -32,6 +33,7 @@ limitations under the License.
 #include "oneflow/core/job/job_desc.h"
 #include "oneflow/core/job/job_instance.h"
 #include "oneflow/core/job/critical_section_instance.h"
+#include "oneflow/core/job/id_manager.h"
 #include "oneflow/core/job/lazy_mode.h"
 #include "oneflow/core/job/plan_util.h"
 #include "oneflow/core/persistence/tee_persistent_log_stream.h"
@@ -260,6 +262,14 @@ Maybe<void> NNGraph::DeleteOutdatedVariableInVariableTensorMgr() {
   return Maybe<void>::Ok();
 }
 
+Maybe<void> NNGraph::EnableCompileCache(const std::string& cache_dir,
+                                        const std::string& build_fingerprint) {
+  CHECK_OR_RETURN(!runtime_inited_);
+  CHECK_OR_RETURN(!cache_dir.empty());
+  compile_cache_.reset(new NNGraphCompileCache(cache_dir, build_fingerprint));
+  return Maybe<void>::Ok();
+}
+
 Maybe<void> NNGraph::CompileAndInitRuntime() {
   CHECK_OR_RETURN(!runtime_inited_);
   JobBuildAndInferCtx* job_ctx = JUST(GetJobBuildAndInferCtx(name_));
@@ -279,21 +289,42 @@ Maybe<void> NNGraph::CompileAndInitRuntime() {
   auto scope = std::make_unique<GlobalJobDescScope>(job_.job_conf(), job_ctx->job_id());
   if (GlobalProcessCtx::IsThisProcessMaster()) {
     double start = GetCurTime();
-    // TODO(chengcheng): new memory reused by chunk
-    Compiler().Compile(&job_, &plan_, /* need_job_complete */ true);
-    PlanUtil::GenMemBlockAndChunkWithVariableOpNames4Plan(&plan_, variable_op_names_);
-
-    VLOG(1) << "Graph name: " << name_ << " compile time: " << (GetCurTime() - start) / 1000000000.0
-            << " seconds.";
-    if (Global<ResourceDesc, ForSession>::Get()->enable_debug_mode()) {
-      TeePersistentLogStream::Create("job_" + name_ + "_plan")->Write(plan_);
-      PlanUtil::ToDotFile(plan_, "job_" + name_ + "_plan.dot");
+    std::string cache_key;
+    bool cache_hit = false;
+    if (compile_cache_) {
+      cache_key = compile_cache_->GenKey(job_, job_ctx->job_id(), variable_op_names_);
+      Job cached_job;
+      Plan cached_plan;
+      // NOTE: the ids in a cached plan must not collide with the ids of the graphs compiled
+      //     in this process, otherwise the graph is compiled again.
+      if (compile_cache_->TryLoad(cache_key, &cached_job, &cached_plan)
+          && Global<IDMgr>::Get()->TryReserveIdsOfPlan(cached_plan)) {
+        job_ = std::move(cached_job);
+        plan_ = std::move(cached_plan);
+        cache_hit = true;
+        compile_cache_hit_ = true;
+        LOG(INFO) << "Graph name: " << name_ << " loaded from compile cache in "
+                  << (GetCurTime() - start) / 1000000000.0 << " seconds.";
+      }
+    }
+    if (!cache_hit) {
+      // TODO(chengcheng): new memory reused by chunk
+      Compiler().Compile(&job_, &plan_, /* need_job_complete */ true);
+      PlanUtil::GenMemBlockAndChunkWithVariableOpNames4Plan(&plan_, variable_op_names_);
+
+      VLOG(1) << "Graph name: " << name_
+              << " compile time: " << (GetCurTime() - start) / 1000000000.0 << " seconds.";
+      if (Global<ResourceDesc, ForSession>::Get()->enable_debug_mode()) {
+        TeePersistentLogStream::Create("job_" + name_ + "_plan")->Write(plan_);
+        PlanUtil::ToDotFile(plan_, "job_" + name_ + "_plan.dot");
+      }
+      PlanUtil::GenRegisterHint(&plan_);
+      // TODO(chengcheng): test collective boxing for multi-job.
+      PlanUtil::GenCollectiveBoxingPlan(&job_, &plan_);
+      // PlanUtil::SetForceInplaceMemBlock(&plan_); NOTE(chengcheng): only for ssp.
+      PlanUtil::DumpCtrlRegstInfoToPlan(&plan_);
+      if (compile_cache_) { compile_cache_->Save(cache_key, job_, plan_); }
     }
-    PlanUtil::GenRegisterHint(&plan_);
-    // TODO(chengcheng): test collective boxing for multi-job.
-    PlanUtil::GenCollectiveBoxingPlan(&job_, &plan_);
-    // PlanUtil::SetForceInplaceMemBlock(&plan_); NOTE(chengcheng): only for ssp.
-    PlanUtil::DumpCtrlRegstInfoToPlan(&plan_);
     PlanUtil::PlanMemoryLog(&plan_, name_);
   }
   if (GlobalProcessCtx::WorldSize() > 1) {
@@ -29,12 +29,17 @@ limitations under the License.
 namespace oneflow {
 
 class Blob;
+class NNGraphCompileCache;
 
 class NNGraph final : public NNGraphIf {
  public:
   explicit NNGraph(const std::string& name,
                    const std::shared_ptr<MultiClientSessionContext>& sessioin_ctx)
-      : name_(name), session_ctx_(sessioin_ctx), runtime_inited_(false), is_closed_(false) {}
+      : name_(name),
+        session_ctx_(sessioin_ctx),
+        compile_cache_hit_(false),
+        runtime_inited_(false),
+        is_closed_(false) {}
   OF_DISALLOW_COPY_AND_MOVE(NNGraph);
   ~NNGraph();
 
@@ -61,7 +66,12 @@ class NNGraph final : public NNGraphIf {
       const std::vector<std::shared_ptr<one::Tensor>>& variable_tensors);
   Maybe<std::vector<std::string>> GetAdditionalVarOpNames() const;
   Maybe<std::vector<std::shared_ptr<one::Tensor>>> GetAdditionalVarOpTensors() const;
+  // Compiled plans are looked up in and saved to cache_dir, see NNGraphCompileCache.
+  Maybe<void> EnableCompileCache(const std::string& cache_dir,
+                                 const std::string& build_fingerprint);
   Maybe<void> CompileAndInitRuntime();
+  // Whether CompileAndInitRuntime used a plan from the compile cache instead of compiling.
+  bool compile_cache_hit() const { return compile_cache_hit_; }
   Maybe<void> Close();
 
  private:
@@ -93,6 +103,8 @@ class NNGraph final : public NNGraphIf {
   HashSet<std::string> variable_op_names_;
   Job job_;
   Plan plan_;
+  std::unique_ptr<NNGraphCompileCache> compile_cache_;
+  bool compile_cache_hit_;
   // TODO(chengcheng): temp impl using runtime now, need reimplement for dynamic multi nn.Graph.
   std::unique_ptr<Runtime> runtime_;
   bool runtime_inited_;
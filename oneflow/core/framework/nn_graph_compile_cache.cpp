@@ -0,0 +1,189 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/nn_graph_compile_cache.h"
+#include <dirent.h>
+#include <sys/stat.h>
+#include <sys/types.h>
+#include <unistd.h>
+#include <utime.h>
+#include <algorithm>
+#include <cerrno>
+#include <cstdio>
+#include <fstream>
+#include <iomanip>
+#include <sstream>
+#include "oneflow/core/common/protobuf.h"
+#include "oneflow/core/common/str_util.h"
+#include "oneflow/core/control/global_process_ctx.h"
+#include "oneflow/core/job/global_for.h"
+#include "oneflow/core/job/resource_desc.h"
+
+extern char** environ;
+
+namespace oneflow {
+
+namespace {
+
+// Bump when the layout of an entry or the content of the key changes.
+constexpr int32_t kCompileCacheFormatVersion = 1;
+constexpr int64_t kDefaultMaxEntries = 32;
+const char* const kJobFileName = "job.pb";
+const char* const kPlanFileName = "plan.pb";
+const char* const kTmpEntryInfix = ".tmp.";
+
+std::string Fnv1a64Hex(const std::string& data) {
+  uint64_t hash = 14695981039346656037ULL;
+  for (unsigned char c : data) {
+    hash ^= c;
+    hash *= 1099511628211ULL;
+  }
+  std::ostringstream ss;
+  ss << std::hex << std::setw(16) << std::setfill('0') << hash;
+  return ss.str();
+}
+
+std::vector<std::string> SortedOneFlowEnvVars() {
+  std::vector<std::string> env_vars;
+  for (char** env = environ; *env != nullptr; ++env) {
+    const std::string env_var(*env);
+    if (env_var.compare(0, 8, "ONEFLOW_") != 0) { continue; }
+    // The cache settings don't change what gets compiled.
+    if (env_var.compare(0, 27, "ONEFLOW_GRAPH_COMPILE_CACHE") == 0) { continue; }
+    env_vars.emplace_back(env_var);
+  }
+  std::sort(env_vars.begin(), env_vars.end());
+  return env_vars;
+}
+
+bool IsDir(const std::string& path, time_t* mtime = nullptr) {
+  struct stat st;
+  if (stat(path.c_str(), &st) != 0 || !S_ISDIR(st.st_mode)) { return false; }
+  if (mtime != nullptr) { *mtime = st.st_mtime; }
+  return true;
+}
+
+bool CreateDirs(const std::string& dir) {
+  size_t pos = 0;
+  while (pos != std::string::npos) {
+    pos = dir.find('/', pos + 1);
+    const std::string prefix = dir.substr(0, pos);
+    if (mkdir(prefix.c_str(), 0755) != 0 && errno != EEXIST) { return false; }
+  }
+  return IsDir(dir);
+}
+
+bool WriteProtoToPbFile(const PbMessage& proto, const std::string& path) {
+  std::ofstream out_stream(path.c_str(), std::ofstream::out | std::ofstream::trunc
+                                             | std::ofstream::binary);
+  if (!proto.SerializeToOstream(&out_stream)) { return false; }
+  out_stream.close();
+  return !out_stream.fail();
+}
+
+// Another process may remove or replace the same entry concurrently, so nothing here
+// is allowed to fail hard.
+void RemoveEntryQuietly(const std::string& entry_dir) {
+  std::remove(JoinPath(entry_dir, kJobFileName).c_str());
+  std::remove(JoinPath(entry_dir, kPlanFileName).c_str());
+  rmdir(entry_dir.c_str());
+}
+
+}  // namespace
+
+NNGraphCompileCache::NNGraphCompileCache(const std::string& cache_dir,
+                                         const std::string& build_fingerprint)
+    : cache_dir_(cache_dir), build_fingerprint_(build_fingerprint) {}
+
+std::string NNGraphCompileCache::GenKey(const Job& job, int64_t job_id,
+                                        const HashSet<std::string>& variable_op_names) const {
+  std::string material;
+  material += "format: " + std::to_string(kCompileCacheFormatVersion) + "\n";
+  material += "build: " + build_fingerprint_ + "\n";
+  material += "job_id: " + std::to_string(job_id) + "\n";
+  material += "world_size: " + std::to_string(GlobalProcessCtx::WorldSize()) + "\n";
+  material += PbMessage2TxtString(Global<ResourceDesc, ForSession>::Get()->resource());
+  std::vector<std::string> sorted_variable_op_names(variable_op_names.begin(),
+                                                    variable_op_names.end());
+  std::sort(sorted_variable_op_names.begin(), sorted_variable_op_names.end());
+  for (const auto& name : sorted_variable_op_names) { material += "variable: " + name + "\n"; }
+  for (const auto& env_var : SortedOneFlowEnvVars()) { material += "env: " + env_var + "\n"; }
+  // Text format prints map fields ordered by key, unlike the binary format.
+  material += PbMessage2TxtString(job);
+  // Two differently seeded hashes, a collision would silently load a wrong plan.
+  return Fnv1a64Hex(material) + Fnv1a64Hex(material + build_fingerprint_);
+}
+
+std::string NNGraphCompileCache::EntryDir(const std::string& key) const {
+  return JoinPath(cache_dir_, key);
+}
+
+bool NNGraphCompileCache::TryLoad(const std::string& key, Job* job, Plan* plan) const {
+  const std::string entry_dir = EntryDir(key);
+  if (!IsDir(entry_dir)) { return false; }
+  Job cached_job;
+  Plan cached_plan;
+  if (!TryParseProtoFromPbFile(JoinPath(entry_dir, kJobFileName), &cached_job)
+      || !TryParseProtoFromPbFile(JoinPath(entry_dir, kPlanFileName), &cached_plan)
+      || cached_plan.task_size() == 0) {
+    LOG(WARNING) << "Ignoring broken nn.Graph compile cache entry " << entry_dir;
+    return false;
+  }
+  // Entries are evicted by last use.
+  utime(entry_dir.c_str(), nullptr);
+  *job = std::move(cached_job);
+  *plan = std::move(cached_plan);
+  return true;
+}
+
+void NNGraphCompileCache::Save(const std::string& key, const Job& job, const Plan& plan) const {
+  const std::string entry_dir = EntryDir(key);
+  const std::string tmp_dir = entry_dir + kTmpEntryInfix + std::to_string(getpid());
+  if (!CreateDirs(tmp_dir) || !WriteProtoToPbFile(job, JoinPath(tmp_dir, kJobFileName))
+      || !WriteProtoToPbFile(plan, JoinPath(tmp_dir, kPlanFileName))) {
+    LOG(WARNING) << "Failed to write nn.Graph compile cache entry " << entry_dir;
+    RemoveEntryQuietly(tmp_dir);
+    return;
+  }
+  // A broken entry with the same key is replaced, a concurrent writer may win.
+  RemoveEntryQuietly(entry_dir);
+  if (rename(tmp_dir.c_str(), entry_dir.c_str()) != 0) { RemoveEntryQuietly(tmp_dir); }
+  EvictLeastRecentlyUsed();
+}
+
+void NNGraphCompileCache::EvictLeastRecentlyUsed() const {
+  const int64_t max_entries =
+      ParseIntegerFromEnv("ONEFLOW_GRAPH_COMPILE_CACHE_MAX_ENTRIES", kDefaultMaxEntries);
+  if (max_entries <= 0) { return; }
+  DIR* dir = opendir(cache_dir_.c_str());
+  if (dir == nullptr) { return; }
+  std::vector<std::pair<time_t, std::string>> entries;
+  while (const struct dirent* ent = readdir(dir)) {
+    const std::string name(ent->d_name);
+    if (name == "." || name == ".." || name.find(kTmpEntryInfix) != std::string::npos) {
+      continue;
+    }
+    time_t mtime = 0;
+    if (IsDir(JoinPath(cache_dir_, name), &mtime)) { entries.emplace_back(mtime, name); }
+  }
+  closedir(dir);
+  if (entries.size() <= max_entries) { return; }
+  std::sort(entries.begin(), entries.end());
+  for (size_t i = 0; i < entries.size() - max_entries; ++i) {
+    RemoveEntryQuietly(JoinPath(cache_dir_, entries.at(i).second));
+  }
+}
+
+}  // namespace oneflow
@@ -0,0 +1,59 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_CORE_FRAMEWORK_NN_GRAPH_COMPILE_CACHE_H_
+#define ONEFLOW_CORE_FRAMEWORK_NN_GRAPH_COMPILE_CACHE_H_
+
+#include <string>
+#include "oneflow/core/common/util.h"
+#include "oneflow/core/job/job.pb.h"
+#include "oneflow/core/job/plan.pb.h"
+
+namespace oneflow {
+
+// On-disk cache of the jobs and plans compiled by nn.Graph. An entry is the directory
+// <cache_dir>/<key> holding the completed job and the plan, so that a later process
+// building the same job can init its runtime without compiling.
+//
+// Invalidation: the key covers everything the compilation depends on (see GenKey), so a
+// changed job, session resource, build or ONEFLOW_* env var misses the cache. Entries
+// that can't be parsed are overwritten, and only the most recently used
+// ONEFLOW_GRAPH_COMPILE_CACHE_MAX_ENTRIES entries are kept.
+class NNGraphCompileCache final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(NNGraphCompileCache);
+  NNGraphCompileCache(const std::string& cache_dir, const std::string& build_fingerprint);
+  ~NNGraphCompileCache() = default;
+
+  // Key of a job not compiled yet. It also covers the job id and the variable op names
+  // of the graph, the resource of the session and all ONEFLOW_* env vars.
+  std::string GenKey(const Job& job, int64_t job_id,
+                     const HashSet<std::string>& variable_op_names) const;
+  // Returns false on a miss, job and plan are left untouched then.
+  bool TryLoad(const std::string& key, Job* job, Plan* plan) const;
+  // Failing to write the cache is not an error, the entry is skipped.
+  void Save(const std::string& key, const Job& job, const Plan& plan) const;
+
+ private:
+  std::string EntryDir(const std::string& key) const;
+  void EvictLeastRecentlyUsed() const;
+
+  std::string cache_dir_;
+  std::string build_fingerprint_;
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_CORE_FRAMEWORK_NN_GRAPH_COMPILE_CACHE_H_
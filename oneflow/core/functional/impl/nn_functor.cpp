@@ -2936,6 +2936,111 @@ class RocAucScoreFunctor {
   std::shared_ptr<OpExpr> op_;
 };
 
+namespace {
+
+// Calls Dispatch(ops.at(n - 1), chunk) for each chunk of at most ops.size() inputs.
+template<typename DispatchFn>
+Maybe<void> ForEachMultiTensorChunk(const std::vector<std::shared_ptr<OpExpr>>& ops,
+                                    const TensorTuple& inputs, const DispatchFn& Dispatch) {
+  CHECK_GE_OR_RETURN(inputs.size(), 1);
+  for (int i = 0; i < inputs.size(); i += ops.size()) {
+    const size_t size = std::min(ops.size(), inputs.size() - i);
+    TensorTuple chunk(size);
+    for (int j = 0; j < size; ++j) { chunk[j] = inputs[i + j]; }
+    JUST(Dispatch(*ops.at(size - 1), chunk));
+  }
+  return Maybe<void>::Ok();
+}
+
+}  // namespace
+
+class MultiTensorNormFunctor {
+ public:
+  MultiTensorNormFunctor() {
+    ops_.resize(kMaxInputCount);
+    for (int n = 0; n < ops_.size(); ++n) {
+      ops_[n] = CHECK_JUST(
+          one::OpBuilder("multi_tensor_norm").Input("x", n + 1).Output("y").Build());
+    }
+  }
+
+  Maybe<Tensor> operator()(const TensorTuple& inputs, const float& ord) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<float>("ord", ord));
+    TensorTuple norms;
+    JUST(ForEachMultiTensorChunk(ops_, inputs,
+                                 [&](const OpExpr& op, const TensorTuple& chunk) -> Maybe<void> {
+                                   norms.emplace_back(
+                                       JUST(OpInterpUtil::Dispatch<Tensor>(op, chunk, attrs)));
+                                   return Maybe<void>::Ok();
+                                 }));
+    if (norms.size() == 1) { return norms.at(0); }
+    // the norm of the norms of the chunks is the norm of all the inputs
+    return (*this)(norms, ord);
+  }
+
+ private:
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
+class MultiTensorClipByNormFunctor {
+ public:
+  MultiTensorClipByNormFunctor() {
+    ops_.resize(kMaxInputCount);
+    for (int n = 0; n < ops_.size(); ++n) {
+      ops_[n] = CHECK_JUST(one::OpBuilder("multi_tensor_clip_by_norm")
+                               .Input("x", n + 1)
+                               .Input("total_norm")
+                               .Build());
+    }
+  }
+
+  Maybe<void> operator()(const TensorTuple& inputs, const std::shared_ptr<one::Tensor>& total_norm,
+                         const float& max_norm, const float& epsilon,
+                         const bool& skip_if_nonfinite) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<float>("max_norm", max_norm));
+    JUST(attrs.SetAttr<float>("epsilon", epsilon));
+    JUST(attrs.SetAttr<bool>("skip_if_nonfinite", skip_if_nonfinite));
+    return ForEachMultiTensorChunk(
+        ops_, inputs, [&](const OpExpr& op, const TensorTuple& chunk) -> Maybe<void> {
+          TensorTuple op_inputs(chunk);
+          op_inputs.emplace_back(total_norm);
+          TensorTuple outputs{};
+          JUST(OpInterpUtil::Dispatch(op, op_inputs, &outputs, attrs));
+          return Maybe<void>::Ok();
+        });
+  }
+
+ private:
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
+class MultiTensorClampFunctor {
+ public:
+  MultiTensorClampFunctor() {
+    ops_.resize(kMaxInputCount);
+    for (int n = 0; n < ops_.size(); ++n) {
+      ops_[n] = CHECK_JUST(one::OpBuilder("multi_tensor_clamp").Input("x", n + 1).Build());
+    }
+  }
+
+  Maybe<void> operator()(const TensorTuple& inputs, const double& min, const double& max) const {
+    MutableAttrMap attrs;
+    JUST(attrs.SetAttr<double>("min", min));
+    JUST(attrs.SetAttr<double>("max", max));
+    return ForEachMultiTensorChunk(
+        ops_, inputs, [&](const OpExpr& op, const TensorTuple& chunk) -> Maybe<void> {
+          TensorTuple outputs{};
+          JUST(OpInterpUtil::Dispatch(op, chunk, &outputs, attrs));
+          return Maybe<void>::Ok();
+        });
+  }
+
+ private:
+  std::vector<std::shared_ptr<OpExpr>> ops_;
+};
+
 }  // namespace impl
 
 ONEFLOW_FUNCTION_LIBRARY(m) {
@@ -3021,6 +3126,9 @@ ONEFLOW_FUNCTION_LIBRARY(m) {
   m.add_functor<impl::OneEmbeddingAdagradUpdateFunctor>("OneEmbeddingAdagradUpdate");
   m.add_functor<impl::OneEmbeddingFtrlUpdateFunctor>("OneEmbeddingFtrlUpdate");
   m.add_functor<impl::RocAucScoreFunctor>("RocAucScore");
+  m.add_functor<impl::MultiTensorNormFunctor>("MultiTensorNorm");
+  m.add_functor<impl::MultiTensorClipByNormFunctor>("MultiTensorClipByNorm");
+  m.add_functor<impl::MultiTensorClampFunctor>("MultiTensorClamp");
 }
 
 }  // namespace functional
@@ -369,6 +369,78 @@ class ConsistentRandPermFunctor {
  private:
   std::shared_ptr<OpExpr> randperm_op_;
 };
+
+namespace {
+
+Maybe<void> SetStatelessRandomAttrs(MutableAttrMap* attrs, const Shape& shape,
+                                    const std::string& distribution, const int64_t& seed,
+                                    const double& low, const double& high, const double& mean,
+                                    const double& std, const Optional<Symbol<DType>>& dtype) {
+  DataType dtype_val = DataType::kFloat;
+  if (dtype.has_value()) {
+    dtype_val = JUST(dtype)->data_type();
+    if (dtype_val != DataType::kFloat && dtype_val != DataType::kDouble) {
+      OF_UNIMPLEMENTED() << "Only support float and double in stateless_random().";
+    }
+  }
+  JUST(attrs->SetAttr<std::string>("distribution", distribution));
+  JUST(attrs->SetAttr<double>("from", low));
+  JUST(attrs->SetAttr<double>("to", high));
+  JUST(attrs->SetAttr<double>("mean", mean));
+  JUST(attrs->SetAttr<double>("std", std));
+  JUST(attrs->SetAttr<int64_t>("seed", seed));
+  JUST(attrs->SetAttr<DataType>("dtype", dtype_val));
+  JUST(attrs->SetAttr<Shape>("shape", shape));
+  return Maybe<void>::Ok();
+}
+
+}  // namespace
+
+class StatelessRandomFunctor {
+ public:
+  StatelessRandomFunctor() {
+    op_ = CHECK_JUST(one::OpBuilder("stateless_random").Output("out").Build());
+  }
+  Maybe<Tensor> operator()(const Shape& shape, const std::string& distribution,
+                           const int64_t& seed, const double& low, const double& high,
+                           const double& mean, const double& std,
+                           const Optional<Symbol<DType>>& dtype,
+                           const Optional<Symbol<Device>>& device) const {
+    MutableAttrMap attrs;
+    JUST(SetStatelessRandomAttrs(&attrs, shape, distribution, seed, low, high, mean, std, dtype));
+    OpExprInterpContext ctx(attrs);
+    ctx.device = device;
+    return OpInterpUtil::Dispatch<Tensor>(*op_, {}, ctx);
+  }
+
+ private:
+  std::shared_ptr<OpExpr> op_;
+};
+
+class ConsistentStatelessRandomFunctor {
+ public:
+  ConsistentStatelessRandomFunctor() {
+    op_ = CHECK_JUST(one::OpBuilder("stateless_random").Output("out").Build());
+  }
+  Maybe<Tensor> operator()(const Shape& shape, const std::string& distribution,
+                           const int64_t& seed, const double& low, const double& high,
+                           const double& mean, const double& std,
+                           const Symbol<ParallelDesc>& placement,
+                           const std::vector<Symbol<SbpParallel>>& sbp_tuple,
+                           const Optional<Symbol<DType>>& dtype) const {
+    JUST(CheckDeviceIdsIsValid(placement));
+    MutableAttrMap attrs;
+    JUST(SetStatelessRandomAttrs(&attrs, shape, distribution, seed, low, high, mean, std, dtype));
+    const auto& nd_sbp = JUST(GetNdSbp(sbp_tuple));
+    if (LazyMode::is_enabled()) {
+      JUST(attrs.SetAttr<std::vector<std::string>>("nd_sbp", *JUST(GetNdSbpStrList(nd_sbp))));
+    }
+    return OpInterpUtil::Dispatch<Tensor>(*op_, {}, OpExprInterpContext(attrs, placement, nd_sbp));
+  }
+
+ private:
+  std::shared_ptr<OpExpr> op_;
+};
 }  // namespace impl
 
 using namespace impl;
@@ -383,6 +455,8 @@ ONEFLOW_FUNCTION_LIBRARY(m) {
   m.add_functor<ConsistentRandNFunctor>("ConsistentRandN");
   m.add_functor<RandIntFunctor, RandInt2Functor>("RandInt");
   m.add_functor<ConsistentRandIntFunctor, ConsistentRandInt2Functor>("ConsistentRandInt");
+  m.add_functor<StatelessRandomFunctor>("StatelessRandom");
+  m.add_functor<ConsistentStatelessRandomFunctor>("ConsistentStatelessRandom");
 };
 
 }  // namespace functional
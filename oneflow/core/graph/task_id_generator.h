@@ -29,6 +29,10 @@ class TaskIdGenerator final {
   ~TaskIdGenerator() = default;
 
   TaskId Generate(const StreamId& stream_id);
+  // Index the next task generated on stream_id gets.
+  task_index_t NextTaskIndex(const StreamId& stream_id) const;
+  // Makes later tasks on the stream of task_id get larger indexes.
+  void Reserve(const TaskId& task_id);
 
  private:
   HashMap<StreamId, task_index_t> stream_id2task_index_counter_;
@@ -39,6 +43,17 @@ inline TaskId TaskIdGenerator::Generate(const StreamId& stream_id) {
   return TaskId{stream_id, task_index};
 }
 
+inline TaskIdGenerator::task_index_t TaskIdGenerator::NextTaskIndex(
+    const StreamId& stream_id) const {
+  auto it = stream_id2task_index_counter_.find(stream_id);
+  return it == stream_id2task_index_counter_.end() ? 0 : it->second;
+}
+
+inline void TaskIdGenerator::Reserve(const TaskId& task_id) {
+  task_index_t* counter = &stream_id2task_index_counter_[task_id.stream_id()];
+  *counter = std::max<task_index_t>(*counter, task_id.task_index() + 1);
+}
+
 }  // namespace oneflow
 
 #endif  // ONEFLOW_CORE_GRAPH_TASK_ID_GENERATOR_H_
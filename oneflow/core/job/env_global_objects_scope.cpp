@@ -202,8 +202,8 @@ Maybe<void> EnvGlobalObjectsScope::Init(const EnvProto& env_proto) {
 #ifdef WITH_CUDA
   Global<EagerNcclCommMgr>::New();
   Global<CudnnConvAlgoCache>::New();
-  Global<embedding::EmbeddingManager>::New();
 #endif
+  Global<embedding::EmbeddingManager>::New();
   Global<vm::VirtualMachineScope>::New(Global<ResourceDesc, ForSession>::Get()->resource());
   Global<EagerJobBuildAndInferCtxMgr>::New();
   if (!Global<ResourceDesc, ForSession>::Get()->enable_dry_run()) {
@@ -261,8 +261,8 @@ EnvGlobalObjectsScope::~EnvGlobalObjectsScope() {
   }
   Global<EagerJobBuildAndInferCtxMgr>::Delete();
   Global<vm::VirtualMachineScope>::Delete();
-#ifdef WITH_CUDA
   Global<embedding::EmbeddingManager>::Delete();
+#ifdef WITH_CUDA
   Global<CudnnConvAlgoCache>::Delete();
   Global<EagerNcclCommMgr>::Delete();
 #endif
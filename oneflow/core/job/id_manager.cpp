@@ -14,6 +14,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 */
 #include "oneflow/core/job/id_manager.h"
+#include "oneflow/core/job/plan.pb.h"
 
 namespace oneflow {
 
@@ -28,4 +29,50 @@ IDMgr::IDMgr() {
   chunk_id_count_ = 0;
 }
 
+bool IDMgr::TryReserveIdsOfPlan(const Plan& plan) {
+  int64_t max_regst_desc_id = -1;
+  int64_t max_mem_block_id = -1;
+  int64_t max_chunk_id = -1;
+  int64_t min_regst_desc_id = regst_desc_id_count_;
+  int64_t min_mem_block_id = mem_block_id_count_;
+  int64_t min_chunk_id = chunk_id_count_;
+  auto UpdateRange = [](int64_t id, int64_t* min_id, int64_t* max_id) {
+    if (id < 0) { return; }
+    *min_id = std::min(*min_id, id);
+    *max_id = std::max(*max_id, id);
+  };
+  std::vector<TaskId> task_ids;
+  for (const TaskProto& task : plan.task()) {
+    task_ids.emplace_back(DecodeTaskIdFromInt64(task.task_id()));
+    const TaskId& task_id = task_ids.back();
+    if (task_id.task_index() < task_id_gen_.NextTaskIndex(task_id.stream_id())) { return false; }
+    for (const auto& pair : task.produced_regst_desc()) {
+      const RegstDescProto& regst_desc = pair.second;
+      UpdateRange(regst_desc.regst_desc_id(), &min_regst_desc_id, &max_regst_desc_id);
+      UpdateRange(regst_desc.mem_block_id(), &min_mem_block_id, &max_mem_block_id);
+      UpdateRange(regst_desc.separated_header_mem_block_id(), &min_mem_block_id,
+                  &max_mem_block_id);
+    }
+  }
+  for (const auto& mem_block : plan.block_chunk_list().mem_block()) {
+    UpdateRange(mem_block.mem_block_id(), &min_mem_block_id, &max_mem_block_id);
+    UpdateRange(mem_block.chunk_id(), &min_chunk_id, &max_chunk_id);
+  }
+  for (const auto& chunk : plan.block_chunk_list().chunk()) {
+    UpdateRange(chunk.chunk_id(), &min_chunk_id, &max_chunk_id);
+  }
+  for (const auto& pair : plan.ctrl_regst_desc_info().ctrl_regst_desc_id2producer_task_id()) {
+    UpdateRange(pair.first, &min_regst_desc_id, &max_regst_desc_id);
+  }
+  if (min_regst_desc_id < regst_desc_id_count_ || min_mem_block_id < mem_block_id_count_
+      || min_chunk_id < chunk_id_count_) {
+    return false;
+  }
+  for (const TaskId& task_id : task_ids) { task_id_gen_.Reserve(task_id); }
+  regst_desc_id_count_ = std::max(regst_desc_id_count_, max_regst_desc_id + 1);
+  mem_block_id_count_ = std::max(mem_block_id_count_, max_mem_block_id + 1);
+  chunk_id_count_ = std::max(chunk_id_count_, max_chunk_id + 1);
+  return true;
+}
+
 }  // namespace oneflow
@@ -24,6 +24,8 @@ limitations under the License.
 
 namespace oneflow {
 
+class Plan;
+
 class IDMgr final {
  public:
   OF_DISALLOW_COPY_AND_MOVE(IDMgr);
@@ -35,6 +37,11 @@ class IDMgr final {
 
   TaskIdGenerator* GetTaskIdGenerator() { return &task_id_gen_; }
 
+  // Reserves the ids used by a plan that was not generated through this IDMgr,
+  // e.g. one loaded from a compile cache, so that later plans don't reuse them.
+  // Returns false and reserves nothing if some of the ids may already be taken.
+  bool TryReserveIdsOfPlan(const Plan& plan);
+
  private:
   friend class Global<IDMgr>;
   IDMgr();
@@ -34,6 +34,11 @@ class BinaryInStream {
   virtual void set_cur_file_pos(uint64_t val) = 0;
   virtual bool IsEof() const = 0;
 
+  // Positional reads leave cur_file_pos untouched and may be issued from
+  // several threads at once. Streams that can't serve them return false.
+  virtual bool SupportsReadAt() const { return false; }
+  virtual void ReadAt(uint64_t offset, char* s, size_t n) const { UNIMPLEMENTED(); }
+
  protected:
   BinaryInStream() = default;
 };
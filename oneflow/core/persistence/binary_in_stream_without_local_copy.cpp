@@ -27,6 +27,11 @@ int32_t BinaryInStreamWithoutLocalCopy::Read(char* s, size_t n) {
   return 0;
 }
 
+void BinaryInStreamWithoutLocalCopy::ReadAt(uint64_t offset, char* s, size_t n) const {
+  CHECK_LE(offset + n, file_size_);
+  file_->Read(offset, n, s);
+}
+
 BinaryInStreamWithoutLocalCopy::BinaryInStreamWithoutLocalCopy(fs::FileSystem* fs,
                                                                const std::string& file_path)
     : cur_file_pos_(0) {
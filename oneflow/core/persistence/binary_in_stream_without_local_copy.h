@@ -34,6 +34,8 @@ class BinaryInStreamWithoutLocalCopy final : public BinaryInStream {
   uint64_t cur_file_pos() const override { return cur_file_pos_; }
   void set_cur_file_pos(uint64_t val) override { cur_file_pos_ = val; }
   bool IsEof() const override { return cur_file_pos_ == file_size_; }
+  bool SupportsReadAt() const override { return true; }
+  void ReadAt(uint64_t offset, char* s, size_t n) const override;
 
  private:
   std::unique_ptr<fs::RandomAccessFile> file_;
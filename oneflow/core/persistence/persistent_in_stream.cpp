@@ -17,8 +17,12 @@ limitations under the License.
 #include "oneflow/core/persistence/binary_in_stream_with_local_copy.h"
 #include "oneflow/core/persistence/binary_in_stream_without_local_copy.h"
 #include "oneflow/core/job/job_set.pb.h"
+#include <chrono>
+#include <condition_variable>
 #include <cstring>
+#include <mutex>
 #include "oneflow/core/common/constant.h"
+#include "oneflow/core/thread/thread_pool.h"
 
 namespace oneflow {
 
@@ -41,8 +45,45 @@ size_t GetBufferSize() {
   return kDefaultBufferSize;
 }
 
+// Number of chunks kept in flight per stream, 0 disables read-ahead.
+int64_t GetReadAheadDepth() {
+  return std::max<int64_t>(
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_DEPTH", 0), 0);
+}
+
+uint64_t GetReadAheadChunkSize() {
+  constexpr int64_t kDefaultChunkSize = 4 * 1024 * 1024;  // 4MB
+  const int64_t chunk_size = ParseIntegerFromEnv(
+      "ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_CHUNK_SIZE_BYTES", kDefaultChunkSize);
+  return chunk_size > 0 ? chunk_size : kDefaultChunkSize;
+}
+
+// Shared by all streams so that reads of different part files, and of
+// different datasets, overlap. Never destroyed, streams owned by globals may
+// still wait for their reads during exit.
+ThreadPool* ReadAheadThreadPool() {
+  static ThreadPool* pool = new ThreadPool(std::max<int64_t>(
+      ParseIntegerFromEnv("ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_THREAD_NUM", 4), 1));
+  return pool;
+}
+
+uint64_t NanosecondsSince(std::chrono::steady_clock::time_point start) {
+  const auto elapsed = std::chrono::steady_clock::now() - start;
+  return std::chrono::duration_cast<std::chrono::nanoseconds>(elapsed).count();
+}
+
 }  // namespace
 
+struct PersistentInStream::ReadAheadChunk {
+  explicit ReadAheadChunk(uint64_t capacity) : buffer(capacity + 1), size(0), done(false) {}
+
+  std::vector<char> buffer;
+  uint64_t size;
+  std::mutex mutex;
+  std::condition_variable cond;
+  bool done;
+};
+
 PersistentInStream::PersistentInStream(fs::FileSystem* fs,
                                        const std::vector<std::string>& file_paths, uint64_t offset,
                                        bool cyclic, bool with_local_copy)
@@ -50,7 +91,8 @@ PersistentInStream::PersistentInStream(fs::FileSystem* fs,
 
 PersistentInStream::PersistentInStream(int64_t session_id, fs::FileSystem* fs,
                                        const std::vector<std::string>& file_paths, uint64_t offset,
-                                       bool cyclic, bool with_local_copy) {
+                                       bool cyclic, bool with_local_copy)
+    : read_ahead_(false), read_ahead_chunk_size_(0), bytes_read_(0), read_ns_(0), stall_ns_(0) {
   if (with_local_copy) { CHECK_EQ(offset, 0); }
   std::vector<std::shared_ptr<BinaryInStream>> streams;
   for (auto& file_path : file_paths) {
@@ -65,10 +107,37 @@ PersistentInStream::PersistentInStream(int64_t session_id, fs::FileSystem* fs,
   } else {
     stream_scanner_.reset(new AcyclicStreamScanner(fs, streams, offset));
   }
-  buffer_.resize(GetBufferSize() + 1);
+  // Local copies are written while reading, which needs sequential reads.
+  const int64_t read_ahead_depth = GetReadAheadDepth();
+  read_ahead_ = read_ahead_depth > 0 && stream_scanner_->SupportsReadAt();
+  if (read_ahead_) {
+    read_ahead_chunk_size_ = GetReadAheadChunkSize();
+    FOR_RANGE(int64_t, i, 0, read_ahead_depth) {
+      free_chunks_.emplace_back(std::make_shared<ReadAheadChunk>(read_ahead_chunk_size_));
+    }
+    // Only holds the terminating '\0' while no chunk is current.
+    buffer_.resize(1);
+  } else {
+    buffer_.resize(GetBufferSize() + 1);
+  }
   cur_buf_begin_ = buffer_.data();
   cur_buf_end_ = buffer_.data();
   *cur_buf_end_ = '\0';
+  if (read_ahead_) { IssueReadAhead(); }
+}
+
+PersistentInStream::~PersistentInStream() {
+  // Pending reads write into chunks they co-own, but still use the streams
+  // and counters of this object.
+  for (const auto& chunk : in_flight_chunks_) {
+    std::unique_lock<std::mutex> lock(chunk->mutex);
+    chunk->cond.wait(lock, [&chunk]() { return chunk->done; });
+  }
+  if (read_ahead_) {
+    VLOG(1) << "PersistentInStream read " << bytes_read_ << " bytes ahead at "
+            << (read_ns_ > 0 ? bytes_read_ * 1e3 / read_ns_ : 0.0)
+            << " MB/s per read, stalled " << stall_seconds() << " s";
+  }
 }
 
 PersistentInStream::PersistentInStream(fs::FileSystem* fs,
@@ -126,13 +195,69 @@ int32_t PersistentInStream::ReadFully(char* s, size_t n) {
 
 void PersistentInStream::UpdateBuffer() {
   CHECK_EQ(cur_buf_begin_, cur_buf_end_);
+  if (read_ahead_) {
+    UpdateBufferFromReadAhead();
+    return;
+  }
   uint64_t n = stream_scanner_->UpdateBuffer(&buffer_);
   cur_buf_begin_ = buffer_.data();
   cur_buf_end_ = buffer_.data() + n;
   *cur_buf_end_ = '\0';
 }
 
+void PersistentInStream::UpdateBufferFromReadAhead() {
+  // The consumer is done with the current chunk, it can be refilled.
+  if (cur_chunk_) { free_chunks_.emplace_back(std::move(cur_chunk_)); }
+  cur_chunk_.reset();
+  if (in_flight_chunks_.empty()) {
+    cur_buf_begin_ = buffer_.data();
+    cur_buf_end_ = buffer_.data();
+    *cur_buf_end_ = '\0';
+    return;
+  }
+  cur_chunk_ = std::move(in_flight_chunks_.front());
+  in_flight_chunks_.pop_front();
+  WaitForChunk(cur_chunk_.get());
+  cur_buf_begin_ = cur_chunk_->buffer.data();
+  cur_buf_end_ = cur_buf_begin_ + cur_chunk_->size;
+  *cur_buf_end_ = '\0';
+  IssueReadAhead();
+}
+
+void PersistentInStream::IssueReadAhead() {
+  while (!free_chunks_.empty()) {
+    std::shared_ptr<BinaryInStream> stream;
+    uint64_t offset = 0;
+    const uint64_t n = stream_scanner_->PlanNextRead(read_ahead_chunk_size_, &stream, &offset);
+    if (n == 0) { break; }
+    std::shared_ptr<ReadAheadChunk> chunk = std::move(free_chunks_.back());
+    free_chunks_.pop_back();
+    chunk->size = n;
+    chunk->done = false;
+    in_flight_chunks_.emplace_back(chunk);
+    ReadAheadThreadPool()->AddWork([this, chunk, stream, offset, n]() {
+      const auto start = std::chrono::steady_clock::now();
+      stream->ReadAt(offset, chunk->buffer.data(), n);
+      read_ns_ += NanosecondsSince(start);
+      bytes_read_ += n;
+      {
+        std::unique_lock<std::mutex> lock(chunk->mutex);
+        chunk->done = true;
+      }
+      chunk->cond.notify_one();
+    });
+  }
+}
+
+void PersistentInStream::WaitForChunk(ReadAheadChunk* chunk) {
+  std::unique_lock<std::mutex> lock(chunk->mutex);
+  if (chunk->done) { return; }
+  const auto start = std::chrono::steady_clock::now();
+  chunk->cond.wait(lock, [chunk]() { return chunk->done; });
+  stall_ns_ += NanosecondsSince(start);
+}
+
 bool PersistentInStream::IsEof() const {
-  return cur_buf_begin_ == cur_buf_end_ && stream_scanner_->IsEof();
+  return cur_buf_begin_ == cur_buf_end_ && in_flight_chunks_.empty() && stream_scanner_->IsEof();
 }
 }  // namespace oneflow
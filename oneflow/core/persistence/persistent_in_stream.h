@@ -18,13 +18,15 @@ limitations under the License.
 
 #include "oneflow/core/persistence/file_system.h"
 #include "oneflow/core/persistence/stream_scanner.h"
+#include <atomic>
+#include <deque>
 
 namespace oneflow {
 
 class PersistentInStream {
  public:
   OF_DISALLOW_COPY_AND_MOVE(PersistentInStream);
-  virtual ~PersistentInStream() {}
+  virtual ~PersistentInStream();
   PersistentInStream(fs::FileSystem* fs, const std::vector<std::string>& file_paths,
                      uint64_t offset, bool cyclic, bool with_local_copy);
   PersistentInStream(fs::FileSystem* fs, const std::vector<std::string>& file_paths, bool cyclic,
@@ -44,15 +46,39 @@ class PersistentInStream {
   int32_t ReadLine(std::string* l);
   int32_t ReadFully(char* s, size_t n);
 
+  // Counters of the read-ahead mode, all zero when it is off.
+  // bytes_read / read_seconds is the throughput of the individual reads,
+  // stall_seconds is the time ReadLine/ReadFully waited for data.
+  uint64_t bytes_read() const { return bytes_read_; }
+  double read_seconds() const { return read_ns_ * 1e-9; }
+  double stall_seconds() const { return stall_ns_ * 1e-9; }
+
  private:
+  struct ReadAheadChunk;
+
   bool IsEof() const;
   void UpdateBuffer();
+  void UpdateBufferFromReadAhead();
+  void IssueReadAhead();
+  void WaitForChunk(ReadAheadChunk* chunk);
 
   std::unique_ptr<StreamScanner> stream_scanner_;
 
   std::vector<char> buffer_;
   char* cur_buf_begin_;
   char* cur_buf_end_;
+
+  // When read-ahead is on, up to read-ahead depth chunks are read on a
+  // background thread pool while the current one is consumed.
+  bool read_ahead_;
+  uint64_t read_ahead_chunk_size_;
+  std::deque<std::shared_ptr<ReadAheadChunk>> in_flight_chunks_;
+  std::vector<std::shared_ptr<ReadAheadChunk>> free_chunks_;
+  std::shared_ptr<ReadAheadChunk> cur_chunk_;
+
+  std::atomic<uint64_t> bytes_read_;
+  std::atomic<uint64_t> read_ns_;
+  uint64_t stall_ns_;
 };
 
 }  // namespace oneflow
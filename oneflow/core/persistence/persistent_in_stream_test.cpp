@@ -0,0 +1,91 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include <gtest/gtest.h>
+#include <cstdlib>
+#include "oneflow/core/common/process_state.h"
+#include "oneflow/core/common/str_util.h"
+#include "oneflow/core/persistence/persistent_in_stream.h"
+#include "oneflow/core/persistence/posix/posix_file_system.h"
+
+namespace oneflow {
+
+namespace {
+
+#ifdef OF_PLATFORM_POSIX
+
+std::vector<std::string> WriteParts(fs::FileSystem* file_system, const std::string& content,
+                                    int32_t part_num) {
+  std::string current_dir = GetCwd();
+  StringReplace(&current_dir, '\\', '/');
+  std::vector<std::string> file_paths;
+  const size_t part_size = content.size() / part_num + 1;
+  for (int32_t i = 0; i < part_num; ++i) {
+    file_paths.emplace_back(
+        JoinPath(current_dir, "/tmp_persistent_in_stream_part_" + std::to_string(i)));
+    std::unique_ptr<fs::WritableFile> file;
+    file_system->NewWritableFile(file_paths.back(), &file);
+    const std::string part = content.substr(i * part_size, part_size);
+    file->Append(part.data(), part.size());
+    file->Close();
+  }
+  return file_paths;
+}
+
+std::string ReadAll(fs::FileSystem* file_system, const std::vector<std::string>& file_paths,
+                    size_t piece_size) {
+  PersistentInStream in_stream(file_system, file_paths, false, false);
+  std::string content;
+  std::vector<char> piece(piece_size);
+  while (in_stream.ReadFully(piece.data(), piece_size) == 0) {
+    content.append(piece.data(), piece_size);
+  }
+  return content;
+}
+
+#endif  // OF_PLATFORM_POSIX
+
+}  // namespace
+
+TEST(PersistentInStream, read_ahead) {
+#ifdef OF_PLATFORM_POSIX
+  std::unique_ptr<fs::FileSystem> file_system(new fs::PosixFileSystem());
+  std::string content;
+  for (int32_t i = 0; i < 10000; ++i) { content += std::to_string(i) + "\n"; }
+  // whole pieces only, ReadFully does not return partial data at the end
+  content.resize(content.size() / 16 * 16);
+  const std::vector<std::string> file_paths = WriteParts(file_system.get(), content, 3);
+
+  ASSERT_EQ(ReadAll(file_system.get(), file_paths, 16), content);
+  // chunks smaller than a part file, several of them in flight
+  setenv("ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_DEPTH", "3", 1);
+  setenv("ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_CHUNK_SIZE_BYTES", "1000", 1);
+  ASSERT_EQ(ReadAll(file_system.get(), file_paths, 16), content);
+  {
+    PersistentInStream in_stream(file_system.get(), file_paths, false, false);
+    std::string line;
+    for (int32_t i = 0; i < 100; ++i) {
+      ASSERT_EQ(in_stream.ReadLine(&line), 0);
+      ASSERT_EQ(line, std::to_string(i));
+    }
+    ASSERT_GT(in_stream.bytes_read(), 0);
+  }
+  unsetenv("ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_DEPTH");
+  unsetenv("ONEFLOW_PERSISTENT_IN_STREAM_READ_AHEAD_CHUNK_SIZE_BYTES");
+  for (const auto& file_path : file_paths) { file_system->DelFile(file_path); }
+#endif
+}
+
+}  // namespace oneflow
@@ -64,6 +64,26 @@ uint64_t StreamScanner::UpdateBuffer(std::vector<char>* buffer) {
   return n;
 }
 
+uint64_t StreamScanner::PlanNextRead(uint64_t max_n, std::shared_ptr<BinaryInStream>* stream,
+                                     uint64_t* offset) {
+  if (cur_stream_id_ == stream_num_) return 0;
+  const auto& cur_stream = streams_[cur_stream_id_];
+  uint64_t n = std::min<uint64_t>(max_n, cur_stream->file_size() - cur_stream->cur_file_pos());
+  if (n == 0) { return 0; }
+  *stream = cur_stream;
+  *offset = cur_stream->cur_file_pos();
+  cur_stream->set_cur_file_pos(*offset + n);
+  AddNForCurFilePos(n);
+  return n;
+}
+
+bool StreamScanner::SupportsReadAt() const {
+  for (const auto& stream : streams_) {
+    if (!stream->SupportsReadAt()) { return false; }
+  }
+  return true;
+}
+
 void AcyclicStreamScanner::AddNForCurFilePos(uint64_t n) {
   whole_file_pos_ += n;
   if (streams_[cur_stream_id_]->IsEof()) { ++cur_stream_id_; }
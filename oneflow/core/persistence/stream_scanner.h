@@ -32,6 +32,11 @@ class StreamScanner {
                 uint64_t offset);
   bool IsEof() const;
   uint64_t UpdateBuffer(std::vector<char>* buffer);
+  // Advances like UpdateBuffer but leaves the reading to the caller: returns
+  // the number of bytes (at most max_n) to read from *stream at *offset.
+  uint64_t PlanNextRead(uint64_t max_n, std::shared_ptr<BinaryInStream>* stream,
+                        uint64_t* offset);
+  bool SupportsReadAt() const;
 
  protected:
   virtual void AddNForCurFilePos(uint64_t n) = 0;
@@ -13,8 +13,9 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 */
+#include <algorithm>
+#include <atomic>
 #include <memory>
-#include <set>
 #include <string>
 #include <unordered_map>
 #include "nlohmann/json.hpp"
@@ -23,67 +24,125 @@ limitations under the License.
 
 using json = nlohmann::json;
 
-namespace nlohmann {
+namespace oneflow {
 
-void to_json(json& j, const std::shared_ptr<::oneflow::profiler::IEvent>& event) {
-  j = event->ToJson();
-}
+namespace profiler {
 
-}  // namespace nlohmann
+namespace {
 
-namespace oneflow {
+constexpr size_t kDefaultEventBufferCapacity = 16384;
 
-namespace profiler {
+thread_local int32_t current_depth = 0;
+thread_local uint32_t current_stream_id = 0;
 
-nlohmann::json IEvent::ToJson() {
-  return json{{"name", name_}, {"cpu_time", GetDuration() / 1000}, {"input_shapes", "-"}};
-}
-void IEvent::Start() { started_at_ = GetTimeNow(); }
-void IEvent::Finish() { finished_at_ = GetTimeNow(); }
-const std::string& IEvent::GetName() const { return name_; }
-time_t IEvent::GetDuration() { return finished_at_ - started_at_; }
-
-std::shared_ptr<IEvent> IEvent::Create(EventType type, const std::string& name) {
-  if (type == EventType::kCustom) { return std::make_shared<CustomEvent>(name); }
-  if (type == EventType::kKernel) { return std::make_shared<KernelEvent>(name); }
-  return nullptr;
-}
+struct ThreadEventBufferCache {
+  uint64_t pmgr_id = 0;
+  // Weak, so that the buffers of a deleted ProfileMgr are not kept alive by idle threads.
+  std::weak_ptr<ThreadEventBuffer> buffer;
+};
 
-nlohmann::json KernelEvent::ToJson() {
-  auto j = IEvent::ToJson();
-  j["type"] = EventType::kKernel;
-  j["input_shapes"] = FormatShapes();
-  return j;
-}
+thread_local ThreadEventBufferCache event_buffer_cache;
+
+std::atomic<uint64_t> next_profile_mgr_id(1);
 
-std::string KernelEvent::Key() { return name_ + "." + FormatShapes(); }
+class NameTable final {
+ public:
+  OF_DISALLOW_COPY_AND_MOVE(NameTable);
+  // The id 0 is the empty name, which stands for no stream.
+  NameTable() { Intern(""); }
+  ~NameTable() = default;
 
-std::string KernelEvent::FormatShapes(size_t max_num_to_format) {
-  if (input_shapes_.size() == 0) { return "-"; }
+  uint32_t Intern(const std::string& name) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = ids_.find(name);
+    if (it != ids_.end()) { return it->second; }
+    const uint32_t id = names_.size();
+    names_.push_back(name);
+    ids_.emplace(name, id);
+    return id;
+  }
+
+  std::vector<std::string> Names() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return names_;
+  }
+
+ private:
+  std::mutex mutex_;
+  std::vector<std::string> names_;
+  std::unordered_map<std::string, uint32_t> ids_;
+};
+
+NameTable* GlobalNameTable() {
+  static NameTable* name_table = new NameTable();
+  return name_table;
+}
+
+std::string FormatShapes(const EventRecord& record) {
+  if (record.num_shapes == 0) { return "-"; }
   std::string result("[");
-  for (size_t i = 0; i < std::min(input_shapes_.size(), max_num_to_format); ++i) {
+  size_t offset = 0;
+  for (size_t i = 0; i < record.num_shapes; ++i) {
     if (i != 0) { result += ", "; }
-    const std::string current_shape = input_shapes_[i].ToString();
+    const int64_t* dims = record.dims + offset;
+    offset += record.num_axes[i];
+    const std::string current_shape =
+        Shape(DimVector(dims, dims + record.num_axes[i])).ToString();
     if (current_shape == "()") {
       result += "scalar";
     } else {
       result += current_shape;
     }
   }
-  if (input_shapes_.size() > max_num_to_format) { result += ", ..."; }
+  if (record.shapes_truncated) { result += ", ..."; }
   result += "]";
   return result;
 }
 
-void KernelEvent::RecordShape(const Shape& shape) { input_shapes_.emplace_back(shape); }
+json RecordToJson(const EventRecord& record, int64_t thread_id,
+                  const std::vector<std::string>& names) {
+  return json{{"name", names.at(record.name_id)},
+              {"cpu_time", (record.finished_at - record.started_at) / 1000},
+              {"input_shapes", FormatShapes(record)},
+              {"type", record.type},
+              {"started_at", record.started_at},
+              {"finished_at", record.finished_at},
+              {"thread_id", thread_id},
+              {"stream_id", names.at(record.stream_id)},
+              {"depth", record.depth}};
+}
+
+}  // namespace
 
-nlohmann::json CustomEvent::ToJson() {
-  auto j = IEvent::ToJson();
-  j["type"] = EventType::kKernel;
-  return j;
+ProfileMgr::ProfileMgr()
+    : id_(next_profile_mgr_id.fetch_add(1)),
+      event_buffer_capacity_(ParseIntegerFromEnv("ONEFLOW_PROFILER_EVENT_BUFFER_CAPACITY",
+                                                  kDefaultEventBufferCapacity)) {
+  CHECK_GT(event_buffer_capacity_, 0);
 }
 
-std::string CustomEvent::Key() { return name_; }
+uint32_t ProfileMgr::InternName(const std::string& name) {
+  // Names are looked up in a per thread cache first, so that only new names take the lock.
+  static thread_local std::unordered_map<std::string, uint32_t> cached_ids;
+  auto it = cached_ids.find(name);
+  if (it != cached_ids.end()) { return it->second; }
+  const uint32_t id = GlobalNameTable()->Intern(name);
+  cached_ids.emplace(name, id);
+  return id;
+}
+
+std::shared_ptr<ThreadEventBuffer> ProfileMgr::ThisThreadEventBuffer() {
+  // The cached buffer is owned by this ProfileMgr when the ids match, so it is still alive.
+  if (event_buffer_cache.pmgr_id == id_) { return event_buffer_cache.buffer.lock(); }
+  auto buffer = std::make_shared<ThreadEventBuffer>(GetThreadId(), event_buffer_capacity_);
+  {
+    std::lock_guard<std::mutex> lock(event_buffers_mutex_);
+    event_buffers_.push_back(buffer);
+  }
+  event_buffer_cache.pmgr_id = id_;
+  event_buffer_cache.buffer = buffer;
+  return buffer;
+}
 
 std::string ProfileMgr::RegisterEventRecorder(const std::shared_ptr<EventRecorder>& event_recorder,
                                               const std::string& name) {
@@ -98,18 +157,31 @@ void ProfileMgr::UnregisterEventRecorder(const std::string& event_recorder_key)
 }
 
 std::string ProfileMgr::DumpResultsJson() {
-  const json j = ExportEvents();
-  return j.dump();
-}
-
-std::vector<std::shared_ptr<IEvent>> ProfileMgr::ExportEvents() {
-  std::vector<std::shared_ptr<IEvent>> events;
-  while (!events_.empty()) {
-    auto e = events_.front();
-    events_.pop();
-    events.emplace_back(e);
+  const std::vector<std::string> names = GlobalNameTable()->Names();
+  // The records are copied out under the lock of each buffer, as other threads may still be
+  // pushing to them.
+  std::vector<EventRecord> records;
+  std::vector<int64_t> thread_ids;
+  uint64_t num_dropped = 0;
+  {
+    std::lock_guard<std::mutex> lock(event_buffers_mutex_);
+    for (const auto& buffer : event_buffers_) {
+      num_dropped += buffer->CopyRecords(&records);
+      thread_ids.resize(records.size(), buffer->thread_id());
+    }
+  }
+  if (num_dropped > 0) {
+    LOG(WARNING) << num_dropped << " profiler events were dropped, "
+                 << "increase ONEFLOW_PROFILER_EVENT_BUFFER_CAPACITY to keep more of them.";
   }
-  return events;
+  std::vector<size_t> order(records.size());
+  for (size_t i = 0; i < order.size(); ++i) { order[i] = i; }
+  std::stable_sort(order.begin(), order.end(), [&](size_t lhs, size_t rhs) {
+    return records[lhs].started_at < records[rhs].started_at;
+  });
+  json j = json::array();
+  for (size_t i : order) { j.push_back(RecordToJson(records[i], thread_ids[i], names)); }
+  return j.dump();
 }
 
 std::string ProfileMgr::GetNextEventRecorderKey(const std::string& name) {
@@ -121,19 +193,59 @@ std::string ProfileMgr::GetNextEventRecorderKey(const std::string& name) {
   return name + "." + std::to_string(event_recorders_last_id_[name]);
 }
 
-std::shared_ptr<EventRecorder> EventRecorder::CreateCustomEventRecorder(const std::string& name) {
-  return std::make_shared<EventRecorder>(IEvent::Create(EventType::kCustom, name));
+EventRecorder::EventRecorder(EventType type, const std::string& name,
+                             const std::string& stream_id)
+    : started_(false), num_dims_(0), outer_stream_id_(0) {
+  ProfileMgr* pmgr = Global<ProfileMgr>::Get();
+  if (pmgr == nullptr) { return; }
+  buffer_ = pmgr->ThisThreadEventBuffer();
+  record_.type = type;
+  record_.name_id = ProfileMgr::InternName(name);
+  record_.stream_id = stream_id.empty() ? 0 : ProfileMgr::InternName(stream_id);
+  record_.num_shapes = 0;
+  record_.shapes_truncated = false;
 }
 
-std::shared_ptr<EventRecorder> EventRecorder::CreateKernelEventRecorder(
-    const std::string& name, const ShapeGetterFuncType& shape_getter) {
-  auto event = IEvent::Create(EventType::kKernel, name);
-  auto kernel_event = std::dynamic_pointer_cast<KernelEvent>(event);
-  if (shape_getter) {
-    for (const auto& x : shape_getter()) { kernel_event->RecordShape(x); }
+EventRecorder::~EventRecorder() {
+  if (!started_) { return; }
+  record_.finished_at = GetTimeNow();
+  current_depth -= 1;
+  current_stream_id = outer_stream_id_;
+  buffer_->Push(record_);
+}
+
+void EventRecorder::RecordShape(const Shape& shape) {
+  if (buffer_ == nullptr) { return; }
+  CHECK(!started_);
+  if (record_.num_shapes == kMaxRecordedShapes
+      || num_dims_ + shape.NumAxes() > kMaxRecordedDims) {
+    record_.shapes_truncated = true;
+    return;
   }
-  return std::make_shared<EventRecorder>(event);
+  if (record_.shapes_truncated) { return; }
+  for (int64_t i = 0; i < shape.NumAxes(); ++i) { record_.dims[num_dims_ + i] = shape.At(i); }
+  num_dims_ += shape.NumAxes();
+  record_.num_axes[record_.num_shapes] = shape.NumAxes();
+  record_.num_shapes += 1;
+}
+
+void EventRecorder::Start() {
+  if (buffer_ == nullptr) { return; }
+  CHECK(!started_);
+  started_ = true;
+  record_.depth = current_depth;
+  current_depth += 1;
+  if (record_.stream_id == 0) { record_.stream_id = current_stream_id; }
+  outer_stream_id_ = current_stream_id;
+  current_stream_id = record_.stream_id;
+  record_.started_at = GetTimeNow();
+}
+
+std::shared_ptr<EventRecorder> EventRecorder::CreateCustomEventRecorder(const std::string& name) {
+  auto event_recorder = std::make_shared<EventRecorder>(EventType::kCustom, name);
+  event_recorder->Start();
+  return event_recorder;
 }
 
 }  // namespace profiler
-}  // namespace oneflow
\ No newline at end of file
+}  // namespace oneflow
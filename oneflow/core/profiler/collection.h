@@ -17,10 +17,9 @@ limitations under the License.
 #ifndef ONEFLOW_CORE_PROFILER_COLLECTION_H_
 #define ONEFLOW_CORE_PROFILER_COLLECTION_H_
 
-#include <functional>
 #include <memory>
+#include <mutex>
 #include <string>
-#include <queue>
 #include <unordered_map>
 #include <vector>
 #include "nlohmann/json.hpp"
@@ -33,50 +32,63 @@ namespace oneflow {
 
 namespace profiler {
 
-enum class EventType { kCustom, kKernel };
-
-class CustomEvent;
-class KernelEvent;
-
-class IEvent {
- public:
-  OF_DISALLOW_COPY_AND_MOVE(IEvent);
-
-  IEvent() = delete;
-  explicit IEvent(const std::string& name) : name_(name) {}
-  virtual std::string Key() = 0;
-  virtual nlohmann::json ToJson();
-  virtual ~IEvent() = default;
-
-  void Start();
-  void Finish();
-  const std::string& GetName() const;
-  time_t GetDuration();
-  static std::shared_ptr<IEvent> Create(EventType type, const std::string& name);
-
- protected:
-  std::string name_;
-  time_t started_at_ = 0;
-  time_t finished_at_ = 0;
+enum class EventType { kCustom, kKernel, kInstruction };
+
+constexpr size_t kMaxRecordedShapes = 4;
+constexpr size_t kMaxRecordedDims = 16;
+
+// A finished event. Records have a fixed size and names are interned, so that recording an event
+// does not allocate, shapes are only formatted when the results are dumped.
+struct EventRecord {
+  // Absolute wall clock time in nanoseconds.
+  time_t started_at;
+  time_t finished_at;
+  uint32_t name_id;
+  // The vm stream the event runs on, events started inside an instruction inherit its stream.
+  uint32_t stream_id;
+  // Number of the events of the same thread this event is nested in.
+  int32_t depth;
+  EventType type;
+  uint8_t num_shapes;
+  bool shapes_truncated;
+  uint8_t num_axes[kMaxRecordedShapes];
+  int64_t dims[kMaxRecordedDims];
 };
 
-class CustomEvent final : public IEvent {
+// Ring buffer of the events recorded by one thread, once it is full the oldest records are
+// overwritten. The lock is only contended while the results are dumped, as all the other pushes
+// come from the owner thread.
+class ThreadEventBuffer final {
  public:
-  explicit CustomEvent(const std::string& custom_name) : IEvent(custom_name) {}
-  std::string Key() override;
-  nlohmann::json ToJson() override;
-};
+  OF_DISALLOW_COPY_AND_MOVE(ThreadEventBuffer);
+  ThreadEventBuffer(int64_t thread_id, size_t capacity)
+      : thread_id_(thread_id), capacity_(capacity), records_(new EventRecord[capacity]), head_(0) {}
+  ~ThreadEventBuffer() = default;
+
+  void Push(const EventRecord& record) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    records_[head_ % capacity_] = record;
+    head_ += 1;
+  }
 
-class KernelEvent final : public IEvent {
- public:
-  explicit KernelEvent(const std::string& kernel_name) : IEvent(kernel_name) {}
-  std::string Key() override;
-  nlohmann::json ToJson() override;
-  void RecordShape(const Shape& shape);
+  // Appends the records which have not been overwritten to `records` and returns the number of
+  // the overwritten ones.
+  uint64_t CopyRecords(std::vector<EventRecord>* records) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    const uint64_t begin = head_ > capacity_ ? head_ - capacity_ : 0;
+    for (uint64_t i = begin; i < head_; ++i) { records->push_back(records_[i % capacity_]); }
+    return begin;
+  }
+
+  int64_t thread_id() const { return thread_id_; }
 
  private:
-  std::vector<Shape> input_shapes_;
-  std::string FormatShapes(size_t max_num_to_format = 4);
+  int64_t thread_id_;
+  size_t capacity_;
+  std::unique_ptr<EventRecord[]> records_;
+  std::mutex mutex_;
+  // Number of the records pushed so far, including the overwritten ones.
+  uint64_t head_;
 };
 
 class EventRecorder;
@@ -84,51 +96,54 @@ class EventRecorder;
 class ProfileMgr {
  public:
   friend class EventRecorder;
-  ProfileMgr() = default;
+  ProfileMgr();
 
   std::string RegisterEventRecorder(const std::shared_ptr<EventRecorder>& event_recorder,
                                     const std::string& name);
   void UnregisterEventRecorder(const std::string& event_recorder_key);
   std::string DumpResultsJson();
 
+  // Names are interned for the whole process, so that the ids cached by threads stay valid.
+  static uint32_t InternName(const std::string& name);
+
  private:
-  std::queue<std::shared_ptr<IEvent>> events_;
+  std::shared_ptr<ThreadEventBuffer> ThisThreadEventBuffer();
+  std::string GetNextEventRecorderKey(const std::string& name);
+
+  // Identifies this ProfileMgr in the buffers cached by threads, as addresses may be reused.
+  uint64_t id_;
+  size_t event_buffer_capacity_;
+  std::mutex event_buffers_mutex_;
+  std::vector<std::shared_ptr<ThreadEventBuffer>> event_buffers_;
   std::unordered_map<std::string, std::shared_ptr<EventRecorder>> event_recorders_;
   // To prevent releasing EventRecorders of the same name.
   std::unordered_map<std::string, int64_t> event_recorders_last_id_;
-
-  std::string GetNextEventRecorderKey(const std::string& name);
-  std::vector<std::shared_ptr<IEvent>> ExportEvents();
 };
 
+// Records an event from Start() until it is destructed. It does nothing if the profiler is not
+// enabled, so it is cheap enough to be put on hot paths.
 class EventRecorder {
  public:
-  using ShapeGetterFuncType = std::function<std::vector<Shape>(void)>;
-
   OF_DISALLOW_COPY_AND_MOVE(EventRecorder);
 
-  explicit EventRecorder(const std::shared_ptr<IEvent>& event) : event_(event) {
-    RegisterEventToProfileMgr(event);
-    event_->Start();
-  }
+  EventRecorder(EventType type, const std::string& name, const std::string& stream_id = "");
+  ~EventRecorder();
 
-  Maybe<void> RegisterEventToProfileMgr(const std::shared_ptr<IEvent>& event) {
-    auto pmgr = Global<profiler::ProfileMgr>::Get();
-    CHECK_NOTNULL_OR_RETURN(pmgr) << "ProfileMgr has not been initialized.";
-    pmgr->events_.push(event_);
-    return Maybe<void>::Ok();
-  }
+  bool IsEnabled() const { return buffer_ != nullptr; }
+  // Shapes are recorded before Start(), so that copying them is not part of the event.
+  void RecordShape(const Shape& shape);
+  void Start();
 
-  ~EventRecorder() {
-    event_->Finish();
-    event_.reset();
-  }
   static std::shared_ptr<EventRecorder> CreateCustomEventRecorder(const std::string& name);
-  static std::shared_ptr<EventRecorder> CreateKernelEventRecorder(
-      const std::string& name, const ShapeGetterFuncType& shape_getter = {});
 
  private:
-  std::shared_ptr<IEvent> event_;
+  // The buffer is shared with the ProfileMgr, so that an event finishing after the profiler is
+  // disabled does not touch the deleted ProfileMgr, its record is dropped with the buffer.
+  std::shared_ptr<ThreadEventBuffer> buffer_;
+  bool started_;
+  size_t num_dims_;
+  uint32_t outer_stream_id_;
+  EventRecord record_;
 };
 
 }  // namespace profiler
@@ -0,0 +1,142 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include <gtest/gtest.h>
+#include <atomic>
+#include <chrono>
+#include <thread>
+#include "oneflow/core/profiler/collection.h"
+
+namespace oneflow {
+
+namespace profiler {
+
+namespace {
+
+nlohmann::json DumpEvents() {
+  return nlohmann::json::parse(Global<ProfileMgr>::Get()->DumpResultsJson());
+}
+
+}  // namespace
+
+TEST(ProfileMgr, NestedEvents) {
+  Global<ProfileMgr>::New();
+  {
+    EventRecorder instruction(EventType::kInstruction, "instruction", "cpu:0");
+    instruction.Start();
+    EventRecorder kernel(EventType::kKernel, "kernel");
+    kernel.RecordShape(Shape({2, 3}));
+    kernel.RecordShape(Shape(DimVector()));
+    kernel.Start();
+  }
+  nlohmann::json events;
+  {
+    // Events are only dumped once they are finished.
+    EventRecorder custom(EventType::kCustom, "custom");
+    custom.Start();
+    events = DumpEvents();
+  }
+  ASSERT_EQ(events.size(), 2);
+  ASSERT_EQ(events.at(0)["name"], "instruction");
+  ASSERT_EQ(events.at(0)["type"], static_cast<int>(EventType::kInstruction));
+  ASSERT_EQ(events.at(0)["depth"], 0);
+  ASSERT_EQ(events.at(1)["name"], "kernel");
+  ASSERT_EQ(events.at(1)["input_shapes"], "[(2,3), scalar]");
+  ASSERT_EQ(events.at(1)["stream_id"], "cpu:0");
+  ASSERT_EQ(events.at(1)["depth"], 1);
+  ASSERT_EQ(events.at(1)["thread_id"], events.at(0)["thread_id"]);
+  ASSERT_LE(events.at(0)["started_at"], events.at(1)["started_at"]);
+  ASSERT_GE(events.at(0)["finished_at"], events.at(1)["finished_at"]);
+  Global<ProfileMgr>::Delete();
+}
+
+TEST(ProfileMgr, ConcurrentEvents) {
+  Global<ProfileMgr>::New();
+  const int64_t num_threads = 8;
+  const int64_t num_events_per_thread = 1000;
+  std::vector<std::thread> threads;
+  for (int64_t i = 0; i < num_threads; ++i) {
+    threads.emplace_back([&]() {
+      for (int64_t j = 0; j < num_events_per_thread; ++j) {
+        EventRecorder kernel(EventType::kKernel, "kernel");
+        kernel.RecordShape(Shape({j}));
+        kernel.Start();
+      }
+    });
+  }
+  for (auto& thread : threads) { thread.join(); }
+  ASSERT_EQ(DumpEvents().size(), static_cast<size_t>(num_threads * num_events_per_thread));
+  Global<ProfileMgr>::Delete();
+}
+
+TEST(ProfileMgr, DumpWhileRecording) {
+  Global<ProfileMgr>::New();
+  std::atomic<bool> stop(false);
+  std::thread thread([&]() {
+    for (int64_t i = 0; !stop.load(); ++i) {
+      EventRecorder kernel(EventType::kKernel, "kernel");
+      kernel.RecordShape(Shape({i, i}));
+      kernel.Start();
+    }
+  });
+  for (int i = 0; i < 100; ++i) {
+    // A record copied while it was overwritten would mix the dims of two events.
+    for (const auto& event : DumpEvents()) {
+      const std::string shapes = event["input_shapes"];
+      const size_t comma = shapes.find(',');
+      ASSERT_EQ(shapes.substr(2, comma - 2), shapes.substr(comma + 1, shapes.size() - comma - 3));
+    }
+  }
+  stop.store(true);
+  thread.join();
+  Global<ProfileMgr>::Delete();
+}
+
+TEST(ProfileMgr, EventFinishedAfterDisable) {
+  Global<ProfileMgr>::New();
+  {
+    EventRecorder kernel(EventType::kKernel, "kernel");
+    kernel.Start();
+    Global<ProfileMgr>::Delete();
+    Global<ProfileMgr>::New();
+  }
+  // The event belongs to the deleted ProfileMgr, it is dropped with its buffer.
+  ASSERT_EQ(DumpEvents().size(), 0);
+  Global<ProfileMgr>::Delete();
+}
+
+TEST(ProfileMgr, EventOverhead) {
+  // Once a thread has recorded more events than its buffer holds, the oldest ones are dropped.
+  const int64_t num_events = 1000000;
+  Global<ProfileMgr>::New();
+  const auto start = std::chrono::steady_clock::now();
+  for (int64_t i = 0; i < num_events; ++i) {
+    EventRecorder kernel(EventType::kKernel, "kernel");
+    kernel.RecordShape(Shape({i, 2}));
+    kernel.Start();
+  }
+  const double seconds =
+      std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+  LOG(INFO) << "Profiler overhead per event: " << seconds * 1e9 / num_events << " ns";
+  const auto events = DumpEvents();
+  ASSERT_GT(events.size(), 0);
+  ASSERT_LE(events.size(), static_cast<size_t>(num_events));
+  ASSERT_EQ(events.back()["input_shapes"], "[(" + std::to_string(num_events - 1) + ",2)]");
+  Global<ProfileMgr>::Delete();
+}
+
+}  // namespace profiler
+
+}  // namespace oneflow
@@ -95,6 +95,8 @@ void EnableProfiler() {
   if (Global<ProfileMgr>::Get() == nullptr) { Global<ProfileMgr>::New(); }
 }
 
+bool IsProfilerEnabled() { return Global<ProfileMgr>::Get() != nullptr; }
+
 // DisableProfilerAndReturnResult will return a json of profile results.
 std::string DisableProfilerAndReturnResult() {
   CHECK_JUST(vm::ClusterSync());
@@ -65,6 +65,8 @@ class RangeGuard final {
 
 void EnableProfiler();
 
+bool IsProfilerEnabled();
+
 // DisableProfilerAndReturnResult will return a json of profile results.
 std::string DisableProfilerAndReturnResult();
 
@@ -19,6 +19,13 @@ limitations under the License.
 
 #include <cstdint>
 #include <time.h>
+#ifdef __linux__
+#include <sys/syscall.h>
+#include <unistd.h>
+#else
+#include <functional>
+#include <thread>
+#endif  // __linux__
 
 namespace oneflow {
 
@@ -34,6 +41,15 @@ inline time_t GetTimeNow(bool allow_monotonic = false) {
   return static_cast<time_t>(t.tv_sec) * 1000000000 + static_cast<time_t>(t.tv_nsec);
 }
 
+inline int64_t GetThreadId() {
+#ifdef __linux__
+  static thread_local int64_t thread_id = syscall(SYS_gettid);
+#else
+  static thread_local int64_t thread_id = std::hash<std::thread::id>()(std::this_thread::get_id());
+#endif  // __linux__
+  return thread_id;
+}
+
 }  // namespace profiler
 }  // namespace oneflow
 
@@ -0,0 +1,39 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/vm/stream_type.h"
+#include "oneflow/core/vm/instruction.h"
+#include "oneflow/core/vm/stream.h"
+#include "oneflow/core/profiler/collection.h"
+
+namespace oneflow {
+
+namespace vm {
+
+void StreamType::Run(Instruction* instruction) const {
+  if (Global<profiler::ProfileMgr>::Get() == nullptr) {
+    Compute(instruction);
+    return;
+  }
+  const std::string stream_id =
+      std::string(stream_tag()) + ":" + std::to_string(instruction->stream().device_id());
+  profiler::EventRecorder er_guard(profiler::EventType::kInstruction,
+                                   instruction->instr_msg().DebugName(), stream_id);
+  er_guard.Start();
+  Compute(instruction);
+}
+
+}  // namespace vm
+}  // namespace oneflow
@@ -38,7 +38,7 @@ class StreamType {
  public:
   virtual ~StreamType() = default;
 
-  void Run(Instruction* instruction) const { Compute(instruction); }
+  void Run(Instruction* instruction) const;
 
   virtual const char* stream_tag() const = 0;
 
@@ -0,0 +1,293 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/common/hash_container.h"
+#include "oneflow/core/thread/thread_manager.h"
+
+namespace oneflow {
+
+namespace {
+
+template<typename K, typename V, typename IDX>
+void UniqueKeysAndValues(const int64_t num_keys, const K* keys, const V* values, IDX* num_unique,
+                         K* unique_keys, V* unique_values, IDX* inverse_indices) {
+  HashMap<K, IDX> key_to_index;
+  key_to_index.reserve(num_keys);
+  IDX count = 0;
+  for (int64_t i = 0; i < num_keys; ++i) {
+    auto it = key_to_index.emplace(keys[i], count);
+    if (it.second) {
+      unique_keys[count] = keys[i];
+      if (values != nullptr) { unique_values[count] = values[i]; }
+      count += 1;
+    }
+    inverse_indices[i] = it.first->second;
+  }
+  *num_unique = count;
+}
+
+template<typename U>
+void GenerateTableIds(const int64_t elem_cnt, const int32_t num_tables, U* table_ids) {
+  for (int64_t i = 0; i < elem_cnt; ++i) { table_ids[i] = i % num_tables; }
+}
+
+void CheckSingleRank(user_op::KernelComputeContext* ctx) {
+  CHECK_EQ(ctx->parallel_ctx().parallel_num(), 1)
+      << "OneEmbedding data shuffle on CPU only supports a single rank";
+}
+
+template<typename T>
+struct CpuComputeType {
+  using type = T;
+};
+
+template<>
+struct CpuComputeType<float16> {
+  using type = float;
+};
+
+}  // namespace
+
+template<typename K, typename U, typename IDX>
+class CpuIdShuffleKernel final : public user_op::OpKernel {
+ public:
+  CpuIdShuffleKernel() = default;
+  ~CpuIdShuffleKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    CheckSingleRank(ctx);
+    const user_op::Tensor* ids = ctx->Tensor4ArgNameAndIndex("ids", 0);
+    user_op::Tensor* num_unique_matrix = ctx->Tensor4ArgNameAndIndex("num_unique_matrix", 0);
+    user_op::Tensor* inverse_unique_partition_indices =
+        ctx->Tensor4ArgNameAndIndex("inverse_unique_partition_indices", 0);
+    user_op::Tensor* cur_rank_num_unique = ctx->Tensor4ArgNameAndIndex("cur_rank_num_unique", 0);
+    user_op::Tensor* cur_rank_unique_ids = ctx->Tensor4ArgNameAndIndex("cur_rank_unique_ids", 0);
+    user_op::Tensor* cur_rank_unique_table_ids =
+        ctx->Tensor4ArgNameAndIndex("cur_rank_unique_table_ids", 0);
+    user_op::Tensor* cur_rank_inverse_indices =
+        ctx->Tensor4ArgNameAndIndex("cur_rank_inverse_indices", 0);
+    const int32_t num_tables = ctx->Attr<int32_t>("num_tables");
+    const bool has_table_ids = ctx->has_input("table_ids", 0);
+    const bool need_gen_table_ids = (!has_table_ids && num_tables > 1);
+    const int64_t num_ids = ids->shape().elem_cnt();
+    std::vector<U> generated_table_ids;
+    const U* table_ids_ptr;
+    if (has_table_ids) {
+      table_ids_ptr = ctx->Tensor4ArgNameAndIndex("table_ids", 0)->dptr<U>();
+    } else if (need_gen_table_ids) {
+      generated_table_ids.resize(num_ids);
+      GenerateTableIds<U>(num_ids, num_tables, generated_table_ids.data());
+      table_ids_ptr = generated_table_ids.data();
+    } else {
+      table_ids_ptr = nullptr;
+      std::memset(cur_rank_unique_table_ids->mut_dptr(), 0, num_ids * sizeof(U));
+    }
+    IDX num_unique = 0;
+    UniqueKeysAndValues<K, U, IDX>(num_ids, ids->dptr<K>(), table_ids_ptr, &num_unique,
+                                   cur_rank_unique_ids->mut_dptr<K>(),
+                                   cur_rank_unique_table_ids->mut_dptr<U>(),
+                                   inverse_unique_partition_indices->mut_dptr<IDX>());
+    // With a single rank every unique id belongs to the current rank, so the second-level unique
+    // over the received ids is the identity.
+    *num_unique_matrix->mut_dptr<IDX>() = num_unique;
+    *cur_rank_num_unique->mut_dptr<IDX>() = num_unique;
+    IDX* cur_rank_inverse_indices_ptr = cur_rank_inverse_indices->mut_dptr<IDX>();
+    for (IDX i = 0; i < num_unique; ++i) { cur_rank_inverse_indices_ptr[i] = i; }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define ID_DATA_TYPE_SEQ                            \
+  OF_PP_MAKE_TUPLE_SEQ(uint32_t, DataType::kUInt32) \
+  OF_PP_MAKE_TUPLE_SEQ(uint64_t, DataType::kUInt64) \
+  OF_PP_MAKE_TUPLE_SEQ(int32_t, DataType::kInt32)   \
+  OF_PP_MAKE_TUPLE_SEQ(int64_t, DataType::kInt64)
+
+#define TABLE_ID_DATA_TYPE_SEQ                      \
+  OF_PP_MAKE_TUPLE_SEQ(uint8_t, DataType::kUInt8)   \
+  OF_PP_MAKE_TUPLE_SEQ(uint32_t, DataType::kUInt32) \
+  OF_PP_MAKE_TUPLE_SEQ(uint64_t, DataType::kUInt64) \
+  OF_PP_MAKE_TUPLE_SEQ(int8_t, DataType::kInt8)     \
+  OF_PP_MAKE_TUPLE_SEQ(int32_t, DataType::kInt32)   \
+  OF_PP_MAKE_TUPLE_SEQ(int64_t, DataType::kInt64)
+
+#define IDX_DATA_TYPE_SEQ                           \
+  OF_PP_MAKE_TUPLE_SEQ(uint32_t, DataType::kUInt32) \
+  OF_PP_MAKE_TUPLE_SEQ(int32_t, DataType::kInt32)
+
+#define REGISTER_CPU_ID_SHUFFLE_KERNEL(k_dtype_pair, table_id_dtype_pair, idx_dtype_pair)         \
+  REGISTER_USER_KERNEL("id_shuffle")                                                              \
+      .SetCreateFn<CpuIdShuffleKernel<OF_PP_PAIR_FIRST(k_dtype_pair),                             \
+                                      OF_PP_PAIR_FIRST(table_id_dtype_pair),                      \
+                                      OF_PP_PAIR_FIRST(idx_dtype_pair)>>()                        \
+      .SetIsMatchedHob(                                                                           \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                          \
+          && (user_op::HobDataType("ids", 0) == OF_PP_PAIR_SECOND(k_dtype_pair))                  \
+          && (user_op::HobDataType("cur_rank_unique_table_ids", 0)                                \
+              == OF_PP_PAIR_SECOND(table_id_dtype_pair))                                          \
+          && (user_op::HobDataType("num_unique_matrix", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair)));
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_ID_SHUFFLE_KERNEL, ID_DATA_TYPE_SEQ,
+                                 TABLE_ID_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename IDX>
+class CpuEmbeddingShuffleKernel final : public user_op::OpKernel {
+ public:
+  CpuEmbeddingShuffleKernel() = default;
+  ~CpuEmbeddingShuffleKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    CheckSingleRank(ctx);
+    const user_op::Tensor* cur_rank_embeddings =
+        ctx->Tensor4ArgNameAndIndex("cur_rank_embeddings", 0);
+    const user_op::Tensor* cur_rank_inverse_indices =
+        ctx->Tensor4ArgNameAndIndex("cur_rank_inverse_indices", 0);
+    const user_op::Tensor* inverse_unique_partition_indices =
+        ctx->Tensor4ArgNameAndIndex("inverse_unique_partition_indices", 0);
+    user_op::Tensor* embeddings = ctx->Tensor4ArgNameAndIndex("embeddings", 0);
+    const int64_t embedding_size = cur_rank_embeddings->shape().At(1);
+    const int64_t num_ids = inverse_unique_partition_indices->shape().elem_cnt();
+    const T* cur_rank_embeddings_ptr = cur_rank_embeddings->dptr<T>();
+    const IDX* cur_rank_inverse_indices_ptr = cur_rank_inverse_indices->dptr<IDX>();
+    const IDX* inverse_unique_partition_indices_ptr = inverse_unique_partition_indices->dptr<IDX>();
+    T* embeddings_ptr = embeddings->mut_dptr<T>();
+    MultiThreadLoop(num_ids, [&](size_t i) {
+      const IDX row = cur_rank_inverse_indices_ptr[inverse_unique_partition_indices_ptr[i]];
+      std::memcpy(embeddings_ptr + i * embedding_size,
+                  cur_rank_embeddings_ptr + row * embedding_size, embedding_size * sizeof(T));
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_EMBEDDING_SHUFFLE_KERNEL(t_dtype_pair, idx_dtype_pair)                      \
+  REGISTER_USER_KERNEL("embedding_shuffle")                                                      \
+      .SetCreateFn<CpuEmbeddingShuffleKernel<OF_PP_PAIR_FIRST(t_dtype_pair),                     \
+                                             OF_PP_PAIR_FIRST(idx_dtype_pair)>>()                \
+      .SetIsMatchedHob(                                                                          \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                         \
+          && (user_op::HobDataType("cur_rank_embeddings", 0) == OF_PP_PAIR_SECOND(t_dtype_pair)) \
+          && (user_op::HobDataType("num_unique_matrix", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair)));
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_EMBEDDING_SHUFFLE_KERNEL,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename IDX>
+class CpuEmbeddingGradientShuffleKernel final : public user_op::OpKernel {
+ public:
+  CpuEmbeddingGradientShuffleKernel() = default;
+  ~CpuEmbeddingGradientShuffleKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    CheckSingleRank(ctx);
+    const user_op::Tensor* embedding_grad = ctx->Tensor4ArgNameAndIndex("embedding_grad", 0);
+    const user_op::Tensor* cur_rank_inverse_indices =
+        ctx->Tensor4ArgNameAndIndex("cur_rank_inverse_indices", 0);
+    const user_op::Tensor* inverse_unique_partition_indices =
+        ctx->Tensor4ArgNameAndIndex("inverse_unique_partition_indices", 0);
+    user_op::Tensor* cur_rank_unique_embedding_grad =
+        ctx->Tensor4ArgNameAndIndex("cur_rank_unique_embedding_grad", 0);
+    using ComputeType = typename CpuComputeType<T>::type;
+    const int64_t embedding_size = cur_rank_unique_embedding_grad->shape().At(1);
+    const int64_t num_ids = inverse_unique_partition_indices->shape().elem_cnt();
+    const int64_t num_rows = cur_rank_unique_embedding_grad->shape().At(0);
+    const T* embedding_grad_ptr = embedding_grad->dptr<T>();
+    const IDX* cur_rank_inverse_indices_ptr = cur_rank_inverse_indices->dptr<IDX>();
+    const IDX* inverse_unique_partition_indices_ptr = inverse_unique_partition_indices->dptr<IDX>();
+    std::vector<ComputeType> sum(num_rows * embedding_size, static_cast<ComputeType>(0));
+    for (int64_t i = 0; i < num_ids; ++i) {
+      const IDX row = cur_rank_inverse_indices_ptr[inverse_unique_partition_indices_ptr[i]];
+      ComputeType* sum_row = sum.data() + row * embedding_size;
+      const T* grad_row = embedding_grad_ptr + i * embedding_size;
+      for (int64_t col = 0; col < embedding_size; ++col) {
+        sum_row[col] += static_cast<ComputeType>(grad_row[col]);
+      }
+    }
+    T* out_ptr = cur_rank_unique_embedding_grad->mut_dptr<T>();
+    for (int64_t i = 0; i < num_rows * embedding_size; ++i) { out_ptr[i] = static_cast<T>(sum[i]); }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_EMBEDDING_GRADIENT_SHUFFLE_KERNEL(t_dtype_pair, idx_dtype_pair)            \
+  REGISTER_USER_KERNEL("embedding_gradient_shuffle")                                            \
+      .SetCreateFn<CpuEmbeddingGradientShuffleKernel<OF_PP_PAIR_FIRST(t_dtype_pair),            \
+                                                     OF_PP_PAIR_FIRST(idx_dtype_pair)>>()       \
+      .SetIsMatchedHob(                                                                         \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                        \
+          && (user_op::HobDataType("embedding_grad", 0) == OF_PP_PAIR_SECOND(t_dtype_pair))     \
+          && (user_op::HobDataType("num_unique_matrix", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair)));
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_EMBEDDING_GRADIENT_SHUFFLE_KERNEL,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename K, typename V, typename IDX>
+class CpuUniqueKeyValuePairKernel final : public user_op::OpKernel {
+ public:
+  CpuUniqueKeyValuePairKernel() = default;
+  ~CpuUniqueKeyValuePairKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const user_op::Tensor* keys = ctx->Tensor4ArgNameAndIndex("keys", 0);
+    user_op::Tensor* num_unique = ctx->Tensor4ArgNameAndIndex("num_unique", 0);
+    user_op::Tensor* unique_keys = ctx->Tensor4ArgNameAndIndex("unique_keys", 0);
+    user_op::Tensor* unique_values = ctx->Tensor4ArgNameAndIndex("unique_values", 0);
+    user_op::Tensor* inverse_indices = ctx->Tensor4ArgNameAndIndex("inverse_indices", 0);
+    const int32_t num_tables = ctx->Attr<int32_t>("num_tables");
+    const bool has_values = ctx->has_input("values", 0);
+    const int64_t num_keys = keys->shape().elem_cnt();
+    std::vector<V> generated_values;
+    const V* values_ptr;
+    if (has_values) {
+      values_ptr = ctx->Tensor4ArgNameAndIndex("values", 0)->dptr<V>();
+    } else if (num_tables > 1) {
+      generated_values.resize(num_keys);
+      GenerateTableIds<V>(num_keys, num_tables, generated_values.data());
+      values_ptr = generated_values.data();
+    } else {
+      values_ptr = nullptr;
+    }
+    UniqueKeysAndValues<K, V, IDX>(num_keys, keys->dptr<K>(), values_ptr,
+                                   reinterpret_cast<IDX*>(num_unique->mut_dptr()),
+                                   unique_keys->mut_dptr<K>(), unique_values->mut_dptr<V>(),
+                                   inverse_indices->mut_dptr<IDX>());
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_UNIQUE_KEY_VALUE_PAIR_KERNEL(k_dtype_pair, value_dtype_pair, idx_dtype_pair) \
+  REGISTER_USER_KERNEL("unique_key_value_pair")                                                   \
+      .SetCreateFn<CpuUniqueKeyValuePairKernel<OF_PP_PAIR_FIRST(k_dtype_pair),                    \
+                                               OF_PP_PAIR_FIRST(value_dtype_pair),                \
+                                               OF_PP_PAIR_FIRST(idx_dtype_pair)>>()               \
+      .SetIsMatchedHob(                                                                           \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                          \
+          && (user_op::HobDataType("keys", 0) == OF_PP_PAIR_SECOND(k_dtype_pair))                 \
+          && (user_op::HobDataType("inverse_indices", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair))    \
+          && (user_op::HobDataType("unique_values", 0) == OF_PP_PAIR_SECOND(value_dtype_pair)));
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_UNIQUE_KEY_VALUE_PAIR_KERNEL, ID_DATA_TYPE_SEQ,
+                                 ID_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+}  // namespace oneflow
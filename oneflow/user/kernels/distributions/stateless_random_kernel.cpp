@@ -0,0 +1,135 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/job/nd_sbp_util.h"
+#include "oneflow/user/kernels/distributions/stateless_random_kernel_util.h"
+
+namespace oneflow {
+
+namespace {
+
+int32_t GetStatelessRandomDistribution(const std::string& distribution) {
+  if (distribution == "uniform") {
+    return kStatelessRandomUniform;
+  } else if (distribution == "normal") {
+    return kStatelessRandomNormal;
+  } else if (distribution == "truncated_normal") {
+    return kStatelessRandomTruncatedNormal;
+  } else {
+    UNIMPLEMENTED() << "Unsupported distribution " << distribution;
+    return -1;
+  }
+}
+
+class StatelessRandomKernelCache final : public user_op::OpKernelCache {
+ public:
+  explicit StatelessRandomKernelCache(const TensorSliceView& view) : view_(view) {}
+  ~StatelessRandomKernelCache() override = default;
+
+  const TensorSliceView& view() const { return view_; }
+
+ private:
+  const TensorSliceView view_;
+};
+
+template<DeviceType device_type, typename T>
+class StatelessRandomKernel final : public user_op::OpKernel {
+ public:
+  StatelessRandomKernel() = default;
+  ~StatelessRandomKernel() = default;
+
+  std::shared_ptr<user_op::OpKernelCache> InitOpKernelCache(
+      user_op::KernelCacheContext* ctx) const override {
+    const Shape& logical_shape = ctx->Attr<Shape>("shape");
+    if (ctx->parallel_ctx().parallel_num() > 1) {
+      const NdSbp& nd_sbp = ctx->NdSbp4ArgNameAndIndex("out", 0);
+      const Shape& parallel_hierarchy = *ctx->parallel_desc().hierarchy();
+      const int64_t parallel_id = ctx->parallel_ctx().parallel_id();
+      return std::make_shared<StatelessRandomKernelCache>(
+          GetTensorSliceView4ParallelId(parallel_hierarchy, nd_sbp, logical_shape, parallel_id));
+    } else {
+      return std::make_shared<StatelessRandomKernelCache>(TensorSliceView(logical_shape));
+    }
+  }
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx, user_op::OpKernelState*,
+               const user_op::OpKernelCache* cache) const override {
+    user_op::Tensor* out = ctx->Tensor4ArgNameAndIndex("out", 0);
+    const int64_t elem_cnt = out->shape().elem_cnt();
+    if (elem_cnt == 0) { return; }
+    const auto* random_cache = dynamic_cast<const StatelessRandomKernelCache*>(cache);
+    CHECK_NOTNULL(random_cache);
+    const TensorSliceView& view = random_cache->view();
+    const Shape& logical_shape = ctx->Attr<Shape>("shape");
+    CHECK_EQ(view.shape().elem_cnt(), elem_cnt);
+
+    StatelessRandomParams params{};
+    params.seed = static_cast<uint64_t>(ctx->Attr<int64_t>("seed"));
+    params.distribution = GetStatelessRandomDistribution(ctx->Attr<std::string>("distribution"));
+    params.from = ctx->Attr<double>("from");
+    params.to = ctx->Attr<double>("to");
+    params.mean = ctx->Attr<double>("mean");
+    params.std = ctx->Attr<double>("std");
+    params.elem_cnt = elem_cnt;
+    // Merge every axis into its outer neighbour while the inner one is held entirely, so a shard
+    // split on the first axis (or not split at all) is addressed as one contiguous range.
+    params.num_axes = 0;
+    int64_t stride = 1;
+    for (int64_t axis = static_cast<int64_t>(view.NumAxes()) - 1; axis >= 0; --axis) {
+      const Range& range = view.At(axis);
+      if (params.num_axes > 0
+          && params.local_dims[params.num_axes - 1] * params.logical_strides[params.num_axes - 1]
+                 == stride
+          && params.offsets[params.num_axes - 1] == 0) {
+        const int32_t inner = params.num_axes - 1;
+        const int64_t inner_size = params.local_dims[inner];
+        params.local_dims[inner] = range.size() * inner_size;
+        params.offsets[inner] = range.begin() * inner_size;
+      } else {
+        params.local_dims[params.num_axes] = range.size();
+        params.offsets[params.num_axes] = range.begin();
+        params.logical_strides[params.num_axes] = stride;
+        params.num_axes += 1;
+      }
+      stride *= logical_shape.At(axis);
+    }
+    // Axes were collected from the innermost one, StatelessRandomLogicalIndex wants them outermost
+    // first.
+    std::reverse(params.local_dims, params.local_dims + params.num_axes);
+    std::reverse(params.offsets, params.offsets + params.num_axes);
+    std::reverse(params.logical_strides, params.logical_strides + params.num_axes);
+    StatelessRandomFunctor<device_type, T>()(ctx->stream(), params, out->mut_dptr<T>());
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+}  // namespace
+
+#define REGISTER_STATELESS_RANDOM_KERNEL(device, dtype)     \
+  REGISTER_USER_KERNEL("stateless_random")                  \
+      .SetCreateFn<StatelessRandomKernel<device, dtype>>()  \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device) \
+                       && (user_op::HobAttr<DataType>("dtype") == GetDataType<dtype>::value));
+
+REGISTER_STATELESS_RANDOM_KERNEL(DeviceType::kCPU, float)
+REGISTER_STATELESS_RANDOM_KERNEL(DeviceType::kCPU, double)
+#ifdef WITH_CUDA
+REGISTER_STATELESS_RANDOM_KERNEL(DeviceType::kCUDA, float)
+REGISTER_STATELESS_RANDOM_KERNEL(DeviceType::kCUDA, double)
+#endif  // WITH_CUDA
+
+}  // namespace oneflow
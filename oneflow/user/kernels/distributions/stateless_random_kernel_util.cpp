@@ -0,0 +1,32 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/user/kernels/distributions/stateless_random_kernel_util.h"
+
+namespace oneflow {
+
+template<typename T>
+struct StatelessRandomFunctor<DeviceType::kCPU, T> final {
+  void operator()(ep::Stream* stream, const StatelessRandomParams& params, T* out) {
+    MultiThreadLoop(params.elem_cnt, [&](size_t i) {
+      out[i] = StatelessRandomSample<T>(params, StatelessRandomLogicalIndex(params, i));
+    });
+  }
+};
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(INSTANTIATE_STATELESS_RANDOM_FUNCTOR, (DeviceType::kCPU),
+                                 STATELESS_RANDOM_DATA_TYPE_SEQ);
+
+}  // namespace oneflow
@@ -0,0 +1,42 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/user/kernels/distributions/stateless_random_kernel_util.h"
+
+namespace oneflow {
+
+namespace {
+
+template<typename T>
+__global__ void StatelessRandomGpu(const StatelessRandomParams params, T* out) {
+  CUDA_1D_KERNEL_LOOP_T(int64_t, i, params.elem_cnt) {
+    out[i] = StatelessRandomSample<T>(params, StatelessRandomLogicalIndex(params, i));
+  }
+}
+
+}  // namespace
+
+template<typename T>
+struct StatelessRandomFunctor<DeviceType::kCUDA, T> final {
+  void operator()(ep::Stream* stream, const StatelessRandomParams& params, T* out) {
+    RUN_CUDA_KERNEL((StatelessRandomGpu<T>), stream, params.elem_cnt, params, out);
+  }
+};
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(INSTANTIATE_STATELESS_RANDOM_FUNCTOR, (DeviceType::kCUDA),
+                                 STATELESS_RANDOM_DATA_TYPE_SEQ);
+
+}  // namespace oneflow
@@ -0,0 +1,153 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_USER_KERNELS_DISTRIBUTIONS_STATELESS_RANDOM_KERNEL_UTIL_H_
+#define ONEFLOW_USER_KERNELS_DISTRIBUTIONS_STATELESS_RANDOM_KERNEL_UTIL_H_
+#include "oneflow/core/ep/include/stream.h"
+#include "oneflow/core/ndarray/xpu_util.h"
+#include "oneflow/core/common/shape_vec.h"
+
+namespace oneflow {
+
+#define STATELESS_RANDOM_DATA_TYPE_SEQ FLOATING_DATA_TYPE_SEQ
+
+enum StatelessRandomDistribution : int32_t {
+  kStatelessRandomUniform = 0,
+  kStatelessRandomNormal = 1,
+  kStatelessRandomTruncatedNormal = 2,
+};
+
+// Samples outside [from, to] are redrawn with the next subsequence, the last one is clamped.
+constexpr uint32_t kStatelessRandomMaxTruncatedNormalTrials = 16;
+
+// Every element is generated from (seed, logical linear index) only, so a shard produces exactly
+// the values it would hold in the full logical tensor, whatever the placement and sbp are.
+struct StatelessRandomParams {
+  uint64_t seed;
+  int32_t distribution;
+  double from;
+  double to;
+  double mean;
+  double std;
+  int64_t elem_cnt;
+  int32_t num_axes;
+  int64_t local_dims[SHAPE_MAX_AXIS_SIZE];
+  int64_t offsets[SHAPE_MAX_AXIS_SIZE];
+  int64_t logical_strides[SHAPE_MAX_AXIS_SIZE];
+};
+
+OF_DEVICE_FUNC int64_t StatelessRandomLogicalIndex(const StatelessRandomParams& params,
+                                                   int64_t local_index) {
+  int64_t logical_index = 0;
+  for (int32_t axis = params.num_axes - 1; axis >= 0; --axis) {
+    const int64_t coord = local_index % params.local_dims[axis];
+    local_index /= params.local_dims[axis];
+    logical_index += (coord + params.offsets[axis]) * params.logical_strides[axis];
+  }
+  return logical_index;
+}
+
+// Philox-4x32-10 counter based generator, see Salmon et al. "Parallel Random Numbers: As Easy as
+// 1, 2, 3". The counter is (index, subsequence, 0) and the key is the seed.
+OF_DEVICE_FUNC void StatelessRandomPhilox(uint64_t seed, uint64_t index, uint32_t subsequence,
+                                          uint32_t* out) {
+  constexpr uint32_t kPhiloxM0 = 0xD2511F53;
+  constexpr uint32_t kPhiloxM1 = 0xCD9E8D57;
+  constexpr uint32_t kPhiloxW0 = 0x9E3779B9;
+  constexpr uint32_t kPhiloxW1 = 0xBB67AE85;
+  uint32_t c0 = static_cast<uint32_t>(index);
+  uint32_t c1 = static_cast<uint32_t>(index >> 32);
+  uint32_t c2 = subsequence;
+  uint32_t c3 = 0;
+  uint32_t k0 = static_cast<uint32_t>(seed);
+  uint32_t k1 = static_cast<uint32_t>(seed >> 32);
+  for (int32_t round = 0; round < 10; ++round) {
+    const uint64_t p0 = static_cast<uint64_t>(kPhiloxM0) * c0;
+    const uint64_t p1 = static_cast<uint64_t>(kPhiloxM1) * c2;
+    c0 = static_cast<uint32_t>(p1 >> 32) ^ c1 ^ k0;
+    c1 = static_cast<uint32_t>(p1);
+    c2 = static_cast<uint32_t>(p0 >> 32) ^ c3 ^ k1;
+    c3 = static_cast<uint32_t>(p0);
+    k0 += kPhiloxW0;
+    k1 += kPhiloxW1;
+  }
+  out[0] = c0;
+  out[1] = c1;
+  out[2] = c2;
+  out[3] = c3;
+}
+
+// Maps the Philox output to the i-th (i < 2) uniform number in [0, 1).
+template<typename T>
+struct StatelessRandomUniform;
+
+template<>
+struct StatelessRandomUniform<float> {
+  OF_DEVICE_FUNC static float Get(const uint32_t* bits, int32_t i) {
+    return static_cast<float>(bits[i] >> 8) * (1.0f / 16777216.0f);
+  }
+};
+
+template<>
+struct StatelessRandomUniform<double> {
+  OF_DEVICE_FUNC static double Get(const uint32_t* bits, int32_t i) {
+    const uint64_t x = (static_cast<uint64_t>(bits[2 * i]) << 32) | bits[2 * i + 1];
+    return static_cast<double>(x >> 11) * (1.0 / 9007199254740992.0);
+  }
+};
+
+template<typename T>
+OF_DEVICE_FUNC T StatelessRandomNormal(uint64_t seed, int64_t index, uint32_t subsequence) {
+  uint32_t bits[4];
+  StatelessRandomPhilox(seed, index, subsequence, bits);
+  // Box-Muller, 1 - u keeps the argument of log in (0, 1].
+  const T u1 = static_cast<T>(1) - StatelessRandomUniform<T>::Get(bits, 0);
+  const T u2 = StatelessRandomUniform<T>::Get(bits, 1);
+  return sqrt(static_cast<T>(-2) * log(u1)) * cos(static_cast<T>(2 * M_PI) * u2);
+}
+
+template<typename T>
+OF_DEVICE_FUNC T StatelessRandomSample(const StatelessRandomParams& params, int64_t index) {
+  const T from = static_cast<T>(params.from);
+  const T to = static_cast<T>(params.to);
+  const T mean = static_cast<T>(params.mean);
+  const T std = static_cast<T>(params.std);
+  if (params.distribution == kStatelessRandomUniform) {
+    uint32_t bits[4];
+    StatelessRandomPhilox(params.seed, index, 0, bits);
+    return from + (to - from) * StatelessRandomUniform<T>::Get(bits, 0);
+  } else if (params.distribution == kStatelessRandomNormal) {
+    return mean + std * StatelessRandomNormal<T>(params.seed, index, 0);
+  } else {
+    T value = mean;
+    for (uint32_t trial = 0; trial < kStatelessRandomMaxTruncatedNormalTrials; ++trial) {
+      value = mean + std * StatelessRandomNormal<T>(params.seed, index, trial);
+      if (value >= from && value <= to) { return value; }
+    }
+    return value < from ? from : to;
+  }
+}
+
+template<DeviceType device_type, typename T>
+struct StatelessRandomFunctor final {
+  void operator()(ep::Stream* stream, const StatelessRandomParams& params, T* out);
+};
+
+#define INSTANTIATE_STATELESS_RANDOM_FUNCTOR(device_type_v, dtype_pair) \
+  template struct StatelessRandomFunctor<device_type_v, OF_PP_PAIR_FIRST(dtype_pair)>;
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_USER_KERNELS_DISTRIBUTIONS_STATELESS_RANDOM_KERNEL_UTIL_H_
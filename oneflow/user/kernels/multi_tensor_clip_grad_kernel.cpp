@@ -0,0 +1,129 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/user/kernels/multi_tensor_clip_grad_kernel_util.h"
+
+namespace oneflow {
+
+namespace {
+
+template<typename T, MultiTensorNormType norm_type>
+T MultiTensorNorm(user_op::KernelComputeContext* ctx, float ord) {
+  using Functor = MultiTensorNormFunctor<T, norm_type>;
+  T acc = Functor::Init();
+  FOR_RANGE(int32_t, i, 0, ctx->input_size("x")) {
+    const user_op::Tensor* x = ctx->Tensor4ArgNameAndIndex("x", i);
+    const T* x_ptr = x->dptr<T>();
+    FOR_RANGE(int64_t, j, 0, x->shape().elem_cnt()) {
+      acc = Functor::Reduce(acc, Functor::Transform(x_ptr[j], ord));
+    }
+  }
+  return Functor::Finalize(acc, ord);
+}
+
+}  // namespace
+
+template<typename T>
+class MultiTensorNormCpuKernel final : public user_op::OpKernel {
+ public:
+  MultiTensorNormCpuKernel() = default;
+  ~MultiTensorNormCpuKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const float ord = ctx->Attr<float>("ord");
+    T* y_ptr = ctx->Tensor4ArgNameAndIndex("y", 0)->mut_dptr<T>();
+    switch (GetMultiTensorNormType(ord)) {
+      case MultiTensorNormType::kL2:
+        *y_ptr = MultiTensorNorm<T, MultiTensorNormType::kL2>(ctx, ord);
+        break;
+      case MultiTensorNormType::kLp:
+        *y_ptr = MultiTensorNorm<T, MultiTensorNormType::kLp>(ctx, ord);
+        break;
+      case MultiTensorNormType::kInf:
+        *y_ptr = MultiTensorNorm<T, MultiTensorNormType::kInf>(ctx, ord);
+        break;
+      case MultiTensorNormType::kNegInf:
+        *y_ptr = MultiTensorNorm<T, MultiTensorNormType::kNegInf>(ctx, ord);
+        break;
+    }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+template<typename T>
+class MultiTensorClipByNormCpuKernel final : public user_op::OpKernel {
+ public:
+  MultiTensorClipByNormCpuKernel() = default;
+  ~MultiTensorClipByNormCpuKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const T total_norm = *ctx->Tensor4ArgNameAndIndex("total_norm", 0)->dptr<T>();
+    const float max_norm = ctx->Attr<float>("max_norm");
+    const float epsilon = ctx->Attr<float>("epsilon");
+    const bool skip_if_nonfinite = ctx->Attr<bool>("skip_if_nonfinite");
+    FOR_RANGE(int32_t, i, 0, ctx->input_size("x")) {
+      user_op::Tensor* x = ctx->Tensor4ArgNameAndIndex("x", i);
+      T* x_ptr = x->mut_dptr<T>();
+      FOR_RANGE(int64_t, j, 0, x->shape().elem_cnt()) {
+        x_ptr[j] =
+            ClipByNormFunctor<T>()(x_ptr[j], total_norm, max_norm, epsilon, skip_if_nonfinite);
+      }
+    }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+template<typename T>
+class MultiTensorClampCpuKernel final : public user_op::OpKernel {
+ public:
+  MultiTensorClampCpuKernel() = default;
+  ~MultiTensorClampCpuKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto min_val = static_cast<T>(ctx->Attr<double>("min"));
+    const auto max_val = static_cast<T>(ctx->Attr<double>("max"));
+    FOR_RANGE(int32_t, i, 0, ctx->input_size("x")) {
+      user_op::Tensor* x = ctx->Tensor4ArgNameAndIndex("x", i);
+      T* x_ptr = x->mut_dptr<T>();
+      FOR_RANGE(int64_t, j, 0, x->shape().elem_cnt()) {
+        x_ptr[j] = ClampFunctor<T>()(x_ptr[j], min_val, max_val);
+      }
+    }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_CLIP_GRAD_CPU_KERNELS(dtype)                             \
+  REGISTER_USER_KERNEL("multi_tensor_norm")                                            \
+      .SetCreateFn<MultiTensorNormCpuKernel<dtype>>()                                  \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)                  \
+                       && (user_op::HobDataType("x", 0) == GetDataType<dtype>::value)); \
+  REGISTER_USER_KERNEL("multi_tensor_clip_by_norm")                                    \
+      .SetCreateFn<MultiTensorClipByNormCpuKernel<dtype>>()                            \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)                  \
+                       && (user_op::HobDataType("x", 0) == GetDataType<dtype>::value)); \
+  REGISTER_USER_KERNEL("multi_tensor_clamp")                                           \
+      .SetCreateFn<MultiTensorClampCpuKernel<dtype>>()                                 \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU)                  \
+                       && (user_op::HobDataType("x", 0) == GetDataType<dtype>::value));
+
+REGISTER_MULTI_TENSOR_CLIP_GRAD_CPU_KERNELS(float)
+REGISTER_MULTI_TENSOR_CLIP_GRAD_CPU_KERNELS(double)
+
+}  // namespace oneflow
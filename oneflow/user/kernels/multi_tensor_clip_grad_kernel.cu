@@ -0,0 +1,234 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include <cub/cub.cuh>
+#include "oneflow/core/kernel/cuda_graph_support.h"
+#include "oneflow/core/ep/cuda/cuda_stream.h"
+#include "oneflow/user/kernels/multi_tensor_clip_grad_kernel_util.h"
+
+namespace oneflow {
+
+namespace {
+
+constexpr int64_t kMultiTensorClipMaxNumBlocks = 512;
+
+template<typename T>
+int GetMultiTensorNumBlocks(int32_t num_tensors, const MultiTensorParams<T>& params) {
+  int64_t max_elem_cnt = 0;
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    max_elem_cnt = std::max(max_elem_cnt, params.sizes[k]);
+  }
+  return std::max<int64_t>(
+      1, std::min((max_elem_cnt + kCudaThreadsNumPerBlock - 1) / kCudaThreadsNumPerBlock,
+                  kMultiTensorClipMaxNumBlocks));
+}
+
+// Calls Launch(num_tensors, params) for each chunk of at most kMultiTensorClipMaxTensors inputs.
+template<typename T, typename LaunchFn>
+void ForEachMultiTensorParams(user_op::KernelComputeContext* ctx, const LaunchFn& Launch) {
+  const int32_t num_inputs = ctx->input_size("x");
+  MultiTensorParams<T> params{};
+  int32_t num_tensors = 0;
+  for (int32_t i = 0; i < num_inputs; ++i) {
+    user_op::Tensor* x = ctx->Tensor4ArgNameAndIndex("x", i);
+    params.x[num_tensors] = x->mut_dptr<T>();
+    params.sizes[num_tensors] = x->shape().elem_cnt();
+    num_tensors += 1;
+    if (num_tensors == kMultiTensorClipMaxTensors || i == num_inputs - 1) {
+      Launch(num_tensors, params);
+      num_tensors = 0;
+    }
+  }
+}
+
+template<typename T, MultiTensorNormType norm_type>
+struct NormReduceOp {
+  __device__ __forceinline__ T operator()(const T& a, const T& b) const {
+    return MultiTensorNormFunctor<T, norm_type>::Reduce(a, b);
+  }
+};
+
+// Every block writes the reduction of the elements it visited to partials[blockIdx.x].
+template<typename T, MultiTensorNormType norm_type>
+__global__ void MultiTensorPartialNormGpu(int32_t num_tensors, float ord,
+                                          MultiTensorParams<T> params, T* partials) {
+  using Functor = MultiTensorNormFunctor<T, norm_type>;
+  typedef cub::BlockReduce<T, kCudaThreadsNumPerBlock> BlockReduce;
+  __shared__ typename BlockReduce::TempStorage cub_reduce_tmp_storage;
+  T acc = Functor::Init();
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    const T* x = params.x[k];
+    CUDA_1D_KERNEL_LOOP(i, params.sizes[k]) {
+      acc = Functor::Reduce(acc, Functor::Transform(x[i], ord));
+    }
+  }
+  T block_acc = BlockReduce(cub_reduce_tmp_storage).Reduce(acc, NormReduceOp<T, norm_type>());
+  if (threadIdx.x == 0) { partials[blockIdx.x] = block_acc; }
+}
+
+template<typename T, MultiTensorNormType norm_type>
+__global__ void MultiTensorFinalizeNormGpu(int32_t num_partials, float ord, const T* partials,
+                                           T* y) {
+  using Functor = MultiTensorNormFunctor<T, norm_type>;
+  typedef cub::BlockReduce<T, kCudaThreadsNumPerBlock> BlockReduce;
+  __shared__ typename BlockReduce::TempStorage cub_reduce_tmp_storage;
+  T acc = Functor::Init();
+  for (int32_t i = threadIdx.x; i < num_partials; i += blockDim.x) {
+    acc = Functor::Reduce(acc, partials[i]);
+  }
+  T block_acc = BlockReduce(cub_reduce_tmp_storage).Reduce(acc, NormReduceOp<T, norm_type>());
+  if (threadIdx.x == 0) { *y = Functor::Finalize(block_acc, ord); }
+}
+
+template<typename T, MultiTensorNormType norm_type>
+void LaunchMultiTensorNorm(user_op::KernelComputeContext* ctx, float ord) {
+  T* partials = ctx->Tensor4ArgNameAndIndex("tmp_buffer", 0)->mut_dptr<T>();
+  T* y = ctx->Tensor4ArgNameAndIndex("y", 0)->mut_dptr<T>();
+  cudaStream_t cuda_stream = ctx->stream()->As<ep::CudaStream>()->cuda_stream();
+  int32_t num_partials = 0;
+  ForEachMultiTensorParams<T>(ctx, [&](int32_t num_tensors, const MultiTensorParams<T>& params) {
+    const int num_blocks = GetMultiTensorNumBlocks(num_tensors, params);
+    MultiTensorPartialNormGpu<T, norm_type>
+        <<<num_blocks, kCudaThreadsNumPerBlock, 0, cuda_stream>>>(num_tensors, ord, params,
+                                                                  partials + num_partials);
+    num_partials += num_blocks;
+  });
+  MultiTensorFinalizeNormGpu<T, norm_type>
+      <<<1, kCudaThreadsNumPerBlock, 0, cuda_stream>>>(num_partials, ord, partials, y);
+}
+
+template<typename T>
+__global__ void MultiTensorClipByNormGpu(int32_t num_tensors, const T* total_norm,
+                                         float max_norm, float epsilon, bool skip_if_nonfinite,
+                                         MultiTensorParams<T> params) {
+  // the norm is read on the device, so clipping never waits for the host
+  const T norm = *total_norm;
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    T* x = params.x[k];
+    CUDA_1D_KERNEL_LOOP(i, params.sizes[k]) {
+      x[i] = ClipByNormFunctor<T>()(x[i], norm, max_norm, epsilon, skip_if_nonfinite);
+    }
+  }
+}
+
+template<typename T>
+__global__ void MultiTensorClampGpu(int32_t num_tensors, T min_val, T max_val,
+                                    MultiTensorParams<T> params) {
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    T* x = params.x[k];
+    CUDA_1D_KERNEL_LOOP(i, params.sizes[k]) { x[i] = ClampFunctor<T>()(x[i], min_val, max_val); }
+  }
+}
+
+}  // namespace
+
+template<typename T>
+class MultiTensorNormGpuKernel final : public user_op::OpKernel, public user_op::CudaGraphSupport {
+ public:
+  MultiTensorNormGpuKernel() = default;
+  ~MultiTensorNormGpuKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const float ord = ctx->Attr<float>("ord");
+    switch (GetMultiTensorNormType(ord)) {
+      case MultiTensorNormType::kL2:
+        LaunchMultiTensorNorm<T, MultiTensorNormType::kL2>(ctx, ord);
+        break;
+      case MultiTensorNormType::kLp:
+        LaunchMultiTensorNorm<T, MultiTensorNormType::kLp>(ctx, ord);
+        break;
+      case MultiTensorNormType::kInf:
+        LaunchMultiTensorNorm<T, MultiTensorNormType::kInf>(ctx, ord);
+        break;
+      case MultiTensorNormType::kNegInf:
+        LaunchMultiTensorNorm<T, MultiTensorNormType::kNegInf>(ctx, ord);
+        break;
+    }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+template<typename T>
+class MultiTensorClipByNormGpuKernel final : public user_op::OpKernel,
+                                             public user_op::CudaGraphSupport {
+ public:
+  MultiTensorClipByNormGpuKernel() = default;
+  ~MultiTensorClipByNormGpuKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const T* total_norm = ctx->Tensor4ArgNameAndIndex("total_norm", 0)->dptr<T>();
+    const float max_norm = ctx->Attr<float>("max_norm");
+    const float epsilon = ctx->Attr<float>("epsilon");
+    const bool skip_if_nonfinite = ctx->Attr<bool>("skip_if_nonfinite");
+    cudaStream_t cuda_stream = ctx->stream()->As<ep::CudaStream>()->cuda_stream();
+    ForEachMultiTensorParams<T>(ctx, [&](int32_t num_tensors, const MultiTensorParams<T>& params) {
+      MultiTensorClipByNormGpu<T><<<GetMultiTensorNumBlocks(num_tensors, params),
+                                    kCudaThreadsNumPerBlock, 0, cuda_stream>>>(
+          num_tensors, total_norm, max_norm, epsilon, skip_if_nonfinite, params);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+template<typename T>
+class MultiTensorClampGpuKernel final : public user_op::OpKernel,
+                                        public user_op::CudaGraphSupport {
+ public:
+  MultiTensorClampGpuKernel() = default;
+  ~MultiTensorClampGpuKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto min_val = static_cast<T>(ctx->Attr<double>("min"));
+    const auto max_val = static_cast<T>(ctx->Attr<double>("max"));
+    cudaStream_t cuda_stream = ctx->stream()->As<ep::CudaStream>()->cuda_stream();
+    ForEachMultiTensorParams<T>(ctx, [&](int32_t num_tensors, const MultiTensorParams<T>& params) {
+      MultiTensorClampGpu<T><<<GetMultiTensorNumBlocks(num_tensors, params),
+                               kCudaThreadsNumPerBlock, 0, cuda_stream>>>(num_tensors, min_val,
+                                                                          max_val, params);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_CLIP_GRAD_CUDA_KERNELS(dtype)                                       \
+  REGISTER_USER_KERNEL("multi_tensor_norm")                                                       \
+      .SetCreateFn<MultiTensorNormGpuKernel<dtype>>()                                             \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCUDA)                            \
+                       && (user_op::HobDataType("x", 0) == GetDataType<dtype>::value))            \
+      .SetInferTmpSizeFn([](user_op::InferContext* ctx) {                                         \
+        const int64_t num_chunks =                                                                \
+            (ctx->input_size("x") + kMultiTensorClipMaxTensors - 1) / kMultiTensorClipMaxTensors; \
+        return num_chunks * kMultiTensorClipMaxNumBlocks * sizeof(dtype);                         \
+      });                                                                                         \
+  REGISTER_USER_KERNEL("multi_tensor_clip_by_norm")                                               \
+      .SetCreateFn<MultiTensorClipByNormGpuKernel<dtype>>()                                       \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCUDA)                            \
+                       && (user_op::HobDataType("x", 0) == GetDataType<dtype>::value));           \
+  REGISTER_USER_KERNEL("multi_tensor_clamp")                                                      \
+      .SetCreateFn<MultiTensorClampGpuKernel<dtype>>()                                            \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCUDA)                            \
+                       && (user_op::HobDataType("x", 0) == GetDataType<dtype>::value));
+
+REGISTER_MULTI_TENSOR_CLIP_GRAD_CUDA_KERNELS(float)
+REGISTER_MULTI_TENSOR_CLIP_GRAD_CUDA_KERNELS(double)
+
+}  // namespace oneflow
@@ -0,0 +1,111 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_USER_KERNELS_MULTI_TENSOR_CLIP_GRAD_KERNEL_UTIL_H_
+#define ONEFLOW_USER_KERNELS_MULTI_TENSOR_CLIP_GRAD_KERNEL_UTIL_H_
+
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/common/data_type.h"
+
+namespace oneflow {
+
+// Max number of tensors handled by one launch, the addresses are passed to the cuda kernel by
+// value so their size is bounded by the 4KB limit of kernel params.
+constexpr int32_t kMultiTensorClipMaxTensors = 128;
+
+template<typename T>
+struct MultiTensorParams {
+  T* x[kMultiTensorClipMaxTensors];
+  int64_t sizes[kMultiTensorClipMaxTensors];
+};
+
+enum class MultiTensorNormType {
+  kL2,
+  kLp,
+  kInf,
+  kNegInf,
+};
+
+inline MultiTensorNormType GetMultiTensorNormType(float ord) {
+  if (ord == 2) { return MultiTensorNormType::kL2; }
+  if (std::isinf(ord)) {
+    return ord > 0 ? MultiTensorNormType::kInf : MultiTensorNormType::kNegInf;
+  }
+  return MultiTensorNormType::kLp;
+}
+
+// A norm is computed as Finalize(Reduce(Transform(x_0), Transform(x_1), ...)), the reductions
+// propagate nan so that a non-finite gradient always gives a non-finite norm.
+template<typename T, MultiTensorNormType norm_type>
+struct MultiTensorNormFunctor;
+
+template<typename T>
+struct MultiTensorNormFunctor<T, MultiTensorNormType::kL2> {
+  OF_DEVICE_FUNC static T Init() { return 0; }
+  OF_DEVICE_FUNC static T Transform(T x, float ord) { return x * x; }
+  OF_DEVICE_FUNC static T Reduce(T a, T b) { return a + b; }
+  OF_DEVICE_FUNC static T Finalize(T acc, float ord) { return sqrt(acc); }
+};
+
+template<typename T>
+struct MultiTensorNormFunctor<T, MultiTensorNormType::kLp> {
+  OF_DEVICE_FUNC static T Init() { return 0; }
+  OF_DEVICE_FUNC static T Transform(T x, float ord) {
+    return pow(x < 0 ? -x : x, static_cast<T>(ord));
+  }
+  OF_DEVICE_FUNC static T Reduce(T a, T b) { return a + b; }
+  OF_DEVICE_FUNC static T Finalize(T acc, float ord) {
+    return pow(acc, static_cast<T>(1) / static_cast<T>(ord));
+  }
+};
+
+template<typename T>
+struct MultiTensorNormFunctor<T, MultiTensorNormType::kInf> {
+  OF_DEVICE_FUNC static T Init() { return 0; }
+  OF_DEVICE_FUNC static T Transform(T x, float ord) { return x < 0 ? -x : x; }
+  OF_DEVICE_FUNC static T Reduce(T a, T b) { return (a != a || a > b) ? a : b; }
+  OF_DEVICE_FUNC static T Finalize(T acc, float ord) { return acc; }
+};
+
+template<typename T>
+struct MultiTensorNormFunctor<T, MultiTensorNormType::kNegInf> {
+  OF_DEVICE_FUNC static T Init() { return GetMaxVal<T>(); }
+  OF_DEVICE_FUNC static T Transform(T x, float ord) { return x < 0 ? -x : x; }
+  OF_DEVICE_FUNC static T Reduce(T a, T b) { return (a != a || a < b) ? a : b; }
+  OF_DEVICE_FUNC static T Finalize(T acc, float ord) { return acc; }
+};
+
+template<typename T>
+struct ClipByNormFunctor {
+  OF_DEVICE_FUNC T operator()(T x, T total_norm, float max_norm, float epsilon,
+                              bool skip_if_nonfinite) const {
+    // norm - norm is nan for a nan or infinite norm
+    if (skip_if_nonfinite && total_norm - total_norm != static_cast<T>(0)) { return x; }
+    const T clip_coef = static_cast<T>(max_norm) / (total_norm + static_cast<T>(epsilon));
+    // a nan norm gives nan gradients, the same as scaling by min(clip_coef, 1)
+    return (clip_coef != clip_coef || clip_coef < static_cast<T>(1)) ? x * clip_coef : x;
+  }
+};
+
+template<typename T>
+struct ClampFunctor {
+  OF_DEVICE_FUNC T operator()(T x, T min_val, T max_val) const {
+    return x < min_val ? min_val : (x > max_val ? max_val : x);
+  }
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_USER_KERNELS_MULTI_TENSOR_CLIP_GRAD_KERNEL_UTIL_H_
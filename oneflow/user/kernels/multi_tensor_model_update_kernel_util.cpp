@@ -0,0 +1,102 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/user/kernels/multi_tensor_model_update_kernel_util.h"
+#include "oneflow/core/thread/thread_manager.h"
+
+namespace oneflow {
+
+// NOTE: the variables of a chunk are updated in parallel, one variable per task.
+
+template<typename T, typename G>
+struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCPU, T, G> {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float weight_decay, float learning_rate_val,
+                     const TensorTupleParams<T, G, 1>& params);
+};
+
+template<typename T, typename G>
+void MultiTensorSGDUpdateKernelUtil<DeviceType::kCPU, T, G>::Update(
+    ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2, float weight_decay,
+    float learning_rate_val, const TensorTupleParams<T, G, 1>& params) {
+  MultiThreadLoop(num_tensors, [&](size_t k) {
+    const G* model_diff = params.model_diff_addresses[k];
+    T* model = params.model_addresses[0][k];
+    for (int64_t i = 0; i != params.sizes[k]; ++i) {
+      SGDUpdateFunctor<T, G>()(model_diff + i, model + i, scale, l1, l2, weight_decay,
+                               learning_rate_val);
+    }
+  });
+}
+
+template struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCPU, float, float>;
+template struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCPU, double, double>;
+
+template<typename T, typename G>
+struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCPU, T, G> {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float beta, float weight_decay, float learning_rate_val,
+                     const TensorTupleParams<T, G, 2>& params);
+};
+
+template<typename T, typename G>
+void MultiTensorMomentumUpdateKernelUtil<DeviceType::kCPU, T, G>::Update(
+    ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2, float beta,
+    float weight_decay, float learning_rate_val, const TensorTupleParams<T, G, 2>& params) {
+  MultiThreadLoop(num_tensors, [&](size_t k) {
+    const G* model_diff = params.model_diff_addresses[k];
+    T* model = params.model_addresses[0][k];
+    T* momentum = params.model_addresses[1][k];
+    for (int64_t i = 0; i != params.sizes[k]; ++i) {
+      MomentumUpdateFunctor<T, G>()(model_diff + i, model + i, momentum + i, scale, l1, l2, beta,
+                                    weight_decay, learning_rate_val);
+    }
+  });
+}
+
+template struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCPU, float, float>;
+template struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCPU, double, double>;
+
+template<typename T, typename G>
+struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCPU, T, G> {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float beta1, float beta2, float epsilon, float weight_decay,
+                     float learning_rate_val, float bias_correction1_val,
+                     float bias_correction2_val, const TensorTupleParams<T, G, 3>& params);
+};
+
+template<typename T, typename G>
+void MultiTensorAdamUpdateKernelUtil<DeviceType::kCPU, T, G>::Update(
+    ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2, float beta1,
+    float beta2, float epsilon, float weight_decay, float learning_rate_val,
+    float bias_correction1_val, float bias_correction2_val,
+    const TensorTupleParams<T, G, 3>& params) {
+  MultiThreadLoop(num_tensors, [&](size_t k) {
+    const G* model_diff = params.model_diff_addresses[k];
+    T* model = params.model_addresses[0][k];
+    T* m = params.model_addresses[1][k];
+    T* v = params.model_addresses[2][k];
+    for (int64_t i = 0; i != params.sizes[k]; ++i) {
+      AdamUpdateFunctor<T, G>()(model_diff + i, model + i, m + i, v + i, /*max_v=*/nullptr, scale,
+                                l1, l2, beta1, beta2, epsilon, weight_decay, /*amsgrad=*/false,
+                                bias_correction1_val, bias_correction2_val, learning_rate_val);
+    }
+  });
+}
+
+template struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCPU, float, float>;
+template struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCPU, double, double>;
+
+}  // namespace oneflow
@@ -0,0 +1,151 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/user/kernels/multi_tensor_model_update_kernel_util.h"
+#include "oneflow/core/ep/cuda/cuda_stream.h"
+
+namespace oneflow {
+
+namespace {
+
+constexpr int64_t kMultiTensorUpdateMaxNumBlocks = 512;
+
+template<typename T, typename G, int N>
+int GetMultiTensorUpdateNumBlocks(int32_t num_tensors, const TensorTupleParams<T, G, N>& params) {
+  int64_t max_elem_cnt = 0;
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    max_elem_cnt = std::max(max_elem_cnt, params.sizes[k]);
+  }
+  return std::max<int64_t>(
+      1, std::min((max_elem_cnt + kCudaThreadsNumPerBlock - 1) / kCudaThreadsNumPerBlock,
+                  kMultiTensorUpdateMaxNumBlocks));
+}
+
+template<typename T, typename G>
+__global__ void MultiTensorSGDUpdateGpu(int32_t num_tensors, T scale, float l1, float l2,
+                                        float weight_decay, float learning_rate_val,
+                                        TensorTupleParams<T, G, 1> params) {
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    const G* model_diff = params.model_diff_addresses[k];
+    T* model = params.model_addresses[0][k];
+    CUDA_1D_KERNEL_LOOP(i, params.sizes[k]) {
+      SGDUpdateFunctor<T, G>()(model_diff + i, model + i, scale, l1, l2, weight_decay,
+                               learning_rate_val);
+    }
+  }
+}
+
+template<typename T, typename G>
+__global__ void MultiTensorMomentumUpdateGpu(int32_t num_tensors, T scale, float l1, float l2,
+                                             float beta, float weight_decay,
+                                             float learning_rate_val,
+                                             TensorTupleParams<T, G, 2> params) {
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    const G* model_diff = params.model_diff_addresses[k];
+    T* model = params.model_addresses[0][k];
+    T* momentum = params.model_addresses[1][k];
+    CUDA_1D_KERNEL_LOOP(i, params.sizes[k]) {
+      MomentumUpdateFunctor<T, G>()(model_diff + i, model + i, momentum + i, scale, l1, l2, beta,
+                                    weight_decay, learning_rate_val);
+    }
+  }
+}
+
+template<typename T, typename G>
+__global__ void MultiTensorAdamUpdateGpu(int32_t num_tensors, T scale, float l1, float l2,
+                                         float beta1, float beta2, float epsilon,
+                                         float weight_decay, float learning_rate_val,
+                                         float bias_correction1_val, float bias_correction2_val,
+                                         TensorTupleParams<T, G, 3> params) {
+  for (int32_t k = 0; k < num_tensors; ++k) {
+    const G* model_diff = params.model_diff_addresses[k];
+    T* model = params.model_addresses[0][k];
+    T* m = params.model_addresses[1][k];
+    T* v = params.model_addresses[2][k];
+    CUDA_1D_KERNEL_LOOP(i, params.sizes[k]) {
+      AdamUpdateFunctor<T, G>()(model_diff + i, model + i, m + i, v + i, /*max_v=*/nullptr, scale,
+                                l1, l2, beta1, beta2, epsilon, weight_decay, /*amsgrad=*/false,
+                                bias_correction1_val, bias_correction2_val, learning_rate_val);
+    }
+  }
+}
+
+}  // namespace
+
+template<typename T, typename G>
+struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, T, G> {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float weight_decay, float learning_rate_val,
+                     const TensorTupleParams<T, G, 1>& params);
+};
+
+template<typename T, typename G>
+void MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, T, G>::Update(
+    ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2, float weight_decay,
+    float learning_rate_val, const TensorTupleParams<T, G, 1>& params) {
+  MultiTensorSGDUpdateGpu<T, G>
+      <<<GetMultiTensorUpdateNumBlocks(num_tensors, params), kCudaThreadsNumPerBlock, 0,
+         stream->As<ep::CudaStream>()->cuda_stream()>>>(num_tensors, scale, l1, l2, weight_decay,
+                                                        learning_rate_val, params);
+}
+
+template struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, float, float>;
+template struct MultiTensorSGDUpdateKernelUtil<DeviceType::kCUDA, double, double>;
+
+template<typename T, typename G>
+struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, T, G> {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float beta, float weight_decay, float learning_rate_val,
+                     const TensorTupleParams<T, G, 2>& params);
+};
+
+template<typename T, typename G>
+void MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, T, G>::Update(
+    ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2, float beta,
+    float weight_decay, float learning_rate_val, const TensorTupleParams<T, G, 2>& params) {
+  MultiTensorMomentumUpdateGpu<T, G>
+      <<<GetMultiTensorUpdateNumBlocks(num_tensors, params), kCudaThreadsNumPerBlock, 0,
+         stream->As<ep::CudaStream>()->cuda_stream()>>>(num_tensors, scale, l1, l2, beta,
+                                                        weight_decay, learning_rate_val, params);
+}
+
+template struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, float, float>;
+template struct MultiTensorMomentumUpdateKernelUtil<DeviceType::kCUDA, double, double>;
+
+template<typename T, typename G>
+struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, T, G> {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float beta1, float beta2, float epsilon, float weight_decay,
+                     float learning_rate_val, float bias_correction1_val,
+                     float bias_correction2_val, const TensorTupleParams<T, G, 3>& params);
+};
+
+template<typename T, typename G>
+void MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, T, G>::Update(
+    ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2, float beta1,
+    float beta2, float epsilon, float weight_decay, float learning_rate_val,
+    float bias_correction1_val, float bias_correction2_val,
+    const TensorTupleParams<T, G, 3>& params) {
+  MultiTensorAdamUpdateGpu<T, G>
+      <<<GetMultiTensorUpdateNumBlocks(num_tensors, params), kCudaThreadsNumPerBlock, 0,
+         stream->As<ep::CudaStream>()->cuda_stream()>>>(
+          num_tensors, scale, l1, l2, beta1, beta2, epsilon, weight_decay, learning_rate_val,
+          bias_correction1_val, bias_correction2_val, params);
+}
+
+template struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, float, float>;
+template struct MultiTensorAdamUpdateKernelUtil<DeviceType::kCUDA, double, double>;
+
+}  // namespace oneflow
@@ -0,0 +1,60 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#ifndef ONEFLOW_USER_KERNELS_MULTI_TENSOR_MODEL_UPDATE_KERNEL_UTIL_H_
+#define ONEFLOW_USER_KERNELS_MULTI_TENSOR_MODEL_UPDATE_KERNEL_UTIL_H_
+
+#include "oneflow/user/kernels/model_update_kernel_util.h"
+
+namespace oneflow {
+
+// Max number of variables updated by one launch, the params are passed to the cuda kernel by
+// value so their size is bounded by the 4KB limit of kernel params.
+constexpr int32_t kMaxTuples = 64;
+
+// Addresses of a chunk of variables. model_addresses[0] are the models and model_addresses[1..N)
+// are the states of them, such as momentum or m and v.
+template<typename T, typename G, int N>
+struct TensorTupleParams {
+  const G* model_diff_addresses[kMaxTuples];
+  T* model_addresses[N][kMaxTuples];
+  int64_t sizes[kMaxTuples];
+};
+
+template<DeviceType device_type, typename T, typename G>
+struct MultiTensorSGDUpdateKernelUtil {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float weight_decay, float learning_rate_val,
+                     const TensorTupleParams<T, G, 1>& params);
+};
+
+template<DeviceType device_type, typename T, typename G>
+struct MultiTensorMomentumUpdateKernelUtil {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float beta, float weight_decay, float learning_rate_val,
+                     const TensorTupleParams<T, G, 2>& params);
+};
+
+template<DeviceType device_type, typename T, typename G>
+struct MultiTensorAdamUpdateKernelUtil {
+  static void Update(ep::Stream* stream, int32_t num_tensors, T scale, float l1, float l2,
+                     float beta1, float beta2, float epsilon, float weight_decay,
+                     float learning_rate_val, float bias_correction1_val,
+                     float bias_correction2_val, const TensorTupleParams<T, G, 3>& params);
+};
+
+}  // namespace oneflow
+
+#endif  // ONEFLOW_USER_KERNELS_MULTI_TENSOR_MODEL_UPDATE_KERNEL_UTIL_H_
@@ -0,0 +1,175 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/kernel/cuda_graph_support.h"
+#include "oneflow/user/kernels/multi_tensor_model_update_kernel_util.h"
+
+namespace oneflow {
+
+namespace {
+
+// Calls Update(num_tensors, params) for each chunk of at most kMaxTuples variables.
+template<typename T, typename G, int N, typename UpdateFn>
+void ForEachTensorTupleParams(user_op::KernelComputeContext* ctx,
+                              const std::vector<std::string>& state_names,
+                              const UpdateFn& Update) {
+  CHECK_EQ(state_names.size() + 1, N);
+  const int32_t num_models = ctx->input_size("model");
+  TensorTupleParams<T, G, N> params{};
+  int32_t num_tensors = 0;
+  for (int32_t i = 0; i < num_models; ++i) {
+    user_op::Tensor* model = ctx->Tensor4ArgNameAndIndex("model", i);
+    params.model_diff_addresses[num_tensors] =
+        ctx->Tensor4ArgNameAndIndex("model_diff", i)->dptr<G>();
+    params.model_addresses[0][num_tensors] = model->mut_dptr<T>();
+    for (int32_t j = 0; j < state_names.size(); ++j) {
+      params.model_addresses[j + 1][num_tensors] =
+          ctx->Tensor4ArgNameAndIndex(state_names.at(j), i)->mut_dptr<T>();
+    }
+    params.sizes[num_tensors] = model->shape().elem_cnt();
+    num_tensors += 1;
+    if (num_tensors == kMaxTuples || i == num_models - 1) {
+      Update(num_tensors, params);
+      num_tensors = 0;
+    }
+  }
+}
+
+}  // namespace
+
+template<DeviceType device_type, typename T, typename G>
+class MultiTensorSGDUpdateKernel final : public user_op::OpKernel,
+                                         public user_op::CudaGraphSupport {
+ public:
+  MultiTensorSGDUpdateKernel() = default;
+  ~MultiTensorSGDUpdateKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto scale = static_cast<T>(ctx->Attr<double>("scale"));
+    const auto l1 = ctx->Attr<float>("l1");
+    const auto l2 = ctx->Attr<float>("l2");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const float learning_rate_val = ctx->Attr<float>("learning_rate_val");
+    ForEachTensorTupleParams<T, G, 1>(
+        ctx, {}, [&](int32_t num_tensors, const TensorTupleParams<T, G, 1>& params) {
+          MultiTensorSGDUpdateKernelUtil<device_type, T, G>::Update(
+              ctx->stream(), num_tensors, scale, l1, l2, weight_decay, learning_rate_val, params);
+        });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(device, dtype, gtype)                     \
+  REGISTER_USER_KERNEL("multi_tensor_sgd_update")                                         \
+      .SetCreateFn<MultiTensorSGDUpdateKernel<device, dtype, gtype>>()                    \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                               \
+                       && (user_op::HobDataType("model", 0) == GetDataType<dtype>::value) \
+                       && (user_op::HobDataType("model_diff", 0) == GetDataType<gtype>::value));
+
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCPU, float, float);
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCPU, double, double);
+#ifdef WITH_CUDA
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCUDA, float, float);
+REGISTER_MULTI_TENSOR_SGD_UPDATE_KERNEL(DeviceType::kCUDA, double, double);
+#endif  // WITH_CUDA
+
+template<DeviceType device_type, typename T, typename G>
+class MultiTensorMomentumUpdateKernel final : public user_op::OpKernel,
+                                              public user_op::CudaGraphSupport {
+ public:
+  MultiTensorMomentumUpdateKernel() = default;
+  ~MultiTensorMomentumUpdateKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto scale = static_cast<T>(ctx->Attr<double>("scale"));
+    const auto l1 = ctx->Attr<float>("l1");
+    const auto l2 = ctx->Attr<float>("l2");
+    const auto beta = ctx->Attr<float>("beta");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const float learning_rate_val = ctx->Attr<float>("learning_rate_val");
+    ForEachTensorTupleParams<T, G, 2>(
+        ctx, {"momentum"}, [&](int32_t num_tensors, const TensorTupleParams<T, G, 2>& params) {
+          MultiTensorMomentumUpdateKernelUtil<device_type, T, G>::Update(
+              ctx->stream(), num_tensors, scale, l1, l2, beta, weight_decay, learning_rate_val,
+              params);
+        });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(device, dtype, gtype)                \
+  REGISTER_USER_KERNEL("multi_tensor_momentum_update")                                    \
+      .SetCreateFn<MultiTensorMomentumUpdateKernel<device, dtype, gtype>>()               \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                               \
+                       && (user_op::HobDataType("model", 0) == GetDataType<dtype>::value) \
+                       && (user_op::HobDataType("model_diff", 0) == GetDataType<gtype>::value));
+
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCPU, float, float);
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCPU, double, double);
+#ifdef WITH_CUDA
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCUDA, float, float);
+REGISTER_MULTI_TENSOR_MOMENTUM_UPDATE_KERNEL(DeviceType::kCUDA, double, double);
+#endif  // WITH_CUDA
+
+template<DeviceType device_type, typename T, typename G>
+class MultiTensorAdamUpdateKernel final : public user_op::OpKernel,
+                                          public user_op::CudaGraphSupport {
+ public:
+  MultiTensorAdamUpdateKernel() = default;
+  ~MultiTensorAdamUpdateKernel() override = default;
+
+ private:
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const auto scale = static_cast<T>(ctx->Attr<double>("scale"));
+    const auto l1 = ctx->Attr<float>("l1");
+    const auto l2 = ctx->Attr<float>("l2");
+    const auto beta1 = ctx->Attr<float>("beta1");
+    const auto beta2 = ctx->Attr<float>("beta2");
+    const auto epsilon = ctx->Attr<float>("epsilon");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const bool do_bias_correction = ctx->Attr<bool>("do_bias_correction");
+    const float learning_rate_val = ctx->Attr<float>("learning_rate_val");
+    const float bias_correction1_val =
+        do_bias_correction ? ctx->Attr<float>("bias_correction1_val") : 1.0;
+    const float bias_correction2_val =
+        do_bias_correction ? ctx->Attr<float>("bias_correction2_val") : 1.0;
+    ForEachTensorTupleParams<T, G, 3>(
+        ctx, {"m", "v"}, [&](int32_t num_tensors, const TensorTupleParams<T, G, 3>& params) {
+          MultiTensorAdamUpdateKernelUtil<device_type, T, G>::Update(
+              ctx->stream(), num_tensors, scale, l1, l2, beta1, beta2, epsilon, weight_decay,
+              learning_rate_val, bias_correction1_val, bias_correction2_val, params);
+        });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return true; }
+};
+
+#define REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(device, dtype, gtype)                    \
+  REGISTER_USER_KERNEL("multi_tensor_adam_update")                                        \
+      .SetCreateFn<MultiTensorAdamUpdateKernel<device, dtype, gtype>>()                   \
+      .SetIsMatchedHob((user_op::HobDeviceType() == device)                               \
+                       && (user_op::HobDataType("model", 0) == GetDataType<dtype>::value) \
+                       && (user_op::HobDataType("model_diff", 0) == GetDataType<gtype>::value));
+
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCPU, float, float);
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCPU, double, double);
+#ifdef WITH_CUDA
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCUDA, float, float);
+REGISTER_MULTI_TENSOR_ADAM_UPDATE_KERNEL(DeviceType::kCUDA, double, double);
+#endif  // WITH_CUDA
+
+}  // namespace oneflow
@@ -0,0 +1,314 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/embedding/key_value_store.h"
+#include "oneflow/core/embedding/embedding_manager.h"
+#include "oneflow/user/kernels/one_embedding_kernel_util.h"
+#include "oneflow/core/framework/random_generator_impl.h"
+#include "oneflow/core/thread/thread_manager.h"
+
+namespace oneflow {
+
+namespace {
+
+class CpuEmbeddingKernelState final : public user_op::OpKernelState {
+ public:
+  explicit CpuEmbeddingKernelState(user_op::KernelInitContext* ctx)
+      : generator_(CHECK_JUST(one::MakeGenerator(DeviceType::kCPU))) {
+    key_value_store_ = Global<embedding::EmbeddingManager>::Get()->GetKeyValueStore(
+        ctx->Attr<std::string>("embedding_name"), ctx->parallel_ctx().parallel_id());
+    uint32_t max_query_length =
+        ctx->TensorDesc4ArgNameAndIndex("unique_ids", 0)->shape().elem_cnt();
+    key_value_store_->ReserveQueryLength(max_query_length);
+    ParseInitializers(ctx->Attr<int64_t>("line_size"), ctx->Attr<int64_t>("embedding_size"),
+                      ctx->Attr<std::string>("state_initializer"),
+                      ctx->Attr<std::string>("embedding_tables"), &initializer_param_,
+                      &initializer_index_);
+  }
+  ~CpuEmbeddingKernelState() override = default;
+
+  embedding::KeyValueStore* KeyValueStore() { return key_value_store_; }
+
+  one::Generator* generator() { return generator_.get(); }
+
+  const int8_t* InitializerIndex() const { return initializer_index_.data(); }
+  const EmbeddingInitializer* Initializers() const { return initializer_param_.data(); }
+
+ private:
+  std::shared_ptr<one::Generator> generator_;
+  embedding::KeyValueStore* key_value_store_;
+  std::vector<EmbeddingInitializer> initializer_param_;
+  std::vector<int8_t> initializer_index_;
+};
+
+class CpuEmbeddingPutKernelState final : public user_op::OpKernelState {
+ public:
+  explicit CpuEmbeddingPutKernelState(user_op::KernelInitContext* ctx) {
+    key_value_store_ = Global<embedding::EmbeddingManager>::Get()->GetKeyValueStore(
+        ctx->Attr<std::string>("embedding_name"), ctx->parallel_ctx().parallel_id());
+    uint32_t max_query_length =
+        ctx->TensorDesc4ArgNameAndIndex("unique_ids", 0)->shape().elem_cnt();
+    key_value_store_->ReserveQueryLength(max_query_length);
+  }
+  ~CpuEmbeddingPutKernelState() override = default;
+
+  embedding::KeyValueStore* KeyValueStore() { return key_value_store_; }
+
+ private:
+  embedding::KeyValueStore* key_value_store_;
+};
+
+template<typename T, typename U>
+void InitMissingValues(std::mt19937* engine, const int64_t line_size,
+                       const EmbeddingInitializer* initializer_param,
+                       const int8_t* initializer_index, const U* table_ids,
+                       const uint32_t num_missing, const uint32_t* missing_indices, T* values) {
+  for (uint32_t row = 0; row < num_missing; ++row) {
+    const uint32_t index = missing_indices[row];
+    const int32_t table_idx = table_ids[index];
+    T* line = values + index * line_size;
+    for (int64_t col = 0; col < line_size; ++col) {
+      const EmbeddingInitializer& initializer =
+          initializer_param[initializer_index[table_idx * line_size + col]];
+      if (initializer.type == InitializerType::kUniform) {
+        std::uniform_real_distribution<float> dis(initializer.uniform_param.low,
+                                                  initializer.uniform_param.high);
+        line[col] = static_cast<T>(dis(*engine));
+      } else if (initializer.type == InitializerType::kNormal) {
+        std::normal_distribution<float> dis(initializer.normal_param.mean,
+                                            initializer.normal_param.std);
+        line[col] = static_cast<T>(dis(*engine));
+      } else if (initializer.type == InitializerType::kConstant) {
+        line[col] = static_cast<T>(initializer.constant_param.value);
+      } else {
+        UNIMPLEMENTED();
+      }
+    }
+  }
+}
+
+template<typename T, typename U, typename IDX>
+void LookupAndInitMissing(ep::Stream* stream, CpuEmbeddingKernelState* embedding_state,
+                          const int64_t num_ids, const int64_t line_size,
+                          const IDX* num_unique_ptr, const void* unique_ids, const U* table_ids,
+                          T* values_ptr, void* tmp_buffer_ptr, uint32_t* return_num_unique,
+                          const bool put_to_kv_store) {
+  const auto& generator = embedding_state->generator();
+  CHECK_NOTNULL(generator);
+  const auto& cpu_generator = CHECK_JUST(generator->template Get<one::CPUGeneratorImpl>());
+  embedding::KeyValueStore* store = embedding_state->KeyValueStore();
+  bool need_value_buffer = (values_ptr == nullptr);
+  EmbeddingTmpBufferManager buffer_manager(tmp_buffer_ptr, num_ids, line_size * sizeof(T),
+                                           need_value_buffer);
+  const uint32_t num_unique = *num_unique_ptr;
+  uint32_t* num_missing_ptr =
+      buffer_manager.template Ptr<uint32_t>(EmbeddingBufferType::kNumMissing);
+  uint32_t* missing_indices =
+      buffer_manager.template Ptr<uint32_t>(EmbeddingBufferType::kMissingIndices);
+  T* store_values =
+      need_value_buffer ? buffer_manager.template Ptr<T>(EmbeddingBufferType::kValues) : values_ptr;
+  store->Get(stream, num_unique, unique_ids, store_values, num_missing_ptr, missing_indices);
+  const uint32_t num_missing = *num_missing_ptr;
+  if (num_missing > 0) {
+    InitMissingValues<T, U>(&cpu_generator->engine(), line_size, embedding_state->Initializers(),
+                            embedding_state->InitializerIndex(), table_ids, num_missing,
+                            missing_indices, store_values);
+  }
+  if (put_to_kv_store) { store->Put(stream, num_unique, unique_ids, store_values); }
+  *return_num_unique = num_unique;
+}
+
+template<typename T, typename U>
+void CopyValuesToEmbeddings(const int64_t num_unique, const int64_t embedding_size,
+                            const int64_t value_size, const T* values, U* embeddings) {
+  MultiThreadLoop(num_unique, [&](size_t row) {
+    const T* in = values + row * value_size;
+    U* out = embeddings + row * embedding_size;
+    for (int64_t col = 0; col < embedding_size; ++col) { out[col] = static_cast<U>(in[col]); }
+  });
+}
+
+}  // namespace
+
+template<typename T, typename U, typename IDX>
+class CpuEmbeddingPrefetchKernel final : public user_op::OpKernel {
+ public:
+  CpuEmbeddingPrefetchKernel() = default;
+  ~CpuEmbeddingPrefetchKernel() override = default;
+
+  std::shared_ptr<user_op::OpKernelState> CreateOpKernelState(
+      user_op::KernelInitContext* ctx) const override {
+    return std::make_shared<CpuEmbeddingKernelState>(ctx);
+  }
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx, user_op::OpKernelState* state,
+               const user_op::OpKernelCache*) const override {
+    auto* embedding_state = dynamic_cast<CpuEmbeddingKernelState*>(state);
+    CHECK(embedding_state != nullptr);
+    const user_op::Tensor* num_unique_ids = ctx->Tensor4ArgNameAndIndex("num_unique_ids", 0);
+    const user_op::Tensor* unique_ids = ctx->Tensor4ArgNameAndIndex("unique_ids", 0);
+    const user_op::Tensor* table_ids = ctx->Tensor4ArgNameAndIndex("table_ids", 0);
+    user_op::Tensor* tmp_buffer = ctx->Tensor4ArgNameAndIndex("tmp_buffer", 0);
+    const int64_t line_size = ctx->Attr<int64_t>("line_size");
+    uint32_t num_unique;
+    T* values_ptr = nullptr;
+    LookupAndInitMissing<T, U, IDX>(ctx->stream(), embedding_state, unique_ids->shape().elem_cnt(),
+                                    line_size, num_unique_ids->dptr<IDX>(), unique_ids->dptr(),
+                                    table_ids->dptr<U>(), values_ptr, tmp_buffer->mut_dptr(),
+                                    &num_unique, true);
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define EMBEDDING_DATA_TYPE_SEQ OF_PP_MAKE_TUPLE_SEQ(float, DataType::kFloat)
+
+#define TABLE_ID_DATA_TYPE_SEQ                      \
+  OF_PP_MAKE_TUPLE_SEQ(uint8_t, DataType::kUInt8)   \
+  OF_PP_MAKE_TUPLE_SEQ(uint32_t, DataType::kUInt32) \
+  OF_PP_MAKE_TUPLE_SEQ(uint64_t, DataType::kUInt64) \
+  OF_PP_MAKE_TUPLE_SEQ(int8_t, DataType::kInt8)     \
+  OF_PP_MAKE_TUPLE_SEQ(int32_t, DataType::kInt32)   \
+  OF_PP_MAKE_TUPLE_SEQ(int64_t, DataType::kInt64)
+
+#define IDX_DATA_TYPE_SEQ                           \
+  OF_PP_MAKE_TUPLE_SEQ(uint32_t, DataType::kUInt32) \
+  OF_PP_MAKE_TUPLE_SEQ(int32_t, DataType::kInt32)
+
+#define REGISTER_CPU_EMBEDDING_PREFETCH_KERNEL(t_dtype_pair, table_dtype_pair, idx_dtype_pair) \
+  REGISTER_USER_KERNEL("embedding_prefetch")                                                   \
+      .SetCreateFn<CpuEmbeddingPrefetchKernel<OF_PP_PAIR_FIRST(t_dtype_pair),                  \
+                                              OF_PP_PAIR_FIRST(table_dtype_pair),              \
+                                              OF_PP_PAIR_FIRST(idx_dtype_pair)>>()             \
+      .SetIsMatchedHob(                                                                        \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                       \
+          && (user_op::HobDataType("table_ids", 0) == OF_PP_PAIR_SECOND(table_dtype_pair))     \
+          && (user_op::HobDataType("num_unique_ids", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair))) \
+      .SetInferTmpSizeFn([](user_op::InferContext* ctx) {                                      \
+        const user_op::TensorDesc& unique_ids = ctx->InputTensorDesc("unique_ids", 0);         \
+        EmbeddingTmpBufferManager buffer_manager(                                              \
+            nullptr, unique_ids.shape().elem_cnt(),                                            \
+            ctx->Attr<int64_t>("line_size") * sizeof(OF_PP_PAIR_FIRST(t_dtype_pair)), true);   \
+        return buffer_manager.TotalBufferSize();                                               \
+      });
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_EMBEDDING_PREFETCH_KERNEL, EMBEDDING_DATA_TYPE_SEQ,
+                                 TABLE_ID_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename U, typename IDX>
+class CpuEmbeddingLookupKernel final : public user_op::OpKernel {
+ public:
+  CpuEmbeddingLookupKernel() = default;
+  ~CpuEmbeddingLookupKernel() override = default;
+
+  std::shared_ptr<user_op::OpKernelState> CreateOpKernelState(
+      user_op::KernelInitContext* ctx) const override {
+    return std::make_shared<CpuEmbeddingKernelState>(ctx);
+  }
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx, user_op::OpKernelState* state,
+               const user_op::OpKernelCache*) const override {
+    auto* embedding_state = dynamic_cast<CpuEmbeddingKernelState*>(state);
+    CHECK(embedding_state != nullptr);
+    const user_op::Tensor* num_unique_ids = ctx->Tensor4ArgNameAndIndex("num_unique_ids", 0);
+    const user_op::Tensor* unique_ids = ctx->Tensor4ArgNameAndIndex("unique_ids", 0);
+    const user_op::Tensor* table_ids = ctx->Tensor4ArgNameAndIndex("table_ids", 0);
+    user_op::Tensor* unique_values = ctx->Tensor4ArgNameAndIndex("unique_values", 0);
+    user_op::Tensor* tmp_buffer = ctx->Tensor4ArgNameAndIndex("tmp_buffer", 0);
+    const int64_t embedding_size = ctx->Attr<int64_t>("embedding_size");
+    const int64_t line_size = ctx->Attr<int64_t>("line_size");
+    uint32_t num_unique;
+    LookupAndInitMissing<T, U, IDX>(ctx->stream(), embedding_state, unique_ids->shape().elem_cnt(),
+                                    line_size, num_unique_ids->dptr<IDX>(), unique_ids->dptr(),
+                                    table_ids->dptr<U>(), unique_values->mut_dptr<T>(),
+                                    tmp_buffer->mut_dptr(), &num_unique, false);
+    if (ctx->has_output("embeddings", 0)) {
+      user_op::Tensor* embeddings = ctx->Tensor4ArgNameAndIndex("embeddings", 0);
+      if (embeddings->data_type() == DataType::kFloat16) {
+        CopyValuesToEmbeddings<T, float16>(num_unique, embedding_size, line_size,
+                                           unique_values->dptr<T>(),
+                                           embeddings->mut_dptr<float16>());
+      } else if (embeddings->data_type() == unique_values->data_type()) {
+        CopyValuesToEmbeddings<T, T>(num_unique, embedding_size, line_size,
+                                     unique_values->dptr<T>(), embeddings->mut_dptr<T>());
+      } else {
+        UNIMPLEMENTED();
+      }
+    }
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_EMBEDDING_LOOKUP_KERNEL(t_dtype_pair, table_dtype_pair, idx_dtype_pair)   \
+  REGISTER_USER_KERNEL("embedding_lookup")                                                     \
+      .SetCreateFn<CpuEmbeddingLookupKernel<OF_PP_PAIR_FIRST(t_dtype_pair),                    \
+                                            OF_PP_PAIR_FIRST(table_dtype_pair),                \
+                                            OF_PP_PAIR_FIRST(idx_dtype_pair)>>()               \
+      .SetIsMatchedHob(                                                                        \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                       \
+          && (user_op::HobDataType("unique_values", 0) == OF_PP_PAIR_SECOND(t_dtype_pair))     \
+          && (user_op::HobDataType("table_ids", 0) == OF_PP_PAIR_SECOND(table_dtype_pair))     \
+          && (user_op::HobDataType("num_unique_ids", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair))) \
+      .SetInferTmpSizeFn([](user_op::InferContext* ctx) {                                      \
+        const user_op::TensorDesc& unique_ids = ctx->InputTensorDesc("unique_ids", 0);         \
+        EmbeddingTmpBufferManager buffer_manager(                                              \
+            nullptr, unique_ids.shape().elem_cnt(),                                            \
+            ctx->Attr<int64_t>("line_size") * sizeof(OF_PP_PAIR_FIRST(t_dtype_pair)), false);  \
+        return buffer_manager.TotalBufferSize();                                               \
+      });
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_EMBEDDING_LOOKUP_KERNEL, EMBEDDING_DATA_TYPE_SEQ,
+                                 TABLE_ID_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename IDX>
+class CpuEmbeddingPutKernel final : public user_op::OpKernel {
+ public:
+  CpuEmbeddingPutKernel() = default;
+  ~CpuEmbeddingPutKernel() override = default;
+
+  std::shared_ptr<user_op::OpKernelState> CreateOpKernelState(
+      user_op::KernelInitContext* ctx) const override {
+    return std::make_shared<CpuEmbeddingPutKernelState>(ctx);
+  }
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx, user_op::OpKernelState* state,
+               const user_op::OpKernelCache*) const override {
+    auto* embedding_state = dynamic_cast<CpuEmbeddingPutKernelState*>(state);
+    CHECK(embedding_state != nullptr);
+    embedding::KeyValueStore* store = embedding_state->KeyValueStore();
+    const user_op::Tensor* num_unique_ids = ctx->Tensor4ArgNameAndIndex("num_unique_ids", 0);
+    const user_op::Tensor* unique_ids = ctx->Tensor4ArgNameAndIndex("unique_ids", 0);
+    const user_op::Tensor* unique_embeddings = ctx->Tensor4ArgNameAndIndex("unique_embeddings", 0);
+    store->Put(ctx->stream(), *num_unique_ids->dptr<IDX>(), unique_ids->dptr(),
+               unique_embeddings->dptr());
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_EMBEDDING_PUT_KERNEL(dtype, typeproto)           \
+  REGISTER_USER_KERNEL("embedding_put")                               \
+      .SetCreateFn<CpuEmbeddingPutKernel<dtype>>()                    \
+      .SetIsMatchedHob((user_op::HobDeviceType() == DeviceType::kCPU) \
+                       && (user_op::HobDataType("num_unique_ids", 0) == typeproto));
+
+OF_PP_FOR_EACH_TUPLE(REGISTER_CPU_EMBEDDING_PUT_KERNEL, IDX_DATA_TYPE_SEQ)
+
+}  // namespace oneflow
@@ -17,6 +17,7 @@ limitations under the License.
 #include "oneflow/core/framework/framework.h"
 #include "oneflow/core/embedding/key_value_store.h"
 #include "oneflow/core/embedding/embedding_manager.h"
+#include "oneflow/user/kernels/one_embedding_kernel_util.h"
 #include "oneflow/core/device/cuda_util.h"
 #include "oneflow/user/kernels/random_mask_generator.h"
 #include "oneflow/core/framework/random_generator_impl.h"
@@ -29,159 +30,6 @@ namespace oneflow {
 
 namespace {
 
-enum class InitializerType { kUniform, kNormal, kConstant };
-
-struct EmbeddingInitializer {
-  InitializerType type;
-  union {
-    struct {
-      float low;
-      float high;
-    } uniform_param;
-    struct {
-      float mean;
-      float std;
-    } normal_param;
-    struct {
-      float value;
-    } constant_param;
-  };
-
-  bool operator==(const EmbeddingInitializer& rhs) const {
-    if (this->type != rhs.type) { return false; }
-    if (rhs.type == InitializerType::kUniform) {
-      return (this->uniform_param.low == rhs.uniform_param.low)
-             && (this->uniform_param.high == rhs.uniform_param.high);
-    } else if (rhs.type == InitializerType::kNormal) {
-      return (this->normal_param.mean == rhs.normal_param.mean)
-             && (this->normal_param.std == rhs.normal_param.std);
-    } else if (rhs.type == InitializerType::kConstant) {
-      return this->constant_param.value == rhs.constant_param.value;
-    } else {
-      UNIMPLEMENTED();
-      return false;
-    }
-  }
-};
-
-void ParseInitializerFromJson(const nlohmann::json& initializer,
-                              EmbeddingInitializer* embedding_initializer) {
-  CHECK(initializer.contains("type"));
-  CHECK(initializer["type"].is_string());
-  std::string type = initializer["type"].get<std::string>();
-  if (type == "uniform") {
-    embedding_initializer->type = InitializerType::kUniform;
-    CHECK(initializer.contains("low"));
-    CHECK(initializer.contains("high"));
-    CHECK(initializer["low"].is_number());
-    CHECK(initializer["high"].is_number());
-    embedding_initializer->uniform_param.low = initializer["low"];
-    embedding_initializer->uniform_param.high = initializer["high"];
-  } else if (type == "normal") {
-    CHECK(initializer.contains("mean"));
-    CHECK(initializer.contains("std"));
-    CHECK(initializer["mean"].is_number());
-    CHECK(initializer["std"].is_number());
-    embedding_initializer->type = InitializerType::kNormal;
-    embedding_initializer->normal_param.mean = initializer["mean"];
-    embedding_initializer->normal_param.std = initializer["std"];
-  } else if (type == "constant") {
-    CHECK(initializer.contains("value"));
-    CHECK(initializer["value"].is_number());
-    embedding_initializer->type = InitializerType::kConstant;
-    embedding_initializer->constant_param.value = initializer["value"];
-  } else {
-    UNIMPLEMENTED() << "Unsupported initializer type";
-  }
-}
-
-int32_t ParseJsonToUniqueInitializerVecAndReturnOffset(
-    const nlohmann::json& initializer, std::vector<EmbeddingInitializer>* initializers) {
-  EmbeddingInitializer embedding_initializer;
-  ParseInitializerFromJson(initializer, &embedding_initializer);
-  for (int32_t i = 0; i < initializers->size(); ++i) {
-    if (initializers->at(i) == embedding_initializer) { return i; }
-  }
-  initializers->push_back(embedding_initializer);
-  return initializers->size() - 1;
-}
-
-void SetInitializerIndex(int32_t row_id, int32_t col_start, int32_t col_end, int64_t line_size,
-                         int8_t index, std::vector<int8_t>* initializer_index) {
-  int64_t row_offset = row_id * line_size;
-  for (int32_t col = col_start; col < col_end; ++col) {
-    initializer_index->at(row_offset + col) = index;
-  }
-}
-
-void ParseAndSetStateInitializerIndex(const std::string& state_initializer,
-                                      const int32_t num_tables, const int64_t line_size,
-                                      const int64_t embedding_size,
-                                      std::vector<EmbeddingInitializer>* initializer_params,
-                                      std::vector<int8_t>* initializer_index) {
-  if (line_size == embedding_size) { return; }
-  CHECK(!state_initializer.empty());
-  auto initializers = nlohmann::json::parse(state_initializer);
-  CHECK(initializers.is_array());
-  const int num_states = line_size / embedding_size - 1;
-  CHECK_EQ(num_states, initializers.size());
-  for (int32_t i = 0; i < num_states; ++i) {
-    int32_t offset =
-        ParseJsonToUniqueInitializerVecAndReturnOffset(initializers.at(i), initializer_params);
-    int32_t col_start = embedding_size + i * embedding_size;
-    int32_t col_end = col_start + embedding_size;
-    CHECK_LE(col_end, line_size);
-    for (int32_t j = 0; j < num_tables; ++j) {
-      SetInitializerIndex(j, col_start, col_end, line_size, offset, initializer_index);
-    }
-  }
-}
-
-void ParseAndSetModelInitializerIndex(const nlohmann::json& tables,
-                                      const std::vector<int64_t>& column_dims,
-                                      const int32_t num_tables, const int32_t num_columns,
-                                      const int64_t line_size, const int64_t embedding_size,
-                                      std::vector<EmbeddingInitializer>* initializer_params,
-                                      std::vector<int8_t>* initializer_index) {
-  for (int32_t i = 0; i < num_tables; ++i) {
-    auto table = tables.at(i);
-    CHECK(table.contains("columns"));
-    auto columns = table["columns"];
-    CHECK(columns.is_array());
-    CHECK_EQ(num_columns, columns.size()) << "columns size must equal to num embedding dims";
-    int32_t col_start = 0;
-    for (int k = 0; k < columns.size(); ++k) {
-      auto column = columns.at(k);
-      CHECK(column.contains("initializer"));
-      int32_t offset =
-          ParseJsonToUniqueInitializerVecAndReturnOffset(column["initializer"], initializer_params);
-      int32_t col_end = col_start + column_dims.at(k);
-      SetInitializerIndex(i, col_start, col_end, line_size, offset, initializer_index);
-      col_start = col_end;
-    }
-    CHECK_EQ(col_start, embedding_size);
-  }
-}
-
-void ParseInitializers(const int64_t line_size, const int64_t embedding_size,
-                       const std::string& state_initializer, const std::string& json_serialized,
-                       std::vector<EmbeddingInitializer>* initializer_params,
-                       std::vector<int8_t>* initializer_index) {
-  auto json_object = nlohmann::json::parse(json_serialized);
-  CHECK(json_object.contains("column_dims"));
-  std::vector<int64_t> column_dims = json_object["column_dims"];
-  const int32_t num_columns = column_dims.size();
-  CHECK(json_object.contains("tables"));
-  auto tables = json_object["tables"];
-  CHECK(tables.is_array());
-  const int32_t num_tables = tables.size();
-  initializer_index->resize(num_tables * line_size);
-  ParseAndSetStateInitializerIndex(state_initializer, num_tables, line_size, embedding_size,
-                                   initializer_params, initializer_index);
-  ParseAndSetModelInitializerIndex(tables, column_dims, num_tables, num_columns, line_size,
-                                   embedding_size, initializer_params, initializer_index);
-}
-
 template<typename IDX>
 class EmbeddingKernelState final : public user_op::OpKernelState {
  public:
@@ -277,42 +125,6 @@ class EmbeddingPutKernelState final : public user_op::OpKernelState {
   embedding::KeyValueStore* key_value_store_;
 };
 
-enum class EmbeddingBufferType { kNumMissing = 0, kMissingIndices, kValues, kMaxType };
-
-class EmbeddingTmpBufferManager final {
- public:
-  OF_DISALLOW_COPY_AND_MOVE(EmbeddingTmpBufferManager);
-  EmbeddingTmpBufferManager(void* ptr, const int64_t num_ids, const int64_t value_byte_size,
-                            const bool need_value_buffer)
-      : offset_(0), offsets_(static_cast<size_t>(EmbeddingBufferType::kMaxType), -1), ptr_(ptr) {
-    AllocBuffer(EmbeddingBufferType::kNumMissing, sizeof(uint32_t));
-    AllocBuffer(EmbeddingBufferType::kMissingIndices, num_ids * sizeof(uint32_t));
-    if (need_value_buffer) { AllocBuffer(EmbeddingBufferType::kValues, num_ids * value_byte_size); }
-  }
-
-  template<typename T = void>
-  T* Ptr(EmbeddingBufferType type) {
-    CHECK(ptr_ != nullptr);
-    int64_t offset = offsets_.at(static_cast<size_t>(type));
-    CHECK_NE(offset, -1);
-    return reinterpret_cast<T*>(reinterpret_cast<char*>(ptr_) + offset);
-  }
-
-  size_t TotalBufferSize() const { return offset_; }
-
- private:
-  void AllocBuffer(EmbeddingBufferType type, size_t size) {
-    const size_t type_id = static_cast<size_t>(type);
-    CHECK_EQ(offsets_.at(type_id), -1);
-    offsets_.at(type_id) = offset_;
-    offset_ += GetCudaAlignedSize(size);
-  }
-
-  size_t offset_;
-  std::vector<int64_t> offsets_;
-  void* ptr_;
-};
-
 template<typename T, typename U>
 __global__ void InitValueKernel(uint64_t seed, one::CUDAGeneratorState* cuda_gen_state,
                                 uint64_t inc_offset, const int32_t line_size,
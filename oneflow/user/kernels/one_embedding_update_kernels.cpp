@@ -0,0 +1,288 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/thread/thread_manager.h"
+#include "oneflow/user/kernels/model_update_kernel_util.h"
+
+namespace oneflow {
+
+namespace {
+
+template<typename T>
+struct EmbeddingUpdateArgs {
+  int64_t num_unique;
+  int64_t line_size;
+  int64_t embedding_size;
+  T scale;
+  float learning_rate;
+  bool skip;
+};
+
+template<typename T, typename IDX>
+EmbeddingUpdateArgs<T> GetEmbeddingUpdateArgs(user_op::KernelComputeContext* ctx,
+                                              const bool has_scale_by_tensor) {
+  const user_op::Tensor* num_unique_ids = ctx->Tensor4ArgNameAndIndex("num_unique_ids", 0);
+  const user_op::Tensor* unique_embeddings = ctx->Tensor4ArgNameAndIndex("unique_embeddings", 0);
+  const user_op::Tensor* embedding_grad = ctx->Tensor4ArgNameAndIndex("embedding_grad", 0);
+  CHECK_EQ(unique_embeddings->shape().NumAxes(), 2);
+  CHECK_EQ(embedding_grad->shape().NumAxes(), 2);
+  EmbeddingUpdateArgs<T> args{};
+  args.num_unique = *num_unique_ids->dptr<IDX>();
+  args.line_size = unique_embeddings->shape().At(1);
+  args.embedding_size = embedding_grad->shape().At(1);
+  args.scale = static_cast<T>(ctx->Attr<double>("scale"));
+  args.learning_rate = *ctx->Tensor4ArgNameAndIndex("learning_rate", 0)->dptr<float>();
+  if (has_scale_by_tensor && ctx->has_input("scale_by_tensor", 0)) {
+    const user_op::Tensor* scale_by_tensor = ctx->Tensor4ArgNameAndIndex("scale_by_tensor", 0);
+    CHECK_EQ(scale_by_tensor->data_type(), unique_embeddings->data_type());
+    CHECK_EQ(scale_by_tensor->shape().elem_cnt(), 1);
+    args.scale *= *scale_by_tensor->dptr<T>();
+  }
+  if (ctx->has_input("down_scale_by_tensor", 0)) {
+    const user_op::Tensor* down_scale_by_tensor =
+        ctx->Tensor4ArgNameAndIndex("down_scale_by_tensor", 0);
+    CHECK_EQ(down_scale_by_tensor->data_type(), unique_embeddings->data_type());
+    CHECK_EQ(down_scale_by_tensor->shape().elem_cnt(), 1);
+    args.scale /= *down_scale_by_tensor->dptr<T>();
+  }
+  args.skip = false;
+  if (ctx->has_input("skip_if", 0)) {
+    const user_op::Tensor* skip_if = ctx->Tensor4ArgNameAndIndex("skip_if", 0);
+    CHECK_EQ(skip_if->shape().elem_cnt(), 1);
+    args.skip = (*skip_if->dptr<int64_t>() != 0);
+  }
+  return args;
+}
+
+// Copies every line to the output and then applies `UpdateFn(model_diff, line)` to each column of
+// the model part, `line` pointing at the model value of that column in the output line.
+template<typename T, typename G, typename UpdateFn>
+void UpdateEmbeddingLines(user_op::KernelComputeContext* ctx, const EmbeddingUpdateArgs<T>& args,
+                          const UpdateFn& update_fn) {
+  const T* unique_values = ctx->Tensor4ArgNameAndIndex("unique_embeddings", 0)->dptr<T>();
+  const G* model_diff = ctx->Tensor4ArgNameAndIndex("embedding_grad", 0)->dptr<G>();
+  T* updated_unique_values =
+      ctx->Tensor4ArgNameAndIndex("updated_unique_embeddings", 0)->mut_dptr<T>();
+  MultiThreadLoop(args.num_unique, [&](size_t row) {
+    const T* in_line = unique_values + row * args.line_size;
+    T* out_line = updated_unique_values + row * args.line_size;
+    std::copy(in_line, in_line + args.line_size, out_line);
+    if (args.skip) { return; }
+    const G* diff_line = model_diff + row * args.embedding_size;
+    for (int64_t col = 0; col < args.embedding_size; ++col) {
+      update_fn(diff_line + col, out_line + col);
+    }
+  });
+}
+
+}  // namespace
+
+template<typename T, typename G, typename IDX>
+class CpuSgdEmbeddingUpdateKernel final : public user_op::OpKernel {
+ public:
+  CpuSgdEmbeddingUpdateKernel() = default;
+  ~CpuSgdEmbeddingUpdateKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const EmbeddingUpdateArgs<T> args = GetEmbeddingUpdateArgs<T, IDX>(ctx, true);
+    CHECK_EQ(args.line_size, args.embedding_size);
+    const float l1 = ctx->Attr<float>("l1");
+    const float l2 = ctx->Attr<float>("l2");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    UpdateEmbeddingLines<T, G>(ctx, args, [&](const G* model_diff, T* model) {
+      SGDUpdateFunctor<T, G>()(model_diff, model, args.scale, l1, l2, weight_decay,
+                               args.learning_rate);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define IDX_DATA_TYPE_SEQ                           \
+  OF_PP_MAKE_TUPLE_SEQ(uint32_t, DataType::kUInt32) \
+  OF_PP_MAKE_TUPLE_SEQ(int32_t, DataType::kInt32)
+
+#define REGISTER_CPU_EMBEDDING_UPDATE_KERNEL(op_name, kernel, t_dtype_pair, g_type_pair,         \
+                                             idx_dtype_pair)                                     \
+  REGISTER_USER_KERNEL(op_name)                                                                  \
+      .SetCreateFn<kernel<OF_PP_PAIR_FIRST(t_dtype_pair), OF_PP_PAIR_FIRST(g_type_pair),         \
+                          OF_PP_PAIR_FIRST(idx_dtype_pair)>>()                                   \
+      .SetIsMatchedHob(                                                                          \
+          (user_op::HobDeviceType() == DeviceType::kCPU)                                         \
+          && (user_op::HobDataType("num_unique_ids", 0) == OF_PP_PAIR_SECOND(idx_dtype_pair))    \
+          && (user_op::HobDataType("embedding_grad", 0) == OF_PP_PAIR_SECOND(g_type_pair))       \
+          && (user_op::HobDataType("unique_embeddings", 0) == OF_PP_PAIR_SECOND(t_dtype_pair)));
+
+#define REGISTER_CPU_SGD_EMBEDDING_UPDATE_KERNEL(t_dtype_pair, g_type_pair, idx_dtype_pair)       \
+  REGISTER_CPU_EMBEDDING_UPDATE_KERNEL("sgd_embedding_update", CpuSgdEmbeddingUpdateKernel,       \
+                                       t_dtype_pair, g_type_pair, idx_dtype_pair)
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_SGD_EMBEDDING_UPDATE_KERNEL, FLOATING_DATA_TYPE_SEQ,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename G, typename IDX>
+class CpuMomentumEmbeddingUpdateKernel final : public user_op::OpKernel {
+ public:
+  CpuMomentumEmbeddingUpdateKernel() = default;
+  ~CpuMomentumEmbeddingUpdateKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const EmbeddingUpdateArgs<T> args = GetEmbeddingUpdateArgs<T, IDX>(ctx, true);
+    CHECK_EQ(args.line_size, args.embedding_size * 2);
+    const float l1 = ctx->Attr<float>("l1");
+    const float l2 = ctx->Attr<float>("l2");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const auto beta = ctx->Attr<float>("beta");
+    const int64_t embedding_size = args.embedding_size;
+    UpdateEmbeddingLines<T, G>(ctx, args, [&](const G* model_diff, T* model) {
+      MomentumUpdateFunctor<T, G>()(model_diff, model, model + embedding_size, args.scale, l1, l2,
+                                    beta, weight_decay, args.learning_rate);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_MOMENTUM_EMBEDDING_UPDATE_KERNEL(t_dtype_pair, g_type_pair, idx_dtype_pair) \
+  REGISTER_CPU_EMBEDDING_UPDATE_KERNEL("momentum_embedding_update",                              \
+                                       CpuMomentumEmbeddingUpdateKernel, t_dtype_pair,           \
+                                       g_type_pair, idx_dtype_pair)
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_MOMENTUM_EMBEDDING_UPDATE_KERNEL,
+                                 FLOATING_DATA_TYPE_SEQ,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename G, typename IDX>
+class CpuAdamEmbeddingUpdateKernel final : public user_op::OpKernel {
+ public:
+  CpuAdamEmbeddingUpdateKernel() = default;
+  ~CpuAdamEmbeddingUpdateKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const EmbeddingUpdateArgs<T> args = GetEmbeddingUpdateArgs<T, IDX>(ctx, true);
+    CHECK_EQ(args.line_size, args.embedding_size * 3);
+    const float l1 = ctx->Attr<float>("l1");
+    const float l2 = ctx->Attr<float>("l2");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const auto beta1 = ctx->Attr<float>("beta1");
+    const auto beta2 = ctx->Attr<float>("beta2");
+    const auto epsilon = ctx->Attr<float>("epsilon");
+    float bias_correction1_val = 1.0;
+    float bias_correction2_val = 1.0;
+    if (ctx->has_input("bias_correction1", 0)) {
+      bias_correction1_val = *ctx->Tensor4ArgNameAndIndex("bias_correction1", 0)->dptr<float>();
+    }
+    if (ctx->has_input("bias_correction2", 0)) {
+      bias_correction2_val = *ctx->Tensor4ArgNameAndIndex("bias_correction2", 0)->dptr<float>();
+    }
+    const int64_t embedding_size = args.embedding_size;
+    UpdateEmbeddingLines<T, G>(ctx, args, [&](const G* model_diff, T* model) {
+      AdamUpdateFunctor<T, G>()(model_diff, model, model + embedding_size,
+                                model + 2 * embedding_size, nullptr, args.scale, l1, l2, beta1,
+                                beta2, epsilon, weight_decay, false, bias_correction1_val,
+                                bias_correction2_val, args.learning_rate);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_ADAM_EMBEDDING_UPDATE_KERNEL(t_dtype_pair, g_type_pair, idx_dtype_pair)     \
+  REGISTER_CPU_EMBEDDING_UPDATE_KERNEL("adam_embedding_update", CpuAdamEmbeddingUpdateKernel,    \
+                                       t_dtype_pair, g_type_pair, idx_dtype_pair)
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_ADAM_EMBEDDING_UPDATE_KERNEL, FLOATING_DATA_TYPE_SEQ,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename G, typename IDX>
+class CpuAdagradEmbeddingUpdateKernel final : public user_op::OpKernel {
+ public:
+  CpuAdagradEmbeddingUpdateKernel() = default;
+  ~CpuAdagradEmbeddingUpdateKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    EmbeddingUpdateArgs<T> args = GetEmbeddingUpdateArgs<T, IDX>(ctx, true);
+    CHECK_EQ(args.line_size, args.embedding_size * 2);
+    const float l1 = ctx->Attr<float>("l1");
+    const float l2 = ctx->Attr<float>("l2");
+    const auto weight_decay = ctx->Attr<float>("weight_decay");
+    const auto lr_decay = ctx->Attr<float>("lr_decay");
+    const auto epsilon = ctx->Attr<float>("epsilon");
+    const int64_t train_step =
+        *ctx->Tensor4ArgNameAndIndex("train_step", 0)->dptr<int64_t>() + 1;
+    args.learning_rate = args.learning_rate / (1 + (train_step - 1) * lr_decay);
+    const int64_t embedding_size = args.embedding_size;
+    UpdateEmbeddingLines<T, G>(ctx, args, [&](const G* model_diff, T* model) {
+      AdagradUpdateFunctor<T, G>()(model_diff, model, model + embedding_size, args.scale, l1, l2,
+                                   epsilon, weight_decay, args.learning_rate);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_ADAGRAD_EMBEDDING_UPDATE_KERNEL(t_dtype_pair, g_type_pair, idx_dtype_pair) \
+  REGISTER_CPU_EMBEDDING_UPDATE_KERNEL("adagrad_embedding_update",                              \
+                                       CpuAdagradEmbeddingUpdateKernel, t_dtype_pair,           \
+                                       g_type_pair, idx_dtype_pair)
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_ADAGRAD_EMBEDDING_UPDATE_KERNEL,
+                                 FLOATING_DATA_TYPE_SEQ,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+template<typename T, typename G, typename IDX>
+class CpuFtrlEmbeddingUpdateKernel final : public user_op::OpKernel {
+ public:
+  CpuFtrlEmbeddingUpdateKernel() = default;
+  ~CpuFtrlEmbeddingUpdateKernel() override = default;
+
+ private:
+  using user_op::OpKernel::Compute;
+  void Compute(user_op::KernelComputeContext* ctx) const override {
+    const EmbeddingUpdateArgs<T> args = GetEmbeddingUpdateArgs<T, IDX>(ctx, false);
+    CHECK_EQ(args.line_size, args.embedding_size * 3)
+        << "The line_size should be equal to 3 x embedding_size. ";
+    const float l1 = 0.0;
+    const float l2 = 0.0;
+    const float weight_decay = ctx->Attr<float>("weight_decay");
+    CHECK_EQ(weight_decay, static_cast<float>(0.0))
+        << "Currently not support for setting weight decay. ";
+    const float lr_power = ctx->Attr<float>("lr_power");
+    const float lambda1 = ctx->Attr<float>("lambda1");
+    const float lambda2 = ctx->Attr<float>("lambda2");
+    const float beta = ctx->Attr<float>("beta");
+    const int64_t embedding_size = args.embedding_size;
+    UpdateEmbeddingLines<T, G>(ctx, args, [&](const G* model_diff, T* model) {
+      FtrlUpdateFunctor<T, G>()(model_diff, model, model + embedding_size,
+                                model + 2 * embedding_size, args.scale, l1, l2, lr_power, lambda1,
+                                lambda2, beta, weight_decay, args.learning_rate);
+    });
+  }
+  bool AlwaysComputeWhenAllOutputsEmpty() const override { return false; }
+};
+
+#define REGISTER_CPU_FTRL_EMBEDDING_UPDATE_KERNEL(t_dtype_pair, g_type_pair, idx_dtype_pair)     \
+  REGISTER_CPU_EMBEDDING_UPDATE_KERNEL("ftrl_embedding_update", CpuFtrlEmbeddingUpdateKernel,    \
+                                       t_dtype_pair, g_type_pair, idx_dtype_pair)
+
+OF_PP_SEQ_PRODUCT_FOR_EACH_TUPLE(REGISTER_CPU_FTRL_EMBEDDING_UPDATE_KERNEL, FLOATING_DATA_TYPE_SEQ,
+                                 FLOATING_DATA_TYPE_SEQ FLOAT16_DATA_TYPE_SEQ, IDX_DATA_TYPE_SEQ)
+
+}  // namespace oneflow
@@ -0,0 +1,75 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/framework/op_generated.h"
+#include "oneflow/core/job/nd_sbp_util.h"
+
+namespace oneflow {
+
+/* static */ Maybe<void> StatelessRandomOp::InferLogicalTensorDesc(user_op::InferContext* ctx) {
+  *ctx->OutputShape("out", 0) = ctx->Attr<Shape>("shape");
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> StatelessRandomOp::InferPhysicalTensorDesc(user_op::InferContext* ctx) {
+  const Shape& parallel_hierarchy = *ctx->parallel_desc().hierarchy();
+  const NdSbp& nd_sbp = ctx->NdSbp4ArgNameAndIndex("out", 0);
+  const Shape& logical_shape = ctx->Attr<Shape>("shape");
+  const int64_t parallel_id = ctx->parallel_ctx().parallel_id();
+  const Shape& physical_shape =
+      GetTensorSliceView4ParallelId(parallel_hierarchy, nd_sbp, logical_shape, parallel_id).shape();
+
+  *ctx->OutputShape("out", 0) = physical_shape;
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> StatelessRandomOp::GetSbp(user_op::SbpContext* ctx) {
+  const Shape& shape = ctx->Attr<Shape>("shape");
+  // Values only depend on the logical index, so every split is as good as broadcast.
+  FOR_RANGE(int64_t, i, 0, shape.NumAxes()) {
+    ctx->NewBuilder().Split(ctx->outputs(), i).Build();
+  }
+  ctx->NewBuilder().Broadcast(ctx->outputs()).Build();
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> StatelessRandomOp::InferNdSbp(user_op::InferNdSbpFnContext* ctx) {
+  SbpParallel default_sbp;
+  default_sbp.mutable_broadcast_parallel();
+  return user_op::InferNdSbp4SrcOp(ctx, default_sbp);
+}
+
+/* static */ Maybe<void> StatelessRandomOp::InferDataType(user_op::InferContext* ctx) {
+  auto dtype = ctx->Attr<DataType>("dtype");
+  CHECK_OR_RETURN(dtype == DataType::kFloat || dtype == DataType::kDouble)
+      << "stateless_random only supports float and double, but got " << DataType_Name(dtype);
+  *ctx->OutputDType("out", 0) = dtype;
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> StatelessRandomOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                    const user_op::UserOpConfWrapper& op_conf) {
+  const std::string& distribution = op_conf.attr<std::string>("distribution");
+  CHECK_OR_RETURN(distribution == "uniform" || distribution == "normal"
+                  || distribution == "truncated_normal")
+      << "Unsupported distribution " << distribution;
+  if (distribution == "truncated_normal") {
+    CHECK_LE_OR_RETURN(op_conf.attr<double>("from"), op_conf.attr<double>("to"));
+  }
+  return Maybe<void>::Ok();
+}
+
+}  // namespace oneflow
@@ -0,0 +1,135 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/framework/op_generated.h"
+
+namespace oneflow {
+
+namespace {
+
+// All tensors of a multi tensor op share the data type, so that one kernel handles them all.
+Maybe<void> CheckMultiTensorDataType(user_op::InferContext* ctx) {
+  const DataType data_type = ctx->InputDType("x", 0);
+  for (int32_t i = 1; i < ctx->input_size("x"); ++i) {
+    CHECK_EQ_OR_RETURN(ctx->InputDType("x", i), data_type);
+  }
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> SetMultiTensorInputArgMutable(const user_op::GetInputArgModifier& GetInputArgModifierFn,
+                                          const user_op::UserOpConfWrapper& conf) {
+  for (int32_t i = 0; i < conf.input_size("x"); ++i) {
+    user_op::InputArgModifier* arg_modifier = GetInputArgModifierFn("x", i);
+    CHECK_NOTNULL_OR_RETURN(arg_modifier);
+    arg_modifier->set_is_mutable(true);
+  }
+  return Maybe<void>::Ok();
+}
+
+}  // namespace
+
+/* static */ Maybe<void> MultiTensorNormOp::InferLogicalTensorDesc(user_op::InferContext* ctx) {
+  *ctx->OutputShape("y", 0) = Shape({});
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> MultiTensorNormOp::InferPhysicalTensorDesc(user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorNormOp::GetSbp(user_op::SbpContext* ctx) {
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Broadcast(ctx->outputs()).Build();
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorNormOp::InferDataType(user_op::InferContext* ctx) {
+  JUST(CheckMultiTensorDataType(ctx));
+  *ctx->OutputDType("y", 0) = ctx->InputDType("x", 0);
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> MultiTensorNormOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                    const user_op::UserOpConfWrapper& conf) {
+  CHECK_GE_OR_RETURN(conf.input_size("x"), 1);
+  // NOTE: only positive p-norms and the (-)infinity norms can be reduced in a single pass
+  const float ord = conf.attr<float>("ord");
+  CHECK_OR_RETURN(ord > 0 || std::isinf(ord)) << "unsupported norm order " << ord;
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorClipByNormOp::InferLogicalTensorDesc(
+    user_op::InferContext* ctx) {
+  CHECK_EQ_OR_RETURN(ctx->InputShape("total_norm", 0).elem_cnt(), 1);
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> MultiTensorClipByNormOp::InferPhysicalTensorDesc(
+    user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorClipByNormOp::GetSbp(user_op::SbpContext* ctx) {
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Build();
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorClipByNormOp::ModifyInputArg(
+    const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) {
+  return SetMultiTensorInputArgMutable(GetInputArgModifierFn, conf);
+}
+
+/* static */ Maybe<void> MultiTensorClipByNormOp::InferDataType(user_op::InferContext* ctx) {
+  JUST(CheckMultiTensorDataType(ctx));
+  CHECK_EQ_OR_RETURN(ctx->InputDType("total_norm", 0), ctx->InputDType("x", 0));
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> MultiTensorClipByNormOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                          const user_op::UserOpConfWrapper& conf) {
+  CHECK_GE_OR_RETURN(conf.input_size("x"), 1);
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorClampOp::InferLogicalTensorDesc(user_op::InferContext* ctx) {
+  return Maybe<void>::Ok();
+}
+
+/*static*/ Maybe<void> MultiTensorClampOp::InferPhysicalTensorDesc(user_op::InferContext* ctx) {
+  return InferLogicalTensorDesc(ctx);
+}
+
+/* static */ Maybe<void> MultiTensorClampOp::GetSbp(user_op::SbpContext* ctx) {
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Build();
+  return Maybe<void>::Ok();
+}
+
+/* static */ Maybe<void> MultiTensorClampOp::ModifyInputArg(
+    const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) {
+  return SetMultiTensorInputArgMutable(GetInputArgModifierFn, conf);
+}
+
+/* static */ Maybe<void> MultiTensorClampOp::InferDataType(user_op::InferContext* ctx) {
+  return CheckMultiTensorDataType(ctx);
+}
+
+/*static*/ Maybe<void> MultiTensorClampOp::CheckAttr(const user_op::UserOpDefWrapper&,
+                                                     const user_op::UserOpConfWrapper& conf) {
+  CHECK_GE_OR_RETURN(conf.input_size("x"), 1);
+  CHECK_LE_OR_RETURN(conf.attr<double>("min"), conf.attr<double>("max"));
+  return Maybe<void>::Ok();
+}
+
+}  // namespace oneflow
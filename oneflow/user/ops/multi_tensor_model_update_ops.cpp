@@ -0,0 +1,143 @@
+/*
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+*/
+#include "oneflow/core/framework/framework.h"
+#include "oneflow/core/framework/op_generated.h"
+
+namespace oneflow {
+
+namespace {
+
+// Inputs of a multi tensor update are lists of the same length, the i-th items of them are the
+// model, model_diff and states of the i-th variable.
+Maybe<void> CheckMultiTensorUpdateInputSize(const user_op::UserOpConfWrapper& conf,
+                                            const std::vector<std::string>& state_names) {
+  const int32_t num_models = conf.input_size("model");
+  CHECK_GE_OR_RETURN(num_models, 1);
+  CHECK_EQ_OR_RETURN(conf.input_size("model_diff"), num_models);
+  for (const auto& state_name : state_names) {
+    CHECK_EQ_OR_RETURN(conf.input_size(state_name), num_models) << state_name;
+  }
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> InferMultiTensorUpdateTensorDesc(user_op::InferContext* ctx,
+                                             const std::vector<std::string>& state_names) {
+  const int32_t num_models = ctx->input_size("model");
+  for (int32_t i = 0; i < num_models; ++i) {
+    const Shape& shape = ctx->InputShape("model", i);
+    CHECK_EQ_OR_RETURN(ctx->InputShape("model_diff", i), shape);
+    for (const auto& state_name : state_names) {
+      CHECK_EQ_OR_RETURN(ctx->InputShape(state_name, i), shape) << state_name;
+    }
+  }
+  return Maybe<void>::Ok();
+}
+
+// All variables of an update share the data type, so that one kernel updates them all.
+Maybe<void> InferMultiTensorUpdateDataType(user_op::InferContext* ctx,
+                                           const std::vector<std::string>& state_names) {
+  const DataType data_type = ctx->InputDType("model", 0);
+  const DataType diff_data_type = ctx->InputDType("model_diff", 0);
+  const int32_t num_models = ctx->input_size("model");
+  for (int32_t i = 0; i < num_models; ++i) {
+    CHECK_EQ_OR_RETURN(ctx->InputDType("model", i), data_type);
+    CHECK_EQ_OR_RETURN(ctx->InputDType("model_diff", i), diff_data_type);
+    for (const auto& state_name : state_names) {
+      CHECK_EQ_OR_RETURN(ctx->InputDType(state_name, i), data_type) << state_name;
+    }
+  }
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> GetMultiTensorUpdateSbp(user_op::SbpContext* ctx) {
+  ctx->NewBuilder().Broadcast(ctx->inputs()).Build();
+  return Maybe<void>::Ok();
+}
+
+Maybe<void> MultiTensorUpdateInputArgModifyFn(
+    const user_op::GetInputArgModifier& GetInputArgModifierFn,
+    const user_op::UserOpConfWrapper& conf, const std::vector<std::string>& state_names) {
+  std::vector<std::string> mutable_names(state_names);
+  mutable_names.emplace_back("model");
+  for (const auto& name : mutable_names) {
+    for (int32_t i = 0; i < conf.input_size(name); ++i) {
+      user_op::InputArgModifier* arg_modifier = GetInputArgModifierFn(name, i);
+      CHECK_NOTNULL_OR_RETURN(arg_modifier);
+      arg_modifier->set_is_mutable(true);
+    }
+  }
+  return Maybe<void>::Ok();
+}
+
+const std::vector<std::string>& SgdStateNames() {
+  static const std::vector<std::string> state_names;
+  return state_names;
+}
+
+const std::vector<std::string>& MomentumStateNames() {
+  static const std::vector<std::string> state_names{"momentum"};
+  return state_names;
+}
+
+const std::vector<std::string>& AdamStateNames() {
+  static const std::vector<std::string> state_names{"m", "v"};
+  return state_names;
+}
+
+}  // namespace
+
+#define DEFINE_MULTI_TENSOR_UPDATE_OP_FNS(op_class, StateNames)                               \
+  /* static */ Maybe<void> op_class::InferLogicalTensorDesc(user_op::InferContext* ctx) {     \
+    return InferMultiTensorUpdateTensorDesc(ctx, StateNames());                               \
+  }                                                                                           \
+  /*static*/ Maybe<void> op_class::InferPhysicalTensorDesc(user_op::InferContext* ctx) {      \
+    return InferLogicalTensorDesc(ctx);                                                       \
+  }                                                                                           \
+  /* static */ Maybe<void> op_class::GetSbp(user_op::SbpContext* ctx) {                       \
+    return GetMultiTensorUpdateSbp(ctx);                                                      \
+  }                                                                                           \
+  /* static */ Maybe<void> op_class::ModifyInputArg(                                          \
+      const GetInputArgModifier& GetInputArgModifierFn, const user_op::UserOpConfWrapper& conf) { \
+    return MultiTensorUpdateInputArgModifyFn(GetInputArgModifierFn, conf, StateNames());      \
+  }                                                                                           \
+  /* static */ Maybe<void> op_class::InferDataType(user_op::InferContext* ctx) {              \
+    return InferMultiTensorUpdateDataType(ctx, StateNames());                                 \
+  }
+
+DEFINE_MULTI_TENSOR_UPDATE_OP_FNS(MultiTensorSgdUpdateOp, SgdStateNames)
+DEFINE_MULTI_TENSOR_UPDATE_OP_FNS(MultiTensorMomentumUpdateOp, MomentumStateNames)
+DEFINE_MULTI_TENSOR_UPDATE_OP_FNS(MultiTensorAdamUpdateOp, AdamStateNames)
+
+#undef DEFINE_MULTI_TENSOR_UPDATE_OP_FNS
+
+/*static*/ Maybe<void> MultiTensorSgdUpdateOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& conf) {
+  return CheckMultiTensorUpdateInputSize(conf, SgdStateNames());
+}
+
+/*static*/ Maybe<void> MultiTensorMomentumUpdateOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& conf) {
+  return CheckMultiTensorUpdateInputSize(conf, MomentumStateNames());
+}
+
+/*static*/ Maybe<void> MultiTensorAdamUpdateOp::CheckAttr(
+    const user_op::UserOpDefWrapper&, const user_op::UserOpConfWrapper& conf) {
+  // NOTE: amsgrad is not supported, it is declared so that the attrs match adam_update.
+  CHECK_OR_RETURN(!conf.attr<bool>("amsgrad"));
+  return CheckMultiTensorUpdateInputSize(conf, AdamStateNames());
+}
+
+}  // namespace oneflow
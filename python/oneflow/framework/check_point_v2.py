@@ -13,8 +13,11 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 import os
+import threading
 import warnings
 from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
@@ -27,6 +30,7 @@ import oneflow
 import oneflow as flow
 import oneflow._oneflow_internal
 import oneflow.core.framework.variable_meta_info_pb2 as variable_meta_info_pb
+import oneflow.framework.balanced_splitter as balanced_splitter
 import oneflow.framework.dtype as dtype_util
 import oneflow.framework.id_util as id_util
 from oneflow.framework.tensor import Tensor
@@ -37,7 +41,13 @@ SNAPSHOT_DONE_FILENAME = "snapshot_done"
 META_INFO_FILENAME = "meta"
 PICKLE_FILENAME = "pickled_data"
 DATA_FILENAME = "out"
+PACKED_DATA_FILENAME = "packed_data"
+TENSOR_INDEX_FILENAME = "tensor_index"
 PROTOCOL_VERSION = 1
+# tensors in a packed file start at page boundaries so that they can be
+# memory-mapped and read with aligned I/O
+PACKED_ALIGNMENT = 4096
+IO_BUFFER_SIZE = 16 * 1024 * 1024
 
 
 class FileBackendVariableBlob:
@@ -103,36 +113,394 @@ class FileBackendVariableBlob:
             dtype=dtype_util.convert_oneflow_dtype_to_numpy_dtype(self.dtype),
         ).reshape(self.shape)
 
+    def memmap(self) -> np.ndarray:
+        if not self.has_meta_info_:
+            raise RuntimeError("This variable does not have meta info")
+        np_dtype = dtype_util.convert_oneflow_dtype_to_numpy_dtype(self.dtype)
+        if np.prod(self.shape).item() == 0:
+            # mmap(2) refuses to map an empty file
+            return np.empty(self.shape, dtype=np_dtype)
+        # copy-on-write mapping: pages are read lazily and in-place writes
+        # to the loaded tensor never reach the file on disk
+        return np.memmap(self.file_path, dtype=np_dtype, mode="c", shape=self.shape)
 
-def _save_tensor_to_disk(tensor: "oneflow.Tensor", dir_name: Union[str, Path]) -> None:
+
+def _as_bytes_view(np_arr: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(np_arr).reshape(-1).view(np.uint8)
+
+
+def _save_numpy_to_disk(
+    np_arr: np.ndarray, dtype: oneflow.dtype, dir_name: Union[str, Path]
+) -> None:
     os.makedirs(dir_name, exist_ok=True)
     meta_info = variable_meta_info_pb.VariableMetaInfo()
-    meta_info.shape.dim[:] = tensor.shape
+    meta_info.shape.dim[:] = np_arr.shape
     meta_info.data_type = oneflow._oneflow_internal.deprecated.GetProtoDtype4OfDtype(
-        tensor.dtype
+        dtype
     )
     data_path = os.path.join(dir_name, DATA_FILENAME)
-    with open(data_path, "wb") as f:
-        f.write(tensor.numpy().tobytes())
+    with open(data_path, "wb", buffering=IO_BUFFER_SIZE) as f:
+        f.write(_as_bytes_view(np_arr))
 
     with open(os.path.join(dir_name, META_INFO_FILENAME), "w") as f:
         f.write(text_format.MessageToString(meta_info))
 
 
+def _save_tensor_to_disk(tensor: "oneflow.Tensor", dir_name: Union[str, Path]) -> None:
+    _save_numpy_to_disk(tensor.numpy(), tensor.dtype, dir_name)
+
+
+class _StagingBufferPool:
+    """Host buffers reused across async saves to hold tensor snapshots. At
+    most ``max_bytes`` of released buffers are kept, the others are freed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.lock_ = threading.Lock()
+        self.max_bytes_ = max_bytes
+        self.free_bytes_ = 0
+        self.free_buffers_ = defaultdict(list)
+
+    def acquire(self, shape: Tuple[int], np_dtype: np.dtype) -> np.ndarray:
+        key = (tuple(shape), np.dtype(np_dtype))
+        with self.lock_:
+            if len(self.free_buffers_[key]) > 0:
+                buffer = self.free_buffers_[key].pop()
+                self.free_bytes_ -= buffer.nbytes
+                return buffer
+        return np.empty(shape, dtype=np_dtype)
+
+    def release(self, buffer: np.ndarray) -> None:
+        key = (buffer.shape, buffer.dtype)
+        with self.lock_:
+            if self.free_bytes_ + buffer.nbytes <= self.max_bytes_:
+                self.free_buffers_[key].append(buffer)
+                self.free_bytes_ += buffer.nbytes
+
+    def free_bytes(self) -> int:
+        with self.lock_:
+            return self.free_bytes_
+
+    def clear(self) -> None:
+        with self.lock_:
+            self.free_buffers_.clear()
+            self.free_bytes_ = 0
+
+
+class AsyncSaveHandle:
+    r"""The handle returned by ``oneflow.save(..., async_=True)``.
+
+    All tensors have already been snapshotted to host memory when the
+    handle is returned, so they can be modified freely while the files
+    are written in background threads.
+    """
+
+    def __init__(self, future: Future, path: Path):
+        self.future_ = future
+        self.path_ = path
+
+    @property
+    def path(self) -> Path:
+        return self.path_
+
+    def done(self) -> bool:
+        return self.future_.done()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        r"""Blocks until the checkpoint is completely written. Exceptions
+        raised while writing are re-raised here.
+        """
+        self.future_.result(timeout)
+
+
+_io_executor_lock = threading.Lock()
+_io_executor = None
+_io_thread_num = None
+_async_save_lock = threading.Lock()
+_async_save_commit_executor = None
+_async_save_pending_handles = []
+_async_save_staging_pool = _StagingBufferPool(
+    int(os.getenv("ONEFLOW_CHECKPOINT_STAGING_POOL_BYTES", 1 << 30))
+)
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    global _io_thread_num
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_thread_num = int(
+                os.getenv(
+                    "ONEFLOW_CHECKPOINT_IO_THREAD_NUM", min(8, os.cpu_count() or 1)
+                )
+            )
+            _io_executor = ThreadPoolExecutor(
+                max_workers=_io_thread_num, thread_name_prefix="oneflow_checkpoint_io"
+            )
+        return _io_executor
+
+
+def _get_async_save_commit_executor() -> ThreadPoolExecutor:
+    global _async_save_commit_executor
+    with _async_save_lock:
+        if _async_save_commit_executor is None:
+            # commits run one at a time so that async saves finish in
+            # the order they were issued
+            _async_save_commit_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="oneflow_save_commit"
+            )
+        return _async_save_commit_executor
+
+
+def _snapshot_tensor(tensor: "oneflow.Tensor") -> Tuple[np.ndarray, bool]:
+    # Returns the host snapshot and whether it is owned by the staging pool
+    if tensor.is_cuda:
+        # the device-to-host copy already produces an independent buffer
+        return tensor.numpy(), False
+    np_arr = tensor.numpy()
+    staging_buffer = _async_save_staging_pool.acquire(np_arr.shape, np_arr.dtype)
+    np.copyto(staging_buffer, np_arr)
+    return staging_buffer, True
+
+
+def _write_file_atomically(file_path: Path, data: bytes) -> None:
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def _pwrite_all(fd: int, buffer: np.ndarray, offset: int) -> None:
+    view = memoryview(buffer)
+    while len(view) > 0:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _pread_all(fd: int, buffer: np.ndarray, offset: int) -> None:
+    view = memoryview(buffer)
+    while len(view) > 0:
+        read = os.preadv(fd, [view], offset)
+        if read == 0:
+            raise EOFError("packed tensor data is truncated")
+        view = view[read:]
+        offset += read
+
+
+class _TensorWriter:
+    """Writes the tensors met while pickling on the checkpoint I/O threads.
+
+    In eager mode a write is issued as soon as a tensor is added and the
+    number of in-flight writes is bounded, otherwise (used by async save)
+    the writes are deferred to `flush`. With `packed`, all tensors are
+    written into a single file at aligned offsets.
+    """
+
+    def __init__(self, path: Path, packed: bool = False, deferred: bool = False):
+        self.path_ = path
+        self.packed_ = packed
+        self.deferred_ = deferred
+        self.packed_nbytes_ = 0
+        self.packed_fd_ = None
+        self.index_ = {}
+        self.deferred_writes_ = []
+        self.futures_ = deque()
+
+    def add(self, tensor: "oneflow.Tensor", rel_name: str) -> Dict[str, Any]:
+        if self.deferred_:
+            (np_arr, from_pool) = _snapshot_tensor(tensor)
+        else:
+            (np_arr, from_pool) = (tensor.numpy(), False)
+        entry = {
+            "shape": tuple(np_arr.shape),
+            "dtype": oneflow._oneflow_internal.deprecated.GetProtoDtype4OfDtype(
+                tensor.dtype
+            ),
+        }
+        if self.packed_:
+            offset = (
+                (self.packed_nbytes_ + PACKED_ALIGNMENT - 1)
+                // PACKED_ALIGNMENT
+                * PACKED_ALIGNMENT
+            )
+            self.packed_nbytes_ = offset + np_arr.nbytes
+            entry["offset"] = offset
+            target = offset
+        else:
+            target = self.path_ / rel_name
+        self.index_[rel_name] = entry
+        write = (np_arr, tensor.dtype, target, from_pool)
+        if self.deferred_:
+            self.deferred_writes_.append(write)
+        else:
+            self._submit(write)
+        return entry
+
+    def _submit(self, write: Tuple) -> None:
+        if self.packed_ and self.packed_fd_ is None:
+            self.path_.mkdir(parents=True, exist_ok=True)
+            self.packed_fd_ = os.open(
+                self.path_ / PACKED_DATA_FILENAME,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                0o644,
+            )
+        executor = _get_io_executor()
+        self.futures_.append(executor.submit(self._write, write))
+        # bound the host memory held by tensors waiting to be written
+        while len(self.futures_) > 2 * _io_thread_num:
+            self.futures_.popleft().result()
+
+    def _write(self, write: Tuple) -> None:
+        (np_arr, dtype, target, from_pool) = write
+        try:
+            if isinstance(target, int):
+                _pwrite_all(self.packed_fd_, _as_bytes_view(np_arr), target)
+            else:
+                _save_numpy_to_disk(np_arr, dtype, target)
+        finally:
+            if from_pool:
+                _async_save_staging_pool.release(np_arr)
+
+    def flush(self) -> None:
+        try:
+            for write in self.deferred_writes_:
+                self._submit(write)
+            self.deferred_writes_ = []
+            while len(self.futures_) > 0:
+                self.futures_.popleft().result()
+        finally:
+            if self.packed_fd_ is not None:
+                os.close(self.packed_fd_)
+                self.packed_fd_ = None
+
+    def write_index(self) -> None:
+        _write_file_atomically(
+            self.path_ / TENSOR_INDEX_FILENAME, pickle.dumps(self.index_)
+        )
+
+
+class _TensorReader:
+    """Reads the tensors of a checkpoint saved by oneflow.save().
+
+    When the checkpoint has a tensor index, `prefetch` reads all tensors on
+    the checkpoint I/O threads using the shapes and dtypes in the index, so
+    no per-tensor meta file is parsed. Packed checkpoints are opened (or
+    memory-mapped) once.
+    """
+
+    def __init__(self, path: Path, mmap: bool = False):
+        self.path_ = path
+        self.mmap_ = mmap
+        self.prefetched_ = {}
+        self.packed_memmap_ = None
+        index_path = path / TENSOR_INDEX_FILENAME
+        if index_path.exists():
+            self.index_ = pickle.loads(index_path.read_bytes())
+        else:
+            self.index_ = {}
+
+    def prefetch(self) -> None:
+        if self.mmap_ or len(self.index_) == 0:
+            return
+        packed_fd = None
+        if any("offset" in entry for entry in self.index_.values()):
+            packed_fd = os.open(self.path_ / PACKED_DATA_FILENAME, os.O_RDONLY)
+        try:
+            executor = _get_io_executor()
+            futures = {
+                rel_name: executor.submit(self._read_file, rel_name, entry, packed_fd)
+                for (rel_name, entry) in self.index_.items()
+            }
+            self.prefetched_ = {
+                rel_name: future.result() for (rel_name, future) in futures.items()
+            }
+        finally:
+            if packed_fd is not None:
+                os.close(packed_fd)
+
+    def _read_file(
+        self, rel_name: str, entry: Dict[str, Any], packed_fd: Optional[int]
+    ) -> np.ndarray:
+        np_dtype = dtype_util.convert_oneflow_dtype_to_numpy_dtype(
+            dtype_util.convert_proto_dtype_to_oneflow_dtype(entry["dtype"])
+        )
+        np_arr = np.empty(entry["shape"], dtype=np_dtype)
+        if "offset" in entry:
+            _pread_all(packed_fd, _as_bytes_view(np_arr), entry["offset"])
+        else:
+            with open(self.path_ / rel_name / DATA_FILENAME, "rb", buffering=0) as f:
+                if f.readinto(_as_bytes_view(np_arr)) != np_arr.nbytes:
+                    raise EOFError(f"tensor data of '{rel_name}' is truncated")
+        return np_arr
+
+    def read(self, rel_name: str, packed_entry: Optional[Dict] = None) -> np.ndarray:
+        if rel_name in self.prefetched_:
+            return self.prefetched_.pop(rel_name)
+        if packed_entry is None:
+            path = str(self.path_ / rel_name)
+            if self.mmap_:
+                return FileBackendVariableBlob(path).memmap()
+            return FileBackendVariableBlob(path).numpy()
+        if not self.mmap_:
+            fd = os.open(self.path_ / PACKED_DATA_FILENAME, os.O_RDONLY)
+            try:
+                return self._read_file(rel_name, packed_entry, fd)
+            finally:
+                os.close(fd)
+        np_dtype = dtype_util.convert_oneflow_dtype_to_numpy_dtype(
+            dtype_util.convert_proto_dtype_to_oneflow_dtype(packed_entry["dtype"])
+        )
+        if np.prod(packed_entry["shape"]).item() == 0:
+            return np.empty(packed_entry["shape"], dtype=np_dtype)
+        if self.packed_memmap_ is None:
+            self.packed_memmap_ = np.memmap(
+                self.path_ / PACKED_DATA_FILENAME, dtype=np.uint8, mode="c"
+            )
+        offset = packed_entry["offset"]
+        nbytes = int(np.prod(packed_entry["shape"])) * np.dtype(np_dtype).itemsize
+        return (
+            self.packed_memmap_[offset : offset + nbytes]
+            .view(np_dtype)
+            .reshape(packed_entry["shape"])
+        )
+
+
+def _commit_async_save(path: Path, pickled_bytes: bytes, writer: _TensorWriter) -> None:
+    writer.flush()
+    writer.write_index()
+    # The pickled object and the snapshot_done marker are written last, so
+    # a save interrupted before this point is never loadable.
+    _write_file_atomically(path / PICKLE_FILENAME, pickled_bytes)
+    _write_file_atomically(path / SNAPSHOT_DONE_FILENAME, b"")
+
+
+def wait_async_saves() -> None:
+    r"""Blocks until all checkpoints issued by ``oneflow.save(..., async_=True)``
+    in this process are written, then frees the cached staging buffers.
+    """
+    with _async_save_lock:
+        handles = list(_async_save_pending_handles)
+        _async_save_pending_handles.clear()
+    for handle in handles:
+        handle.wait()
+    _async_save_staging_pool.clear()
+
+
 ValueContainer = Union[FileBackendVariableBlob, np.ndarray, "oneflow.Tensor"]
 
 
-def _LoadSingleVariable(
-    path: Optional[str], global_src_rank: Optional[int] = None
+def _MakeVariable(
+    np_arr: Optional[np.ndarray], global_src_rank: Optional[int] = None
 ) -> "flow.Tensor":
+    # np_arr is owned by the returned tensor. If it is memory-mapped, the
+    # data is only paged in when it is actually read.
     if global_src_rank is not None:
         rank = flow.env.get_rank()
         if rank == global_src_rank:
-            assert isinstance(path, str)
-            file_backed_blob = FileBackendVariableBlob(path)
-            loaded = flow.tensor(
-                file_backed_blob.numpy(), dtype=file_backed_blob.dtype
-            ).to("cuda")
+            loaded = flow.from_numpy(np_arr).to("cuda")
         else:
             loaded = flow.tensor([]).to("cuda")
         loaded = loaded.to_global(
@@ -140,8 +508,136 @@ def _LoadSingleVariable(
         )
         return loaded
 
-    assert isinstance(path, str)
-    return flow.tensor(FileBackendVariableBlob(path).numpy())
+    return flow.from_numpy(np_arr)
+
+
+def _ReadSingleVariable(path: str, mmap: bool = False) -> np.ndarray:
+    file_backed_blob = FileBackendVariableBlob(path)
+    if mmap:
+        return file_backed_blob.memmap()
+    return file_backed_blob.numpy()
+
+
+def _get_shard_ranges(
+    shape: Sequence[int], placement: "flow.placement", nd_sbp: Sequence["flow.sbp.sbp"]
+) -> Tuple[List[Tuple[Tuple[int, int], ...]], List[int]]:
+    # Returns the [start, end) range of every axis held by each parallel id,
+    # and the rank of each parallel id
+    ranks = np.array(placement.ranks)
+    hierarchy = ranks.shape
+    assert len(hierarchy) == len(nd_sbp)
+    ranges_list = []
+    for parallel_id in range(ranks.size):
+        coord = np.unravel_index(parallel_id, hierarchy)
+        ranges = [(0, dim) for dim in shape]
+        for (i, sbp) in enumerate(nd_sbp):
+            (sbp_type, axis) = sbp.__getstate__()
+            if sbp_type == "S":
+                (start, end) = ranges[axis]
+                (part_start, part_end) = balanced_splitter.BalancedRanges(
+                    end - start, hierarchy[i]
+                )[coord[i]]
+                ranges[axis] = (start + part_start, start + part_end)
+        ranges_list.append(tuple(ranges))
+    return ranges_list, ranks.flatten().tolist()
+
+
+def _save_global_tensor_shards(
+    tensor: "flow.Tensor", abs_dir_name: Path
+) -> Dict[str, Any]:
+    # partial sum shards can not be concatenated, reduce them first
+    nd_sbp = tuple(
+        flow.sbp.broadcast if sbp == flow.sbp.partial_sum else sbp for sbp in tensor.sbp
+    )
+    if nd_sbp != tuple(tensor.sbp):
+        tensor = tensor.to_global(sbp=nd_sbp)
+    ranges_list, ranks = _get_shard_ranges(tensor.shape, tensor.placement, nd_sbp)
+    rank = flow.env.get_rank()
+    local_tensor = tensor.to_local() if rank in ranks else None
+    shards = []
+    shard_index4ranges = {}
+    for (parallel_id, ranges) in enumerate(ranges_list):
+        if ranges in shard_index4ranges:
+            # broadcast replicas are written only once
+            continue
+        shard_index4ranges[ranges] = len(shards)
+        shard_dir_name = f"shard_{len(shards)}"
+        shards.append(
+            {
+                "path": shard_dir_name,
+                "offsets": tuple(start for (start, _) in ranges),
+                "shape": tuple(end - start for (start, end) in ranges),
+            }
+        )
+        if ranks[parallel_id] == rank:
+            _save_tensor_to_disk(local_tensor, abs_dir_name / shard_dir_name)
+    return {
+        "shape": tuple(tensor.shape),
+        "dtype": oneflow._oneflow_internal.deprecated.GetProtoDtype4OfDtype(
+            tensor.dtype
+        ),
+        "placement": tensor.placement,
+        "sbp": nd_sbp,
+        "shards": shards,
+    }
+
+
+def _load_global_tensor_shards(
+    abs_dir_name: Path,
+    meta: Dict[str, Any],
+    placement: Optional["flow.placement"] = None,
+    sbp: Optional[Sequence["flow.sbp.sbp"]] = None,
+) -> "flow.Tensor":
+    shape = meta["shape"]
+    dtype = dtype_util.convert_proto_dtype_to_oneflow_dtype(meta["dtype"])
+    np_dtype = dtype_util.convert_oneflow_dtype_to_numpy_dtype(dtype)
+    if placement is None:
+        placement = meta["placement"]
+    if sbp is None:
+        sbp = meta["sbp"]
+    if isinstance(sbp, flow.sbp.sbp):
+        sbp = (sbp,)
+    # axes which can not be split in this tensor fall back to broadcast
+    nd_sbp = []
+    for x in sbp:
+        (sbp_type, axis) = x.__getstate__()
+        if sbp_type == "P" or (sbp_type == "S" and axis >= len(shape)):
+            nd_sbp.append(flow.sbp.broadcast)
+        else:
+            nd_sbp.append(x)
+    nd_sbp = tuple(nd_sbp)
+
+    ranges_list, ranks = _get_shard_ranges(shape, placement, nd_sbp)
+    rank = flow.env.get_rank()
+    if rank in ranks:
+        dst_ranges = ranges_list[ranks.index(rank)]
+        local = np.empty([end - start for (start, end) in dst_ranges], dtype=np_dtype)
+        for shard in meta["shards"]:
+            src_ranges = [
+                (offset, offset + dim)
+                for (offset, dim) in zip(shard["offsets"], shard["shape"])
+            ]
+            overlap = [
+                (max(src[0], dst[0]), min(src[1], dst[1]))
+                for (src, dst) in zip(src_ranges, dst_ranges)
+            ]
+            if any(start >= end for (start, end) in overlap):
+                continue
+            # only the pages covering the overlapping region are read
+            src = FileBackendVariableBlob(str(abs_dir_name / shard["path"])).memmap()
+            src_slice = tuple(
+                slice(start - src_start, end - src_start)
+                for ((start, end), (src_start, _)) in zip(overlap, src_ranges)
+            )
+            dst_slice = tuple(
+                slice(start - dst_start, end - dst_start)
+                for ((start, end), (dst_start, _)) in zip(overlap, dst_ranges)
+            )
+            local[dst_slice] = src[src_slice]
+        local_tensor = flow.tensor(local, dtype=dtype, device=placement.type)
+    else:
+        local_tensor = flow.tensor([], dtype=dtype, device=placement.type)
+    return local_tensor.to_global(placement=placement, sbp=nd_sbp)
 
 
 def _broadcast_py_object(obj, src: int = 0):
@@ -161,23 +657,34 @@ def tensor_getstate(self):
         # save_load_path is not None means setstate/getstate is called inside
         # flow.save or flow.load
         assert isinstance(save_load_path, Path)
+        if save_sharded and not self.is_local:
+            rel_dir_name = f"global_tensor_{self.global_id()}"
+            meta = _save_global_tensor_shards(self, save_load_path / rel_dir_name)
+            return {"path": rel_dir_name, "sharded": meta}
+        elif save_sharded:
+            # local tensors are written by rank 0, which also writes the
+            # pickled object
+            rel_dir_name = id_util.UniqueStr("tensor_")
+            if flow.env.get_rank() == 0:
+                tensor_writer.add(self, rel_dir_name)
+            return {"path": rel_dir_name}
         if global_src_dsk_rank is None:
             assert self.is_local
             rel_dir_name = id_util.UniqueStr("tensor_")
-            abs_dir_name = save_load_path / rel_dir_name
 
             tensor = self
         else:
             assert not self.is_local
             rel_dir_name = f"global_tensor_{self.global_id()}"
-            abs_dir_name = save_load_path / rel_dir_name
 
             tensor = self.to_global(
                 sbp=flow.sbp.broadcast,
                 placement=flow.placement("cpu", [global_src_dsk_rank]),
             ).to_local()
         if global_src_dsk_rank is None or global_src_dsk_rank == flow.env.get_rank():
-            _save_tensor_to_disk(tensor, abs_dir_name)
+            entry = tensor_writer.add(tensor, rel_dir_name)
+            if "offset" in entry:
+                return {"path": rel_dir_name, "packed": entry}
 
         return {"path": rel_dir_name}
     else:
@@ -203,7 +710,17 @@ def tensor_setstate(self, pickle_dict):
         assert isinstance(save_load_path, Path)
         rel_dir_name = pickle_dict["path"]
         abs_dir_name = save_load_path / rel_dir_name
-        self.__init__(_LoadSingleVariable(str(abs_dir_name), global_src_dsk_rank))
+        if "sharded" in pickle_dict:
+            self.__init__(
+                _load_global_tensor_shards(
+                    abs_dir_name, pickle_dict["sharded"], load_placement, load_sbp
+                )
+            )
+            return
+        np_arr = None
+        if global_src_dsk_rank is None or global_src_dsk_rank == flow.env.get_rank():
+            np_arr = tensor_reader.read(rel_dir_name, pickle_dict.get("packed"))
+        self.__init__(_MakeVariable(np_arr, global_src_dsk_rank))
     else:
         if "placement" in pickle_dict:
             return self.__init__(
@@ -243,7 +760,7 @@ def RegisterMethods():
 
 
 def legacy_load(
-    path: Union[str, Path], global_src_rank: Optional[int] = None,
+    path: Union[str, Path], global_src_rank: Optional[int] = None, mmap: bool = False,
 ) -> Dict[str, "flow.Tensor"]:
     assert os.path.isdir(path), "Directory {} doesn't exist!".format(path)
     rank = flow.env.get_rank()
@@ -256,15 +773,26 @@ def legacy_load(
             _broadcast_py_object(all_files, global_src_rank)
     else:
         all_files = _broadcast_py_object(None, global_src_rank)
-    for f in all_files:
+    if global_src_rank is None or rank == global_src_rank:
+        # read all variables on the checkpoint I/O threads first
+        def read(f):
+            try:
+                return _ReadSingleVariable(os.path.join(path, f), mmap)
+            except FileNotFoundError:
+                return None
+
+        np_arrs = list(_get_io_executor().map(read, all_files))
+    else:
+        np_arrs = [None] * len(all_files)
+    for (f, np_arr) in zip(all_files, np_arrs):
         var_dir = os.path.join(path, f)
-        try:
-            var_dict[f] = _LoadSingleVariable(var_dir, global_src_rank)
-        except FileNotFoundError:
+        if np_arr is None and (global_src_rank is None or rank == global_src_rank):
             warnings.warn(
                 f"'{var_dir}' does not have valid tensor data. Please check it if it is unexpected.",
                 stacklevel=2,
             )
+            continue
+        var_dict[f] = _MakeVariable(np_arr, global_src_rank)
     return var_dict
 
 
@@ -281,7 +809,48 @@ def tensor_pickling_context(path: Path, global_src_dst_rank: int):
         save_load_path = None
 
 
-def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
+@contextmanager
+def _tensor_io_context(
+    writer: Optional[_TensorWriter] = None, reader: Optional[_TensorReader] = None
+):
+    global tensor_writer
+    global tensor_reader
+    tensor_writer = writer
+    tensor_reader = reader
+    try:
+        yield
+    finally:
+        tensor_writer = None
+        tensor_reader = None
+
+
+@contextmanager
+def _sharded_pickling_context(
+    sharded: bool,
+    placement: Optional["flow.placement"] = None,
+    sbp: Optional[Sequence["flow.sbp.sbp"]] = None,
+):
+    global save_sharded
+    global load_placement
+    global load_sbp
+    save_sharded = sharded
+    load_placement = placement
+    load_sbp = sbp
+    try:
+        yield
+    finally:
+        save_sharded = False
+        load_placement = None
+        load_sbp = None
+
+
+def load(
+    path: str,
+    global_src_rank: Optional[int] = None,
+    mmap: bool = False,
+    placement: Optional["flow.placement"] = None,
+    sbp: Optional[Union["flow.sbp.sbp", Sequence["flow.sbp.sbp"]]] = None,
+) -> Any:
     r"""Loads an object saved with oneflow.save() from a directory.
 
     Args:
@@ -292,6 +861,21 @@ def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
             read the files in `path`, and tensors in the loaded
             object will be consistent with placement = 
             `flow.placement('cuda', [global_src_rank])`
+        mmap (bool, optional): If True, local tensors are backed by a
+            copy-on-write memory map of their data files instead of being
+            read into memory up front, so the data is only paged in when
+            it is used (e.g. by `Module.load_state_dict`). The files must
+            not be modified while the loaded tensors are alive.
+            Default: False
+        placement (flow.placement, optional): The placement of global
+            tensors saved with ``sharded=True``. Each rank only reads the
+            parts of the shard files overlapping its local tensor, so the
+            checkpoint can be resharded onto a different placement.
+            Default: the placement the tensors were saved with
+        sbp (flow.sbp.sbp or tuple of flow.sbp.sbp, optional): The sbp of
+            global tensors saved with ``sharded=True``. ``partial_sum`` and
+            splits along an axis the tensor does not have are loaded as
+            ``broadcast``. Default: the sbp the tensors were saved with
 
     Returns:
         The loaded object
@@ -307,7 +891,7 @@ def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
     else:
         is_legacy = _broadcast_py_object(None, global_src_rank)
     if is_legacy:
-        return legacy_load(path, global_src_rank)
+        return legacy_load(path, global_src_rank, mmap)
 
     if global_src_rank is not None:
         if rank == global_src_rank:
@@ -318,15 +902,26 @@ def load(path: str, global_src_rank: Optional[int] = None,) -> Any:
     else:
         pickle_bytes = pickle_path.read_bytes()
 
-    with tensor_pickling_context(path, global_src_rank):
+    reader = None
+    if global_src_rank is None or global_src_rank == rank:
+        reader = _TensorReader(path, mmap)
+        reader.prefetch()
+    with tensor_pickling_context(path, global_src_rank), _tensor_io_context(
+        reader=reader
+    ), _sharded_pickling_context(False, placement, sbp):
         res = pickle.loads(pickle_bytes)
     assert res["protocol_version"] == PROTOCOL_VERSION
     return res["data"]
 
 
 def save(
-    obj: Any, path: Union[str, Path], global_dst_rank: Optional[int] = None,
-) -> None:
+    obj: Any,
+    path: Union[str, Path],
+    global_dst_rank: Optional[int] = None,
+    async_: bool = False,
+    sharded: bool = False,
+    packed: bool = False,
+) -> Optional[AsyncSaveHandle]:
     r"""Save an object to a directory.
 
     Args:
@@ -337,10 +932,33 @@ def save(
             will be saved by the process whose rank == 
             global_src_rank, while other processes will not do any
             disk I/O.
+        async_ (bool, optional): If True, all tensors are snapshotted to
+            host memory and the files are written by background threads.
+            An :class:`AsyncSaveHandle` is returned, call its ``wait()``
+            (or ``oneflow.framework.check_point_v2.wait_async_saves()``)
+            before reading the checkpoint. The ``snapshot_done`` marker is
+            written last, so an interrupted save is never loadable.
+            Default: False
+        sharded (bool, optional): If True, every rank writes only the
+            local shards of global tensors it holds (broadcast replicas are
+            written once), together with an index of their placement, sbp
+            and offsets, and rank 0 writes the remaining data. It must be
+            called on all ranks and `path` should be on a file system
+            shared by them. Can not be used with `global_dst_rank` or
+            `async_`. Default: False
+        packed (bool, optional): If True, the data of all tensors is
+            written into a single file at aligned offsets instead of one
+            directory per tensor, so loading opens one data file and one
+            index. Can not be used with `sharded`. Default: False
+
+    Returns:
+        An :class:`AsyncSaveHandle` if ``async_`` is True, otherwise None
     """
     path: Path = Path(path)
 
     if isinstance(obj, graph_util.Graph):
+        if async_:
+            raise NotImplementedError("async save of nn.Graph is not supported yet.")
         graph: graph_util.Graph = obj
         if not graph._is_compiled:
             raise RuntimeError("graph must be compiled first.")
@@ -355,16 +973,60 @@ def save(
 
         return
 
+    if sharded:
+        if global_dst_rank is not None or async_ or packed:
+            raise ValueError(
+                "sharded save can not be used with global_dst_rank, async_ or packed."
+            )
+        path.mkdir(exist_ok=True)
+
     obj = {"protocol_version": PROTOCOL_VERSION, "data": obj}
-    with tensor_pickling_context(path, global_dst_rank):
-        pickled_bytes = pickle.dumps(obj)
+    writer = _TensorWriter(path, packed=packed, deferred=async_)
+    try:
+        with tensor_pickling_context(path, global_dst_rank), _tensor_io_context(
+            writer=writer
+        ), _sharded_pickling_context(sharded):
+            pickled_bytes = pickle.dumps(obj)
+    finally:
+        if not async_:
+            writer.flush()
 
     def write_to_path(path):
         path.mkdir(exist_ok=True)
+        writer.write_index()
         pickle_path = path / PICKLE_FILENAME
         pickle_path.write_bytes(pickled_bytes)
 
-    if global_dst_rank is not None:
+    def write_to_path_async(path):
+        path.mkdir(exist_ok=True)
+        # invalidate a checkpoint previously saved in the same directory
+        # before any of its tensor files is overwritten
+        for filename in (SNAPSHOT_DONE_FILENAME, PICKLE_FILENAME):
+            if (path / filename).exists():
+                (path / filename).unlink()
+        future = _get_async_save_commit_executor().submit(
+            _commit_async_save, path, pickled_bytes, writer
+        )
+        handle = AsyncSaveHandle(future, path)
+        with _async_save_lock:
+            # keep failed saves around so that wait_async_saves() reports them
+            _async_save_pending_handles[:] = [
+                x
+                for x in _async_save_pending_handles
+                if not x.done() or x.future_.exception() is not None
+            ]
+            _async_save_pending_handles.append(handle)
+        return handle
+
+    if async_:
+        write_to_path = write_to_path_async
+
+    if sharded:
+        if flow.env.get_rank() == 0:
+            write_to_path(path)
+        # make sure all shards are written when save returns on any rank
+        flow.comm.barrier()
+    elif global_dst_rank is not None:
         assert isinstance(
             global_dst_rank, int
         ), f"global_dst_rank expected type int, but got {type(global_dst_rank)}."
@@ -372,11 +1034,21 @@ def save(
             global_dst_rank >= 0 and global_dst_rank < flow.env.get_world_size()
         ), f"out of range (expected to be in range of [0, {flow.env.get_world_size()}), but got {global_dst_rank})."
         if flow.env.get_rank() == global_dst_rank:
-            write_to_path(path)
+            return write_to_path(path)
+        elif async_:
+            # other ranks do not do any disk I/O
+            finished = Future()
+            finished.set_result(None)
+            return AsyncSaveHandle(finished, path)
     else:
         # global_dst_rank is None
-        write_to_path(path)
+        return write_to_path(path)
 
 
 save_load_path = None
 global_src_dsk_rank = None
+tensor_writer = None
+tensor_reader = None
+save_sharded = False
+load_placement = None
+load_sbp = None
@@ -19,6 +19,7 @@ import oneflow.ops.initializer_util as initializer_util
 import oneflow._oneflow_internal.lazy_mode as lazy_mode
 import oneflow.core.framework.variable_meta_info_pb2 as variable_meta_info_pb
 
+import functools
 import numpy as np
 from typing import Union
 
@@ -721,6 +722,23 @@ def _any(self, dim=[], keepdim=False):
     return flow.any(self, dim, keepdim)
 
 
+def _deferrable(init_method):
+    """Makes an in-place initializer only record itself on parameters created under
+    ``oneflow.nn.utils.deferred_init``, it is replayed when they are materialized.
+    """
+
+    @functools.wraps(init_method)
+    def deferrable_init_method(self, *args, **kwargs):
+        deferred = getattr(self, "_deferred_init", None)
+        if deferred is not None:
+            deferred.calls.append((deferrable_init_method, args, kwargs))
+            return self
+        return init_method(self, *args, **kwargs)
+
+    return deferrable_init_method
+
+
+@_deferrable
 def _uniform(self, a=0, b=1):
     if isinstance(a, Tensor):
         assert a.ndim == 0 and a.nelement() == 1, "a must be a number or scalar tensor!"
@@ -734,6 +752,7 @@ def _uniform(self, a=0, b=1):
     return _init_by_initializer_conf(self, initializer_conf)
 
 
+@_deferrable
 def _trunc_normal_(
     self, mean=0.0, std=1.0, a=-2.0, b=2.0,
 ):
@@ -743,6 +762,7 @@ def _trunc_normal_(
     return res
 
 
+@_deferrable
 def _kaiming_uniform(
     self, a=0, mode="fan_in", nonlinearity="leaky_relu", *, data_format="NCHW"
 ):
@@ -757,6 +777,7 @@ def _kaiming_uniform(
     return _init_by_initializer_conf(self, initializer_conf)
 
 
+@_deferrable
 def _kaiming_normal(
     self, a=0, mode="fan_in", nonlinearity="leaky_relu", *, data_format="NCHW"
 ):
@@ -771,12 +792,14 @@ def _kaiming_normal(
     return _init_by_initializer_conf(self, initializer_conf)
 
 
+@_deferrable
 def _xavier_normal(self, gain=1.0, *, data_format="NCHW"):
     assert gain == 1.0, "Only gain == 1.0 is supported now"
     initializer_conf = flow.xavier_normal_initializer(data_format=data_format)
     return _init_by_initializer_conf(self, initializer_conf)
 
 
+@_deferrable
 def _xavier_uniform(self, gain=1.0, *, data_format="NCHW"):
     assert gain == 1.0, "Only gain == 1.0 is supported now"
     initializer_conf = flow.xavier_uniform_initializer(data_format=data_format)
@@ -802,8 +825,11 @@ def _orthogonal(self, gain=1.0):
     return self
 
 
+@_deferrable
 def _normal(self, mean=0, std=1):
-    if self.is_global:
+    if self.is_global and _can_init_shard_locally(self):
+        return _init_shard_locally(self, distribution="normal", mean=mean, std=std)
+    elif self.is_global:
         src_tensor = flow.normal(mean, std, self.shape)
         src_tensor = src_tensor.to_global(
             placement=self.placement,
@@ -823,6 +849,7 @@ def _normal(self, mean=0, std=1):
         )
 
 
+@_deferrable
 def _fill(self, value):
     initializer_conf = flow.constant_initializer(value=value, dtype=self.dtype)
     return _init_by_initializer_conf(self, initializer_conf)
@@ -838,10 +865,57 @@ def _copy_from_numpy_to_eager_local_tensor(eager_local_tensor, np_arr):
     copy_from_numpy(np_arr)
 
 
+def _next_shard_init_seed():
+    # Drawn from the default generator: ranks seeded alike agree on it without communication,
+    # and flow.manual_seed makes the initialization reproducible.
+    return flow.randint(0, 2 ** 62, (1,), generator=flow.default_generator).item()
+
+
+def _can_init_shard_locally(tensor):
+    return tensor.is_floating_point() and not lazy_mode.is_enabled()
+
+
+def _init_shard_locally(tensor, distribution, random_seed=None, **kwargs):
+    """Fills the global ``tensor`` with a counter based generator keyed by the logical index
+    of each element: every rank only generates its own shard, on its own device, and the
+    result does not depend on placement or sbp.
+    """
+    if random_seed is None:
+        random_seed = _next_shard_init_seed()
+    if tensor.dtype in (flow.float32, flow.float64):
+        dtype = tensor.dtype
+    else:
+        dtype = flow.float32
+    sbp = tuple(
+        flow.sbp.broadcast if sbp == flow.sbp.partial_sum else sbp for sbp in tensor.sbp
+    )
+    src_tensor = flow._C.stateless_random(
+        tensor.shape,
+        distribution,
+        random_seed,
+        placement=tensor.placement,
+        sbp=sbp,
+        dtype=dtype,
+        **kwargs,
+    )
+    if dtype != tensor.dtype:
+        src_tensor = src_tensor.to(dtype=tensor.dtype)
+    tensor.copy_(src_tensor)
+    return tensor
+
+
 def _init_by_initializer_conf(tensor, initializer_conf, random_seed=None):
+    shape = tuple(tensor.shape)
+    if tensor.is_global and _can_init_shard_locally(tensor):
+        stateless_random_args = initializer_util.GetStatelessRandomArgs(
+            initializer_conf, shape
+        )
+        if stateless_random_args is not None:
+            return _init_shard_locally(
+                tensor, random_seed=random_seed, **stateless_random_args
+            )
     if random_seed is None:
         random_seed = flow.default_generator.initial_seed()
-    shape = tuple(tensor.shape)
     initializer = initializer_util.GetInitializer(initializer_conf, random_seed, shape)
 
     np_arr = initializer_util.generate_values_by_initializer(
@@ -14,6 +14,8 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 from multiprocessing.reduction import ForkingPickler
+import threading
+import weakref
 
 import numpy as np
 
@@ -34,25 +36,198 @@ except ImportError:
     pass
 
 
+# Every tensor sent through a queue lives in a shared memory slab. Slabs are
+# created by the sending process and recycled once the receiving side drops
+# the tensor, so steady-state transfers cost neither shm_open/mmap nor unlink.
+# The first bytes of a slab are a small header shared by both processes.
+_SLAB_HEADER_SIZE = 64
+_SLAB_MIN_SIZE = 64 * 1024
+# header[_SLAB_BUSY] is set by the producer when it hands out the slab and
+# cleared by the consumer when the received tensor is released.
+_SLAB_BUSY = 0
+# header[_SLAB_RETIRED] is set by the producer before it exits, telling the
+# consumer to drop its mapping once the slab is released.
+_SLAB_RETIRED = 1
+
+
+class _SharedMemorySlab(object):
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((_SLAB_HEADER_SIZE,), dtype=np.uint8, buffer=shm.buf)
+        self.capacity = shm.size - _SLAB_HEADER_SIZE
+        self.data_address = self.header.__array_interface__["data"][0] + (
+            _SLAB_HEADER_SIZE
+        )
+        # producer side bookkeeping
+        self.generation = 0
+        self.sent = False
+
+    def ndarray(self, shape, dtype):
+        return np.ndarray(
+            shape, dtype=dtype, buffer=self.shm.buf, offset=_SLAB_HEADER_SIZE
+        )
+
+
+class _SharedMemorySlabPool(object):
+    """Slabs created by this process, reused for every outgoing tensor."""
+
+    def __init__(self):
+        self.lock_ = threading.Lock()
+        self.slabs_ = []
+
+    def acquire(self, nbytes):
+        with self.lock_:
+            best = None
+            for slab in self.slabs_:
+                if (
+                    slab.header[_SLAB_BUSY] == 0
+                    and slab.capacity >= nbytes
+                    and (best is None or slab.capacity < best.capacity)
+                ):
+                    best = slab
+            if best is None:
+                capacity = _SLAB_MIN_SIZE
+                while capacity < nbytes:
+                    capacity *= 2
+                shm = shared_memory.SharedMemory(
+                    create=True, size=capacity + _SLAB_HEADER_SIZE
+                )
+                best = _SharedMemorySlab(shm)
+                self.slabs_.append(best)
+            best.header[_SLAB_BUSY] = 1
+            best.header[_SLAB_RETIRED] = 0
+            best.generation += 1
+            best.sent = False
+            return best
+
+    def find(self, np_arr):
+        if not np_arr.flags["C_CONTIGUOUS"]:
+            return None
+        address = np_arr.__array_interface__["data"][0]
+        with self.lock_:
+            for slab in self.slabs_:
+                if (
+                    slab.data_address == address
+                    and slab.header[_SLAB_BUSY] == 1
+                    and not slab.sent
+                    and np_arr.nbytes <= slab.capacity
+                ):
+                    return slab
+        return None
+
+    def retire(self):
+        with self.lock_:
+            for slab in self.slabs_:
+                slab.header[_SLAB_RETIRED] = 1
+
+
+_producer_slab_pool = _SharedMemorySlabPool()
+
+# name -> [slab, number of live tensors backed by it]
+_attached_slabs = {}
+_attached_slabs_lock = threading.Lock()
+
+
+def empty_shared_ndarray(shape, dtype):
+    r"""Returns an uninitialized numpy array backed by a shared memory slab.
+
+    A tensor created from it with :func:`oneflow.from_numpy` is sent to other
+    processes without copying. The slab is recycled if the tensor is dropped
+    before being sent.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+    slab = _producer_slab_pool.acquire(max(nbytes, 1))
+    generation = slab.generation
+
+    def release_unsent():
+        if slab.generation == generation and not slab.sent:
+            slab.header[_SLAB_BUSY] = 0
+
+    arr = slab.ndarray(shape, dtype)
+    # numpy views keep a reference to their base, so the slab is recycled only
+    # after every array and tensor viewing it is gone.
+    weakref.finalize(arr, release_unsent)
+    return arr
+
+
+def retire_shared_memory_slabs():
+    r"""Marks every slab created by this process as retired. Must be called
+    before the process exits and unlinks its shared memory."""
+    _producer_slab_pool.retire()
+
+
+def release_retired_shared_memory_slabs():
+    r"""Drops the mappings of idle slabs whose producer has exited."""
+    with _attached_slabs_lock:
+        _release_retired_slabs()
+
+
+def _release_retired_slabs():
+    # Called with `_attached_slabs_lock` held.
+    for name in [
+        name
+        for name, (slab, live) in _attached_slabs.items()
+        if live == 0 and slab.header[_SLAB_RETIRED] == 1
+    ]:
+        slab = _attached_slabs.pop(name)[0]
+        slab.header = None
+        slab.shm.close()
+
+
+def _attach_slab(name, size):
+    with _attached_slabs_lock:
+        entry = _attached_slabs.get(name)
+        if entry is None:
+            # A new producer showed up, drop the slabs of the finished ones.
+            _release_retired_slabs()
+            entry = [
+                _SharedMemorySlab(shared_memory.SharedMemory(name, False, size)),
+                0,
+            ]
+            _attached_slabs[name] = entry
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_slab(name):
+    with _attached_slabs_lock:
+        entry = _attached_slabs[name]
+        entry[1] -= 1
+        if entry[1] == 0:
+            slab = entry[0]
+            slab.header[_SLAB_BUSY] = 0
+            if slab.header[_SLAB_RETIRED] == 1:
+                del _attached_slabs[name]
+                slab.header = None
+                slab.shm.close()
+
+
+def _share_to_slab(tensor_data):
+    slab = _producer_slab_pool.find(tensor_data)
+    if slab is None:
+        slab = _producer_slab_pool.acquire(tensor_data.nbytes)
+        slab.ndarray(tensor_data.shape, tensor_data.dtype)[...] = tensor_data
+    slab.sent = True
+    return slab
+
+
+def _rebuild_slab_ndarray(name, size, shape, dtype):
+    slab = _attach_slab(name, size)
+    return slab.ndarray(shape, dtype)
+
+
 def rebuild_empty_tensor(shape, dtype, requires_grad):
     t = flow.tensor([], dtype=dtype)
     t.requires_grad = requires_grad
     return t.reshape(*shape)
 
 
-def rebuild_shm_tensor(shm, shape, dtype, requires_grad):
-    def delete_shm():
-        shm.close()
-        try:
-            shm.unlink()
-        except:
-            pass
-
-    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+def rebuild_slab_tensor(name, size, shape, dtype, requires_grad):
+    arr = _rebuild_slab_ndarray(name, size, shape, dtype)
     t = flow.from_numpy(arr)
-    t._register_storage_delete_hook(delete_shm)
+    t._register_storage_delete_hook(lambda: _release_slab(name))
     t.requires_grad = requires_grad
-
     return t
 
 
@@ -62,14 +237,10 @@ def rebuild_empty_parameter(shape, dtype, requires_grad):
     return Parameter(t, requires_grad=requires_grad)
 
 
-def rebuild_shm_parameter(shm, shape, dtype, requires_grad):
-    def delete_shm():
-        shm.close()
-        shm.unlink()
-
-    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+def rebuild_slab_parameter(name, size, shape, dtype, requires_grad):
+    arr = _rebuild_slab_ndarray(name, size, shape, dtype)
     t = flow.from_numpy(arr)
-    t._register_storage_delete_hook(delete_shm)
+    t._register_storage_delete_hook(lambda: _release_slab(name))
     return Parameter(t, requires_grad=requires_grad)
 
 
@@ -80,14 +251,16 @@ def reduce_tensor(tensor):
     if tensor_data.nbytes == 0:
         return (rebuild_empty_tensor, (tensor.shape, tensor.dtype, requires_grad))
     else:
-        shm = shared_memory.SharedMemory(create=True, size=tensor_data.nbytes)
-        shm_numpy = np.ndarray(
-            tensor_data.shape, dtype=tensor_data.dtype, buffer=shm.buf
-        )
-        shm_numpy[:] = tensor_data[:]
+        slab = _share_to_slab(tensor_data)
         return (
-            rebuild_shm_tensor,
-            (shm, tensor_data.shape, tensor_data.dtype, requires_grad),
+            rebuild_slab_tensor,
+            (
+                slab.shm.name,
+                slab.shm.size,
+                tensor_data.shape,
+                tensor_data.dtype,
+                requires_grad,
+            ),
         )
 
 
@@ -96,16 +269,21 @@ def reduce_parameter(tensor):
     requires_grad = tensor.requires_grad
 
     if tensor_data.nbytes == 0:
-        return (rebuild_empty_parameter, (tensor, shape, tensor.dtype, requires_grad))
-    else:
-        shm = shared_memory.SharedMemory(create=True, size=tensor_data.nbytes)
-        shm_numpy = np.ndarray(
-            tensor_data.shape, dtype=tensor_data.dtype, buffer=shm.buf
+        return (
+            rebuild_empty_parameter,
+            (tensor.shape, tensor.dtype, requires_grad),
         )
-        shm_numpy[:] = tensor_data[:]
+    else:
+        slab = _share_to_slab(tensor_data)
         return (
-            rebuild_shm_parameter,
-            (shm, tensor_data.shape, tensor_data.dtype, requires_grad),
+            rebuild_slab_parameter,
+            (
+                slab.shm.name,
+                slab.shm.size,
+                tensor_data.shape,
+                tensor_data.dtype,
+                requires_grad,
+            ),
         )
 
 
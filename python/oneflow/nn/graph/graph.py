@@ -13,6 +13,7 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import copy
 import logging
 import os
 import time
@@ -41,6 +42,8 @@ from oneflow.nn.graph.util import (
     sys_exc_error_msg,
     IONodeType,
     IONode,
+    IOPlan,
+    IOPlanMismatch,
 )
 from oneflow.nn.module import Module
 from oneflow.nn.optimizer.lr_scheduler import LRScheduler
@@ -131,7 +134,13 @@ class Graph(object):
         self._debug_max_v_level = 0
         self._debug_max_py_stack_depth = 2
         self._outputs_buffer_size = 2
+        self._outputs_buffer_reuse = False
         self._cur_index_of_ouputs_buffer = 0
+        # Flattening plans of the inputs and outputs, built at compile time
+        self._input_plan = None
+        self._output_plan = None
+        # Graphs compiled for the shape buckets, keyed by the padded sizes
+        self._shape_bucket_graphs = dict()
 
         self._session = session_ctx.GetDefaultSession()
         assert type(self._session) is MultiClientSession
@@ -206,6 +215,9 @@ class Graph(object):
 
             Donot override this function.
         """
+        if self.config._shape_buckets is not None:
+            return self.__call_shape_bucket_graph(*args, **kwargs)
+
         if not self._is_compiled:
             with graph_build_util.DebugScopeContext(
                 self._debug_min_s_level,
@@ -217,6 +229,47 @@ class Graph(object):
 
         return self.__run(*args, **kwargs)
 
+    def __call_shape_bucket_graph(self, *args, **kwargs):
+        shape_buckets = self.config._shape_buckets
+        actual, padded = shape_buckets.bucket_of((args, kwargs))
+        graph = self._shape_bucket_graphs.get(padded)
+        if graph is None:
+            graph = self.__new_shape_bucket_graph()
+            self._shape_bucket_graphs[padded] = graph
+        if padded != actual:
+            args, kwargs = shape_buckets.pad((args, kwargs), actual, padded)
+        return shape_buckets.slice(graph(*args, **kwargs), actual, padded)
+
+    def __new_shape_bucket_graph(self):
+        # A graph of the same class which wraps the same modules, without calling
+        # the __init__ of the subclass, which may create new modules.
+        graph = type(self).__new__(type(self))
+        Graph.__init__(graph)
+        graph_attrs = set(graph.__dict__.keys())
+        for name, value in self.__dict__.items():
+            if name not in graph_attrs:
+                object.__setattr__(graph, name, value)
+        graph.config = self.config._copy_for_shape_bucket()
+        graph._opts = list(self._opts)
+        graph._grad_scaler = self._grad_scaler
+        graph._verbose = self._verbose
+        graph._additional_variable_tobe_loaded = self._additional_variable_tobe_loaded
+        debug_attrs = (
+            "_debug",
+            "_debug_min_s_level",
+            "_debug_max_v_level",
+            "_debug_max_py_stack_depth",
+        )
+        for attr in debug_attrs:
+            object.__setattr__(graph, attr, getattr(self, attr))
+        for name, block in self._blocks.items():
+            graph._add_block(name, block.origin)
+            for src, dst in zip(block.modules(), graph._blocks[name].modules()):
+                dst.config = copy.copy(src.config)
+                for attr in debug_attrs:
+                    setattr(dst, attr, getattr(src, attr))
+        return graph
+
     def add_optimizer(
         self, optim: Optimizer, *, lr_sch: LRScheduler = None, is_sparse: bool = False,
     ):
@@ -609,6 +662,7 @@ class Graph(object):
     def _generate_config_proto(self):
         self.config.proto.set_job_name(self._name)
         self._outputs_buffer_size = self.config._outputs_buffer_size
+        self._outputs_buffer_reuse = self.config._outputs_buffer_reuse
 
         if self._grad_scaler is not None:
             self._grad_scaler._generate_conf_for_graph(
@@ -731,6 +785,14 @@ class Graph(object):
                 0, 0, self._shallow_repr() + " start building plan.",
             )
             compile_and_init_start = time.perf_counter()
+            compile_cache_dir = self.config._compile_cache_dir or os.getenv(
+                "ONEFLOW_GRAPH_COMPILE_CACHE_DIR"
+            )
+            if compile_cache_dir:
+                self._c_nn_graph.enable_compile_cache(
+                    os.path.abspath(compile_cache_dir),
+                    oneflow.__version__ + "+" + oneflow.__git_commit__,
+                )
             self._c_nn_graph.complie_and_init_runtime()
             compile_and_init_end = time.perf_counter()
             self.__print(
@@ -866,6 +928,7 @@ class Graph(object):
                 arg_op_names,
                 convert_to_tensor_tuple(self.__flatten_io("input", *args, **kwargs)),
             )
+            self._input_plan = IOPlan((args, kwargs))
             self._c_nn_graph.register_output_op_names_and_tensors(
                 output_op_names, self._outputs_tensor_tuple
             )
@@ -923,6 +986,7 @@ class Graph(object):
         self._eager_outputs, _ = self.__map_io(
             "output", build_real_output, *self._eager_outputs
         )
+        self._output_plan = IOPlan(self._eager_outputs)
 
         self._outputs_tensor_tuple = convert_to_synced_tensor_tuple(
             self.__flatten_io("output", *self._eager_outputs)
@@ -970,11 +1034,14 @@ class Graph(object):
 
     def __run(self, *args, **kwargs):
         try:
-            flattened_eager_args = self.__flatten_io("input", *args, **kwargs)
+            try:
+                flattened_eager_args = self._input_plan.flatten((args, kwargs))
+            except IOPlanMismatch:
+                # Let the generic path flatten, it reports the bad items.
+                flattened_eager_args = self.__flatten_io("input", *args, **kwargs)
             outputs_tensor_tuple = self._outputs_tensor_tuple_buffer[
                 self._cur_index_of_ouputs_buffer
             ]
-            eager_outputs = self._eager_outputs_buffer[self._cur_index_of_ouputs_buffer]
 
             # oneflow._oneflow_internal.eager.Sync() NOTE(chengcheng): Need Sync?
             oneflow._oneflow_internal.nn.graph.RunLazyNNGraph(
@@ -998,8 +1065,15 @@ class Graph(object):
             )
             raise
 
-        # Copy outputs from buffer
-        eager_outputs, _ = self.__copy_io("output", *eager_outputs)
+        if self._outputs_buffer_reuse:
+            # Return the buffer tensors, they are overwritten by a later call.
+            eager_outputs = self._output_plan.unflatten(outputs_tensor_tuple)
+        else:
+            # Copy outputs from buffer
+            with oneflow._oneflow_internal.lazy_mode.guard(False):
+                eager_outputs = self._output_plan.unflatten(
+                    [tensor.to(copy=True) for tensor in outputs_tensor_tuple]
+                )
 
         # Make sure that last used devices of tensors in `outputs_tensor_tuple` are
         # "critical_section".
@@ -1166,14 +1240,6 @@ class Graph(object):
 
         return self.__map_io(io_type, func, *args, **kwargs)
 
-    def __copy_io(self, io_type, *args, **kwargs):
-        def func(tensor):
-            with oneflow._oneflow_internal.lazy_mode.guard(False):
-                build_arg = tensor.to(copy=True)
-                return build_arg
-
-        return self.__map_io(io_type, func, *args, **kwargs)
-
     def _add_block(self, name: str, module: Module = None) -> None:
         r"""Adds module to the graph as a block so that the module will
         be called in nn.Graph.build.
@@ -13,11 +13,13 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import copy
 import os
 
 from collections import OrderedDict
 
 from oneflow.nn.graph.optimizer import OptDict
+from oneflow.nn.graph.util import ShapeBuckets
 import oneflow._oneflow_internal.oneflow.core.job.job_conf as job_conf_cfg
 
 
@@ -28,6 +30,9 @@ class GraphConfig(object):
     def __init__(self):
         super().__init__()
         self._outputs_buffer_size = 2
+        self._outputs_buffer_reuse = False
+        self._compile_cache_dir = None
+        self._shape_buckets = None
         self.proto = job_conf_cfg.JobConfigProto()
         self._train(False)
 
@@ -61,6 +66,130 @@ class GraphConfig(object):
         """
         self._outputs_buffer_size = value
 
+    def enable_outputs_buffer_reuse(self, mode: bool = True):
+        r"""If set to true, calling the graph returns its outputs buffer tensors
+        directly instead of copies of them.
+
+        This saves a copy per output on every call, which matters for small
+        graphs called at a high rate. An output returned by one call is
+        overwritten by the call that happens ``outputs_buffer_size`` calls
+        later, so consume or copy it before then.
+
+        For example:
+
+        .. code-block:: python
+
+            import oneflow as flow
+
+            class Graph(flow.nn.Graph):
+                def __init__(self):
+                    super().__init__()
+                    self.linear = flow.nn.Linear(3, 8, False)
+                    self.config.enable_outputs_buffer_reuse(True)
+                def build(self, x):
+                    return self.linear(x)
+
+            graph = Graph()
+
+        Args:
+            mode (bool, optional): The default vaule is True.
+        """
+        assert type(mode) is bool
+        self._outputs_buffer_reuse = mode
+
+    def enable_compile_cache(self, cache_dir: str):
+        r"""Cache the compiled execution plan of the graph in ``cache_dir``.
+
+        Compiling a large graph can take minutes. With the cache enabled, a later
+        process that builds the same graph with the same OneFlow build, resource
+        config and ``ONEFLOW_*`` environment variables loads the plan from
+        ``cache_dir`` instead of compiling it again. The graph is still built and
+        its logical job passes still run, only the plan generation is skipped.
+
+        The cache can also be enabled for all graphs with the environment
+        variable ``ONEFLOW_GRAPH_COMPILE_CACHE_DIR``. At most
+        ``ONEFLOW_GRAPH_COMPILE_CACHE_MAX_ENTRIES`` (32 by default) recently used
+        plans are kept in a cache directory.
+
+        For example:
+
+        .. code-block:: python
+
+            import oneflow as flow
+
+            class Graph(flow.nn.Graph):
+                def __init__(self):
+                    super().__init__()
+                    self.linear = flow.nn.Linear(3, 8, False)
+                    self.config.enable_compile_cache("./graph_compile_cache")
+                def build(self, x):
+                    return self.linear(x)
+
+            graph = Graph()
+
+        Args:
+            cache_dir (str): The directory to keep the cached plans in.
+        """
+        assert isinstance(cache_dir, str) and len(cache_dir) > 0
+        self._compile_cache_dir = cache_dir
+
+    def set_shape_buckets(self, dim2sizes: dict, pad_value=0, output_dims=None):
+        r"""Run the graph on inputs of varying sizes by padding them to shape buckets.
+
+        ``dim2sizes`` maps a dim of the inputs to its bucket sizes. When the graph is
+        called, the size of each bucketed dim is taken from the first input tensor
+        that has the dim, and rounded up to the nearest bucket size. Input tensors
+        with that size on the dim are padded with ``pad_value`` to the bucket size.
+
+        ``output_dims`` declares where the bucketed dims are in the outputs, which
+        are sliced back to the original sizes along them. It has one entry per output
+        tensor, in the order they are returned. An entry gives for each dim of the
+        output the bucketed input dim it corresponds to, or None. An entry of None
+        leaves that output untouched. Without ``output_dims``, an output which has
+        the size of a bucket on any dim raises ``ValueError``, because it can not be
+        told apart from a dim which only happens to have the same size.
+
+        One graph is compiled per bucket, at the first call that falls into it. All
+        of them share the modules, and so the parameters, of this graph. A call with
+        a size larger than the largest bucket raises ``ValueError``.
+
+        For example:
+
+        .. code-block:: python
+
+            import oneflow as flow
+
+            class Graph(flow.nn.Graph):
+                def __init__(self, model):
+                    super().__init__()
+                    self.model = model
+                    # batch size on dim 0 and sequence length on dim 1, the output
+                    # of shape (batch, seq_len, hidden) is sliced on both
+                    self.config.set_shape_buckets(
+                        {0: [1, 8, 32], 1: [64, 128, 512]}, output_dims=[(0, 1, None)]
+                    )
+                def build(self, input_ids):
+                    return self.model(input_ids)
+
+        Note:
+            The padded positions take part in the computation, so the model must
+            ignore them, for example with a mask that is padded with zeros too.
+
+        Args:
+            dim2sizes (dict): Maps a dim to the list of its bucket sizes.
+            pad_value (float or int, optional): The value to pad inputs with. Default: 0
+            output_dims (list, optional): The bucketed input dim of each dim of each
+                output tensor. Default: None
+        """
+        self._shape_buckets = ShapeBuckets(dim2sizes, pad_value, output_dims)
+
+    def _copy_for_shape_bucket(self):
+        config = copy.copy(self)
+        config.proto = job_conf_cfg.JobConfigProto()
+        config.proto.CopyFrom(self.proto)
+        config._shape_buckets = None
+        return config
+
     def enable_amp(self, mode: bool = True):
         r"""If set to true, then graph will use mixed precision mode, it means use both float16 and float32 during model training.
 
@@ -14,8 +14,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import sys
+from bisect import bisect_left
 from collections import OrderedDict
 
+import oneflow
 from oneflow.framework.tensor import Tensor
 
 
@@ -165,3 +167,264 @@ class IONode(object):
             # Leaf node: TENSOR/NONE/OPAQUE
             mapped_value = leaf_node_fn(self)
         return mapped_value
+
+
+class IOPlanMismatch(Exception):
+    pass
+
+
+class IOPlan(object):
+    r"""Flattening and unflattening plan of a nested input or output structure.
+
+    The plan is compiled once from a structure and flattens later structures of
+    the same layout in the order of ``IONode.named_nodes``, without building
+    ``IONode`` trees again. ``flatten`` raises ``IOPlanMismatch`` when the
+    layout differs.
+    """
+
+    # Spec kinds, a spec is a tuple whose first item is the kind.
+    _TENSOR = 0
+    _NONE = 1
+    _OPAQUE = 2
+    _TUPLE = 3
+    _LIST = 4
+    _DICT = 5
+
+    def __init__(self, value):
+        self._tensor_num = 0
+        self._spec = self.__compile(value)
+
+    @property
+    def tensor_num(self):
+        return self._tensor_num
+
+    def __compile(self, value):
+        if isinstance(value, tuple):
+            return (IOPlan._TUPLE, [self.__compile(item) for item in value])
+        elif isinstance(value, list):
+            return (IOPlan._LIST, [self.__compile(item) for item in value])
+        elif isinstance(value, dict):
+            keys = tuple(value.keys())
+            return (IOPlan._DICT, [self.__compile(value[key]) for key in keys], keys)
+        elif isinstance(value, Tensor):
+            self._tensor_num += 1
+            return (IOPlan._TENSOR,)
+        elif value is None:
+            return (IOPlan._NONE,)
+        else:
+            return (IOPlan._OPAQUE,)
+
+    def flatten(self, value):
+        flattened = []
+        self.__flatten(self._spec, value, flattened)
+        return flattened
+
+    def __flatten(self, spec, value, flattened):
+        kind = spec[0]
+        if kind == IOPlan._TENSOR:
+            if not isinstance(value, Tensor):
+                raise IOPlanMismatch
+            flattened.append(value)
+        elif kind == IOPlan._NONE:
+            if value is not None:
+                raise IOPlanMismatch
+        elif kind == IOPlan._OPAQUE:
+            if value is None or isinstance(value, (Tensor, tuple, list, dict)):
+                raise IOPlanMismatch
+        elif kind == IOPlan._DICT:
+            if not isinstance(value, dict) or len(value) != len(spec[2]):
+                raise IOPlanMismatch
+            try:
+                for key, sub_spec in zip(spec[2], spec[1]):
+                    self.__flatten(sub_spec, value[key], flattened)
+            except KeyError:
+                raise IOPlanMismatch
+        else:
+            if not isinstance(value, tuple if kind == IOPlan._TUPLE else list) or len(
+                value
+            ) != len(spec[1]):
+                raise IOPlanMismatch
+            for sub_spec, item in zip(spec[1], value):
+                self.__flatten(sub_spec, item, flattened)
+
+    def unflatten(self, flattened):
+        r"""Rebuilds the structure from tensors in flattened order. Opaque
+        leaves, which are never flattened, become ``None``."""
+        it = iter(flattened)
+        return self.__unflatten(self._spec, it)
+
+    def __unflatten(self, spec, it):
+        kind = spec[0]
+        if kind == IOPlan._TENSOR:
+            return next(it)
+        elif kind == IOPlan._TUPLE:
+            return tuple(self.__unflatten(sub_spec, it) for sub_spec in spec[1])
+        elif kind == IOPlan._LIST:
+            return [self.__unflatten(sub_spec, it) for sub_spec in spec[1]]
+        elif kind == IOPlan._DICT:
+            return {
+                key: self.__unflatten(sub_spec, it)
+                for key, sub_spec in zip(spec[2], spec[1])
+            }
+        return None
+
+
+def _map_tensors(value, fn):
+    if isinstance(value, Tensor):
+        return fn(value)
+    elif isinstance(value, tuple):
+        items = [_map_tensors(item, fn) for item in value]
+        return type(value)(*items) if hasattr(value, "_fields") else tuple(items)
+    elif isinstance(value, list):
+        return [_map_tensors(item, fn) for item in value]
+    elif isinstance(value, dict):
+        return type(value)((key, _map_tensors(item, fn)) for key, item in value.items())
+    return value
+
+
+class ShapeBuckets(object):
+    r"""Shape buckets of the inputs of a graph, see ``GraphConfig.set_shape_buckets``.
+
+    A bucket is keyed by the padded size of each bucketed dim. The actual size of
+    a dim is the size of that dim of the first input tensor which has it. Every
+    input tensor whose dim has the actual size is padded to the bucket size.
+    Output tensors are sliced back along the dims declared in ``output_dims``.
+    """
+
+    def __init__(self, dim2sizes, pad_value=0, output_dims=None):
+        assert isinstance(dim2sizes, dict) and len(dim2sizes) > 0
+        self._dims = tuple(sorted(dim2sizes.keys()))
+        self._dim2sizes = dict()
+        for dim in self._dims:
+            assert isinstance(dim, int) and dim >= 0, "dim must be a non-negative int"
+            sizes = sorted(set(dim2sizes[dim]))
+            assert len(sizes) > 0 and all(
+                isinstance(size, int) and size > 0 for size in sizes
+            ), "bucket sizes must be positive ints"
+            self._dim2sizes[dim] = sizes
+        self._pad_value = pad_value
+        if output_dims is not None:
+            output_dims = [
+                None if dims is None else tuple(dims) for dims in output_dims
+            ]
+            for dims in output_dims:
+                assert dims is None or all(
+                    dim is None or dim in self._dim2sizes for dim in dims
+                ), "output_dims must only refer to bucketed dims"
+        self._output_dims = output_dims
+
+    @property
+    def dim2sizes(self):
+        return self._dim2sizes
+
+    def bucket_of(self, value):
+        r"""Returns the actual and the padded sizes of the bucketed dims."""
+        dim2actual = dict()
+
+        def record(tensor):
+            for dim in self._dims:
+                if dim not in dim2actual and tensor.ndim > dim:
+                    dim2actual[dim] = tensor.shape[dim]
+            return tensor
+
+        _map_tensors(value, record)
+        actual = []
+        padded = []
+        for dim in self._dims:
+            if dim not in dim2actual:
+                raise ValueError("No input tensor has the bucketed dim {}.".format(dim))
+            sizes = self._dim2sizes[dim]
+            idx = bisect_left(sizes, dim2actual[dim])
+            if idx == len(sizes):
+                raise ValueError(
+                    "Size {} of dim {} exceeds the largest shape bucket {}.".format(
+                        dim2actual[dim], dim, sizes[-1]
+                    )
+                )
+            actual.append(dim2actual[dim])
+            padded.append(sizes[idx])
+        return tuple(actual), tuple(padded)
+
+    def pad(self, value, actual, padded):
+        def pad_tensor(tensor):
+            for dim, actual_size, padded_size in zip(self._dims, actual, padded):
+                if (
+                    padded_size == actual_size
+                    or tensor.ndim <= dim
+                    or tensor.shape[dim] != actual_size
+                ):
+                    continue
+                pad_shape = list(tensor.shape)
+                pad_shape[dim] = padded_size - actual_size
+                if tensor.is_global:
+                    padding = oneflow.full(
+                        pad_shape,
+                        self._pad_value,
+                        dtype=tensor.dtype,
+                        placement=tensor.placement,
+                        sbp=tensor.sbp,
+                    )
+                else:
+                    padding = oneflow.full(
+                        pad_shape,
+                        self._pad_value,
+                        dtype=tensor.dtype,
+                        device=tensor.device,
+                    )
+                tensor = oneflow.cat([tensor, padding], dim=dim)
+            return tensor
+
+        return _map_tensors(value, pad_tensor)
+
+    def slice(self, value, actual, padded):
+        dim2bucket = {
+            dim: (actual_size, padded_size)
+            for dim, actual_size, padded_size in zip(self._dims, actual, padded)
+        }
+        output_index = [0]
+
+        def check_undeclared(tensor, index):
+            # A dim with the size of a bucket may as well be a feature dim or a
+            # reduction result which only happens to match, so it is not guessed.
+            # Nothing needs slicing for a dim whose input was not padded.
+            for dim in self._dims:
+                actual_size, padded_size = dim2bucket[dim]
+                if actual_size != padded_size and padded_size in tuple(tensor.shape):
+                    raise ValueError(
+                        "Output {} of shape {} has the size {} of the bucket of dim {}, "
+                        "declare its bucketed dims with the output_dims argument of "
+                        "set_shape_buckets.".format(
+                            index, tuple(tensor.shape), padded_size, dim
+                        )
+                    )
+
+        def slice_tensor(tensor):
+            index = output_index[0]
+            output_index[0] += 1
+            if self._output_dims is None:
+                check_undeclared(tensor, index)
+                return tensor
+            if index >= len(self._output_dims):
+                raise ValueError(
+                    "The graph returns more tensors than the {} entries of "
+                    "output_dims.".format(len(self._output_dims))
+                )
+            dims = self._output_dims[index]
+            if dims is None:
+                return tensor
+            for output_dim, dim in enumerate(dims):
+                if dim is None:
+                    continue
+                actual_size, padded_size = dim2bucket[dim]
+                if output_dim >= tensor.ndim or tensor.shape[output_dim] != padded_size:
+                    raise ValueError(
+                        "Output {} of shape {} is declared to have the bucketed dim {} "
+                        "on dim {}, but its size is not the bucket size {}.".format(
+                            index, tuple(tensor.shape), dim, output_dim, padded_size
+                        )
+                    )
+                if padded_size != actual_size:
+                    tensor = tensor.narrow(output_dim, 0, actual_size)
+            return tensor
+
+        return _map_tensors(value, slice_tensor)
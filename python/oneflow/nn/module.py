@@ -51,6 +51,164 @@ def _addindent(s_, numSpaces):
 T = TypeVar("T", bound="Module")
 
 
+class _FlatParameterGroup(object):
+    """Parameters of one (dtype, device) pair that share a flat data buffer and
+    a flat gradient buffer. ``offsets[i]`` is the element offset of
+    ``params[i]`` in both buffers.
+    """
+
+    def __init__(self, params, offsets, data, grad):
+        self.params = params
+        self.offsets = offsets
+        self.data = data
+        self.grad = grad
+
+
+def _flat_view(buffer, start, tensor):
+    return flow._C.slice_view_1d_contiguous(buffer, start, start + tensor.numel()).view(
+        tensor.shape
+    )
+
+
+def _flat_grad_setting_fn(group, index):
+    param = group.params[index]
+    start = group.offsets[index]
+
+    def grad_setting(grad):
+        # group.grad is dropped when the gradients are managed by
+        # DistributedDataParallel
+        if param.grad is None and group.grad is not None:
+            # the view may still hold the gradient from before a
+            # zero_grad(set_to_none=True), and it is accumulated into in place
+            grad_view = _flat_view(group.grad, start, param)
+            grad_view.zero_()
+            param.grad = grad_view
+            param._is_grad_acc_inplace = True
+        return grad
+
+    return grad_setting
+
+
+# Number of active ``oneflow.nn.utils.deferred_init`` contexts.
+_deferred_init_depth = 0
+
+
+class _DeferredInit(object):
+    """What is needed to materialize a parameter created under
+    ``oneflow.nn.utils.deferred_init``: its logical meta, where it will live and
+    the initializer calls recorded on it (see ``framework.tensor._deferrable``).
+    """
+
+    def __init__(self, param):
+        self.shape = tuple(param.shape)
+        self.dtype = param.dtype
+        self.device = param.device
+        self.placement = None
+        self.sbp = None
+        self.calls = []
+        # The single element behind a local placeholder, see _set_placeholder.
+        self.storage = None
+
+
+def _is_deferred(tensor):
+    return getattr(tensor, "_deferred_init", None) is not None
+
+
+def _set_placeholder(param, deferred):
+    # A broadcast view of a single NaN element, so the placeholder reports the
+    # right shape, dtype and device without holding storage for the whole
+    # tensor. Writes other than the recorded initializers land in that element,
+    # which lets _check_placeholder notice them.
+    value = float("nan") if deferred.dtype.is_floating_point else 0
+    deferred.storage = flow.full(
+        [1] * len(deferred.shape), value, dtype=deferred.dtype, device=deferred.device,
+    )
+    param.data = deferred.storage.expand(*deferred.shape)
+
+
+def _check_placeholder(param):
+    deferred = param._deferred_init
+    if deferred.storage is None or not deferred.dtype.is_floating_point:
+        return
+    if not np.isnan(deferred.storage.numpy()).all():
+        raise RuntimeError(
+            "A parameter of shape {} created under oneflow.nn.utils.deferred_init "
+            "was modified in place by an operation that can not be deferred "
+            "(e.g. indexing, copy_ or .data). Only the initializers of "
+            "oneflow.nn.init and the in-place initializers of Tensor are recorded, "
+            "build this module outside of deferred_init.".format(deferred.shape)
+        )
+
+
+def _defer_parameter(param):
+    deferred = _DeferredInit(param)
+    _set_placeholder(param, deferred)
+    param._deferred_init = deferred
+
+
+def _apply_to_deferred_parameter(param, fn):
+    """Records the dtype, device or placement ``fn`` converts ``param`` to. The
+    local placeholder is replaced, so the parameter stays unallocated. A global
+    target can not be set as the data of a local parameter, so like ``_apply``
+    does for allocated parameters, a new global Parameter is returned. It holds
+    uninitialized shards until it is materialized in place.
+    """
+    deferred = param._deferred_init
+    if deferred.placement is not None:
+        with flow.no_grad():
+            data = fn(param)
+        if not data.is_global:
+            raise RuntimeError(
+                "A deferred global parameter can not be converted back to local"
+            )
+        deferred.dtype = data.dtype
+        deferred.placement = data.placement
+        deferred.sbp = data.sbp
+        param.data = data
+        return param
+    _check_placeholder(param)
+    # Conversions are replayed on a one element probe to learn the target.
+    with flow.no_grad():
+        probe = fn(flow.empty(1, dtype=deferred.dtype, device=deferred.device))
+    deferred.dtype = probe.dtype
+    if not probe.is_global:
+        deferred.device = probe.device
+        _set_placeholder(param, deferred)
+        return param
+    deferred.placement = probe.placement
+    deferred.sbp = probe.sbp
+    deferred.storage = None
+    data = flow.empty(
+        deferred.shape,
+        dtype=deferred.dtype,
+        placement=deferred.placement,
+        sbp=deferred.sbp,
+    )
+    new_param = Parameter(data, param.requires_grad)
+    new_param._deferred_init = deferred
+    param._deferred_init = None
+    return new_param
+
+
+def _materialize_parameter(param, run_init=True):
+    """Allocates ``param`` in place where it is meant to live and replays its
+    recorded initializers. The parameter object is kept, so optimizers and
+    modules holding it see the materialized tensor.
+    """
+    if run_init:
+        _check_placeholder(param)
+    deferred = param._deferred_init
+    param._deferred_init = None
+    if deferred.placement is None:
+        param.data = flow.empty(
+            deferred.shape, dtype=deferred.dtype, device=deferred.device
+        )
+    if run_init:
+        with flow.no_grad():
+            for (init_method, args, kwargs) in deferred.calls:
+                init_method(param, *args, **kwargs)
+
+
 class Module(object):
     def __init__(self):
         self.training = True
@@ -64,11 +222,17 @@ class Module(object):
         self._state_dict_hooks = OrderedDict()
         self._load_state_dict_pre_hooks = OrderedDict()
         self._modules = OrderedDict()
+        # Whether this module or one of its submodules may still own parameters
+        # created under ``oneflow.nn.utils.deferred_init``.
+        self._has_deferred_parameters = _deferred_init_depth > 0
 
     def forward(self, *args, **kwargs):
         raise NotImplementedError()
 
     def __call__(self, *args, **kwargs):
+        if self._has_deferred_parameters:
+            self._materialize_deferred_parameters()
+
         for hook in itertools.chain(self._forward_pre_hooks.values()):
             result = hook(self, args)
             if result is not None:
@@ -106,6 +270,8 @@ class Module(object):
         elif name == "":
             raise KeyError('module name can\'t be empty string ""')
         self._modules[name] = module
+        if module is not None and module._has_deferred_parameters:
+            self._has_deferred_parameters = True
 
     def register_buffer(
         self, name: str, tensor: Optional[Tensor], persistent: bool = True
@@ -157,8 +323,28 @@ class Module(object):
                 )
             )
         else:
+            if (
+                _deferred_init_depth > 0
+                and param.is_local
+                and param.is_leaf
+                and param.numel() > 1
+                and param.is_floating_point()
+                and not _is_deferred(param)
+            ):
+                _defer_parameter(param)
+            if _is_deferred(param):
+                self._has_deferred_parameters = True
             self._parameters[name] = param
 
+    def _materialize_deferred_parameters(self):
+        for module in self.modules():
+            if not module._has_deferred_parameters:
+                continue
+            for param in module._parameters.values():
+                if param is not None and _is_deferred(param):
+                    _materialize_parameter(param)
+            module._has_deferred_parameters = False
+
     def __getattr__(self, name: str) -> Union[Tensor, "Module"]:
         if "_parameters" in self.__dict__:
             _parameters = self.__dict__["_parameters"]
@@ -220,6 +406,8 @@ class Module(object):
                     self._non_persistent_buffers_set,
                 )
                 modules[name] = value
+                if value._has_deferred_parameters:
+                    self._has_deferred_parameters = True
             elif modules is not None and name in modules:
                 if value is not None:
                     raise TypeError(
@@ -332,7 +520,17 @@ class Module(object):
                 "If you need gradients in your forward method, consider using autograd.grad instead."
             )
 
+        flat_params = set()
+        if not set_to_none:
+            for group in self.__dict__.get("_flat_parameter_groups", []):
+                if group.grad is None:
+                    continue
+                group.grad.zero_()
+                flat_params.update(group.params)
+
         for p in self.parameters():
+            if p in flat_params:
+                continue
             if p.grad is not None:
                 if set_to_none:
                     p.grad = None
@@ -343,6 +541,75 @@ class Module(object):
                         p.grad.requires_grad_(False)
                     p.grad.zero_()
 
+    def flatten_parameters(self: T) -> T:
+        r"""Moves the local parameters of this module (and all submodules) into
+        contiguous buffers, one per (dtype, device) pair, and turns every
+        parameter into a view of its buffer. Gradients are accumulated into a
+        second flat buffer with the same layout, so that :meth:`zero_grad` and
+        other whole-model operations can work on a few large tensors instead of
+        many small ones.
+
+        Parameters keep their identity, so optimizers that already hold them
+        keep working. Autograd hooks registered on the parameters before this
+        call are dropped, so call it right after building the model, before
+        wrapping it with :func:`oneflow.nn.parallel.DistributedDataParallel` or
+        registering hooks. Global parameters are left untouched.
+
+        Returns:
+            Module: self
+
+        For example:
+
+        .. code-block:: python
+
+            >>> import oneflow as flow
+            >>> m = flow.nn.Linear(4, 3).flatten_parameters()
+            >>> m.weight.shape
+            oneflow.Size([3, 4])
+
+        """
+
+        def numel_in_buffer(tensor):
+            # align every view to 512 bytes like the buckets in
+            # nn.parallel.DistributedDataParallel
+            unit_size = max(512 // tensor.element_size(), 1)
+            return (tensor.numel() + (unit_size - 1)) // unit_size * unit_size
+
+        grouped_params = OrderedDict()
+        for param in self.parameters():
+            if param.is_global:
+                continue
+            key = (param.dtype, str(param.device))
+            grouped_params.setdefault(key, []).append(param)
+
+        groups = []
+        for params in grouped_params.values():
+            offsets = []
+            total = 0
+            for param in params:
+                offsets.append(total)
+                total += numel_in_buffer(param)
+            dtype, device = params[0].dtype, params[0].device
+            data = flow.zeros(total, dtype=dtype, device=device)
+            grad = flow.zeros(total, dtype=dtype, device=device)
+            group = _FlatParameterGroup(params, offsets, data, grad)
+            with flow.no_grad():
+                for (i, (param, start)) in enumerate(zip(params, offsets)):
+                    old_grad = param.grad
+                    param_view = _flat_view(data, start, param)
+                    param_view.copy_(param)
+                    param.data = param_view
+                    if old_grad is not None:
+                        grad_view = _flat_view(grad, start, param)
+                        grad_view.copy_(old_grad)
+                        param.grad = grad_view
+                        param._is_grad_acc_inplace = True
+                    if param.requires_grad:
+                        param.register_hook(_flat_grad_setting_fn(group, i))
+            groups.append(group)
+        self._flat_parameter_groups = groups
+        return self
+
     def _save_to_state_dict(self, destination, prefix, keep_vars):
         for (name, param) in self._parameters.items():
             if param is not None:
@@ -391,6 +658,9 @@ class Module(object):
                         )
                     )
                     continue
+                if _is_deferred(param):
+                    # The checkpoint overwrites the recorded initializers.
+                    _materialize_parameter(param, run_init=False)
                 try:
                     with flow.no_grad():
                         param.copy_(input_param)
@@ -509,6 +779,11 @@ class Module(object):
         for (key, param) in self._parameters.items():
             if param is None:
                 continue
+            if _is_deferred(param):
+                if param not in applied_dict:
+                    applied_dict[param] = _apply_to_deferred_parameter(param, fn)
+                self._parameters[key] = applied_dict[param]
+                continue
 
             need_apply = False
             if param not in applied_dict:
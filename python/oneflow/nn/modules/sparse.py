@@ -16,10 +16,18 @@ limitations under the License.
 from typing import List, Optional, Tuple
 
 import oneflow as flow
-from oneflow.framework.tensor import Tensor
+from oneflow.framework.tensor import Tensor, _deferrable
 from oneflow.nn.module import Module
 
 
+@_deferrable
+def _fill_row_with_zero_(weight, row):
+    # Recorded instead of run on parameters created under deferred_init.
+    with flow.no_grad():
+        weight[row].fill_(0)
+    return weight
+
+
 class Embedding(Module):
     """A simple lookup table that stores embeddings of a fixed dictionary and size.
 
@@ -95,8 +103,7 @@ class Embedding(Module):
 
     def _fill_padding_idx_with_zero(self) -> None:
         if self.padding_idx is not None:
-            with flow.no_grad():
-                self.weight[self.padding_idx].fill_(0)
+            _fill_row_with_zero_(self.weight, self.padding_idx)
 
     def forward(self, indices):
         res = flow._C.gather(self.weight, indices, axis=0)
@@ -57,6 +57,10 @@ class AdamW(Optimizer):
         weight_decay (float, optional): weight decay (L2 penalty) (In the equation is λ, default: 0)
         amsgrad (bool, optional): whether to use the AMSGrad variant of this algorithm. (default: False) 
         do_bias_correction (bool, optional): Whether do bias correction (default: True)
+        foreach (bool, optional): Whether update all the parameters of the same
+            data type and device with one multi tensor kernel, instead of one kernel per
+            parameter. It only applies to local float parameters without amsgrad, and
+            creates the states in flat contiguous buffers. (default: False)
 
     .. _Adam\\: A Method for Stochastic Optimization:
         https://arxiv.org/abs/1412.6980
@@ -119,6 +123,7 @@ class AdamW(Optimizer):
         weight_decay: float = 0,
         amsgrad: bool = False,
         do_bias_correction: bool = True,
+        foreach: bool = False,
     ):
         assert lr >= 0.0, f"Invalid learning rate: {lr}"
         assert eps >= 0.0, f"Invalid epsilon value: {eps}"
@@ -144,6 +149,7 @@ class AdamW(Optimizer):
             for param in param_group.parameters:
                 assert param.is_leaf, "parameters must be leaf tensor"
                 self._state[param] = dict()
+        self._foreach = foreach
 
         self._op_with_amsgrad = (
             flow.stateful_op("adam_update")
@@ -194,6 +200,20 @@ class AdamW(Optimizer):
                     "do_bias_correction": param_group["do_bias_correction"],
                     "amsgrad": param_group["amsgrad"],
                 }
+                if (
+                    self._foreach
+                    and not param_group["amsgrad"]
+                    and self._supports_multi_tensor_update(param_group)
+                ):
+                    self._multi_tensor_update(
+                        param_group,
+                        "multi_tensor_adam_update",
+                        ("m", "v"),
+                        ("exp_avg", "exp_avg_sq"),
+                        flow._C.dispatch_adam_update,
+                        **kwargs,
+                    )
+                    continue
 
                 for param in param_group.parameters:
                     if param.grad is None:
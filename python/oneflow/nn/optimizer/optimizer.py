@@ -22,7 +22,7 @@ from typing import Any, Callable, Dict, Union
 from oneflow.framework.tensor import Tensor
 from oneflow.nn.graph.block import TensorBlock
 from oneflow.nn.parameter import Parameter
-from oneflow.nn.utils.clip_grad import clip_grad_norm_
+from oneflow.nn.utils.clip_grad import clip_grad_norm_, _check_nonfinite_grad_norm
 import oneflow as flow
 
 
@@ -99,14 +99,39 @@ class _SourceOpOnlyResourceDependenceMode:
         del self.guard
 
 
-def _decorate_step(step):
+def _decorate_step(optimizer, step):
     def decorated_step(*args, **kwargs):
+        # raise the error deferred by clip_grad_norm_(error_if_nonfinite=True)
+        # before the parameters are updated
+        for param_group in optimizer.param_groups:
+            _check_nonfinite_grad_norm(param_group.parameters)
         with _SourceOpOnlyResourceDependenceMode():
             return step(*args, **kwargs)
 
     return decorated_step
 
 
+# Multi tensor update ops keyed by the op type name, the names of the state
+# inputs and the number of variables.
+_multi_tensor_update_ops = dict()
+
+
+def _multi_tensor_update_op(op_type_name, state_arg_names, num_tensors):
+    key = (op_type_name, state_arg_names, num_tensors)
+    op = _multi_tensor_update_ops.get(key)
+    if op is None:
+        builder = (
+            flow.stateful_op(op_type_name)
+            .Input("model", num_tensors)
+            .Input("model_diff", num_tensors)
+        )
+        for arg_name in state_arg_names:
+            builder = builder.Input(arg_name, num_tensors)
+        op = builder.Build()
+        _multi_tensor_update_ops[key] = op
+    return op
+
+
 class Optimizer(object):
     def __init__(self, parameters, options):
         self.param_groups = list()
@@ -116,7 +141,7 @@ class Optimizer(object):
 
         self._parse_input_parameters(parameters)
 
-        self.step = _decorate_step(self.step)
+        self.step = _decorate_step(self, self.step)
 
     def add_param_group(self, param_group) -> None:
         raise NotImplementedError()
@@ -293,6 +318,63 @@ class Optimizer(object):
                     else:
                         param.grad.zero_()
 
+    def _supports_multi_tensor_update(self, param_group):
+        for param in param_group.parameters:
+            if param.is_global or param.dtype not in (flow.float32, flow.float64):
+                return False
+        return True
+
+    def _multi_tensor_update(
+        self,
+        param_group,
+        op_type_name,
+        state_arg_names,
+        state_names,
+        dispatch,
+        **kwargs,
+    ):
+        r"""Updates the parameters with gradients of ``param_group`` with one
+        ``op_type_name`` op per data type and device.
+
+        The states named ``state_names`` are passed to the op as the inputs named
+        ``state_arg_names``. Missing states are created as views of one flat
+        zero buffer per data type and device.
+        """
+        groups = collections.OrderedDict()
+        for param in param_group.parameters:
+            if param.grad is None:
+                continue
+            groups.setdefault((param.dtype, param.device), []).append(param)
+        for params in groups.values():
+            self._init_flat_states(params, state_names)
+            inputs = list(params)
+            inputs.extend(param.grad for param in params)
+            for state_name in state_names:
+                inputs.extend(self._state[param][state_name] for param in params)
+            op = _multi_tensor_update_op(op_type_name, state_arg_names, len(params))
+            dispatch(op, inputs, **kwargs)
+
+    def _init_flat_states(self, params, state_names):
+        params = [
+            param
+            for param in params
+            if any(name not in self._state[param] for name in state_names)
+        ]
+        if len(params) == 0:
+            return
+        numel = sum(param.numel() for param in params)
+        for state_name in state_names:
+            flat_state = flow.zeros(
+                numel, dtype=params[0].dtype, device=params[0].device
+            )
+            offset = 0
+            for param in params:
+                if state_name not in self._state[param]:
+                    self._state[param][state_name] = flat_state.narrow(
+                        0, offset, param.numel()
+                    ).view(param.shape)
+                offset += param.numel()
+
     def _parse_input_parameters(self, parameters):
         """
         Supports such parameters:
@@ -48,6 +48,10 @@ class SGD(Optimizer):
         lr (float, optional): learning rate (default: 1e-3)
         momentum (float, optional): Momentum factor (default: 0.0)
         weight_decay (float, optional): weight decay (L2 penalty) (default: 0.0)
+        foreach (bool, optional): Whether update all the parameters of the same
+            data type and device with one multi tensor kernel, instead of one kernel per
+            parameter. It only applies to local float parameters, and creates the
+            momentum buffers in flat contiguous buffers. (default: False)
 
     For example: 
 
@@ -101,6 +105,7 @@ class SGD(Optimizer):
         lr: float = 0.001,
         momentum: float = 0.0,
         weight_decay: float = 0.0,
+        foreach: bool = False,
     ):
         assert lr >= 0.0, f"Invalid learning rate: {lr}"
         assert momentum >= 0.0, f"Invalid momentum: {momentum}"
@@ -115,6 +120,7 @@ class SGD(Optimizer):
             for param in param_group.parameters:
                 assert param.is_leaf, "parameters must be leaf tensor"
                 self._state[param] = dict()
+        self._foreach = foreach
 
         self._momentum_sgd = (
             flow.stateful_op("momentum_update")
@@ -141,6 +147,29 @@ class SGD(Optimizer):
             for param_group in self.param_groups:
                 lr = param_group["lr"]
                 l2 = param_group["weight_decay"]
+                if self._foreach and self._supports_multi_tensor_update(param_group):
+                    if param_group["momentum"] == 0.0:
+                        self._multi_tensor_update(
+                            param_group,
+                            "multi_tensor_sgd_update",
+                            (),
+                            (),
+                            flow._C.dispatch_sgd_update,
+                            learning_rate=lr,
+                            l2=l2,
+                        )
+                    else:
+                        self._multi_tensor_update(
+                            param_group,
+                            "multi_tensor_momentum_update",
+                            ("momentum",),
+                            ("momentum_buf",),
+                            flow._C.dispatch_momentum_update,
+                            learning_rate=lr,
+                            l2=l2,
+                            beta=param_group["momentum"],
+                        )
+                    continue
                 for param in param_group.parameters:
                     if param.grad is None:
                         continue
@@ -0,0 +1,305 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import math
+
+import oneflow as flow
+
+
+class GradBucket(object):
+    """The gradients of one dtype in a DistributedDataParallel bucket, passed to
+    communication hooks.
+    """
+
+    def __init__(self, index, buffer, params, offsets, is_last):
+        self._index = index
+        self._buffer = buffer
+        self._params = params
+        self._offsets = offsets
+        self._is_last = is_last
+
+    def index(self):
+        """The index of the bucket, buckets are all-reduced in index order."""
+        return self._index
+
+    def buffer(self):
+        """The flat tensor holding the gradients of the bucket."""
+        return self._buffer
+
+    def parameters(self):
+        """The parameters whose gradients are stored in the bucket."""
+        return self._params
+
+    def gradients(self):
+        """Views of the gradients in :meth:`buffer`, one per parameter."""
+        return [
+            flow._C.slice_view_1d_contiguous(
+                self._buffer, start, start + param.numel()
+            ).view(param.shape)
+            for (param, start) in zip(self._params, self._offsets)
+        ]
+
+    def is_last(self):
+        """Whether this is the last bucket communicated in an iteration."""
+        return self._is_last
+
+
+class DefaultState(object):
+    """The state of a communication hook, counts the bytes the hook passes to
+    collective operations.
+
+    Attributes:
+        bytes_sent (int): bytes of the tensors this rank handed to collectives.
+        bytes_uncompressed (int): bytes of the gradient buckets the hook
+            communicated, ``bytes_uncompressed / bytes_sent`` is the
+            compression ratio.
+    """
+
+    def __init__(self):
+        self.world_size = flow.env.get_world_size()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+
+    def _record(self, bucket, *sent):
+        buffer = bucket.buffer()
+        self.bytes_uncompressed += buffer.numel() * buffer.element_size()
+        for tensor in sent:
+            self.bytes_sent += tensor.numel() * tensor.element_size()
+
+
+def allreduce_hook(state: DefaultState, bucket: GradBucket) -> flow.Tensor:
+    """Averages the gradients of the bucket across ranks, the default behavior
+    of DistributedDataParallel.
+    """
+    buffer = bucket.buffer()
+    state._record(bucket, buffer)
+    buffer.mul_(1 / state.world_size)
+    # NOTE(jianhao)(higher-order-grad):
+    # local allreduce doesn't have gradient function, higher-order grad may be unsupported
+    flow._C.local_all_reduce(buffer, inplace=True)
+    return buffer
+
+
+def _compress_hook(state, bucket, dtype):
+    buffer = bucket.buffer()
+    if buffer.dtype == dtype:
+        return allreduce_hook(state, bucket)
+    compressed = buffer.to(dtype)
+    compressed.mul_(1 / state.world_size)
+    state._record(bucket, compressed)
+    flow._C.local_all_reduce(compressed, inplace=True)
+    buffer.copy_(compressed)
+    return buffer
+
+
+def fp16_compress_hook(state: DefaultState, bucket: GradBucket) -> flow.Tensor:
+    """Casts the gradients of the bucket to float16 before all-reducing them and
+    casts the result back, halving the communication of float32 gradients.
+    """
+    return _compress_hook(state, bucket, flow.float16)
+
+
+def bf16_compress_hook(state: DefaultState, bucket: GradBucket) -> flow.Tensor:
+    """Like :func:`fp16_compress_hook` but uses bfloat16, which keeps the range of
+    float32 at a lower precision.
+    """
+    return _compress_hook(state, bucket, flow.bfloat16)
+
+
+def _allreduce_flat(state, tensors):
+    # all-reduces a list of tensors with a single collective
+    flat = flow.cat([x.flatten() for x in tensors])
+    state.bytes_sent += flat.numel() * flat.element_size()
+    flow._C.local_all_reduce(flat, inplace=True)
+    start = 0
+    for x in tensors:
+        x.copy_(flat[start : start + x.numel()].view(x.shape))
+        start += x.numel()
+
+
+def _orthogonalize(matrix, epsilon=1e-8):
+    # Gram-Schmidt on the columns, the rank of PowerSGD is small
+    columns = []
+    for i in range(matrix.shape[1]):
+        col = matrix[:, i]
+        for prev in columns:
+            col = col - (col * prev).sum() * prev
+        col = col / (flow.linalg.norm(col) + epsilon)
+        columns.append(col)
+    matrix.copy_(flow.stack(columns, dim=1))
+
+
+class PowerSGDState(DefaultState):
+    """The state of :func:`powerSGD_hook`.
+
+    Args:
+        matrix_approximation_rank (int): the rank of the low-rank approximation of
+            every gradient matrix. Default: 1
+        start_powerSGD_iter (int): all-reduce the full gradients for this many
+            iterations before compressing them. Default: 10
+        use_error_feedback (bool): add the approximation error of the last
+            iteration to the gradients before compressing them. Default: ``True``
+        warm_start (bool): reuse the low-rank factors of the last iteration as
+            the starting point of the power iteration. Default: ``True``
+        seed (int): the seed of the random initial factors, must be the same on
+            all ranks. Default: 0
+    """
+
+    def __init__(
+        self,
+        matrix_approximation_rank: int = 1,
+        start_powerSGD_iter: int = 10,
+        use_error_feedback: bool = True,
+        warm_start: bool = True,
+        seed: int = 0,
+    ):
+        super().__init__()
+        self.matrix_approximation_rank = matrix_approximation_rank
+        self.start_powerSGD_iter = start_powerSGD_iter
+        self.use_error_feedback = use_error_feedback
+        self.warm_start = warm_start
+        self.generator = flow.Generator("cpu")
+        self.generator.manual_seed(seed)
+        self.iter = 0
+        self.error_dict = {}
+        self.q_memory_dict = {}
+
+    def _q_of(self, param, matrix, rank):
+        q = self.q_memory_dict.get(param)
+        if q is None or not self.warm_start:
+            q = flow.randn(
+                matrix.shape[1], rank, dtype=matrix.dtype, generator=self.generator,
+            ).to(matrix.device)
+            _orthogonalize(q)
+            self.q_memory_dict[param] = q
+        return q
+
+
+def powerSGD_hook(state: PowerSGDState, bucket: GradBucket) -> flow.Tensor:
+    """Compresses every gradient matrix ``M`` of the bucket into the product of two
+    low-rank factors ``P @ Q.T`` with one step of power iteration and only
+    all-reduces the factors. Vectors and matrices that are too small to benefit
+    are all-reduced as they are.
+    """
+    if state.iter < state.start_powerSGD_iter:
+        result = allreduce_hook(state, bucket)
+    else:
+        result = _power_sgd_compress(state, bucket)
+    if bucket.is_last():
+        state.iter += 1
+    return result
+
+
+def _power_sgd_compress(state, bucket):
+    buffer = bucket.buffer()
+    state.bytes_uncompressed += buffer.numel() * buffer.element_size()
+    world_size = state.world_size
+    uncompressed = []
+    matrices = []
+    for (param, grad) in zip(bucket.parameters(), bucket.gradients()):
+        if grad.ndim < 2:
+            uncompressed.append(grad)
+            continue
+        matrix = grad.view(grad.shape[0], -1)
+        n, m = matrix.shape
+        rank = min(n, m, state.matrix_approximation_rank)
+        if (n + m) * rank >= n * m:
+            uncompressed.append(grad)
+            continue
+        if state.use_error_feedback:
+            error = state.error_dict.get(param)
+            if error is not None:
+                matrix.add_(error)
+        matrices.append((param, matrix, state._q_of(param, matrix, rank)))
+
+    if len(uncompressed) > 0:
+        _allreduce_flat(state, uncompressed)
+        for grad in uncompressed:
+            grad.mul_(1 / world_size)
+    if len(matrices) == 0:
+        return buffer
+
+    ps = [flow.matmul(matrix, q) for (_, matrix, q) in matrices]
+    _allreduce_flat(state, ps)
+    for p in ps:
+        _orthogonalize(p)
+    for ((_, matrix, q), p) in zip(matrices, ps):
+        q.copy_(flow.matmul(matrix, p, transpose_a=True))
+    _allreduce_flat(state, [q for (_, _, q) in matrices])
+    for ((param, matrix, q), p) in zip(matrices, ps):
+        q.mul_(1 / world_size)
+        approximation = flow.matmul(p, q, transpose_b=True)
+        if state.use_error_feedback:
+            state.error_dict[param] = matrix - approximation
+        matrix.copy_(approximation)
+    return buffer
+
+
+class TopKState(DefaultState):
+    """The state of :func:`topk_hook`.
+
+    Args:
+        compress_ratio (float): the fraction of the gradients of a bucket that is
+            communicated. Default: 0.01
+        use_error_feedback (bool): add the gradients that were not communicated
+            in the last iteration to the gradients before selecting the largest
+            ones. Default: ``True``
+    """
+
+    def __init__(self, compress_ratio: float = 0.01, use_error_feedback: bool = True):
+        super().__init__()
+        assert 0 < compress_ratio <= 1
+        self.compress_ratio = compress_ratio
+        self.use_error_feedback = use_error_feedback
+        self.error_dict = {}
+
+
+def topk_hook(state: TopKState, bucket: GradBucket) -> flow.Tensor:
+    """Only communicates the ``compress_ratio`` fraction of the gradients of the
+    bucket that are largest in magnitude, as (value, index) pairs gathered from
+    all ranks.
+    """
+    buffer = bucket.buffer()
+    # the bucket layout is stable after the first iteration, so the bucket is
+    # identified by its parameters
+    key = (id(bucket.parameters()[0]), buffer.dtype)
+    if state.use_error_feedback:
+        error = state.error_dict.get(key)
+        if error is not None and error.numel() == buffer.numel():
+            buffer.add_(error)
+    k = max(1, int(math.ceil(buffer.numel() * state.compress_ratio)))
+    _, indices = flow.topk(buffer.abs(), k)
+    values = flow.gather(buffer, 0, indices)
+    if state.use_error_feedback:
+        state.error_dict[key] = flow.scatter(buffer, 0, indices, 0.0)
+    state._record(bucket, values, indices)
+
+    gathered_values = [flow.zeros_like(values) for _ in range(state.world_size)]
+    gathered_indices = [flow.zeros_like(indices) for _ in range(state.world_size)]
+    flow.comm.all_gather(gathered_values, values)
+    flow.comm.all_gather(gathered_indices, indices)
+    buffer.copy_(
+        flow.scatter_add(
+            flow.zeros_like(buffer),
+            0,
+            flow.cat(gathered_indices),
+            flow.cat(gathered_values),
+        )
+    )
+    buffer.mul_(1 / state.world_size)
+    return buffer
@@ -13,68 +13,271 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import types
 import warnings
 from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional
 
 import oneflow as flow
+from oneflow.nn.parallel import comm_hooks
+from oneflow.nn.parallel.comm_hooks import GradBucket
 from oneflow.support.env_var_util import parse_boolean_form_env
 from oneflow.framework.tensor_tuple_util import convert_to_tensor_tuple
 
 
+def numel_in_bucket(tensor: flow.Tensor):
+    def align(x: int, unit_size: int):
+        return (x + (unit_size - 1)) // unit_size * unit_size
+
+    # tensor memory should be align to 512 bytes for cuda operations
+    # TODO(jianhao): expose the `kCudaMemAllocAlignSize` from C++ to
+    # avoid this hardcoded "512"
+    return align(tensor.numel(), max(512 // tensor.element_size(), 1))
+
+
+class _Bucket(object):
+    """A group of parameters whose gradients are stored in the same flat
+    tensors (one per dtype) and all-reduced together once all of them are
+    ready.
+    """
+
+    def __init__(self, params, device):
+        self.params = params
+        self.offsets = {}
+        numels = OrderedDict()
+        for param in params:
+            offset = numels.get(param.dtype, 0)
+            self.offsets[param] = offset
+            numels[param.dtype] = offset + numel_in_bucket(param)
+        self.tensors = OrderedDict(
+            (dtype, flow.zeros(numel, dtype=dtype, device=device))
+            for (dtype, numel) in numels.items()
+        )
+        self.num_pending = len(params)
+
+    def grad_view(self, param):
+        start = self.offsets[param]
+        return flow._C.slice_view_1d_contiguous(
+            self.tensors[param.dtype], start, start + param.numel()
+        ).view(param.shape)
+
+
+def build_buckets(params, device, bucket_cap_bytes, bucket_size=None):
+    buckets = []
+    current = []
+    current_bytes = 0
+    for param in params:
+        param_bytes = numel_in_bucket(param) * param.element_size()
+        if bucket_size is not None:
+            full = len(current) >= bucket_size
+        else:
+            full = current_bytes + param_bytes > bucket_cap_bytes
+        if len(current) > 0 and full:
+            buckets.append(_Bucket(current, device))
+            current = []
+            current_bytes = 0
+        current.append(param)
+        current_bytes += param_bytes
+    if len(current) > 0:
+        buckets.append(_Bucket(current, device))
+    bucket_index = {x: i for (i, bucket) in enumerate(buckets) for x in bucket.params}
+    return buckets, bucket_index
+
+
+def rebuild_buckets(module, ready_order):
+    """Rebuilds the buckets in the order gradients arrived in the first
+    backward pass. The order of rank 0 is broadcast so that every rank
+    launches the same all-reduce sequence.
+    """
+    params = list(module._ddp_state_for_reversed_params.keys())
+    position = {x: i for (i, x) in enumerate(params)}
+    ready_positions = [position[x] for x in ready_order]
+    seen = set(ready_positions)
+    ready_positions += [i for i in range(len(params)) if i not in seen]
+    device = module._ddp_device
+    order = flow.tensor(ready_positions, dtype=flow.int64, device=device)
+    flow._C.broadcast(order, inplace=True)
+    ordered_params = [params[i] for i in order.numpy().tolist()]
+
+    buckets, bucket_index = build_buckets(
+        ordered_params, device, module._ddp_bucket_cap_bytes, module._ddp_bucket_size
+    )
+    with flow.no_grad():
+        for param in ordered_params:
+            if param.grad is not None:
+                grad = buckets[bucket_index[param]].grad_view(param)
+                grad.copy_(param.grad)
+                param.grad = grad
+                param._is_grad_acc_inplace = True
+    module._buckets = buckets
+    module._bucket_index = bucket_index
+
+
 def grad_setting_fn(module, param):
     def grad_setting(grad):
         if param.grad is None:
-            start = module._param_grad_offset_in_bucket[param]
-            bucket_index = module._bucket_index[param]
-            bucket_tensor = module._bucket_tensors[bucket_index]
-            param.grad = flow._C.slice_view_1d_contiguous(
-                bucket_tensor, start, start + param.numel()
-            ).view(param.shape)
+            bucket = module._buckets[module._bucket_index[param]]
+            param.grad = bucket.grad_view(param)
             param._is_grad_acc_inplace = True
         return grad
 
     return grad_setting
 
 
+def communicate_bucket(module, index):
+    bucket = module._buckets[index]
+    is_last_bucket = index == len(module._buckets) - 1
+    for (i, (dtype, buffer)) in enumerate(bucket.tensors.items()):
+        params = [x for x in bucket.params if x.dtype == dtype]
+        grad_bucket = GradBucket(
+            index,
+            buffer,
+            params,
+            [bucket.offsets[x] for x in params],
+            is_last_bucket and i == len(bucket.tensors) - 1,
+        )
+        result = module._ddp_comm_hook(module._ddp_comm_hook_state, grad_bucket)
+        if result is not buffer:
+            buffer.copy_(result)
+
+
 def allreduce_fn(module, param):
     ddp_state_for_reversed_params = module._ddp_state_for_reversed_params
-    buckets = module._buckets
-    bucket_tensors = module._bucket_tensors
 
     def allreduce(grad):
-        ddp_state_for_reversed_params[param][0] = True
-        for index, bucket in enumerate(buckets):
-            deleted = all(ddp_state_for_reversed_params[x][1] for x in bucket)
-            if deleted:
-                continue
+        if not module._ddp_sync:
+            # inside no_sync(), gradients accumulate in the buckets locally
+            return
+        # a parameter is ready in this iteration if its state holds the
+        # current iteration number, so no per-iteration reset is needed
+        state = ddp_state_for_reversed_params[param]
+        if state[0] == module._ddp_iteration:
+            return
+        state[0] = module._ddp_iteration
+        if module._ddp_ready_order is not None:
+            module._ddp_ready_order.append(param)
 
-            assert not any(ddp_state_for_reversed_params[x][1] for x in bucket)
-
-            all_params_in_bucket_ready = all(
-                ddp_state_for_reversed_params[x][0] for x in bucket
-            )
-            if all_params_in_bucket_ready:
-                for x in bucket:
-                    ddp_state_for_reversed_params[x][1] = True
-                # NOTE(jianhao)(higher-order-grad):
-                # local allreduce doesn't have gradient function, higher-order grad may be unsupported
-                flow._C.local_all_reduce(bucket_tensors[index], inplace=True)
-            else:
-                break
+        buckets = module._buckets
+        buckets[module._bucket_index[param]].num_pending -= 1
+        # launch the buckets strictly in order so that all ranks issue the
+        # same sequence of collective operations
+        while (
+            module._ddp_next_bucket < len(buckets)
+            and buckets[module._ddp_next_bucket].num_pending == 0
+        ):
+            communicate_bucket(module, module._ddp_next_bucket)
+            module._ddp_next_bucket += 1
 
     return allreduce
 
 
+@contextmanager
+def no_sync(module):
+    r"""A context manager that disables the gradient synchronization of a module
+    wrapped by :func:`DistributedDataParallel`, available as
+    ``module.no_sync()``. Gradients of the iterations run inside it accumulate
+    locally, and are averaged together with the gradients of the first
+    iteration run outside of it.
+
+    For example:
+
+    .. code-block:: python
+
+        m = flow.nn.parallel.DistributedDataParallel(m)
+        with m.no_sync():
+            for x in micro_batches[:-1]:
+                m(x).sum().backward()
+        m(micro_batches[-1]).sum().backward()
+
+    """
+    require_backward_grad_sync = module._ddp_require_backward_grad_sync
+    module._ddp_require_backward_grad_sync = False
+    try:
+        yield
+    finally:
+        module._ddp_require_backward_grad_sync = require_backward_grad_sync
+
+
+def register_comm_hook(module, state: object, hook: Callable):
+    r"""Registers a communication hook that replaces the all-reduce of the
+    gradient buckets of a module wrapped by :func:`DistributedDataParallel`.
+    It is available as ``module.register_comm_hook(state, hook)``.
+
+    ``hook(state, bucket)`` is called with a
+    :class:`oneflow.nn.parallel.comm_hooks.GradBucket` once the gradients of
+    the bucket are ready, and returns a tensor holding the gradients averaged
+    across all ranks, either ``bucket.buffer()`` updated in place or a new
+    tensor that is copied back into it.
+
+    Args:
+        state (object): passed to every call of ``hook``, the built-in hooks
+            count the bytes they communicate in it.
+        hook (Callable): the communication hook, e.g.
+            :func:`oneflow.nn.parallel.comm_hooks.fp16_compress_hook`.
+
+    For example:
+
+    .. code-block:: python
+
+        from oneflow.nn.parallel import comm_hooks
+
+        m = flow.nn.parallel.DistributedDataParallel(m)
+        state = comm_hooks.PowerSGDState(matrix_approximation_rank=2)
+        m.register_comm_hook(state, comm_hooks.powerSGD_hook)
+        ...
+        print(state.bytes_sent / state.bytes_uncompressed)
+
+    """
+    module._ddp_comm_hook_state = state
+    module._ddp_comm_hook = hook
+
+
 def DistributedDataParallel(
-    module: "flow.nn.Module", *, broadcast_buffers: bool = True, bucket_size: int = 10
+    module: "flow.nn.Module",
+    *,
+    broadcast_buffers: bool = True,
+    bucket_size: Optional[int] = None,
+    bucket_cap_mb: float = 25,
+    static_graph: bool = False,
 ):
-    assert all(x.dtype == flow.float32 for x in module.parameters())
+    r"""Wraps ``module`` in place so that the gradients of its parameters are
+    averaged across all ranks during backward.
+
+    Gradients are stored in buckets of flat tensors, and a bucket is
+    all-reduced as soon as all its gradients are ready, overlapping
+    communication with the rest of the backward pass. After the first
+    iteration the buckets are rebuilt in the order the gradients actually
+    arrived.
+
+    Args:
+        module (oneflow.nn.Module): the module to wrap.
+        broadcast_buffers (bool): broadcast the buffers of rank 0 at the beginning
+            of every forward. Default: ``True``
+        bucket_size (int, optional): if set, put this many parameters in a bucket
+            instead of bucketing by ``bucket_cap_mb``. Default: ``None``
+        bucket_cap_mb (float): the maximum size of a bucket in megabytes, a
+            parameter larger than this gets a bucket of its own. Default: 25
+        static_graph (bool): the set of parameters that receive gradients is the
+            same in every iteration and on every rank. The outputs of the module
+            are then returned as they are, instead of being rewired to depend on
+            all parameters so that unused parameters still get (zero) gradients.
+            Default: ``False``
+
+    The wrapped module also gets these methods:
+
+    - ``no_sync()``: a context manager, the gradients of the forward and
+      backward passes inside it are accumulated locally in the buckets, and
+      the accumulated gradients are averaged in the first backward pass after
+      it. Use it to skip the communication of gradient accumulation steps.
+    - ``register_comm_hook(state, hook)``: see :func:`register_comm_hook`.
+    """
+    assert all(x.is_floating_point() for x in module.parameters())
     if parse_boolean_form_env("ONEFLOW_DISABLE_VIEW", False):
         warnings.warn(
             "because the environment variable 'ONEFLOW_DISABLE_VIEW' is set to true, so the view mechanism is disabled, and we will set bucket_size = 1"
         )
         bucket_size = 1
-    world_size = flow.env.get_world_size()
     with flow.no_grad():
         for x in module.parameters():
             requires_grad = x.requires_grad
@@ -84,75 +287,60 @@ def DistributedDataParallel(
             x.requires_grad_(requires_grad)
 
     all_grad_size = sum([x.numel() for x in module.parameters()])
+    device = None
     if all_grad_size > 0:
         device = list(module.parameters())[0].device
         assert all(x.device == device for x in module.parameters())
     reversed_param_list = list(
         reversed(list([param for param in module.parameters() if param.requires_grad]))
     )
-    module._param_grad_offset_in_bucket = {}
+    for param in reversed_param_list:
+        assert param.is_leaf
 
-    def numel_in_bucket(tensor: flow.Tensor):
-        def align(x: int, unit_size: int):
-            return (x + (unit_size - 1)) // unit_size * unit_size
+    # gradients live in the ddp buckets from now on
+    for group in getattr(module, "_flat_parameter_groups", []):
+        group.grad = None
 
-        # tensor memory should be align to 512 bytes for cuda operations,
-        # 4 is the bytes of a float number
-        # TODO(jianhao): expose the `kCudaMemAllocAlignSize` from C++ to
-        # avoid this hardcoded "512"
-        return align(tensor.numel(), 512 // 4)
-
-    offset_in_bucket = 0
-    with flow.no_grad():
-        for i, param in enumerate(reversed_param_list):
-            assert param.is_leaf
-            if i % bucket_size == 0:
-                offset_in_bucket = 0
-            module._param_grad_offset_in_bucket[param] = offset_in_bucket
-            offset_in_bucket += numel_in_bucket(param)
-
-    module._bucket_index = {
-        x: i // bucket_size for i, x in enumerate(reversed_param_list)
-    }
-    module._buckets = [
-        reversed_param_list[i : i + bucket_size]
-        for i in range(0, len(reversed_param_list), bucket_size)
-    ]
-
-    bucket_elems = 0
-    module._bucket_tensors = []
-    for b in module._buckets:
-        bucket_elems = sum([numel_in_bucket(x) for x in b])
-        module._bucket_tensors.append(
-            flow.zeros(bucket_elems, dtype=flow.float32, device=device)
-        )
+    module._ddp_device = device
+    module._ddp_bucket_size = bucket_size
+    module._ddp_bucket_cap_bytes = int(bucket_cap_mb * 1024 * 1024)
+    module._ddp_comm_hook_state = comm_hooks.DefaultState()
+    module._ddp_comm_hook = comm_hooks.allreduce_hook
+    module.register_comm_hook = types.MethodType(register_comm_hook, module)
+    module._buckets, module._bucket_index = build_buckets(
+        reversed_param_list, device, module._ddp_bucket_cap_bytes, bucket_size
+    )
 
     ddp_state_for_reversed_params = OrderedDict(
-        reversed([(x, [False, False]) for x in module.parameters() if x.requires_grad])
+        reversed([(x, [-1]) for x in module.parameters() if x.requires_grad])
     )
     module._ddp_state_for_reversed_params = ddp_state_for_reversed_params
-    # The gradient shoule be averaged by all the nodes, so besides allreduce,
-    # a division by world_size is required.
-    # Use x * (1 / world_size) instead of x / world_size for two reasons:
-    # 1. multiplication is faster than division
-    # 2. An inplace operation is needed here (for allreduce grouping)
-    #    But we do not have inplace division in oneflow.
-    mul_factor = 1 / world_size
-
-    def inplace_mul_and_return_none(x):
-        x.mul_(mul_factor)
-        return None
-
+    module._ddp_iteration = -1
+    module._ddp_next_bucket = 0
+    # the order in which gradients become ready is recorded in the first
+    # iteration and used to rebuild the buckets
+    module._ddp_ready_order = []
+    module._ddp_static_graph = static_graph
+    module._ddp_require_backward_grad_sync = True
+    module._ddp_sync = True
+    module.no_sync = types.MethodType(no_sync, module)
     for param in module.parameters():
         if param.requires_grad:
             param.register_hook(grad_setting_fn(module, param))
-            param._register_post_grad_accumulation_hook(inplace_mul_and_return_none)
             param._register_post_grad_accumulation_hook(allreduce_fn(module, param))
 
     def post_forward_hook(module, input, output):
         ddp_state_for_reversed_params = module._ddp_state_for_reversed_params
-        for state in ddp_state_for_reversed_params.values():
-            state[0], state[1] = False, False
+        if module._ddp_ready_order:
+            rebuild_buckets(module, module._ddp_ready_order)
+            module._ddp_ready_order = None
+        module._ddp_iteration += 1
+        module._ddp_next_bucket = 0
+        for bucket in module._buckets:
+            bucket.num_pending = len(bucket.params)
+        module._ddp_sync = module._ddp_require_backward_grad_sync
+        if module._ddp_static_graph:
+            return output
         if isinstance(output, (tuple, list)):
             if isinstance(output[0], dict):
                 # For List[Dict[Tensor]] return type.
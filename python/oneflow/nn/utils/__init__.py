@@ -16,3 +16,8 @@ limitations under the License.
 from oneflow.nn.utils.clip_grad import clip_grad_norm_, clip_grad_value_
 from oneflow.nn.utils.weight_norm import weight_norm
 from oneflow.nn.utils.weight_norm import remove_weight_norm
+from oneflow.nn.utils.deferred_init import (
+    deferred_init,
+    is_deferred,
+    materialize_module,
+)
@@ -22,12 +22,53 @@ import oneflow as flow
 
 from oneflow.framework.tensor import Tensor
 from oneflow.framework.tensor import register_tensor_op
+from oneflow.framework.graph_build_util import lazy_mode
 from oneflow.nn.module import Module
 
 
 _tensor_or_tensors = Union[Tensor, Iterable[Tensor]]
 
 
+def _defer_nonfinite_check(parameters, total_norm, norm_type):
+    # the flag stays on the device and is read by the next optimizer step, see
+    # _check_nonfinite_grad_norm
+    nonfinite = flow.logical_or(total_norm.isnan(), total_norm.isinf())
+    for p in parameters:
+        p._nonfinite_grad_norm = (nonfinite, norm_type)
+    return nonfinite
+
+
+def _check_nonfinite_grad_norm(parameters):
+    pending = []
+    for p in parameters:
+        check = getattr(p, "_nonfinite_grad_norm", None)
+        if check is None:
+            continue
+        p._nonfinite_grad_norm = None
+        if all(check[0] is not other[0] for other in pending):
+            pending.append(check)
+    for (nonfinite, norm_type) in pending:
+        if nonfinite.item():
+            raise RuntimeError(
+                f"The total norm of order {norm_type} for gradients from "
+                "`parameters` is non-finite, so it cannot be clipped. To disable "
+                "this error and scale the gradients by the non-finite norm anyway, "
+                "set `error_if_nonfinite=False`"
+            )
+
+
+def _can_use_multi_tensor_ops(grads):
+    if lazy_mode.is_enabled():
+        return False
+    grad0 = grads[0]
+    if grad0.is_global or grad0.dtype not in (flow.float32, flow.float64):
+        return False
+    return all(
+        not g.is_global and g.dtype == grad0.dtype and g.device == grad0.device
+        for g in grads
+    )
+
+
 def clip_grad_norm_(
     parameters: _tensor_or_tensors,
     max_norm: float,
@@ -48,6 +89,14 @@ def clip_grad_norm_(
             norm of the gradients from :attr:``parameters`` is ``nan``,
             ``inf``, or ``-inf``. Default: False (will switch to True in the future)
 
+    .. note::
+        When the gradients are local float32 or float64 tensors on the same
+        device, the norm and the clipping are computed by a few multi tensor
+        kernels whatever the number of parameters, and the host never waits for
+        the device. With ``error_if_nonfinite``, the gradients are left
+        unscaled when the norm is non-finite and the error is raised by the
+        next ``step()`` of an optimizer holding the parameters.
+
     Returns:
         Parameters after cliping gradient norm
         Total norm of the parameters (viewed as a single vector).
@@ -129,19 +178,23 @@ def clip_grad_norm_(
                 ),
                 norm_type,
             )
-        if error_if_nonfinite and flow.logical_or(
-            total_norm.isnan(), total_norm.isinf()
-        ):
-            raise RuntimeError(
-                f"The total norm of order {norm_type} for gradients from "
-                "`parameters` is non-finite, so it cannot be clipped. To disable "
-                "this error and scale the gradients by the non-finite norm anyway, "
-                "set `error_if_nonfinite=False`"
-            )
         clip_coef = max_norm / (total_norm + 1e-6)
         clip_coef_clamped = clip_coef.clamp(max=1.0)
+        if error_if_nonfinite:
+            nonfinite = _defer_nonfinite_check(parameters, total_norm, norm_type)
+            clip_coef_clamped = clip_coef_clamped.masked_fill(nonfinite, 1.0)
         for p in parameters:
             p.grad.detach().mul_(clip_coef_clamped.to_global(placement=p.placement))
+    elif _can_use_multi_tensor_ops([p.grad for p in parameters]) and (
+        norm_type > 0 or norm_type == float("-inf")
+    ):
+        grads = [p.grad.detach() for p in parameters]
+        total_norm = flow._C.multi_tensor_norm(grads, norm_type)
+        if error_if_nonfinite:
+            _defer_nonfinite_check(parameters, total_norm, norm_type)
+        flow._C.multi_tensor_clip_by_norm_(
+            grads, total_norm, max_norm, 1e-6, skip_if_nonfinite=error_if_nonfinite
+        )
     else:
         device = parameters[0].grad.device
         if norm_type == float("inf"):
@@ -160,17 +213,11 @@ def clip_grad_norm_(
                 ),
                 norm_type,
             )
-        if error_if_nonfinite and flow.logical_or(
-            total_norm.isnan(), total_norm.isinf()
-        ):
-            raise RuntimeError(
-                f"The total norm of order {norm_type} for gradients from "
-                "`parameters` is non-finite, so it cannot be clipped. To disable "
-                "this error and scale the gradients by the non-finite norm anyway, "
-                "set `error_if_nonfinite=False`"
-            )
         clip_coef = max_norm / (total_norm + 1e-6)
         clip_coef_clamped = clip_coef.clamp(max=1.0)
+        if error_if_nonfinite:
+            nonfinite = _defer_nonfinite_check(parameters, total_norm, norm_type)
+            clip_coef_clamped = clip_coef_clamped.masked_fill(nonfinite, 1.0)
         for p in parameters:
             p.grad.detach().mul_(clip_coef_clamped.to(p.grad.device))
     return total_norm
@@ -190,7 +237,12 @@ def clip_grad_value_(parameters: _tensor_or_tensors, clip_value: float) -> None:
     """
     if isinstance(parameters, flow.Tensor):
         parameters = [parameters]
+    parameters = list(parameters)
     clip_value = float(clip_value)
+    grads = [p.grad.detach() for p in parameters if p.grad is not None]
+    if len(grads) > 0 and _can_use_multi_tensor_ops(grads):
+        flow._C.multi_tensor_clamp_(grads, -clip_value, clip_value)
+        return
     for p in filter(lambda p: p.grad is not None, parameters):
         # TODO: Switch to inplace clamp function
         p.grad[:] = p.grad.clamp(min=-clip_value, max=clip_value)
@@ -0,0 +1,80 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from contextlib import contextmanager
+
+import oneflow as flow
+import oneflow.nn.module as module_util
+from oneflow.framework.tensor import Tensor
+from oneflow.nn.module import Module
+
+
+@contextmanager
+def deferred_init():
+    r"""Context manager that defers parameter initialization of the modules
+    built inside it.
+
+    The parameters keep their shape, dtype and device, but hold no storage:
+    initializers called on them, like ``flow.nn.init.kaiming_uniform_`` in
+    ``reset_parameters``, are only recorded. A deferred parameter is
+    materialized
+
+    - by ``Module.load_state_dict``, which allocates it and copies the checkpoint
+      in without running its initializers,
+    - at the first call of the module that owns it, or by :func:`materialize_module`,
+      which allocate it and replay its initializers.
+
+    ``Module.to``, ``Module.to_global`` and the like only record where the
+    parameter should go, so it is allocated straight at its final device or
+    placement, and global parameters are initialized shard by shard.
+
+    Other in-place writes to a deferred parameter, like indexing followed by
+    ``fill_`` or ``copy_`` through ``.data``, can not be replayed. They raise a
+    RuntimeError when the parameter is converted or materialized.
+
+    For example:
+
+    .. code-block:: python
+
+        >>> import oneflow as flow
+        >>> with flow.nn.utils.deferred_init():
+        ...     m = flow.nn.Linear(1024, 1024)
+        >>> flow.nn.utils.is_deferred(m.weight)
+        True
+        >>> m = flow.nn.utils.materialize_module(m)
+        >>> flow.nn.utils.is_deferred(m.weight)
+        False
+
+    """
+    module_util._deferred_init_depth += 1
+    try:
+        yield
+    finally:
+        module_util._deferred_init_depth -= 1
+
+
+def is_deferred(tensor: Tensor) -> bool:
+    r"""Returns True if ``tensor`` is a parameter created under
+    :func:`deferred_init` that has not been materialized yet.
+    """
+    return module_util._is_deferred(tensor)
+
+
+def materialize_module(module: Module) -> Module:
+    r"""Allocates every deferred parameter of ``module`` and its submodules and
+    replays the initializers recorded on it. Returns ``module``.
+    """
+    module._materialize_deferred_parameters()
+    return module
@@ -93,6 +93,10 @@ def _init(
     assert store_options.__contains__("kv_store")
     kv_store = store_options["kv_store"]
     assert isinstance(kv_store, dict)
+    device = kv_store.get("device", "cuda")
+    assert device in ["cuda", "cpu"]
+    if device == "cpu":
+        assert parallel_num == 1, "cpu OneEmbedding only supports one rank"
     if kv_store.__contains__("caches"):
         caches = kv_store["caches"]
         assert isinstance(caches, (dict, list, tuple))
@@ -104,6 +108,10 @@ def _init(
             for i in range(len(caches)):
                 assert isinstance(caches[i], dict)
                 _check_cache(caches[i])
+        if device == "cpu":
+            assert len(caches) <= 1
+            for cache in caches:
+                assert cache["value_memory_kind"] == "host"
         for i in range(len(caches)):
             if caches[i].__contains__("capacity"):
                 caches[i]["capacity"] = caches[i]["capacity"] // parallel_num
@@ -124,6 +132,10 @@ def _init(
         persistent_table["capacity_hint"] = (
             persistent_table["capacity_hint"] // parallel_num
         )
+    if persistent_table.__contains__("compaction_occupancy_threshold"):
+        assert 0 <= persistent_table["compaction_occupancy_threshold"] <= 1
+    if persistent_table.__contains__("compaction_interval_ms"):
+        assert persistent_table["compaction_interval_ms"] >= 0
     key_value_store_options["kv_store"] = kv_store
     # initializer
     if tables is not None:
@@ -184,6 +196,7 @@ class Embedding(Module):
             store_options,
             default_initializer,
         )
+        self.device = key_value_store_options["kv_store"].get("device", "cuda")
         self.key_value_store_options = json.dumps(key_value_store_options)
         self.embedding_tables = json.dumps(embedding_tables)
         self.num_tables = len(embedding_tables["tables"])
@@ -197,7 +210,7 @@ class Embedding(Module):
 
     def _save_to_state_dict(self, destination, prefix, keep_vars):
         snapshot_timestamp_tensor = flow.tensor(
-            datetime.datetime.now().timestamp(), dtype=flow.float64, device="cuda"
+            datetime.datetime.now().timestamp(), dtype=flow.float64, device=self.device,
         )
         # Broadcast timestamp tensor from master rank.
         flow.comm.broadcast(snapshot_timestamp_tensor, src=0)
@@ -446,6 +459,70 @@ def make_cached_host_mem_store_options(
     return options
 
 
+def make_cpu_store_options(
+    persistent_path,
+    capacity=None,
+    size_factor=1,
+    physical_block_size=512,
+    cache_budget_mb=0,
+):
+    """make CPU store_options param of MultiTableEmbedding, which keeps the embedding in host memory and runs the lookup, shuffle and update ops on CPU. If cache_budget_mb > 0, host memory is used as a LRU cache of the persistent storage, otherwise all embeddings are kept in host memory.
+
+    Args:
+        persistent_path (str, list): persistent storage path of Embedding. If passed a str, current rank Embedding will be saved in path/rank_id-num_ranks path. If passed a list, the list length must equals num_ranks, each elem of list represent the path of rank_id Embedding.
+        capacity (int): total capacity of Embedding
+        size_factor (int, optional): store size factor of embedding_dim, if SGD update, and momentum = 0, should be 1, if momentum > 0, it should be 2. if Adam, should be 3. Defaults to 1.
+        physical_block_size (int, optional): physical_block_size should be sector size. Defaults to 512.
+        cache_budget_mb (int, optional): the MB budget of host memory as cache. Defaults to 0.
+
+    Returns:
+        dict: CPU store_options param of MultiTableEmbedding
+
+    For example:
+
+    .. code-block:: python
+
+        >>> import oneflow as flow    
+        >>> store_options = flow.one_embedding.make_cpu_store_options(
+        >>>     persistent_path="/your_path_to_ssd", capacity=vocab_size,
+        >>> )
+        >>> # pass the store_options to the "store_options" param of flow.one_embedding.MultiTableEmbedding
+        >>> # and move the embedding module to "cpu"
+        >>> # ...
+    """
+    assert isinstance(persistent_path, (str, list, tuple))
+    if capacity is not None:
+        assert capacity > 0
+    else:
+        capacity = 0
+    assert cache_budget_mb > 0 or capacity > 0
+    if cache_budget_mb > 0:
+        cache = {
+            "policy": "lru",
+            "cache_memory_budget_mb": cache_budget_mb,
+            "value_memory_kind": "host",
+        }
+    else:
+        cache = {
+            "policy": "full",
+            "capacity": int(capacity),
+            "value_memory_kind": "host",
+        }
+    options = {
+        "kv_store": {
+            "device": "cpu",
+            "caches": [cache],
+            "persistent_table": {
+                "path": persistent_path,
+                "physical_block_size": physical_block_size,
+                "capacity_hint": int(capacity),
+            },
+        },
+        "size_factor": size_factor,
+    }
+    return options
+
+
 def make_uniform_initializer(low, high):
     """make uniform initializer param of make_table_options
 
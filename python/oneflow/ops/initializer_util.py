@@ -1209,6 +1209,44 @@ def EmptyInitializerImpl(
     return None
 
 
+def GetStatelessRandomArgs(initializer_conf, var_blob_shape):
+    """Translates ``initializer_conf`` to the arguments of ``flow._C.stateless_random``,
+    or returns None if the initializer has no counter based equivalent.
+    """
+    if initializer_conf.HasField("random_uniform_conf"):
+        conf = initializer_conf.random_uniform_conf
+        return dict(distribution="uniform", low=conf.min, high=conf.max)
+    elif initializer_conf.HasField("random_normal_conf"):
+        conf = initializer_conf.random_normal_conf
+        return dict(distribution="normal", mean=conf.mean, std=conf.std)
+    elif initializer_conf.HasField("truncated_normal_conf"):
+        conf = initializer_conf.truncated_normal_conf
+        return _stateless_truncated_normal_args(conf.mean, conf.std)
+    elif initializer_conf.HasField("variance_scaling_conf"):
+        conf = initializer_conf.variance_scaling_conf
+        scale = conf.scale / GenInitialFan(conf, var_blob_shape)
+        if conf.distribution == initializer_conf_util.kTruncatedNormal:
+            stddev = math.sqrt(scale) / 0.8796256610342398
+            return _stateless_truncated_normal_args(0.0, stddev)
+        elif conf.distribution == initializer_conf_util.kRandomNormal:
+            return dict(distribution="normal", mean=0.0, std=math.sqrt(scale))
+        elif conf.distribution == initializer_conf_util.kRandomUniform:
+            limit = math.sqrt(3.0 * scale)
+            return dict(distribution="uniform", low=-limit, high=limit)
+    return None
+
+
+def _stateless_truncated_normal_args(mean, std):
+    # Same truncation as RngTruncatedNormal.
+    return dict(
+        distribution="truncated_normal",
+        mean=mean,
+        std=std,
+        low=mean - 2 * std,
+        high=mean + 2 * std,
+    )
+
+
 def _elem_cnt(shape):
     return np.prod(shape).astype(int).item()
 
@@ -15,7 +15,13 @@ limitations under the License.
 """
 
 import oneflow._oneflow_internal
-from oneflow.profiler.profiler import profile, record_function
+from oneflow.profiler.profiler import (
+    ProfilerAction,
+    chrome_trace_handler,
+    profile,
+    record_function,
+    schedule,
+)
 
 __all__ = [
     "range_push",
@@ -24,6 +30,9 @@ __all__ = [
     "profiler_stop",
     "profile",
     "record_function",
+    "schedule",
+    "ProfilerAction",
+    "chrome_trace_handler",
 ]
 
 
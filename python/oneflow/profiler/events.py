@@ -13,19 +13,27 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import os
 import json
 import copy
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 from collections import OrderedDict
 from prettytable import PrettyTable
 from oneflow.profiler.util import format_time
 
 
+# Events recorded around each vm instruction, they wrap the kernel events and are
+# only shown on the chrome trace timeline by default.
+INSTRUCTION_EVENT_TYPE = 2
+
+
 def format_event_type(event_type):
     if event_type == 0:
         return "custom"
     if event_type == 1:
         return "kernel"
+    if event_type == INSTRUCTION_EVENT_TYPE:
+        return "instruction"
     raise ValueError(f"Undefined event type {event_type}.")
 
 
@@ -38,6 +46,11 @@ class Event:
         count: int,
         input_shapes: str,
         event_type: int,
+        started_at: Optional[int] = None,
+        finished_at: Optional[int] = None,
+        thread_id: Optional[int] = None,
+        stream_id: str = "",
+        depth: int = 0,
     ) -> None:
         self.name = name
         self.cpu_time = cpu_time
@@ -45,6 +58,12 @@ class Event:
         self.count = count
         self.input_shapes = input_shapes
         self.event_type = event_type
+        # Absolute wall clock time in nanoseconds, None for aggregated events.
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.thread_id = thread_id
+        self.stream_id = stream_id
+        self.depth = depth
 
     def update(self, event):
         self.cpu_time_total += event.cpu_time
@@ -66,7 +85,17 @@ class Event:
     @classmethod
     def from_dict(cls, d: dict):
         return cls(
-            d["name"], d["cpu_time"], d["cpu_time"], 1, d["input_shapes"], d["type"]
+            d["name"],
+            d["cpu_time"],
+            d["cpu_time"],
+            1,
+            d["input_shapes"],
+            d["type"],
+            d.get("started_at"),
+            d.get("finished_at"),
+            d.get("thread_id"),
+            d.get("stream_id", ""),
+            d.get("depth", 0),
         )
 
 
@@ -84,23 +113,27 @@ class Events(list):
     def __str__(self):
         return self.table()
 
-    def key_averages(self):
+    def key_averages(self, include_instructions: bool = False):
         stats: Dict[Tuple[str, ...], Event] = OrderedDict()
 
         def get_key(event: Event) -> Tuple[str, ...]:
             return event.name, event.input_shapes
 
         for event in self:
+            if not include_instructions and event.event_type == INSTRUCTION_EVENT_TYPE:
+                continue
             key = get_key(event=event)
             if key in stats:
                 stats[key].update(event)
             else:
                 stats[key] = copy.deepcopy(event)
+                stats[key].started_at = None
+                stats[key].finished_at = None
         results = Events()
         results.extend(stats.values())
         return results
 
-    def table(self):
+    def table(self, include_instructions: bool = False):
         t = PrettyTable()
         t.field_names = [
             "Name",
@@ -111,6 +144,8 @@ class Events(list):
             "Shapes of inputs",
         ]
         for item in self:
+            if not include_instructions and item.event_type == INSTRUCTION_EVENT_TYPE:
+                continue
             t.add_row(
                 [
                     item.name,
@@ -122,3 +157,37 @@ class Events(list):
                 ]
             )
         return t.get_string()
+
+    def chrome_trace(self, pid: Optional[int] = None) -> dict:
+        """Returns the events in the Trace Event Format of chrome://tracing and Perfetto,
+        every event becomes a complete event on the timeline of the thread it ran on."""
+        if pid is None:
+            pid = os.getpid()
+        timed_events = [e for e in self if e.started_at is not None]
+        base_time = min((e.started_at for e in timed_events), default=0)
+        trace_events = []
+        for event in timed_events:
+            args = {"depth": event.depth}
+            if event.input_shapes != "-":
+                args["input_shapes"] = event.input_shapes
+            if event.stream_id != "":
+                args["stream_id"] = event.stream_id
+            trace_events.append(
+                {
+                    "name": event.name,
+                    "cat": format_event_type(event.event_type),
+                    "ph": "X",
+                    "ts": (event.started_at - base_time) / 1000.0,
+                    "dur": (event.finished_at - event.started_at) / 1000.0,
+                    "pid": pid,
+                    "tid": event.thread_id,
+                    "args": args,
+                }
+            )
+        # The events of a thread are sorted so that the outer ones come first.
+        trace_events.sort(key=lambda e: (e["tid"], e["ts"], e["args"]["depth"]))
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str, pid: Optional[int] = None):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(pid), f)
@@ -13,36 +13,176 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import os
+import socket
+import time
+from enum import Enum
+from typing import Callable, List, Optional
+
 import oneflow._oneflow_internal
-from typing import Optional
 from oneflow.profiler.events import Events
 
 
+class ProfilerAction(Enum):
+    NONE = 0
+    WARMUP = 1
+    RECORD = 2
+    RECORD_AND_SAVE = 3
+
+
+def schedule(
+    *, wait: int, warmup: int, active: int, repeat: int = 0, skip_first: int = 0
+) -> Callable[[int], ProfilerAction]:
+    """Returns a callable mapping a step number to a ProfilerAction.
+
+    After ``skip_first`` steps the profiler cycles through ``wait`` idle steps,
+    ``warmup`` steps whose events are discarded and ``active`` recorded steps.
+    The trace is handed to ``on_trace_ready`` at the end of every active window.
+    With ``repeat == 0`` the cycle repeats until profiling stops.
+    """
+    if wait < 0 or warmup < 0 or active <= 0 or repeat < 0 or skip_first < 0:
+        raise ValueError(
+            "Invalid profiler schedule: wait, warmup, repeat and skip_first must be "
+            "non-negative and active must be positive"
+        )
+
+    def schedule_fn(step: int) -> ProfilerAction:
+        if step < skip_first:
+            return ProfilerAction.NONE
+        step -= skip_first
+        cycle_len = wait + warmup + active
+        if repeat > 0 and step // cycle_len >= repeat:
+            return ProfilerAction.NONE
+        pos = step % cycle_len
+        if pos < wait:
+            return ProfilerAction.NONE
+        if pos < wait + warmup:
+            return ProfilerAction.WARMUP
+        if pos < cycle_len - 1:
+            return ProfilerAction.RECORD
+        return ProfilerAction.RECORD_AND_SAVE
+
+    return schedule_fn
+
+
+def _default_schedule_fn(_: int) -> ProfilerAction:
+    return ProfilerAction.RECORD
+
+
+def chrome_trace_handler(
+    dir_name: str, worker_name: Optional[str] = None, max_files: Optional[int] = None
+) -> Callable[["profile"], None]:
+    """Returns an ``on_trace_ready`` callback that exports every active window as a
+    chrome trace into ``dir_name``. If ``max_files`` is set, only the newest
+    ``max_files`` traces written by this handler are kept."""
+    if max_files is not None and max_files <= 0:
+        raise ValueError("max_files must be positive")
+    if worker_name is None:
+        worker_name = "{}_{}".format(socket.gethostname(), os.getpid())
+    written: List[str] = []
+
+    def handler(prof: "profile") -> None:
+        os.makedirs(dir_name, exist_ok=True)
+        file_name = "{}.step{}.{}.trace.json".format(
+            worker_name, prof.step_num, int(time.time() * 1000)
+        )
+        path = os.path.join(dir_name, file_name)
+        prof.export_chrome_trace(path)
+        written.append(path)
+        while max_files is not None and len(written) > max_files:
+            stale = written.pop(0)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    return handler
+
+
 class profile:
-    def __init__(self) -> None:
+    """Profiles the code inside the context.
+
+    Without ``schedule`` every step is recorded and the events are available after
+    the context exits. With ``schedule``, call ``step()`` at the end of every
+    training step: the profiler is only enabled during warmup and active steps, and
+    ``on_trace_ready(prof)`` is called each time an active window finishes.
+    """
+
+    def __init__(
+        self,
+        schedule: Optional[Callable[[int], ProfilerAction]] = None,
+        on_trace_ready: Optional[Callable[["profile"], None]] = None,
+    ) -> None:
         self.profile_events: Optional[Events] = None
+        self.schedule = schedule if schedule is not None else _default_schedule_fn
+        self.on_trace_ready = on_trace_ready
+        self.step_num = 0
+        self.current_action = ProfilerAction.NONE
 
     def __enter__(self):
-        oneflow._oneflow_internal.profiler.EnableProfiler()
+        self.step_num = 0
+        self.current_action = self.schedule(self.step_num)
+        self.__transit(ProfilerAction.NONE, self.current_action)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.profile_events = Events(
+        self.__transit(self.current_action, None)
+        self.current_action = ProfilerAction.NONE
+
+    def step(self):
+        """Signals the end of a step so the schedule can move on."""
+        prev_action = self.current_action
+        self.step_num += 1
+        self.current_action = self.schedule(self.step_num)
+        self.__transit(prev_action, self.current_action)
+
+    def __transit(
+        self, prev_action: ProfilerAction, action: Optional[ProfilerAction]
+    ) -> None:
+        # action is None when the profiler is leaving the context
+        recording_actions = (ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE)
+        if prev_action == ProfilerAction.RECORD_AND_SAVE or (
+            prev_action == ProfilerAction.RECORD and action not in recording_actions
+        ):
+            self.__stop(save=True)
+            prev_action = ProfilerAction.NONE
+        elif prev_action == ProfilerAction.WARMUP and action != ProfilerAction.WARMUP:
+            self.__stop(save=False)
+            prev_action = ProfilerAction.NONE
+        if prev_action == ProfilerAction.NONE and action not in (
+            None,
+            ProfilerAction.NONE,
+        ):
+            oneflow._oneflow_internal.profiler.EnableProfiler()
+
+    def __stop(self, save: bool) -> None:
+        events = Events(
             oneflow._oneflow_internal.profiler.DisableProfilerAndReturnResult()
         )
+        if save:
+            self.profile_events = events
+            if self.on_trace_ready is not None:
+                self.on_trace_ready(self)
 
     def __check_finish(self):
         if self.profile_events is None:
             raise RuntimeError("Profiler didn't finish running")
 
-    def key_averages(self):
+    def key_averages(self, include_instructions: bool = False):
+        """Averages the events by name and input shapes. The vm instruction events,
+        which wrap the kernel events, are left out unless include_instructions is
+        True, they are still in ``events()`` and the chrome trace."""
         self.__check_finish()
-        return self.profile_events.key_averages()
+        return self.profile_events.key_averages(include_instructions)
 
     def events(self):
         self.__check_finish()
         return self.profile_events
 
+    def export_chrome_trace(self, path: str):
+        """Writes the events to a JSON file which can be opened by chrome://tracing or
+        https://ui.perfetto.dev, one timeline per thread."""
+        self.__check_finish()
+        self.profile_events.export_chrome_trace(path)
+
 
 class record_function:
     def __init__(self, name: str) -> None:
@@ -50,10 +190,17 @@ class record_function:
         self.__event_recorder_key = ""
 
     def __enter__(self):
-        self.__event_recorder_key = oneflow._oneflow_internal.profiler.StartRecord(
-            self.name
-        )
+        # nothing is recorded outside the active windows of a scheduled profile
+        if oneflow._oneflow_internal.profiler.IsProfilerEnabled():
+            self.__event_recorder_key = oneflow._oneflow_internal.profiler.StartRecord(
+                self.name
+            )
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        oneflow._oneflow_internal.profiler.EndRecord(self.__event_recorder_key)
+        if (
+            self.__event_recorder_key != ""
+            and oneflow._oneflow_internal.profiler.IsProfilerEnabled()
+        ):
+            oneflow._oneflow_internal.profiler.EndRecord(self.__event_recorder_key)
+        self.__event_recorder_key = ""
@@ -0,0 +1,85 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import collections
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+from oneflow.utils.data._utils.collate import default_collate
+
+
+Point = collections.namedtuple("Point", ["x", "y"])
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestDefaultCollate(flow.unittest.TestCase):
+    def _make_sample(test_case, i):
+        return {
+            "image": np.full((3, 4), i, dtype=np.float32),
+            "label": i,
+            "weight": float(i) / 2,
+            "mask": flow.ones(2, dtype=flow.int8) * i,
+            "point": Point(np.int32(i), [i, i + 1]),
+            "name": "sample_{}".format(i),
+        }
+
+    def _check(test_case, batch, indices):
+        test_case.assertEqual(batch["image"].shape, flow.Size([len(indices), 3, 4]))
+        test_case.assertEqual(batch["image"].dtype, flow.float32)
+        test_case.assertTrue(
+            np.array_equal(batch["image"].numpy()[:, 0, 0], np.array(indices))
+        )
+        test_case.assertEqual(batch["label"].dtype, flow.int64)
+        test_case.assertEqual(batch["label"].numpy().tolist(), indices)
+        test_case.assertEqual(batch["weight"].dtype, flow.float64)
+        test_case.assertEqual(batch["mask"].dtype, flow.int8)
+        test_case.assertEqual(batch["mask"].numpy()[:, 1].tolist(), indices)
+        test_case.assertTrue(isinstance(batch["point"], Point))
+        test_case.assertEqual(batch["point"].x.dtype, flow.int32)
+        test_case.assertEqual(
+            batch["point"].y[1].numpy().tolist(), [i + 1 for i in indices]
+        )
+        test_case.assertEqual(batch["name"], ["sample_{}".format(i) for i in indices])
+
+    def test_nested_batch(test_case):
+        for indices in [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]:
+            batch = default_collate([test_case._make_sample(i) for i in indices])
+            test_case._check(batch, indices)
+
+    def test_layout_change(test_case):
+        # the cached layout does not match, the batch is collated anyway
+        batch = default_collate(
+            [np.zeros((2,), dtype=np.float32), np.ones((2,), dtype=np.float32)]
+        )
+        test_case.assertEqual(batch.shape, flow.Size([2, 2]))
+        batch = default_collate([np.zeros((3,), dtype=np.float64)] * 2)
+        test_case.assertEqual(batch.shape, flow.Size([2, 3]))
+        test_case.assertEqual(batch.dtype, flow.float64)
+        with test_case.assertRaises(RuntimeError):
+            default_collate([[1, 2], [1]])
+
+    def test_bool_and_numpy_scalar(test_case):
+        batch = default_collate([(True, np.float32(1.5)), (False, np.float32(2.5))])
+        test_case.assertEqual(batch[0].dtype, flow.bool)
+        test_case.assertEqual(batch[1].dtype, flow.float32)
+        test_case.assertEqual(batch[1].numpy().tolist(), [1.5, 2.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+class IndexDataset(flow.utils.data.Dataset):
+    def __init__(self, length=64, dim=32):
+        self.length = length
+        self.dim = dim
+
+    def __getitem__(self, index):
+        return np.full((self.dim,), index, dtype=np.float32), index
+
+    def __len__(self):
+        return self.length
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestSharedMemoryTransport(flow.unittest.TestCase):
+    def _check_batches(test_case, dataloader, epochs=3):
+        for _ in range(epochs):
+            seen = []
+            for x, idx in dataloader:
+                test_case.assertEqual(x.shape, flow.Size([8, 32]))
+                test_case.assertTrue(
+                    np.array_equal(
+                        x.numpy(), np.repeat(idx.numpy()[:, None], 32, axis=1)
+                    )
+                )
+                seen.extend(idx.numpy().tolist())
+            test_case.assertEqual(sorted(seen), list(range(64)))
+
+    def test_multiprocess_transport(test_case):
+        dataloader = flow.utils.data.DataLoader(
+            IndexDataset(), batch_size=8, shuffle=True, num_workers=2
+        )
+        test_case._check_batches(dataloader)
+
+    def test_persistent_workers_transport(test_case):
+        dataloader = flow.utils.data.DataLoader(
+            IndexDataset(),
+            batch_size=8,
+            shuffle=True,
+            num_workers=2,
+            persistent_workers=True,
+        )
+        test_case._check_batches(dataloader)
+
+    @unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
+    def test_pin_memory(test_case):
+        for num_workers in [0, 2]:
+            dataloader = flow.utils.data.DataLoader(
+                IndexDataset(), batch_size=8, num_workers=num_workers, pin_memory=True
+            )
+            test_case._check_batches(dataloader, epochs=1)
+            x, _ = next(iter(dataloader))
+            # pinning an already pinned tensor returns it unchanged
+            test_case.assertTrue(x.pin_memory() is x)
+
+    def test_tensor_survives_slab_reuse(test_case):
+        dataloader = flow.utils.data.DataLoader(
+            IndexDataset(), batch_size=8, num_workers=2
+        )
+        kept = [x for x, _ in dataloader]
+        for i, x in enumerate(kept):
+            test_case.assertTrue(
+                np.array_equal(
+                    x.numpy(), np.repeat(np.arange(i * 8, i * 8 + 8)[:, None], 32, 1)
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Prints the host overhead per call of a small graph with nested inputs and
+# outputs, with the outputs copied and with the outputs buffers reused:
+#
+#   python3 graph_call_overhead_benchmark.py [--iters 1000] [--repeat 5]
+import argparse
+import time
+
+import oneflow as flow
+
+from test_graph_call_overhead import NestedIOGraph, _make_inputs
+
+
+def _per_call_us(graph, inputs, iters):
+    graph(*inputs[0][:2], scale=inputs[0][2])
+    start = time.perf_counter()
+    for i in range(iters):
+        (x, pair, scale) = inputs[i % len(inputs)]
+        out = graph(x, pair, scale=scale)
+    out["sum"].numpy()
+    return (time.perf_counter() - start) / iters * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iters", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = [_make_inputs(i) for i in range(4)]
+    for (name, reuse_outputs) in (("copy", False), ("reuse", True)):
+        graph = NestedIOGraph(reuse_outputs=reuse_outputs)
+        # the best of a few runs, the others are mostly noise of the machine
+        us = min(_per_call_us(graph, inputs, args.iters) for _ in range(args.repeat))
+        print(f"{name}: {us:.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
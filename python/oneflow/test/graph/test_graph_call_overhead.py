@@ -0,0 +1,92 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+class NestedIOGraph(flow.nn.Graph):
+    def __init__(self, reuse_outputs=False):
+        super().__init__()
+        self.config.enable_outputs_buffer_reuse(reuse_outputs)
+
+    def build(self, x, pair, scale=None):
+        y = x + pair[0]
+        return {"sum": y, "pair": [y * pair[1], None], "scale": scale * 2}
+
+
+def _make_inputs(i):
+    x = flow.tensor([float(i)] * 4)
+    pair = (flow.ones(4), flow.tensor([2.0] * 4))
+    return x, pair, flow.tensor([float(i)])
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestGraphCallOverhead(oneflow.unittest.TestCase):
+    def _check_outputs(test_case, out, i):
+        test_case.assertTrue(np.array_equal(out["sum"].numpy(), [i + 1.0] * 4))
+        test_case.assertEqual(len(out["pair"]), 2)
+        test_case.assertTrue(
+            np.array_equal(out["pair"][0].numpy(), [(i + 1.0) * 2] * 4)
+        )
+        test_case.assertIsNone(out["pair"][1])
+        test_case.assertTrue(np.array_equal(out["scale"].numpy(), [i * 2.0]))
+
+    def test_nested_io(test_case):
+        graph = NestedIOGraph()
+        outs = []
+        for i in range(5):
+            x, pair, scale = _make_inputs(i)
+            outs.append(graph(x, pair, scale=scale))
+        # outputs are copies, earlier ones are not overwritten
+        for i, out in enumerate(outs):
+            test_case._check_outputs(out, i)
+
+    def test_outputs_buffer_reuse(test_case):
+        graph = NestedIOGraph(reuse_outputs=True)
+        for i in range(5):
+            x, pair, scale = _make_inputs(i)
+            test_case._check_outputs(graph(x, pair, scale=scale), i)
+
+    def test_outputs_buffer_reuse_matches_copy(test_case):
+        copy_graph = NestedIOGraph()
+        reuse_graph = NestedIOGraph(reuse_outputs=True)
+        copy_outs = []
+        reuse_outs = []
+        for i in range(4):
+            x, pair, scale = _make_inputs(i)
+            copy_out = copy_graph(x, pair, scale=scale)
+            reuse_out = reuse_graph(x, pair, scale=scale)
+            for key in ("sum", "scale"):
+                test_case.assertTrue(
+                    np.array_equal(copy_out[key].numpy(), reuse_out[key].numpy())
+                )
+            copy_outs.append(copy_out)
+            reuse_outs.append(reuse_out)
+        # with the default outputs_buffer_size of 2, every other call returns
+        # the same buffer tensors, while copies are always new tensors
+        for i in range(2):
+            for key in ("sum", "scale"):
+                test_case.assertTrue(reuse_outs[i][key] is reuse_outs[i + 2][key])
+                test_case.assertFalse(reuse_outs[i][key] is reuse_outs[i + 1][key])
+                test_case.assertFalse(copy_outs[i][key] is copy_outs[i + 2][key])
+
+
+if __name__ == "__main__":
+    unittest.main()
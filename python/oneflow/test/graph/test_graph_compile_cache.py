@@ -0,0 +1,123 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+class LinearGraph(flow.nn.Graph):
+    def __init__(self, linear, cache_dir):
+        super().__init__()
+        self.linear = linear
+        self.config.enable_compile_cache(cache_dir)
+
+    def build(self, x):
+        return self.linear(x)
+
+
+# Builds the same graph as a fresh process would, and reports whether its plan came
+# from the compile cache and how far its output is from eager.
+_RUN_CACHED_GRAPH = """
+import json
+import sys
+
+import numpy as np
+import oneflow as flow
+
+
+class LinearGraph(flow.nn.Graph):
+    def __init__(self, linear, cache_dir):
+        super().__init__()
+        self.linear = linear
+        self.config.enable_compile_cache(cache_dir)
+
+    def build(self, x):
+        return self.linear(x)
+
+
+flow.manual_seed(0)
+linear = flow.nn.Linear(3, 8, False)
+x = flow.randn(4, 3)
+graph = LinearGraph(linear, sys.argv[1])
+graph_out = graph(x)
+print(
+    json.dumps(
+        {
+            "cache_hit": graph._c_nn_graph.compile_cache_hit,
+            "max_diff": float(np.abs(graph_out.numpy() - linear(x).numpy()).max()),
+        }
+    )
+)
+"""
+
+
+def _run_cached_graph_in_new_process(cache_dir):
+    output = subprocess.check_output(
+        [sys.executable, "-c", _RUN_CACHED_GRAPH, cache_dir], env=os.environ.copy()
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestGraphCompileCache(oneflow.unittest.TestCase):
+    def test_compile_cache_save(test_case):
+        linear = flow.nn.Linear(3, 8, False)
+        x = flow.randn(4, 3)
+        eager_out = linear(x)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            graph = LinearGraph(linear, cache_dir)
+            test_case.assertTrue(
+                np.allclose(graph(x).numpy(), eager_out.numpy(), 1e-05, 1e-05)
+            )
+            entries = os.listdir(cache_dir)
+            test_case.assertEqual(len(entries), 1)
+            test_case.assertEqual(
+                sorted(os.listdir(os.path.join(cache_dir, entries[0]))),
+                ["job.pb", "plan.pb"],
+            )
+
+            # Another graph has another job name and id, so it misses the cache.
+            other_graph = LinearGraph(linear, cache_dir)
+            test_case.assertTrue(
+                np.allclose(other_graph(x).numpy(), eager_out.numpy(), 1e-05, 1e-05)
+            )
+            test_case.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_compile_cache_reuse_in_new_process(test_case):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = _run_cached_graph_in_new_process(cache_dir)
+            test_case.assertFalse(first["cache_hit"])
+            test_case.assertLess(first["max_diff"], 1e-05)
+            entries = os.listdir(cache_dir)
+            test_case.assertEqual(len(entries), 1)
+
+            second = _run_cached_graph_in_new_process(cache_dir)
+            test_case.assertTrue(second["cache_hit"])
+            test_case.assertLess(second["max_diff"], 1e-05)
+            # A hit reuses the entry instead of adding one.
+            test_case.assertEqual(os.listdir(cache_dir), entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+
+
+class BucketedLinearGraph(flow.nn.Graph):
+    def __init__(self, linear):
+        super().__init__()
+        self.linear = linear
+        self.config.set_shape_buckets(
+            {0: [2, 4], 1: [4, 8]}, output_dims=[(0, 1, None), (0,)]
+        )
+
+    def build(self, x, mask):
+        return self.linear(x) * mask.unsqueeze(-1), mask.sum(dim=1)
+
+
+class UndeclaredOutputGraph(flow.nn.Graph):
+    def __init__(self, linear):
+        super().__init__()
+        self.linear = linear
+        self.config.set_shape_buckets({1: [4, 8]})
+
+    def build(self, x):
+        return self.linear(x)
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestGraphShapeBuckets(oneflow.unittest.TestCase):
+    def test_shape_buckets(test_case):
+        linear = flow.nn.Linear(3, 5)
+        graph = BucketedLinearGraph(linear)
+        for batch, seq_len in [(1, 3), (2, 4), (3, 5), (4, 8), (1, 2)]:
+            x = flow.randn(batch, seq_len, 3)
+            mask = flow.ones(batch, seq_len)
+            out, mask_sum = graph(x, mask)
+            test_case.assertEqual(out.shape, flow.Size([batch, seq_len, 5]))
+            test_case.assertTrue(
+                np.allclose(out.numpy(), linear(x).numpy(), 1e-05, 1e-05)
+            )
+            # padded positions are zeros
+            test_case.assertTrue(np.array_equal(mask_sum.numpy(), [seq_len] * batch))
+        # (1, 3) and (1, 2) -> (2, 4), (3, 5) -> (4, 8), (4, 8) -> (4, 8)
+        test_case.assertEqual(
+            sorted(graph._shape_bucket_graphs.keys()), [(2, 4), (4, 8)]
+        )
+
+        # The bucket graphs share the parameters.
+        with flow.no_grad():
+            linear.weight.fill_(1.0)
+        x = flow.randn(1, 3, 3)
+        out, _ = graph(x, flow.ones(1, 3))
+        test_case.assertTrue(np.allclose(out.numpy(), linear(x).numpy(), 1e-05, 1e-05))
+
+    def test_output_dim_of_bucket_size(test_case):
+        # The feature dim of the output has the size of the padded seq_len bucket.
+        linear = flow.nn.Linear(3, 4)
+        graph = BucketedLinearGraph(linear)
+        x = flow.randn(2, 3, 3)
+        out, _ = graph(x, flow.ones(2, 3))
+        test_case.assertEqual(out.shape, flow.Size([2, 3, 4]))
+        test_case.assertTrue(np.allclose(out.numpy(), linear(x).numpy(), 1e-05, 1e-05))
+
+        graph = UndeclaredOutputGraph(linear)
+        # nothing is padded, so there is nothing to slice
+        x = flow.randn(2, 4, 3)
+        out = graph(x)
+        test_case.assertEqual(out.shape, flow.Size([2, 4, 4]))
+        test_case.assertTrue(np.allclose(out.numpy(), linear(x).numpy(), 1e-05, 1e-05))
+        with test_case.assertRaises(ValueError):
+            graph(flow.randn(2, 3, 3))
+
+    def test_exceeds_largest_bucket(test_case):
+        graph = BucketedLinearGraph(flow.nn.Linear(3, 5))
+        with test_case.assertRaises(ValueError):
+            graph(flow.randn(5, 2, 3), flow.ones(5, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -147,6 +147,78 @@ def _test_clip_grad_norm_consistent_impl(
     )
 
 
+def _make_many_grads(device, num_params):
+    np_grads = [np.random.randn(i % 7 + 1, 3) for i in range(num_params)]
+    params = []
+    for np_grad in np_grads:
+        param = flow.nn.Parameter(
+            flow.zeros(*np_grad.shape, dtype=flow.float32, device=device)
+        )
+        param.grad = flow.tensor(np_grad, dtype=flow.float32, device=device)
+        params.append(param)
+    return np_grads, params
+
+
+def _test_clip_grad_norm_many_params_impl(
+    test_case, device, num_params, max_norm, norm_type
+):
+    np_grads, params = _make_many_grads(device, num_params)
+    norm_type = float(norm_type)
+    flat = np.concatenate([g.flatten() for g in np_grads])
+    if norm_type == float("inf"):
+        np_total_norm = np.max(np.abs(flat))
+    elif norm_type == float("-inf"):
+        np_total_norm = np.min(np.abs(flat))
+    else:
+        np_total_norm = np.sum(np.abs(flat) ** norm_type) ** (1.0 / norm_type)
+    clip_coef = min(max_norm / (np_total_norm + 1e-6), 1.0)
+
+    of_total_norm = flow.nn.utils.clip_grad_norm_(params, max_norm, norm_type)
+    test_case.assertTrue(np.allclose(of_total_norm.numpy(), np_total_norm, 1e-4, 1e-4))
+    for (param, np_grad) in zip(params, np_grads):
+        test_case.assertTrue(
+            np.allclose(param.grad.numpy(), np_grad * clip_coef, 1e-4, 1e-4)
+        )
+
+
+def _test_clip_grad_value_many_params_impl(test_case, device, num_params, clip_value):
+    np_grads, params = _make_many_grads(device, num_params)
+    flow.nn.utils.clip_grad_value_(params, clip_value)
+    for (param, np_grad) in zip(params, np_grads):
+        test_case.assertTrue(
+            np.allclose(
+                param.grad.numpy(), np.clip(np_grad, -clip_value, clip_value), 1e-5
+            )
+        )
+
+
+def _test_clip_grad_norm_nonfinite(test_case, device):
+    np_grads, params = _make_many_grads(device, 3)
+    params[1].grad[0, 0] = float("nan")
+    np_grads[1][0, 0] = float("nan")
+    optimizer = flow.optim.SGD(params, lr=0.1)
+    np_params = [p.numpy() for p in params]
+    # the clip call does not wait for the device, the gradients are left
+    # unscaled and the error is raised by the next optimizer step
+    flow.nn.utils.clip_grad_norm_(params, 1.0, error_if_nonfinite=True)
+    for (param, np_grad) in zip(params, np_grads):
+        test_case.assertTrue(
+            np.allclose(param.grad.numpy(), np_grad, 1e-5, equal_nan=True)
+        )
+    with test_case.assertRaises(RuntimeError):
+        optimizer.step()
+    for (param, np_param) in zip(params, np_params):
+        test_case.assertTrue(np.array_equal(param.numpy(), np_param))
+    # the check is consumed by the step which raised it
+    optimizer.zero_grad()
+    optimizer.step()
+
+    np_grads, params = _make_many_grads(device, 3)
+    optimizer = flow.optim.SGD(params, lr=0.1)
+    flow.nn.utils.clip_grad_norm_(params, 1.0, error_if_nonfinite=True)
+    optimizer.step()
+
+
 @flow.unittest.skip_unless_1n1d()
 class TestClipGrad(flow.unittest.TestCase):
     def test_clip_grad(test_case):
@@ -167,6 +239,26 @@ class TestClipGrad(flow.unittest.TestCase):
             _test_clip_grad_value_impl(test_case, *arg)
             _test_graph_clip_grad_value_impl(test_case, *arg)
 
+    def test_clip_grad_many_params(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        # more parameters than a single multi tensor kernel launch takes
+        arg_dict["num_params"] = [1, 10, 300]
+        arg_dict["max_norm"] = [0.5, 100.0]
+        arg_dict["norm_type"] = ["inf", "-inf", 1.0, 2.0, 3.5]
+        for arg in GenArgList(arg_dict):
+            _test_clip_grad_norm_many_params_impl(test_case, *arg)
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        arg_dict["num_params"] = [1, 300]
+        arg_dict["clip_value"] = [0, 0.5]
+        for arg in GenArgList(arg_dict):
+            _test_clip_grad_value_many_params_impl(test_case, *arg)
+
+    def test_clip_grad_norm_nonfinite(test_case):
+        for device in ["cpu", "cuda"]:
+            _test_clip_grad_norm_nonfinite(test_case, device)
+
 
 @unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
 class TestClipGradConsistent(flow.unittest.TestCase):
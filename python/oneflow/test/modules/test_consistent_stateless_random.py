@@ -0,0 +1,116 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+from oneflow.test_utils.automated_test_util import *
+
+
+_distribution_args = [
+    dict(distribution="uniform", low=-0.5, high=2.0),
+    dict(distribution="normal", mean=1.0, std=3.0),
+    dict(distribution="truncated_normal", mean=0.0, std=1.0, low=-2.0, high=2.0),
+]
+
+
+def _broadcast_sbp(placement):
+    return [flow.sbp.broadcast for _ in range(len(placement.ranks.shape))]
+
+
+def _to_numpy(x):
+    return x.to_global(sbp=_broadcast_sbp(x.placement)).to_local().numpy()
+
+
+def _test_stateless_random_sbp_invariant(test_case, shape, placement, sbp):
+    for kwargs in _distribution_args:
+        kwargs = dict(kwargs)
+        distribution = kwargs.pop("distribution")
+        x = flow._C.stateless_random(
+            shape, distribution, 2022, placement=placement, sbp=sbp, **kwargs
+        )
+        test_case.assertEqual(x.shape, flow.Size(shape))
+        test_case.assertEqual(x.sbp, sbp)
+        ref = flow._C.stateless_random(
+            shape,
+            distribution,
+            2022,
+            placement=placement,
+            sbp=_broadcast_sbp(placement),
+            **kwargs,
+        )
+        x_np = _to_numpy(x)
+        test_case.assertTrue(np.array_equal(x_np, _to_numpy(ref)))
+        if "low" in kwargs:
+            test_case.assertTrue(np.all(x_np >= kwargs["low"]))
+            test_case.assertTrue(np.all(x_np <= kwargs["high"]))
+
+
+def _test_init_sbp_invariant(test_case, shape, placement, sbp):
+    ref = flow.nn.Parameter(
+        flow.empty(*shape, placement=placement, sbp=_broadcast_sbp(placement))
+    )
+    x = flow.nn.Parameter(flow.empty(*shape, placement=placement, sbp=sbp))
+    for init in [
+        lambda t: flow.nn.init.uniform_(t, -1.0, 1.0),
+        lambda t: flow.nn.init.normal_(t, 0.0, 0.02),
+        lambda t: flow.nn.init.kaiming_uniform_(t, a=0.1),
+        lambda t: flow.nn.init.kaiming_normal_(t),
+        flow.nn.init.xavier_uniform_,
+        flow.nn.init.xavier_normal_,
+    ]:
+        flow.manual_seed(123)
+        init(ref)
+        flow.manual_seed(123)
+        init(x)
+        test_case.assertEqual(x.sbp, sbp)
+        test_case.assertTrue(np.array_equal(_to_numpy(x), _to_numpy(ref)))
+
+
+class TestStatelessRandomConsistent(flow.unittest.TestCase):
+    @globaltest
+    def test_stateless_random_sbp_invariant(test_case):
+        for shape in [(8,), (8, 16), (8, 4, 6)]:
+            for placement in all_placement():
+                for sbp in all_sbp(
+                    placement, max_dim=len(shape), except_partial_sum=True
+                ):
+                    _test_stateless_random_sbp_invariant(
+                        test_case, shape, placement, sbp
+                    )
+
+    @globaltest
+    def test_init_sbp_invariant(test_case):
+        for shape in [(8, 16), (8, 4, 2, 2)]:
+            for placement in all_placement():
+                for sbp in all_sbp(placement, max_dim=len(shape)):
+                    _test_init_sbp_invariant(test_case, shape, placement, sbp)
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_stateless_random_local(test_case):
+        x = flow._C.stateless_random((1000,), "uniform", 7, low=0.0, high=1.0)
+        y = flow._C.stateless_random((1000,), "uniform", 7, low=0.0, high=1.0)
+        test_case.assertTrue(np.array_equal(x.numpy(), y.numpy()))
+        test_case.assertTrue(np.all(x.numpy() >= 0.0))
+        test_case.assertTrue(np.all(x.numpy() < 1.0))
+        z = flow._C.stateless_random((1000,), "uniform", 8, low=0.0, high=1.0)
+        test_case.assertFalse(np.array_equal(x.numpy(), z.numpy()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -304,6 +304,247 @@ class TestDDP(flow.unittest.TestCase):
         for dev_type in test_device:
             test_case._test_broadcast_buffer(dev_type)
 
+    def _test_ddp_bucket_by_bytes(test_case, dev_type):
+        class Mul(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                for i in range(4):
+                    self.register_parameter(
+                        f"w{i}", flow.nn.Parameter(flow.ones(256 * 1024))
+                    )
+
+            def forward(self, x):
+                for i in range(4):
+                    x = x * getattr(self, f"w{i}")
+                return x
+
+        rank = flow.env.get_rank()
+        x = flow.ones(256 * 1024, device=dev_type) * (rank + 1)
+        m = Mul().to(dev_type)
+        # every parameter has 1MB of gradient, so a bucket holds two of them
+        m = ddp(m, bucket_cap_mb=2)
+        test_case.assertEqual(len(m._buckets), 2)
+        test_case.assertTrue(all(len(b.params) == 2 for b in m._buckets))
+
+        for _ in range(2):
+            m(x).sum().backward()
+            for i in range(4):
+                test_case.assertTrue(np.allclose(getattr(m, f"w{i}").grad.numpy(), 1.5))
+            m.zero_grad()
+
+    def test_ddp_bucket_by_bytes(test_case):
+        for dev_type in test_device:
+            test_case._test_ddp_bucket_by_bytes(dev_type)
+
+    def _test_ddp_rebuild_buckets(test_case, dev_type):
+        class Model(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w1 = flow.nn.Parameter(flow.Tensor([1]))
+                self.w2 = flow.nn.Parameter(flow.Tensor([2]))
+                self.w3 = flow.nn.Parameter(flow.Tensor([3]))
+
+            def forward(self, x):
+                # the gradient of w1 is ready first
+                x = x * self.w3
+                x = x * self.w2
+                return x * self.w1
+
+        rank = flow.env.get_rank()
+        x = flow.Tensor([rank + 1]).to(dev_type)
+        m = Model().to(dev_type)
+        m = ddp(m, bucket_size=1)
+        test_case.assertTrue(m._buckets[0].params[0] is m.w3)
+
+        m(x).backward()
+        m(x).backward()
+        test_case.assertTrue(m._buckets[0].params[0] is m.w1)
+        test_case.assertTrue(np_allclose_with_shape(m.w1.grad.numpy(), np.array([18])))
+        test_case.assertTrue(np_allclose_with_shape(m.w2.grad.numpy(), np.array([9])))
+        test_case.assertTrue(np_allclose_with_shape(m.w3.grad.numpy(), np.array([6])))
+
+    def test_ddp_rebuild_buckets(test_case):
+        for dev_type in test_device:
+            test_case._test_ddp_rebuild_buckets(dev_type)
+
+    def _test_ddp_mixed_dtypes(test_case, dev_type):
+        class Mul(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w1 = flow.nn.Parameter(flow.ones(2, dtype=flow.float64))
+                self.w2 = flow.nn.Parameter(flow.ones(2))
+
+            def forward(self, x):
+                return (x.to(flow.float64) * self.w1).to(flow.float32) * self.w2
+
+        rank = flow.env.get_rank()
+        x = flow.Tensor([rank + 1, rank + 1]).to(dev_type)
+        m = Mul().to(dev_type)
+        m = ddp(m)
+        test_case.assertEqual(len(m._buckets), 1)
+        test_case.assertEqual(len(m._buckets[0].tensors), 2)
+        m(x).sum().backward()
+        test_case.assertEqual(m.w1.grad.dtype, flow.float64)
+        test_case.assertTrue(
+            np_allclose_with_shape(m.w1.grad.numpy(), np.array([1.5, 1.5]))
+        )
+        test_case.assertTrue(
+            np_allclose_with_shape(m.w2.grad.numpy(), np.array([1.5, 1.5]))
+        )
+
+    def test_ddp_mixed_dtypes(test_case):
+        for dev_type in test_device:
+            test_case._test_ddp_mixed_dtypes(dev_type)
+
+    def _test_ddp_comm_hook(test_case, dev_type, hook, state, rtol):
+        class Model(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w = flow.nn.Parameter(flow.ones(16, 8))
+                self.b = flow.nn.Parameter(flow.ones(8))
+
+            def forward(self, x):
+                return flow.matmul(x, self.w) + self.b
+
+        rank = flow.env.get_rank()
+        x = flow.ones(2, 16, device=dev_type) * (rank + 1)
+        m = Model().to(dev_type)
+        m = ddp(m)
+        m.register_comm_hook(state, hook)
+        m(x).sum().backward()
+
+        # the gradients of w are rank-one and the same in all columns, so
+        # they are also recovered by the compressing hooks
+        test_case.assertTrue(np.allclose(m.w.grad.numpy(), 3.0, rtol=rtol))
+        test_case.assertTrue(np.allclose(m.b.grad.numpy(), 2.0, rtol=rtol))
+        test_case.assertTrue(state.bytes_sent > 0)
+        test_case.assertTrue(state.bytes_uncompressed > 0)
+
+    def _test_ddp_topk_error_feedback(test_case, dev_type):
+        from oneflow.nn.parallel import comm_hooks
+
+        class Mul(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                # 128 float32 elements fill a bucket without padding
+                self.w = flow.nn.Parameter(flow.ones(128))
+
+            def forward(self, x):
+                return x * self.w
+
+        world_size = flow.env.get_world_size()
+        rank = flow.env.get_rank()
+        np_grad = np.arange(1, 129, dtype=np.float32) * (rank + 1)
+        dense = np.arange(1, 129, dtype=np.float32) * (world_size + 1) / 2
+        x = flow.tensor(np_grad, device=dev_type)
+        m = ddp(Mul().to(dev_type))
+        state = comm_hooks.TopKState(compress_ratio=0.25)
+        m.register_comm_hook(state, comm_hooks.topk_hook)
+
+        updates = []
+        for _ in range(100):
+            m(x).sum().backward()
+            updates.append(m.w.grad.numpy())
+            m.zero_grad()
+        (residual,) = state.error_dict.values()
+
+        # the 32 largest gradients are sent, the others are carried into the
+        # next step, where they are the largest ones
+        expected = np.where(np.arange(128) >= 96, dense, 0)
+        test_case.assertTrue(np.allclose(updates[0], expected, 1e-5, 1e-5))
+        expected = np.where((np.arange(128) >= 64) & (np.arange(128) < 96), 2, 0)
+        test_case.assertTrue(np.allclose(updates[1], expected * dense, 1e-5, 1e-5))
+
+        # nothing is lost: the updates and the residuals left on the ranks sum
+        # up to the dense all-reduced gradients, so the updates converge to them
+        flow.comm.all_reduce(residual)
+        total = np.sum(updates, axis=0)
+        test_case.assertTrue(
+            np.allclose(
+                total + residual.numpy() / world_size, dense * len(updates), 1e-4
+            )
+        )
+        mean_error = np.abs(total / len(updates) - dense).max()
+        test_case.assertLess(mean_error, 0.05 * dense.max())
+
+    def test_ddp_comm_hooks(test_case):
+        from oneflow.nn.parallel import comm_hooks
+
+        for dev_type in test_device:
+            test_case._test_ddp_comm_hook(
+                dev_type, comm_hooks.allreduce_hook, comm_hooks.DefaultState(), 1e-5
+            )
+            state = comm_hooks.PowerSGDState(start_powerSGD_iter=0)
+            test_case._test_ddp_comm_hook(
+                dev_type, comm_hooks.powerSGD_hook, state, 1e-4
+            )
+            test_case.assertTrue(state.bytes_sent < state.bytes_uncompressed)
+        if "cuda" in test_device:
+            for hook in [comm_hooks.fp16_compress_hook, comm_hooks.bf16_compress_hook]:
+                state = comm_hooks.DefaultState()
+                test_case._test_ddp_comm_hook("cuda", hook, state, 1e-2)
+                test_case.assertEqual(state.bytes_sent * 2, state.bytes_uncompressed)
+            state = comm_hooks.TopKState(compress_ratio=1.0)
+            test_case._test_ddp_comm_hook("cuda", comm_hooks.topk_hook, state, 1e-5)
+            test_case._test_ddp_topk_error_feedback("cuda")
+
+    def _test_ddp_no_sync(test_case, dev_type):
+        class Mul(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w = flow.nn.Parameter(flow.Tensor([1, 1]))
+
+            def forward(self, x):
+                return x * self.w
+
+        rank = flow.env.get_rank()
+        x = flow.Tensor([rank + 1, rank + 1]).to(dev_type)
+        m = Mul().to(dev_type)
+        m = ddp(m)
+
+        with m.no_sync():
+            m(x).sum().backward()
+        # the gradient is not synchronized inside no_sync
+        test_case.assertTrue(
+            np_allclose_with_shape(m.w.grad.numpy(), np.array([rank + 1] * 2))
+        )
+        m(x).sum().backward()
+        test_case.assertTrue(np_allclose_with_shape(m.w.grad.numpy(), np.array([3, 3])))
+
+    def test_ddp_no_sync(test_case):
+        for dev_type in test_device:
+            test_case._test_ddp_no_sync(dev_type)
+
+    def _test_ddp_static_graph(test_case, dev_type):
+        class Mul(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w1 = flow.nn.Parameter(flow.Tensor([1, 1]))
+                self.w2 = flow.nn.Parameter(flow.Tensor([2, 2]))
+
+            def forward(self, x):
+                return x * self.w1 * self.w2
+
+        rank = flow.env.get_rank()
+        x = flow.Tensor([rank + 1, rank + 1]).to(dev_type)
+        m = Mul().to(dev_type)
+        m = ddp(m, static_graph=True)
+
+        for i in range(3):
+            m(x).sum().backward()
+            test_case.assertTrue(
+                np_allclose_with_shape(m.w1.grad.numpy(), np.array([3, 3]) * (i + 1))
+            )
+            test_case.assertTrue(
+                np_allclose_with_shape(
+                    m.w2.grad.numpy(), np.array([1.5, 1.5]) * (i + 1)
+                )
+            )
+
+    def test_ddp_static_graph(test_case):
+        for dev_type in test_device:
+            test_case._test_ddp_static_graph(dev_type)
+
 
 if __name__ == "__main__":
     unittest.main()
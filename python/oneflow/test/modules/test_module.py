@@ -201,6 +201,68 @@ class TestModule(flow.unittest.TestCase):
         res2 = m()
         test_case.assertTrue(np.array_equal(res1.numpy(), res2.numpy()))
 
+    @flow.unittest.skip_unless_1n1d()
+    def test_load_state_dict_with_mmap(test_case):
+        m = flow.nn.Linear(16, 8)
+        x = flow.randn(4, 16)
+        res1 = m(x)
+        with tempfile.TemporaryDirectory() as save_dir:
+            flow.save(m.state_dict(), save_dir)
+            loaded_state_dict = flow.load(save_dir, mmap=True)
+            test_case.assertTrue(
+                np.array_equal(loaded_state_dict["weight"].numpy(), m.weight.numpy())
+            )
+            m2 = flow.nn.Linear(16, 8)
+            m2.load_state_dict(loaded_state_dict)
+            # writing to a mmap-loaded tensor must not modify the checkpoint
+            loaded_state_dict["bias"].fill_(0)
+            reloaded_state_dict = flow.load(save_dir)
+            test_case.assertTrue(
+                np.array_equal(reloaded_state_dict["bias"].numpy(), m.bias.numpy())
+            )
+            del loaded_state_dict
+        res2 = m2(x)
+        test_case.assertTrue(np.array_equal(res1.numpy(), res2.numpy()))
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_async_save_state_dict(test_case):
+        m = flow.nn.Linear(16, 8)
+        expected_weight = m.weight.numpy().copy()
+        with tempfile.TemporaryDirectory() as save_dir:
+            handle = flow.save(m.state_dict(), save_dir, async_=True)
+            # tensors are snapshotted before flow.save returns
+            with flow.no_grad():
+                m.weight.fill_(0)
+            handle.wait()
+            test_case.assertTrue(handle.done())
+            test_case.assertTrue(
+                os.path.exists(os.path.join(save_dir, "snapshot_done"))
+            )
+            loaded_state_dict = flow.load(save_dir)
+        test_case.assertTrue(
+            np.array_equal(loaded_state_dict["weight"].numpy(), expected_weight)
+        )
+
+    @flow.unittest.skip_unless_1n1d()
+    def test_async_save_staging_pool(test_case):
+        from oneflow.framework import check_point_v2
+
+        pool = check_point_v2._StagingBufferPool(max_bytes=1024)
+        buffer = pool.acquire((64,), np.float32)
+        pool.release(buffer)
+        test_case.assertEqual(pool.free_bytes(), 256)
+        test_case.assertTrue(pool.acquire((64,), np.float32) is buffer)
+        test_case.assertEqual(pool.free_bytes(), 0)
+        # buffers beyond the cap are freed instead of cached
+        pool.release(np.empty(512, dtype=np.float32))
+        test_case.assertEqual(pool.free_bytes(), 0)
+
+        m = flow.nn.Linear(16, 8)
+        with tempfile.TemporaryDirectory() as save_dir:
+            flow.save(m.state_dict(), save_dir, async_=True)
+            check_point_v2.wait_async_saves()
+        test_case.assertEqual(check_point_v2._async_save_staging_pool.free_bytes(), 0)
+
     @flow.unittest.skip_unless_1n4d()
     def test_save_and_load_global_from_nested_dict(test_case):
         class CustomModule(flow.nn.Module):
@@ -255,6 +317,67 @@ class TestModule(flow.unittest.TestCase):
 
         test_case.assertTrue(np.array_equal(res1.numpy(), res2.numpy()))
 
+    @flow.unittest.skip_unless_1n1d()
+    def test_packed_save_state_dict(test_case):
+        m = flow.nn.Sequential(
+            *[flow.nn.Linear(4, 4) for _ in range(64)], flow.nn.BatchNorm1d(4)
+        )
+        state_dict = m.state_dict()
+        with tempfile.TemporaryDirectory() as save_dir:
+            flow.save(state_dict, save_dir, packed=True)
+            test_case.assertTrue(os.path.isfile(os.path.join(save_dir, "packed_data")))
+            for mmap in (False, True):
+                loaded_state_dict = flow.load(save_dir, mmap=mmap)
+                test_case.assertEqual(loaded_state_dict.keys(), state_dict.keys())
+                for (key, value) in state_dict.items():
+                    test_case.assertEqual(loaded_state_dict[key].dtype, value.dtype)
+                    test_case.assertTrue(
+                        np.array_equal(loaded_state_dict[key].numpy(), value.numpy())
+                    )
+                del loaded_state_dict
+
+    @flow.unittest.skip_unless_1n4d()
+    def test_sharded_save_and_load_global(test_case):
+        class CustomModule(flow.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.param = flow.nn.Parameter(flow.randn(3, 33, 3, 3))
+
+            def forward(self):
+                return self.param
+
+        m1 = CustomModule()
+        m1 = m1.to_global(
+            flow.placement("cuda", range(4)), flow.sbp.broadcast
+        ).to_global(sbp=flow.sbp.split(1))
+        res1 = m1()
+
+        with tempfile.TemporaryDirectory() as f:
+            # every rank must write into the same directory
+            f = flow.framework.check_point_v2._broadcast_py_object(f, 0)
+            flow.save(m1.state_dict(), f, sharded=True)
+
+            # load with the saved placement and sbp
+            loaded_state_dict = flow.load(f)
+            test_case.assertEqual(loaded_state_dict["param"].sbp, res1.sbp)
+            m2 = CustomModule()
+            m2 = m2.to_global(
+                flow.placement("cuda", range(4)), flow.sbp.broadcast
+            ).to_global(sbp=flow.sbp.split(1))
+            m2.load_state_dict(loaded_state_dict)
+            test_case.assertTrue(np.array_equal(res1.numpy(), m2().numpy()))
+
+            # reshard onto a 2d placement with another sbp
+            placement = flow.placement("cuda", [[0, 1], [2, 3]])
+            sbp = [flow.sbp.split(0), flow.sbp.split(2)]
+            loaded_state_dict = flow.load(f, placement=placement, sbp=sbp)
+            test_case.assertEqual(loaded_state_dict["param"].placement, placement)
+            test_case.assertEqual(loaded_state_dict["param"].sbp, tuple(sbp))
+            test_case.assertTrue(
+                np.array_equal(res1.numpy(), loaded_state_dict["param"].numpy())
+            )
+            flow.comm.barrier()
+
     @flow.unittest.skip_unless_1n1d()
     @unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
     def test_module_cpu_cuda(test_case):
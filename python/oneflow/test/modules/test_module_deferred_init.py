@@ -0,0 +1,198 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+from oneflow.test_utils.test_util import GenArgList
+
+
+def _make_model():
+    return flow.nn.Sequential(
+        flow.nn.Linear(5, 7), flow.nn.ReLU(), flow.nn.Linear(7, 3)
+    )
+
+
+def _test_deferred_init_load_state_dict(test_case, device):
+    model = _make_model().to(device).double()
+    with flow.nn.utils.deferred_init():
+        deferred_model = _make_model()
+    params = list(deferred_model.parameters())
+    for param in params:
+        test_case.assertTrue(flow.nn.utils.is_deferred(param))
+    deferred_model.to(device).double()
+    deferred_model.load_state_dict(model.state_dict())
+    for (param, deferred_param, ref) in zip(
+        params, deferred_model.parameters(), model.parameters()
+    ):
+        test_case.assertTrue(param is deferred_param)
+        test_case.assertFalse(flow.nn.utils.is_deferred(param))
+        test_case.assertEqual(param.device, flow.device(device))
+        test_case.assertEqual(param.dtype, flow.float64)
+        test_case.assertTrue(np.array_equal(param.numpy(), ref.numpy()))
+
+
+def _test_deferred_init_materialize(test_case, device):
+    flow.manual_seed(0)
+    model = _make_model().to(device)
+    flow.manual_seed(0)
+    with flow.nn.utils.deferred_init():
+        deferred_model = _make_model()
+    deferred_model.to(device)
+    flow.nn.utils.materialize_module(deferred_model)
+    for (param, ref) in zip(deferred_model.parameters(), model.parameters()):
+        test_case.assertFalse(flow.nn.utils.is_deferred(param))
+        test_case.assertEqual(param.device, flow.device(device))
+        test_case.assertTrue(param.requires_grad)
+        test_case.assertTrue(np.array_equal(param.numpy(), ref.numpy()))
+
+
+def _test_deferred_init_materialize_on_call(test_case, device):
+    with flow.nn.utils.deferred_init():
+        deferred_model = _make_model()
+    deferred_model.to(device)
+    optimizer = flow.optim.SGD(deferred_model.parameters(), lr=0.1)
+    x = flow.randn(4, 5, device=device)
+    deferred_model(x).sum().backward()
+    optimizer.step()
+    for param in deferred_model.parameters():
+        test_case.assertFalse(flow.nn.utils.is_deferred(param))
+        test_case.assertIsNotNone(param.grad)
+
+
+def _test_deferred_init_optimizer_before_materialize(test_case, device):
+    with flow.nn.utils.deferred_init():
+        deferred_model = _make_model()
+    deferred_model.to_global(flow.placement(device, ranks=[0]), flow.sbp.broadcast)
+    optimizer = flow.optim.SGD(deferred_model.parameters(), lr=0.1)
+    flow.nn.utils.materialize_module(deferred_model)
+    optimizer_params = optimizer.param_groups[0].parameters
+    test_case.assertEqual(len(optimizer_params), 4)
+    for (param, optimizer_param) in zip(deferred_model.parameters(), optimizer_params):
+        test_case.assertTrue(param is optimizer_param)
+        test_case.assertFalse(flow.nn.utils.is_deferred(param))
+        test_case.assertTrue(param.is_global)
+    before = [param.numpy() for param in optimizer_params]
+    deferred_model(
+        flow.randn(
+            4, 5, placement=optimizer_params[0].placement, sbp=flow.sbp.broadcast
+        )
+    ).sum().backward()
+    optimizer.step()
+    for (param, value) in zip(optimizer_params, before):
+        test_case.assertFalse(np.array_equal(param.numpy(), value))
+
+
+def _test_deferred_init_tied_parameters(test_case, device):
+    with flow.nn.utils.deferred_init():
+        encoder = flow.nn.Linear(5, 5)
+        decoder = flow.nn.Linear(5, 5)
+    decoder.weight = encoder.weight
+    decoder.to(device)
+    encoder.to(device)
+    x = flow.randn(4, 5, device=device)
+    decoder(x)
+    encoder(x)
+    test_case.assertTrue(encoder.weight is decoder.weight)
+    test_case.assertFalse(flow.nn.utils.is_deferred(encoder.weight))
+
+
+class _ReadsChildParameters(flow.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = flow.nn.Linear(5, 3)
+
+    def forward(self, x):
+        return flow.matmul(x, self.linear.weight.transpose(0, 1)) + self.linear.bias
+
+
+def _test_deferred_init_materialize_children_on_call(test_case, device):
+    flow.manual_seed(0)
+    model = _ReadsChildParameters().to(device)
+    flow.manual_seed(0)
+    with flow.nn.utils.deferred_init():
+        deferred_model = _ReadsChildParameters()
+    deferred_model.to(device)
+    x = flow.randn(4, 5, device=device)
+    test_case.assertTrue(
+        np.allclose(deferred_model(x).numpy(), model(x).numpy(), 1e-5, 1e-5)
+    )
+    # a child created under deferred_init and attached to a regular parent
+    parent = flow.nn.Module()
+    parent.forward = lambda x: flow.matmul(x, parent.child.weight.transpose(0, 1))
+    with flow.nn.utils.deferred_init():
+        parent.child = flow.nn.Linear(5, 3)
+    parent.to(device)
+    parent(x)
+    test_case.assertFalse(flow.nn.utils.is_deferred(parent.child.weight))
+
+
+def _test_deferred_init_embedding_padding_idx(test_case, device):
+    with flow.nn.utils.deferred_init():
+        embedding = flow.nn.Embedding(10, 4, padding_idx=2)
+    embedding.to(device)
+    flow.nn.utils.materialize_module(embedding)
+    weight = embedding.weight.numpy()
+    test_case.assertTrue(np.array_equal(weight[2], np.zeros(4)))
+    test_case.assertFalse(np.isnan(weight).any())
+
+
+def _test_deferred_init_untracked_write(test_case, device):
+    # the write itself may be rejected, otherwise it must not be dropped silently
+    with test_case.assertRaises(RuntimeError):
+        with flow.nn.utils.deferred_init():
+            model = flow.nn.Linear(5, 3)
+            with flow.no_grad():
+                model.weight[0].fill_(1.0)
+        model.to(device)
+    with test_case.assertRaises(RuntimeError):
+        with flow.nn.utils.deferred_init():
+            model = flow.nn.Linear(5, 3).to(device)
+            with flow.no_grad():
+                model.weight.data.copy_(flow.ones(3, 5, device=device))
+        flow.nn.utils.materialize_module(model)
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestModuleDeferredInit(flow.unittest.TestCase):
+    def test_deferred_init(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["test_fun"] = [
+            _test_deferred_init_load_state_dict,
+            _test_deferred_init_materialize,
+            _test_deferred_init_materialize_on_call,
+            _test_deferred_init_optimizer_before_materialize,
+            _test_deferred_init_tied_parameters,
+            _test_deferred_init_materialize_children_on_call,
+            _test_deferred_init_embedding_padding_idx,
+            _test_deferred_init_untracked_write,
+        ]
+        arg_dict["device"] = ["cpu", "cuda"]
+        for arg in GenArgList(arg_dict):
+            arg[0](test_case, *arg[1:])
+
+    def test_parameters_outside_context_are_not_deferred(test_case):
+        with flow.nn.utils.deferred_init():
+            pass
+        m = flow.nn.Linear(3, 4)
+        test_case.assertFalse(flow.nn.utils.is_deferred(m.weight))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+import oneflow as flow
+import oneflow.unittest
+from oneflow.test_utils.test_util import GenArgList
+
+
+def _make_model(device):
+    return flow.nn.Sequential(
+        flow.nn.Linear(5, 7), flow.nn.ReLU(), flow.nn.Linear(7, 3)
+    ).to(device)
+
+
+def _test_flatten_parameters_forward_backward(test_case, device):
+    model = _make_model(device)
+    flat_model = _make_model(device)
+    flat_model.load_state_dict(model.state_dict())
+    params = list(flat_model.parameters())
+    flat_model.flatten_parameters()
+
+    test_case.assertEqual(len(flat_model._flat_parameter_groups), 1)
+    group = flat_model._flat_parameter_groups[0]
+    for (param, flat_param) in zip(params, flat_model.parameters()):
+        test_case.assertTrue(param is flat_param)
+        test_case.assertTrue(flat_param.requires_grad)
+    for (param, ref) in zip(flat_model.parameters(), model.parameters()):
+        test_case.assertTrue(np.array_equal(param.numpy(), ref.numpy()))
+
+    x = flow.randn(4, 5, device=device)
+    for _ in range(2):
+        model(x).sum().backward()
+        flat_model(x).sum().backward()
+    for (param, ref) in zip(flat_model.parameters(), model.parameters()):
+        test_case.assertTrue(
+            np.allclose(param.grad.numpy(), ref.grad.numpy(), 1e-5, 1e-5)
+        )
+
+    # the gradients live in the flat gradient buffer
+    flat_grad = group.grad.numpy()
+    for (param, start) in zip(group.params, group.offsets):
+        test_case.assertTrue(
+            np.array_equal(
+                flat_grad[start : start + param.numel()], param.grad.numpy().flatten(),
+            )
+        )
+
+    # in-place updates through the parameters are visible in the flat buffer
+    with flow.no_grad():
+        for param in flat_model.parameters():
+            param.fill_(1.0)
+    flat_data = group.data.numpy()
+    for (param, start) in zip(group.params, group.offsets):
+        test_case.assertTrue(np.all(flat_data[start : start + param.numel()] == 1.0))
+
+
+def _test_flatten_parameters_zero_grad(test_case, device):
+    model = _make_model(device)
+    flat_model = _make_model(device)
+    flat_model.load_state_dict(model.state_dict())
+    flat_model.flatten_parameters()
+    group = flat_model._flat_parameter_groups[0]
+
+    x = flow.randn(4, 5, device=device)
+    flat_model(x).sum().backward()
+    flat_model.zero_grad()
+    test_case.assertTrue(np.all(group.grad.numpy() == 0))
+    for param in flat_model.parameters():
+        test_case.assertTrue(np.all(param.grad.numpy() == 0))
+
+    for _ in range(2):
+        x = flow.randn(4, 5, device=device)
+        for m in (model, flat_model):
+            m(x).sum().backward()
+        for (param, ref) in zip(flat_model.parameters(), model.parameters()):
+            test_case.assertTrue(
+                np.allclose(param.grad.numpy(), ref.grad.numpy(), 1e-5, 1e-5)
+            )
+        for m in (model, flat_model):
+            m.zero_grad(set_to_none=True)
+        for param in flat_model.parameters():
+            test_case.assertIsNone(param.grad)
+
+
+def _test_flatten_parameters_with_optimizer(test_case, device):
+    model = _make_model(device)
+    flat_model = _make_model(device)
+    flat_model.load_state_dict(model.state_dict())
+    optimizer = flow.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    flat_optimizer = flow.optim.SGD(flat_model.parameters(), lr=0.1, momentum=0.9)
+    flat_model.flatten_parameters()
+
+    for _ in range(3):
+        x = flow.randn(4, 5, device=device)
+        for (m, optim) in ((model, optimizer), (flat_model, flat_optimizer)):
+            m(x).sum().backward()
+            optim.step()
+            optim.zero_grad()
+    for (param, ref) in zip(flat_model.parameters(), model.parameters()):
+        test_case.assertTrue(np.allclose(param.numpy(), ref.numpy(), 1e-5, 1e-5))
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestModuleFlattenParameters(flow.unittest.TestCase):
+    def test_flatten_parameters(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["test_fun"] = [
+            _test_flatten_parameters_forward_backward,
+            _test_flatten_parameters_zero_grad,
+            _test_flatten_parameters_with_optimizer,
+        ]
+        arg_dict["device"] = ["cpu", "cuda"]
+        for arg in GenArgList(arg_dict):
+            arg[0](test_case, *arg[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,7 @@ from oneflow.nn.parameter import Parameter
 
 def compare_with_numpy_adam(
     test_case,
+    device,
     weight_decay,
     scale,
     learning_rate,
@@ -57,14 +58,14 @@ def compare_with_numpy_adam(
 
     def adam_by_oneflow():
         unique_embeddings_tensor = flow.tensor(init_value, requires_grad=False).to(
-            "cuda"
+            device
         )
         lr_tensor = flow.tensor(
             np.array(learning_rate).reshape(1,).astype(np.float32)
-        ).to("cuda")
+        ).to(device)
         down_scale_by_tensor = flow.tensor(
             np.array(down_scale_by).astype(np.float32)
-        ).to("cuda")
+        ).to(device)
 
         def train_one_iter(
             num_valid,
@@ -94,20 +95,20 @@ def compare_with_numpy_adam(
         for i in range(1, train_iters):
             num_valid_tensor = flow.tensor(
                 np.array(num_valid_seq[i]).reshape(1,).astype(np.int32)
-            ).to("cuda")
-            grad_tensor = flow.tensor(random_grad_seq[i]).to("cuda")
+            ).to(device)
+            grad_tensor = flow.tensor(random_grad_seq[i]).to(device)
             skip_if_tensor = flow.tensor(
                 np.array(skip_if_seq[i]).reshape(1,).astype(np.int64)
-            ).to("cuda")
+            ).to(device)
             if do_bias_correction:
                 bias_correction1 = 1.0 - np.power(beta1, i)
                 bias_correction2 = 1.0 - np.power(beta2, i)
                 bias_correction1_tensor = flow.tensor(
                     np.array(bias_correction1).reshape(1,).astype(np.float32)
-                ).to("cuda")
+                ).to(device)
                 bias_correction2_tensor = flow.tensor(
                     np.array(bias_correction2).reshape(1,).astype(np.float32)
-                ).to("cuda")
+                ).to(device)
             else:
                 bias_correction1_tensor = None
                 bias_correction2_tensor = None
@@ -180,11 +181,13 @@ def compare_with_numpy_adam(
     )
 
 
-@unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
 @flow.unittest.skip_unless_1n1d()
 class TestOptimizers(flow.unittest.TestCase):
     def test_one_embedding_adam(test_case):
         arg_dict = OrderedDict()
+        arg_dict["device"] = ["cuda", "cpu"]
+        if os.getenv("ONEFLOW_TEST_CPU_ONLY"):
+            arg_dict["device"] = ["cpu"]
         arg_dict["weight_decay"] = [0, 0.1]
         arg_dict["scale"] = [1, 0.1]
         arg_dict["learning_rate"] = [1, 1.5]
@@ -0,0 +1,95 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from collections import OrderedDict
+import tempfile
+
+import numpy as np
+from oneflow.test_utils.test_util import GenArgDict
+
+import oneflow as flow
+
+
+def _test_cpu_embedding_train(test_case, cache_budget_mb, batch_size):
+    num_rows = 64
+    embedding_size = 16
+    learning_rate = 0.5
+    ids = np.random.randint(0, num_rows, (batch_size,), dtype=np.int64)
+    grads = [
+        np.random.uniform(size=(batch_size, embedding_size)).astype(np.float32)
+        for _ in range(2)
+    ]
+
+    # the store outlives this test in the embedding manager, keep its files
+    persistent_path = tempfile.mkdtemp()
+    store_options = flow.one_embedding.make_cpu_store_options(
+        persistent_path=persistent_path,
+        capacity=num_rows,
+        cache_budget_mb=cache_budget_mb,
+    )
+    embedding = flow.one_embedding.MultiTableEmbedding(
+        name="cpu_embedding_{}_{}".format(cache_budget_mb, batch_size),
+        embedding_dim=embedding_size,
+        dtype=flow.float,
+        key_type=flow.int64,
+        tables=[
+            flow.one_embedding.make_table_options(
+                flow.one_embedding.make_uniform_initializer(low=-1, high=1)
+            )
+        ],
+        store_options=store_options,
+    )
+
+    class TrainGraph(flow.nn.Graph):
+        def __init__(self):
+            super().__init__()
+            self.embedding = embedding
+            self.add_optimizer(flow.optim.SGD(embedding.parameters(), lr=learning_rate))
+
+        def build(self, ids, grad):
+            values = self.embedding(ids)
+            (values * grad).sum().backward()
+            return values
+
+    graph = TrainGraph()
+    ids_tensor = flow.tensor(ids)
+    values = [graph(ids_tensor, flow.tensor(grad)).numpy() for grad in grads]
+
+    # the lookup returns the same row for duplicated ids
+    for i in range(batch_size):
+        first = np.where(ids == ids[i])[0][0]
+        test_case.assertTrue(np.array_equal(values[0][i], values[0][first]))
+    test_case.assertTrue(np.all(np.abs(values[0]) <= 1))
+    # the gradients of duplicated ids are summed before the sgd update
+    expected = values[0].copy()
+    for i in range(batch_size):
+        expected[i] -= learning_rate * grads[0][ids == ids[i]].sum(axis=0)
+    test_case.assertTrue(np.allclose(values[1], expected, rtol=1e-4, atol=1e-4))
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestOneEmbeddingCpu(flow.unittest.TestCase):
+    def test_cpu_embedding_train(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["cache_budget_mb"] = [0, 8]
+        arg_dict["batch_size"] = [1, 128]
+        for arg in GenArgDict(arg_dict):
+            _test_cpu_embedding_train(test_case, **arg)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -28,7 +28,7 @@ from oneflow.nn.parameter import Parameter
 
 
 def compare_with_numpy_sgd(
-    test_case, momentum, weight_decay, scale, learning_rate, train_iters,
+    test_case, device, momentum, weight_decay, scale, learning_rate, train_iters,
 ):
 
     num_rows = 500
@@ -49,14 +49,14 @@ def compare_with_numpy_sgd(
 
     def sgd_by_oneflow():
         unique_embeddings_tensor = flow.tensor(init_value, requires_grad=False).to(
-            "cuda"
+            device
         )
         lr_tensor = flow.tensor(
             np.array(learning_rate).reshape(1,).astype(np.float32)
-        ).to("cuda")
+        ).to(device)
         down_scale_by_tensor = flow.tensor(
             np.array(down_scale_by).astype(np.float32)
-        ).to("cuda")
+        ).to(device)
 
         def train_one_iter(num_valid, unique_embeddings, embedding_grad, skip_if):
             return flow._C.one_embedding_sgd_update(
@@ -74,11 +74,11 @@ def compare_with_numpy_sgd(
         for i in range(train_iters):
             num_valid_tensor = flow.tensor(
                 np.array(num_valid_seq[i]).reshape(1,).astype(np.int32)
-            ).to("cuda")
-            grad_tensor = flow.tensor(random_grad_seq[i]).to("cuda")
+            ).to(device)
+            grad_tensor = flow.tensor(random_grad_seq[i]).to(device)
             skip_if_tensor = flow.tensor(
                 np.array(skip_if_seq[i]).reshape(1,).astype(np.int64)
-            ).to("cuda")
+            ).to(device)
             updated_tensor = train_one_iter(
                 num_valid_tensor, unique_embeddings_tensor, grad_tensor, skip_if_tensor
             )
@@ -129,11 +129,13 @@ def compare_with_numpy_sgd(
         )
 
 
-@unittest.skipIf(os.getenv("ONEFLOW_TEST_CPU_ONLY"), "only test cpu cases")
 @flow.unittest.skip_unless_1n1d()
 class TestOptimizers(flow.unittest.TestCase):
     def test_one_embedding_sgd(test_case):
         arg_dict = OrderedDict()
+        arg_dict["device"] = ["cuda", "cpu"]
+        if os.getenv("ONEFLOW_TEST_CPU_ONLY"):
+            arg_dict["device"] = ["cpu"]
         arg_dict["momentum"] = [0, 0.9]
         arg_dict["weight_decay"] = [0, 0.1]
         arg_dict["scale"] = [1, 0.1]
@@ -0,0 +1,93 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+from oneflow.test_utils.test_util import GenArgList
+
+import oneflow as flow
+from oneflow.nn.parameter import Parameter
+
+
+def _train(device, optim_cls, options, init_values, grads_seq):
+    params = [
+        Parameter(flow.tensor(value, device=flow.device(device)))
+        for value in init_values
+    ]
+    optim = optim_cls(params, **options)
+    for grads in grads_seq:
+        for param, grad in zip(params, grads):
+            # Leave the grad of one param as None in some iters.
+            param.grad = None if grad is None else flow.tensor(grad, device=device)
+        optim.step()
+        optim.zero_grad(set_to_none=True)
+    return [param.numpy() for param in params]
+
+
+def compare_foreach_with_per_param(test_case, device, optim_cls, options):
+    shapes = [(10,), (3, 4), (1,), (2, 3, 5)]
+    init_values = [np.random.uniform(size=shape).astype(np.float32) for shape in shapes]
+    grads_seq = []
+    for i in range(6):
+        grads = [np.random.uniform(size=shape).astype(np.float32) for shape in shapes]
+        if i % 2 == 1:
+            grads[1] = None
+        grads_seq.append(grads)
+    expected = _train(device, optim_cls, options, init_values, grads_seq)
+    foreach_options = dict(options, foreach=True)
+    actual = _train(device, optim_cls, foreach_options, init_values, grads_seq)
+    for x, y in zip(expected, actual):
+        test_case.assertTrue(np.allclose(x, y, rtol=1e-5, atol=1e-5))
+
+
+@flow.unittest.skip_unless_1n1d()
+class TestForeachOptimizers(flow.unittest.TestCase):
+    def test_foreach_sgd(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        arg_dict["optim_cls"] = [flow.optim.SGD]
+        arg_dict["options"] = [
+            {"lr": 0.1},
+            {"lr": 0.1, "momentum": 0.9, "weight_decay": 0.1},
+        ]
+        for arg in GenArgList(arg_dict):
+            compare_foreach_with_per_param(test_case, *arg)
+
+    def test_foreach_adam(test_case):
+        arg_dict = OrderedDict()
+        arg_dict["device"] = ["cpu", "cuda"]
+        arg_dict["optim_cls"] = [flow.optim.Adam, flow.optim.AdamW]
+        arg_dict["options"] = [
+            {"lr": 1e-3},
+            {"lr": 1e-3, "weight_decay": 0.1, "do_bias_correction": False},
+        ]
+        for arg in GenArgList(arg_dict):
+            compare_foreach_with_per_param(test_case, *arg)
+
+    def test_foreach_state_dict(test_case):
+        x = Parameter(flow.randn(3, 4))
+        adam = flow.optim.Adam([x], lr=1e-3, foreach=True)
+        x.grad = flow.ones(3, 4)
+        adam.step()
+        state = adam.state_dict()["state"][0]
+        test_case.assertEqual(state["exp_avg"].shape, x.shape)
+        test_case.assertEqual(state["exp_avg_sq"].shape, x.shape)
+
+
+if __name__ == "__main__":
+    unittest.main()
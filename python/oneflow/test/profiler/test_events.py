@@ -47,6 +47,79 @@ class TestEventAndEvents(flow.unittest.TestCase):
         test_case.assertEqual(Events(events_json), events)
         test_case.assertEqual(Events(events_json).key_averages(), events_avg)
 
+    def test_instruction_events(test_case):
+        events_json = json.dumps(
+            [
+                {"name": "relu", "cpu_time": 10, "input_shapes": "-", "type": 1},
+                {"name": "relu:Call", "cpu_time": 12, "input_shapes": "-", "type": 2},
+            ]
+        )
+        events = Events(events_json)
+        test_case.assertEqual(events.key_averages(), [Event("relu", 10, 10, 1, "-", 1)])
+        test_case.assertEqual(len(events.key_averages(include_instructions=True)), 2)
+        test_case.assertNotIn("relu:Call", events.table())
+        test_case.assertIn("relu:Call", events.table(include_instructions=True))
+        # the chrome trace keeps them
+        test_case.assertEqual(len(events), 2)
+
+    def test_chrome_trace(test_case):
+        events_json = json.dumps(
+            [
+                {
+                    "name": "conv2d",
+                    "cpu_time": 2,
+                    "input_shapes": "[(2,3,32,32)]",
+                    "type": 1,
+                    "started_at": 11000,
+                    "finished_at": 13000,
+                    "thread_id": 7,
+                    "stream_id": "cpu:0",
+                    "depth": 1,
+                },
+                {
+                    "name": "forward",
+                    "cpu_time": 5,
+                    "input_shapes": "-",
+                    "type": 0,
+                    "started_at": 10000,
+                    "finished_at": 15000,
+                    "thread_id": 7,
+                    "stream_id": "",
+                    "depth": 0,
+                },
+            ]
+        )
+        trace = Events(events_json).chrome_trace(pid=0)
+        test_case.assertEqual(
+            trace["traceEvents"],
+            [
+                {
+                    "name": "forward",
+                    "cat": "custom",
+                    "ph": "X",
+                    "ts": 0.0,
+                    "dur": 5.0,
+                    "pid": 0,
+                    "tid": 7,
+                    "args": {"depth": 0},
+                },
+                {
+                    "name": "conv2d",
+                    "cat": "kernel",
+                    "ph": "X",
+                    "ts": 1.0,
+                    "dur": 2.0,
+                    "pid": 0,
+                    "tid": 7,
+                    "args": {
+                        "depth": 1,
+                        "input_shapes": "[(2,3,32,32)]",
+                        "stream_id": "cpu:0",
+                    },
+                },
+            ],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
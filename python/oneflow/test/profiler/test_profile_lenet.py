@@ -13,6 +13,9 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import os
+import json
+import tempfile
 import unittest
 import oneflow.unittest
 import oneflow as flow
@@ -80,6 +83,22 @@ class TestProfileLenet(flow.unittest.TestCase):
         test_case.assertIsNotNone(get_event(events, "lenet_forward_total_time"))
         test_case.assertIsNotNone(get_event(events, "lenet_backward_total_time"))
 
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_path = os.path.join(tmp_dir, "trace.json")
+            prof.export_chrome_trace(trace_path)
+            with open(trace_path) as f:
+                trace_events = json.load(f)["traceEvents"]
+        conv_trace_events = [e for e in trace_events if e["name"] == "conv2d"]
+        test_case.assertEqual(len(conv_trace_events), 2)
+        for e in conv_trace_events:
+            test_case.assertEqual(e["ph"], "X")
+            test_case.assertEqual(e["cat"], "kernel")
+            test_case.assertGreater(e["dur"], 0)
+            # Kernels run inside the vm instruction which launches them.
+            test_case.assertEqual(e["args"]["stream_id"], "cpu:0")
+            test_case.assertGreater(e["args"]["depth"], 0)
+        test_case.assertTrue(any(e["cat"] == "instruction" for e in trace_events))
+
 
 if __name__ == "__main__":
     unittest.main()
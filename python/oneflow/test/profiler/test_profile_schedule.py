@@ -0,0 +1,88 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import tempfile
+import unittest
+import oneflow.unittest
+import oneflow as flow
+import oneflow.profiler
+from oneflow.profiler import ProfilerAction
+
+
+def count_events(events, name: str):
+    return sum(1 for e in events if e.name == name)
+
+
+class TestProfileSchedule(flow.unittest.TestCase):
+    def test_schedule(test_case):
+        schedule = oneflow.profiler.schedule(
+            wait=1, warmup=1, active=2, repeat=2, skip_first=1
+        )
+        N = ProfilerAction.NONE
+        W = ProfilerAction.WARMUP
+        R = ProfilerAction.RECORD
+        S = ProfilerAction.RECORD_AND_SAVE
+        test_case.assertEqual(
+            [schedule(step) for step in range(11)], [N, N, W, R, S, N, W, R, S, N, N],
+        )
+        with test_case.assertRaises(ValueError):
+            oneflow.profiler.schedule(wait=0, warmup=0, active=0)
+
+    def test_scheduled_profile(test_case):
+        x = flow.randn(2, 3)
+        windows = []
+
+        def on_trace_ready(prof):
+            windows.append((prof.step_num, count_events(prof.events(), "relu")))
+
+        with oneflow.profiler.profile(
+            schedule=oneflow.profiler.schedule(wait=2, warmup=1, active=2, repeat=2),
+            on_trace_ready=on_trace_ready,
+        ) as prof:
+            for _ in range(12):
+                with oneflow.profiler.record_function("step"):
+                    flow.relu(x)
+                prof.step()
+                test_case.assertEqual(
+                    oneflow._oneflow_internal.profiler.IsProfilerEnabled(),
+                    prof.current_action != ProfilerAction.NONE,
+                )
+        # warmup steps and idle steps are not recorded
+        test_case.assertEqual(windows, [(5, 2), (10, 2)])
+        test_case.assertEqual(count_events(prof.events(), "step"), 2)
+        test_case.assertFalse(oneflow._oneflow_internal.profiler.IsProfilerEnabled())
+
+    def test_chrome_trace_handler(test_case):
+        x = flow.randn(2, 3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with oneflow.profiler.profile(
+                schedule=oneflow.profiler.schedule(wait=1, warmup=0, active=1),
+                on_trace_ready=oneflow.profiler.chrome_trace_handler(
+                    tmp_dir, worker_name="worker", max_files=2
+                ),
+            ) as prof:
+                for _ in range(10):
+                    flow.relu(x)
+                    prof.step()
+            trace_steps = sorted(
+                int(f.split(".")[1][len("step") :]) for f in os.listdir(tmp_dir)
+            )
+            # only the two newest of the five windows are kept
+            test_case.assertEqual(trace_steps, [8, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
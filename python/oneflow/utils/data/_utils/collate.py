@@ -22,7 +22,11 @@ static methods.
 import re
 import collections
 
+import numpy as np
+
 import oneflow as flow
+from oneflow.multiprocessing.reductions import empty_shared_ndarray
+from . import worker
 
 
 string_classes = (str, bytes)
@@ -71,13 +75,224 @@ default_convert_err_msg_format = (
 )
 
 
+def _new_batch_buffer(shape, dtype):
+    # In a worker process the batch is written straight into a shared memory
+    # slab, so sending it to the main process does not copy it again.
+    if worker.get_worker_info() is not None:
+        return empty_shared_ndarray(shape, dtype)
+    return np.empty(shape, dtype=dtype)
+
+
+def _stack_into_buffer(arrays):
+    elem = arrays[0]
+    out = _new_batch_buffer((len(arrays),) + elem.shape, elem.dtype)
+    np.stack(arrays, out=out)
+    return flow.from_numpy(out)
+
+
+class _SchemaMismatch(Exception):
+    pass
+
+
+# Leaf kinds of a `_CollateSchema`.
+_LEAF_ARRAY = 0  # numpy arrays, numpy scalars and cpu local tensors
+_LEAF_FLOAT = 1
+_LEAF_INT = 2  # also covers bool, the exact type is recorded
+_LEAF_STRING = 3
+_LEAF_OTHER = 4  # collated column-wise by the generic recursive path
+
+# Node kinds of a `_CollateSchema`.
+_NODE_LEAF = 0
+_NODE_MAPPING = 1
+_NODE_NAMEDTUPLE = 2
+_NODE_SEQUENCE = 3
+
+
+class _CollateSchema(object):
+    r"""Nested layout of a sample, inferred from the first sample of a batch.
+
+    Samples are flattened into one column per leaf and every array column is
+    copied with a single ``np.stack`` into one preallocated buffer, instead
+    of creating a tensor per sample and stacking those.
+    """
+
+    def __init__(self, elem):
+        self.leaves = []
+        self.root = self._build(elem)
+
+    def _leaf(self, kind, *spec):
+        self.leaves.append((kind,) + spec)
+        return (_NODE_LEAF, len(self.leaves) - 1)
+
+    def _build(self, elem):
+        elem_type = type(elem)
+        if isinstance(elem, (flow.Tensor, flow._oneflow_internal.Tensor)):
+            if elem.is_local and not elem.is_cuda and not elem.requires_grad:
+                return self._leaf(
+                    _LEAF_ARRAY, True, tuple(elem.shape), elem.dtype, elem.numpy().dtype
+                )
+        elif isinstance(elem, (np.ndarray, np.generic)) and not isinstance(
+            elem, (np.str_, np.bytes_)
+        ):
+            if np_str_obj_array_pattern.search(elem.dtype.str) is None:
+                return self._leaf(
+                    _LEAF_ARRAY, False, elem.shape, elem.dtype, elem.dtype
+                )
+        elif elem_type is float:
+            return self._leaf(_LEAF_FLOAT)
+        elif elem_type is int or elem_type is bool:
+            return self._leaf(_LEAF_INT, elem_type)
+        elif isinstance(elem, string_classes):
+            return self._leaf(_LEAF_STRING)
+        elif isinstance(elem, collections.abc.Mapping):
+            keys = tuple(elem.keys())
+            return (_NODE_MAPPING, keys, [self._build(elem[key]) for key in keys])
+        elif isinstance(elem, tuple) and hasattr(elem, "_fields"):  # namedtuple
+            return (_NODE_NAMEDTUPLE, elem_type, [self._build(e) for e in elem])
+        elif isinstance(elem, collections.abc.Sequence):
+            return (_NODE_SEQUENCE, len(elem), [self._build(e) for e in elem])
+        return self._leaf(_LEAF_OTHER)
+
+    def _flatten(self, node, sample, columns):
+        kind, spec = node[0], node[1]
+        if kind == _NODE_LEAF:
+            leaf = self.leaves[spec]
+            leaf_kind = leaf[0]
+            if leaf_kind == _LEAF_ARRAY:
+                is_tensor, shape, dtype = leaf[1], leaf[2], leaf[3]
+                if is_tensor:
+                    if not (
+                        isinstance(sample, (flow.Tensor, flow._oneflow_internal.Tensor))
+                        and sample.dtype == dtype
+                        and tuple(sample.shape) == shape
+                        and sample.is_local
+                        and not sample.is_cuda
+                        and not sample.requires_grad
+                    ):
+                        raise _SchemaMismatch
+                    sample = sample.numpy()
+                elif not (
+                    isinstance(sample, (np.ndarray, np.generic))
+                    and sample.dtype == dtype
+                    and sample.shape == shape
+                ):
+                    raise _SchemaMismatch
+            elif leaf_kind == _LEAF_FLOAT:
+                if type(sample) is not float:
+                    raise _SchemaMismatch
+            elif leaf_kind == _LEAF_INT:
+                if type(sample) is not leaf[1]:
+                    raise _SchemaMismatch
+            elif leaf_kind == _LEAF_STRING:
+                if not isinstance(sample, string_classes):
+                    raise _SchemaMismatch
+            columns[spec].append(sample)
+        elif kind == _NODE_MAPPING:
+            if not isinstance(sample, collections.abc.Mapping) or len(sample) != len(
+                spec
+            ):
+                raise _SchemaMismatch
+            try:
+                for key, child in zip(spec, node[2]):
+                    self._flatten(child, sample[key], columns)
+            except KeyError:
+                raise _SchemaMismatch
+        elif kind == _NODE_NAMEDTUPLE:
+            if type(sample) is not spec:
+                raise _SchemaMismatch
+            for e, child in zip(sample, node[2]):
+                self._flatten(child, e, columns)
+        else:
+            if (
+                not isinstance(sample, collections.abc.Sequence)
+                or isinstance(sample, string_classes)
+                or len(sample) != spec
+            ):
+                raise _SchemaMismatch
+            for e, child in zip(sample, node[2]):
+                self._flatten(child, e, columns)
+
+    def _collate_leaf(self, leaf, column):
+        leaf_kind = leaf[0]
+        if leaf_kind == _LEAF_ARRAY:
+            out = _new_batch_buffer((len(column),) + leaf[2], leaf[4])
+            np.stack(column, out=out)
+            return flow.from_numpy(out)
+        elif leaf_kind == _LEAF_FLOAT:
+            return flow.from_numpy(np.array(column, dtype=np.float64))
+        elif leaf_kind == _LEAF_INT:
+            return flow.from_numpy(
+                np.array(column, dtype=np.bool_ if leaf[1] is bool else np.int64)
+            )
+        elif leaf_kind == _LEAF_STRING:
+            return column
+        return _default_collate(column)
+
+    def _unflatten(self, node, outputs):
+        kind = node[0]
+        if kind == _NODE_LEAF:
+            return outputs[node[1]]
+        elif kind == _NODE_MAPPING:
+            return {
+                key: self._unflatten(child, outputs)
+                for key, child in zip(node[1], node[2])
+            }
+        elif kind == _NODE_NAMEDTUPLE:
+            return node[1](*(self._unflatten(child, outputs) for child in node[2]))
+        return [self._unflatten(child, outputs) for child in node[2]]
+
+    def collate(self, batch):
+        columns = [[] for _ in self.leaves]
+        for sample in batch:
+            self._flatten(self.root, sample, columns)
+        outputs = [
+            self._collate_leaf(leaf, column)
+            for leaf, column in zip(self.leaves, columns)
+        ]
+        return self._unflatten(self.root, outputs)
+
+
+# Schemas are cached across batches, keyed by the type of the top level sample.
+_schema_cache = {}
+_SCHEMA_CACHE_SIZE = 32
+
+
 def default_collate(batch):
     r"""Puts each data field into a tensor with outer dimension batch size"""
 
+    if len(batch) == 0:
+        return _default_collate(batch)
+    key = type(batch[0])
+    schema = _schema_cache.get(key)
+    if schema is not None:
+        try:
+            return schema.collate(batch)
+        except _SchemaMismatch:
+            pass
+    # The layout changed or was never seen, infer it from this batch.
+    schema = _CollateSchema(batch[0])
+    if len(_schema_cache) >= _SCHEMA_CACHE_SIZE:
+        _schema_cache.clear()
+    _schema_cache[key] = schema
+    try:
+        return schema.collate(batch)
+    except _SchemaMismatch:
+        # Samples of this batch do not share one layout.
+        return _default_collate(batch)
+
+
+def _default_collate(batch):
     elem = batch[0]
     elem_type = type(elem)
     if isinstance(elem, (flow.Tensor, flow._oneflow_internal.Tensor)):
-        # TODO: tensor.storage()._new_shared(numel)
+        if (
+            worker.get_worker_info() is not None
+            and elem.is_local
+            and elem.device.type == "cpu"
+            and not elem.requires_grad
+            and all(b.dtype == elem.dtype and b.shape == elem.shape for b in batch)
+        ):
+            return _stack_into_buffer([b.numpy() for b in batch])
         return flow._C.stack(batch, dim=0)
     elif (
         elem_type.__module__ == "numpy"
@@ -89,7 +304,14 @@ def default_collate(batch):
             if np_str_obj_array_pattern.search(elem.dtype.str) is not None:
                 raise TypeError(default_collate_err_msg_format.format(elem.dtype))
 
-            return default_collate([flow.tensor(b) for b in batch])
+            if all(
+                isinstance(b, np.ndarray)
+                and b.dtype == elem.dtype
+                and b.shape == elem.shape
+                for b in batch
+            ):
+                return _stack_into_buffer(batch)
+            return _default_collate([flow.tensor(b) for b in batch])
         elif elem.shape == ():  # scalars
             return flow.tensor(batch)
     elif isinstance(elem, float):
@@ -99,9 +321,9 @@ def default_collate(batch):
     elif isinstance(elem, string_classes):
         return batch
     elif isinstance(elem, collections.abc.Mapping):
-        return {key: default_collate([d[key] for d in batch]) for key in elem}
+        return {key: _default_collate([d[key] for d in batch]) for key in elem}
     elif isinstance(elem, tuple) and hasattr(elem, "_fields"):  # namedtuple
-        return elem_type(*(default_collate(samples) for samples in zip(*batch)))
+        return elem_type(*(_default_collate(samples) for samples in zip(*batch)))
     elif isinstance(elem, collections.abc.Sequence):
         # check to make sure that the elements in batch have consistent size
         it = iter(batch)
@@ -109,6 +331,6 @@ def default_collate(batch):
         if not all(len(elem) == elem_size for elem in it):
             raise RuntimeError("each element in list of batch should be of equal size")
         transposed = zip(*batch)
-        return [default_collate(samples) for samples in transposed]
+        return [_default_collate(samples) for samples in transposed]
 
     raise TypeError(default_collate_err_msg_format.format(elem_type))
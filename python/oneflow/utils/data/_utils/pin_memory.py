@@ -0,0 +1,93 @@
+"""
+Copyright 2020 The OneFlow Authors. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+r""""Contains definitions of the methods used by the _BaseDataLoaderIter to put
+fetched tensors into pinned memory.
+
+These **needs** to be in global scope since Py2 doesn't support serializing
+static methods.
+"""
+import collections
+import queue
+
+import oneflow as flow
+from . import MP_STATUS_CHECK_INTERVAL
+from .worker import ExceptionWrapper
+
+
+string_classes = (str, bytes)
+
+
+def _pin_memory_loop(in_queue, out_queue, done_event):
+    # See NOTE [ Data Loader Multiprocessing Shutdown Logic ] for details on the
+    # logic of this function.
+    def do_one_step():
+        try:
+            r = in_queue.get(timeout=MP_STATUS_CHECK_INTERVAL)
+        except queue.Empty:
+            return
+        idx, data = r
+        if not done_event.is_set() and not isinstance(data, ExceptionWrapper):
+            try:
+                data = pin_memory(data)
+            except Exception:
+                data = ExceptionWrapper(where="in pin memory thread")
+            r = (idx, data)
+        while not done_event.is_set():
+            try:
+                out_queue.put(r, timeout=MP_STATUS_CHECK_INTERVAL)
+                break
+            except queue.Full:
+                continue
+
+    # See NOTE [ Data Loader Multiprocessing Shutdown Logic ] for details on the
+    # logic of this function.
+    while not done_event.is_set():
+        # Make sure that we don't preserve any object from one iteration
+        # to the next
+        do_one_step()
+
+
+def pin_memory(data):
+    r"""Copies every tensor in ``data`` into page-locked host memory.
+
+    Page-locked blocks come from the caching host allocator, so steady-state
+    batches reuse memory released by earlier ones instead of registering new
+    pages with the driver.
+    """
+    if isinstance(data, (flow.Tensor, flow._oneflow_internal.Tensor)):
+        return data.pin_memory()
+    elif isinstance(data, string_classes):
+        return data
+    elif isinstance(data, collections.abc.Mapping):
+        try:
+            return type(data)({k: pin_memory(sample) for k, sample in data.items()})
+        except TypeError:
+            # The mapping type may not support `__init__(iterable)`.
+            return {k: pin_memory(sample) for k, sample in data.items()}
+    elif isinstance(data, tuple) and hasattr(data, "_fields"):  # namedtuple
+        return type(data)(*(pin_memory(sample) for sample in data))
+    elif isinstance(data, tuple):
+        return [pin_memory(sample) for sample in data]
+    elif isinstance(data, collections.abc.Sequence):
+        try:
+            return type(data)([pin_memory(sample) for sample in data])
+        except TypeError:
+            # The sequence type may not support `__init__(iterable)` (e.g., `range`).
+            return [pin_memory(sample) for sample in data]
+    elif hasattr(data, "pin_memory"):
+        return data.pin_memory()
+    else:
+        return data
@@ -26,6 +26,7 @@ from dataclasses import dataclass
 from typing import Union
 from oneflow.multiprocessing import _prctl_pr_set_pdeathsig  # type: ignore[attr-defined]
 from oneflow.multiprocessing import unlink_all_shared_memory
+from oneflow.multiprocessing.reductions import retire_shared_memory_slabs
 import signal
 
 import oneflow as flow
@@ -290,6 +291,7 @@ def _worker_loop(
     try:
 
         def cleanup_shm_at_exit(num, frame):
+            retire_shared_memory_slabs()
             unlink_all_shared_memory()
             # Use os._exit() to handle the exit of the subprocess to avoid share memory leaks
             # caused by the subprocess continuing for a period of time after the parent process ends.
@@ -411,5 +413,7 @@ def _worker_loop(
         data_queue.close()
 
     # Python subprocess will be exited by os._exit(), which skips destructors of
-    # C++ objects, so we should explicitly call unlink_all_shared_memory() here
+    # C++ objects, so we should explicitly call unlink_all_shared_memory() here.
+    # Slabs still mapped by the main process are released there once retired.
+    retire_shared_memory_slabs()
     unlink_all_shared_memory()
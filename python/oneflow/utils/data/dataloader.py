@@ -27,6 +27,7 @@ import multiprocessing as python_multiprocessing
 import oneflow.multiprocessing as multiprocessing
 import oneflow as flow
 from oneflow.utils.data import _utils
+from oneflow.multiprocessing.reductions import release_retired_shared_memory_slabs
 
 
 class ExceptionWrapper(object):
@@ -153,6 +154,11 @@ class DataLoader(Generic[T_co]):
         collate_fn (callable, optional): merges a list of samples to form a
             mini-batch of Tensor(s).  Used when using batched loading from a
             map-style dataset.
+        pin_memory (bool, optional): If ``True``, the data loader will copy Tensors
+            into page-locked host memory before returning them, which makes the
+            following copy to CUDA devices faster and asynchronous. Batches produced
+            by worker processes are collated straight into recycled shared memory, so
+            the only copy on the way is the one into pinned memory. (default: ``False``)
         drop_last (bool, optional): set to ``True`` to drop the last incomplete batch,
             if the dataset size is not divisible by the batch size. If ``False`` and
             the size of dataset is not divisible by the batch size, then the last batch
@@ -191,6 +197,7 @@ class DataLoader(Generic[T_co]):
     dataset: Dataset[T_co]
     batch_size: Optional[int]
     num_workers: int
+    pin_memory: bool
     drop_last: bool
     timeout: float
     sampler: Sampler
@@ -207,6 +214,7 @@ class DataLoader(Generic[T_co]):
         batch_sampler: Optional[Sampler[Sequence[int]]] = None,
         num_workers: int = 0,
         collate_fn: Optional[_collate_fn_t] = None,
+        pin_memory: bool = False,
         drop_last: bool = False,
         timeout: float = 0,
         worker_init_fn: Optional[_worker_init_fn_t] = None,
@@ -240,6 +248,7 @@ class DataLoader(Generic[T_co]):
 
         self.dataset = dataset
         self.prefetch_factor = prefetch_factor
+        self.pin_memory = pin_memory
         self.timeout = timeout
         self.worker_init_fn = worker_init_fn
         self.multiprocessing_context = multiprocessing_context
@@ -519,7 +528,7 @@ class _BaseDataLoaderIter(object):
         self._index_sampler = loader._index_sampler
         self._num_workers = loader.num_workers
         self._prefetch_factor = loader.prefetch_factor
-        self._pin_memory = False
+        self._pin_memory = loader.pin_memory
         self._timeout = loader.timeout
         self._collate_fn = loader.collate_fn
         self._sampler_iter = iter(self._index_sampler)
@@ -590,9 +599,10 @@ class _SingleProcessDataLoaderIter(_BaseDataLoaderIter):
 
     def _next_data(self):
         index = self._next_index()  # may raise StopIteration
+        data = self._dataset_fetcher.fetch(index)  # may raise StopIteration
         if self._pin_memory:
-            raise NotImplementedError("Dataloader pin memory is not support yet!")
-        return self._dataset_fetcher.fetch(index)
+            data = _utils.pin_memory.pin_memory(data)
+        return data
 
 
 class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
@@ -964,7 +974,6 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
             self._workers.append(w)
 
         if self._pin_memory:
-            raise NotImplementedError("Dataloader pin memory is not support yet!")
             self._pin_memory_thread_done_event = threading.Event()
 
             # Queue is not type-annotated
@@ -974,7 +983,6 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 args=(
                     self._worker_result_queue,
                     self._data_queue,
-                    flow.cuda.current_device(),  # TODO:flow.cuda.current_device()
                     self._pin_memory_thread_done_event,
                 ),
             )
@@ -1263,6 +1271,9 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                     # wrong, we set a timeout and if the workers fail to join,
                     # they are killed in the `finally` block.
                     w.join(timeout=_utils.MP_STATUS_CHECK_INTERVAL)
+                # Exited workers have retired their shared memory slabs, drop
+                # the ones no batch refers to anymore.
+                release_retired_shared_memory_slabs()
                 for q in self._index_queues:
                     q.cancel_join_thread()
                     q.close()